@@ -1,133 +1,98 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
 import streamlit as st
 import streamlit.components.v1 as components
 
+from curriculum_graph import SvgCache, build_graph, direction_matches, directions_in, render_svg, table1_rows, to_dot
+from extract_cache import ExtractCache, cached_run_full_extract
+from plan_extract import result_from_dict
+from template_profiles import TemplateStore
+
 # 设置页面为宽屏模式
-st.set_page_config(layout="wide", page_title="2024级焊接专业完整课程逻辑图")
-
-st.title("2024级材料成型及控制工程（焊接方向）完整课程逻辑导图")
-st.caption("依据辽宁石油化工大学2024版人才培养方案绘制 [cite: 1, 6, 11]")
-
-# 完整 Mermaid 脚本：包含 8 个学期及全部核心节点
-mermaid_code = """
-graph LR
-    %% 第一学年：基础与工具
-    subgraph S1 [第1学期 - 11门]
-        C1_1[大学外语1★]
-        C1_2[高等数学D1★]
-        C1_3[数据科学与智能技术概论]
-        C1_4[工程制图与CAD II★]
-        C1_9[思想道德与法治★]
-        C1_11[形势与政策1]
-    end
-
-    subgraph S2 [第2学期 - 13门]
-        C2_2[高等数学D2★]
-        C2_3[大学物理F1★]
-        C2_5[Python语言程序设计★]
-        C2_6[普通化学]
-        C2_7[二维材料成型计算机绘图]
-        C2_11[中国近现代史纲要]
-        C2_13[形势与政策2]
-    end
-
-    %% 第二学年：学科转接
-    subgraph S3 [第3学期 - 14门]
-        C3_2[线性代数B★]
-        C3_3[大学物理F2★]
-        C3_5[材料物理化学★]
-        C3_6[工程力学B2★]
-        C3_9[三维材料成型计算机绘图]
-        C3_11[工程训练B]
-        C3_14[形势与政策3]
-    end
-
-    subgraph S4 [第4学期 - 15门]
-        C4_2[概率论与数理统计B★]
-        C4_5[电工与电子技术C★]
-        C4_7[材料科学基础★]
-        C4_8[热流体★]
-        C4_13[马克思主义基本原理★]
-        C4_15[形势与政策4]
-    end
-
-    %% 第三学年：专业核心
-    subgraph S5 [第5学期 - 12门]
-        C5_3[材料成型智能控制基础★]
-        C5_4[材料成型方法及工艺★]
-        C5_5[工程材料及热处理★]
-        C5_8[工程材料冷加工基础★]
-        C5_9[机械设计基础★]
-        C5_12[认识实习★]
-        C5_13[习近平新时代思想概论]
-    end
-
-    subgraph S6 [第6学期 - 12门]
-        C6_4[焊接方法及工艺★]
-        C6_5[焊接质量检验与评价★]
-        C6_7[焊接冶金与金属焊接性★]
-        C6_8[焊接结构★]
-        C6_9[焊接结构课程设计★]
-        C6_10[焊接原理及工艺实验★]
-        C6_14[大学生就业指导]
-    end
-
-    %% 第四学年：工程出口
-    subgraph S7 [第7学期 - 10门]
-        C7_3[焊接工艺课程设计★]
-        C7_6[工业机器人★]
-        C7_11[生产实习★]
-        C7_2[增材制造技术]
-        C7_4[绿色智能焊接新技术]
-        C7_5[绿色智能交叉焊接综合实验]
-    end
-
-    subgraph S8 [第8学期 - 2门]
-        C8_1[毕业设计★终极产出]
-    end
-
-    %% 核心逻辑关系连线 (根据培养方案逻辑流还原)
-    C1_2 --> C2_2 --> C3_2 --> C4_2 --> C5_1
-    C1_4 --> C2_7 --> C3_9 --> C5_9
-    C2_3 --> C3_3 --> C4_5 --> C5_3
-    C2_6 --> C3_5 --> C4_7 --> C5_5
-    C4_7 --> C6_7
-    C3_6 --> C5_9 --> C6_8
-    C5_4 --> C6_4 --> C7_3
-    C5_3 --> C6_4
-    C6_8 --> C6_9 --> C8_1
-    C5_12 --> C7_11 --> C8_1
-    C6_4 & C6_7 & C6_8 --> C7_3 --> C8_1
-    C7_6 --> C8_1
-
-    %% 样式美化
-    style C8_1 fill:#f96,stroke:#333,stroke-width:4px
-    style C4_7 fill:#bbf,stroke:#333
-    style C6_4 fill:#bbf,stroke:#333
-    style C6_8 fill:#bbf,stroke:#333
-"""
-
-# 定义渲染函数，修复了之前导致报错的 f-string 语法
-def render_mermaid(code):
-    components.html(
-        f"""
-        <div class="mermaid">
-            {code}
-        </div>
-        <script type="module">
-            import mermaid from 'https://cdn.jsdelivr.net/npm/mermaid@10/dist/mermaid.esm.min.mjs';
-            mermaid.initialize({{ 
-                startOnLoad: true,
-                theme: 'neutral',
-                flowchart: {{ 
-                    useMaxWidth: false, 
-                    htmlLabels: true,
-                    curve: 'basis' 
-                }}
-            }});
-        </script>
-        """,
-        height=1200, 
-        scrolling=True
-    )
-
-render_mermaid(mermaid_code)
\ No newline at end of file
+st.set_page_config(layout="wide", page_title="课程逻辑图（自动生成）")
+
+st.title("培养方案课程逻辑导图（由附表1 教学计划表自动生成）")
+st.caption("按上课学期分层；连线来自先修课程列、同名系列课与专业先修规则。服务端 graphviz 渲染，结果按图内容哈希缓存，离线可用。")
+
+@st.cache_resource
+def get_extract_cache() -> ExtractCache:
+    return ExtractCache()
+
+@st.cache_resource
+def get_svg_cache() -> SvgCache:
+    """进程级单例：SVG 缓存（内存 + 磁盘）。"""
+    return SvgCache()
+
+@st.cache_resource
+def get_template_store() -> TemplateStore:
+    """进程级单例：版式模板库（按附表标题行确定各页属于哪个附表，只取附表1 建图）。"""
+    return TemplateStore()
+
+def load_rows(name: str, data: bytes) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    支持三种输入：
+    - 培养方案 PDF：走确定性抽取（命中磁盘缓存时秒级返回）
+    - 确定性抽取导出的 JSON（含 tables）
+    - LLM 全量抽取 JSON（含 table1）
+    返回 (附表1 课程行, 标题)。
+    """
+    title = name.rsplit(".", 1)[0]
+    if name.lower().endswith(".pdf"):
+        result, _ = cached_run_full_extract(get_extract_cache(), data, templates=get_template_store())
+        return table1_rows(result), title
+    d = json.loads(data.decode("utf-8"))
+    if isinstance(d, dict) and "tables" in d:
+        return table1_rows(result_from_dict(d)), title
+    if isinstance(d, dict) and "table1" in d:
+        return list(d.get("table1") or []), title
+    raise ValueError("无法识别的 JSON：需要确定性抽取结果（tables）或 LLM 抽取结果（table1）")
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_dot(rows: List[Dict[str, Any]], title: str, direction: str, compact: bool) -> Tuple[str, int, int]:
+    """课程行 → DOT 源码（同样的输入直接命中缓存）。返回 (dot, 节点数, 边数)。"""
+    if direction:
+        rows = [r for r in rows if direction_matches(r.get("专业方向"), direction)]
+    g = build_graph(rows, title=title)
+    if compact:
+        g = g.connected_or_core()
+    return to_dot(g), len(g.nodes), g.edge_count()
+
+with st.sidebar:
+    st.markdown("## 数据来源")
+    up = st.file_uploader("上传培养方案 PDF 或抽取结果 JSON", type=["pdf", "json"])
+    compact = st.checkbox("只显示学位课与有连线的课程", value=True)
+
+if up is None:
+    st.info("上传培养方案 PDF，或主页面导出的抽取结果 JSON，即可生成课程逻辑图。")
+    st.stop()
+
+try:
+    with st.spinner("正在读取教学计划表…"):
+        rows, title = load_rows(up.name, up.getvalue())
+except Exception as e:
+    st.error(f"读取失败：{e}")
+    st.stop()
+
+if not rows:
+    st.warning("未在文件中找到附表1 课程行（需含“课程名称”列）。")
+    st.stop()
+
+dirs = directions_in(rows)
+direction = ""
+if dirs:
+    with st.sidebar:
+        direction = st.selectbox("专业方向", ["（全部）"] + dirs)
+    direction = "" if direction == "（全部）" else direction
+
+dot, n_nodes, n_edges = build_dot(rows, title + (f"（{direction}方向）" if direction else ""), direction, compact)
+st.caption(f"{n_nodes} 门课程，{n_edges} 条先修关系")
+
+svg: Optional[str] = render_svg(dot, get_svg_cache())
+if svg is not None:
+    components.html(f'<div style="overflow:auto">{svg}</div>', height=900, scrolling=True)
+    st.download_button("下载 SVG", data=svg.encode("utf-8"), file_name=f"{title}_课程逻辑图.svg", mime="image/svg+xml")
+else:
+    # 服务器未安装 graphviz 可执行文件：交给前端内置的 graphviz 渲染（同样无需外网）
+    st.graphviz_chart(dot, use_container_width=True)
+st.download_button("下载 DOT 源码", data=dot.encode("utf-8"), file_name=f"{title}_课程逻辑图.dot", mime="text/vnd.graphviz")
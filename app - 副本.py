@@ -9,615 +9,350 @@
 
 from __future__ import annotations
 
-import io
 import json
-import re
-import zipfile
-import hashlib
-from dataclasses import asdict, dataclass
-from datetime import datetime
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass, field
 from typing import Any, Dict, List, Optional, Tuple
 
-import numpy as np
 import pandas as pd
 import streamlit as st
-
-# 依赖：pdfplumber
-try:
-    import pdfplumber
-except Exception as e:
-    pdfplumber = None
-    st.error(f"缺少依赖 pdfplumber: {e}")
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from plan_extract import (
+    ExtractResult,
+    changed_pages,
+    clean_text,
+    table_to_df,
+)
+from extract_cache import ExtractCache, cached_run_full_extract
+from pdf_source import PdfInput, PdfSource
+from prefetch import PREFETCH_ENABLED, Prefetcher, wait_prefetched
+from session_store import ResultHandle, SessionResultStore
+from exporters import XLSX_MIME, export_df, safe_df_from_tablepack, tables_xlsx_file, tables_zip_file, xlsxwriter
+from pdf_backends import BACKENDS, DEFAULT_BACKEND, available_backends
+from plan_analytics import AnalyticsStore
+from plan_index import PlanIndex
+from support_matrix import SupportMatrix, expected_indicators
+from template_profiles import TemplateStore
+from table_types import TypedTable, checks_frame, credit_checks, required_credits, table_role, type_frame
+from profiling import RunProfiler, profiling_enabled_by_env
+from jobs import DONE, QUEUED, JobManager, QueueFullError
+
+# 依赖：pdfplumber / PyMuPDF（按需导入，见 pdf_backends）
+if not available_backends():
+    st.error("缺少 PDF 解析依赖（pdfplumber 或 PyMuPDF），无法抽取 PDF。")
 
 # ----------------------------
-# 基础工具
+# 导出功能
 # ----------------------------
-def sha256_bytes(data: bytes) -> str:
-    h = hashlib.sha256()
-    h.update(data)
-    return h.hexdigest()
-
-def clean_text(s: str) -> str:
-    if s is None:
-        return ""
-    s = str(s)
-    s = s.replace("\u00a0", " ")
-    s = re.sub(r"[ \t]+", " ", s)
-    return s.strip()
-
-def normalize_multiline(text: str) -> str:
-    """保留换行，做基础清理，便于正则分段。"""
-    if text is None:
-        return ""
-    text = str(text).replace("\r\n", "\n").replace("\r", "\n")
-    lines = [clean_text(ln) for ln in text.split("\n")]
-    out: List[str] = []
-    blank = 0
-    for ln in lines:
-        if ln.strip() == "":
-            blank += 1
-            if blank <= 2:
-                out.append("")
-        else:
-            blank = 0
-            out.append(ln)
-    return "\n".join(out).strip()
-
-def make_unique_columns(cols: List[str]) -> List[str]:
-    seen: Dict[str, int] = {}
-    out: List[str] = []
-    for c in cols:
-        c0 = clean_text(c) or "col"
-        if c0 not in seen:
-            seen[c0] = 1
-            out.append(c0)
-        else:
-            seen[c0] += 1
-            out.append(f"{c0}_{seen[c0]}")
-    return out
-
-def postprocess_table_df(df: pd.DataFrame) -> pd.DataFrame:
-    """表格后处理：去空白、去 NaN、合并格造成的空白做向下填充。"""
-    if df is None or df.empty:
-        return df
-
-    df = df.copy()
-    df = df.replace({None: ""}).fillna("")
-    for c in df.columns:
-        df[c] = df[c].astype(str).map(lambda x: clean_text(x))
-
-    # 1) 删除完全空行
-    mask_all_empty = df.apply(lambda r: all((clean_text(x) == "" for x in r.values.tolist())), axis=1)
-    df = df.loc[~mask_all_empty].reset_index(drop=True)
-
-    # 2) 向下填充（合并格常见列）
-    fill_down_keywords = ["课程体系", "课程模块", "课程性质", "课程类别", "类别", "模块", "环节", "学期", "方向"]
-    for c in df.columns:
-        if any(k in str(c) for k in fill_down_keywords):
-            last = ""
-            new_col = []
-            for v in df[c].tolist():
-                if v != "":
-                    last = v
-                    new_col.append(v)
-                else:
-                    new_col.append(last)
-            df[c] = new_col
+def build_json_bytes(result: ExtractResult) -> bytes:
+    """构建 JSON 导出文件"""
+    return json.dumps(asdict(result), ensure_ascii=False, indent=2).encode("utf-8")
 
-    return df
+# ----------------------------
+# 渲染缓存与分页
+# ----------------------------
+PAGE_SIZE_OPTIONS = [20, 50, 100, 200]
 
-def normalize_table(raw_table: List[List[Any]]) -> List[List[str]]:
-    """
-    pdfplumber.extract_tables() 返回 list[list[str|None]]
-    这里做基础清洗：去空行、补齐列数、去掉全空列
-    """
-    if not raw_table:
-        return []
-
-    rows = []
-    max_cols = 0
-    for r in raw_table:
-        if r is None:
-            continue
-        rr = [clean_text(c) for c in r]
-        # 跳过全空行
-        if all(c == "" for c in rr):
-            continue
-        rows.append(rr)
-        max_cols = max(max_cols, len(rr))
-
-    if not rows or max_cols == 0:
-        return []
-
-    # 补齐列数
-    for i in range(len(rows)):
-        if len(rows[i]) < max_cols:
-            rows[i] = rows[i] + [""] * (max_cols - len(rows[i]))
-
-    # 去掉全空列
-    keep_cols = []
-    for j in range(max_cols):
-        col = [rows[i][j] for i in range(len(rows))]
-        if any(c != "" for c in col):
-            keep_cols.append(j)
-
-    if not keep_cols:
-        return []
-
-    cleaned = [[row[j] for j in keep_cols] for row in rows]
-    return cleaned
-
-def table_to_df(cleaned_table: List[List[str]]) -> pd.DataFrame:
+@dataclass
+class RenderCache:
     """
-    尝试把第一行当表头；如果表头太差就用默认列名。
+    每个抽取结果对应一份 DataFrame 缓存（抽取完成后建立一次）。
+    DataFrame 在首次被查看时才物化，之后的 rerun 直接复用，
+    交互耗时不再随表格数量线性增长。
     """
-    if not cleaned_table or len(cleaned_table) == 0:
-        return pd.DataFrame()
-    
-    if len(cleaned_table) == 1:
-        # 只有一行，做单行df
-        return pd.DataFrame([cleaned_table[0]])
-
-    header = cleaned_table[0]
-    body = cleaned_table[1:]
-
-    # 表头判定：至少有一半单元格非空
-    non_empty = sum(1 for x in header if clean_text(x) != "")
-    if non_empty >= max(1, len(header) // 2):
-        cols = [h if h else f"col_{i+1}" for i, h in enumerate(header)]
-        df = pd.DataFrame(body, columns=cols)
-    else:
-        # 否则不用表头
-        df = pd.DataFrame(cleaned_table)
+    result_key: str
+    table_groups: Dict[str, List[int]]          # 附表/页面分组 -> result.tables 下标
+    table_dirs: List[str]                       # 每个 TablePack 的方向（已清洗）
+    table_dfs: Dict[int, pd.DataFrame]
+    page_table_dfs: Dict[Tuple[int, int], pd.DataFrame]
+    support: Optional[SupportMatrix] = None     # 附表4 支撑矩阵（首次查看时构建）
+    typed: Dict[Any, TypedTable] = field(default_factory=dict)   # 表格下标 / 附表名 → 类型化结果
+
+def result_cache_key(result: ExtractResult) -> str:
+    return f"{result.file_sha256}:{result.extracted_at}"
+
+def build_render_cache(result: ExtractResult) -> RenderCache:
+    groups: Dict[str, List[int]] = {}
+    dirs: List[str] = []
+    for idx, t in enumerate(result.tables):
+        appendix = clean_text(t.get("appendix") or "")
+        label = appendix or f"第{t.get('page')}页表格"
+        groups.setdefault(label, []).append(idx)
+        dirs.append(clean_text(t.get("direction") or ""))
+    return RenderCache(
+        result_key=result_cache_key(result),
+        table_groups=groups,
+        table_dirs=dirs,
+        table_dfs={},
+        page_table_dfs={},
+    )
 
-    return postprocess_table_df(df)
+def get_render_cache(result: ExtractResult) -> RenderCache:
+    """渲染缓存挂在会话结果的热缓存条目上（不进 session_state），条目被挤出热缓存时一并释放，再查看时重建。"""
+    handle: Optional[ResultHandle] = st.session_state.get("extract_handle")
+    if handle is not None:
+        try:
+            return get_session_store().derived(handle, "render", build_render_cache)
+        except KeyError:
+            pass
+    return build_render_cache(result)
+
+def cached_table_df(cache: RenderCache, result: ExtractResult, idx: int) -> pd.DataFrame:
+    df = cache.table_dfs.get(idx)
+    if df is None:
+        df = safe_df_from_tablepack(result.tables[idx])
+        cache.table_dfs[idx] = df
+    return df
 
-# ----------------------------
-# PDF 抽取：文本 + 表格 (使用 pdfplumber 的表格提取)
-# ----------------------------
-def extract_pages_text_and_tables(pdf_bytes: bytes, enable_ocr: bool = False) -> Tuple[List[Dict[str, Any]], str]:
-    """
-    提取每页的文本和表格
-    返回：页面数据列表（含文本和表格），全文文本
-    """
-    if pdfplumber is None:
-        return [], ""
-    
-    pages_data = []
-    full_text_parts = []
-    
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        # 表格设置：偏"宽松"，提升跨页/复杂表格提取成功率
-        table_settings = {
-            "vertical_strategy": "lines",
-            "horizontal_strategy": "lines",
-            "intersection_tolerance": 5,
-            "snap_tolerance": 3,
-            "join_tolerance": 3,
-            "edge_min_length": 3,
-            "min_words_vertical": 1,
-            "min_words_horizontal": 1,
-            "text_tolerance": 2,
-        }
-        
-        for idx, page in enumerate(pdf.pages, start=1):
-            # 提取文本
-            text = page.extract_text() or ""
-            text = normalize_multiline(text)
-            
-            # 如果需要OCR且文本太少
-            if enable_ocr and len(text) < 50:
-                try:
-                    import pytesseract
-                    from PIL import Image
-                    img = page.to_image(resolution=220).original
-                    ocr_text = pytesseract.image_to_string(img, lang="chi_sim+eng")
-                    if len(ocr_text) > len(text):
-                        text = normalize_multiline(ocr_text)
-                except Exception:
-                    pass
-            
-            full_text_parts.append(text)
-            
-            # 提取表格
-            raw_tables = []
-            try:
-                raw_tables = page.extract_tables(table_settings=table_settings) or []
-            except Exception:
-                raw_tables = []
-            
-            # 清洗表格
-            cleaned_tables = []
-            for t in raw_tables:
-                ct = normalize_table(t)
-                if ct:
-                    cleaned_tables.append(ct)
-            
-            pages_data.append({
-                "page": idx,
-                "text": text,
-                "tables": cleaned_tables,
-                "tables_count": len(cleaned_tables)
-            })
-    
-    full_text = "\n".join(full_text_parts)
-    return pages_data, full_text
+def cached_page_table_df(cache: RenderCache, page_data: Dict[str, Any], i: int) -> pd.DataFrame:
+    key = (page_data["page"], i)
+    df = cache.page_table_dfs.get(key)
+    if df is None:
+        df = table_to_df(page_data["tables"][i])
+        cache.page_table_dfs[key] = df
+    return df
+
+def cached_typed_table(cache: RenderCache, result: ExtractResult, idx: int) -> TypedTable:
+    typed = cache.typed.get(idx)
+    if typed is None:
+        typed = cache.typed[idx] = type_frame(cached_table_df(cache, result, idx))
+    return typed
+
+def cached_typed_role(cache: RenderCache, result: ExtractResult, role: str) -> Optional[TypedTable]:
+    """同一角色（table1 计划表 / table2 学分统计）的各页表格合并（带方向列）后类型化，供学分核对。"""
+    if role not in cache.typed:
+        dfs = [export_df(t) for t in result.tables if table_role(t.get("columns") or []) == role]
+        dfs = [df for df in dfs if not df.empty]
+        cache.typed[role] = type_frame(pd.concat(dfs, ignore_index=True)) if dfs else None
+    return cache.typed[role]
+
+def render_type_report(typed: TypedTable, key: str) -> None:
+    """类型化结果：数值 / 类别列数与解析失败明细（原表展示不变）。"""
+    if not typed.kinds:
+        return
+    kinds = list(typed.kinds.values())
+    n_cat = kinds.count("category")
+    st.caption(f"🔢 已类型化 {len(kinds) - n_cat} 个数值列、{n_cat} 个类别列；解析失败 {typed.failure_count} 处")
+    if typed.failure_count:
+        with st.expander("需要校对的单元格", expanded=False):
+            st.dataframe(typed.failure_report(), use_container_width=True, hide_index=True, key=f"typefail_{key}")
+
+def cached_support_matrix(cache: RenderCache, result: ExtractResult) -> SupportMatrix:
+    if cache.support is None:
+        cache.support = SupportMatrix.from_result(result)
+    return cache.support
+
+def render_df_paged(df: pd.DataFrame, key: str, page_size: int, **kwargs: Any) -> None:
+    """长表分页展示：每次只把当前页切片交给 st.dataframe。"""
+    n = len(df)
+    if n <= page_size:
+        st.dataframe(df, use_container_width=True, **kwargs)
+        return
+    n_pages = (n + page_size - 1) // page_size
+    pg = st.number_input(f"分页（共 {n_pages} 页，{n} 行）", min_value=1, max_value=n_pages,
+                         value=1, step=1, key=f"pg_{key}")
+    start = (int(pg) - 1) * page_size
+    st.dataframe(df.iloc[start:start + page_size], use_container_width=True, **kwargs)
 
 # ----------------------------
-# 结构化解析：章节/毕业要求/培养目标/附表标题
+# Streamlit UI
 # ----------------------------
-def split_sections(full_text: str) -> Dict[str, str]:
-    """
-    按 "一、/二、/三、..." 大章切分。
-    兼容：三、 / 三. / 三．
-    """
-    text = normalize_multiline(full_text)
-    lines = text.splitlines()
-    pat = re.compile(r"^\s*([一二三四五六七八九十]+)\s*[、\.．]\s*([^\n\r]+?)\s*$")
-
-    sections: Dict[str, List[str]] = {}
-    cur_key = "封面/前言"
-
-    for ln in lines:
-        m = pat.match(ln)
-        if m:
-            num = m.group(1)
-            title = clean_text(m.group(2))
-            cur_key = f"{num}、{title}"
-            sections.setdefault(cur_key, [])
-        else:
-            sections.setdefault(cur_key, []).append(ln)
-
-    return {k: "\n".join(v).strip() for k, v in sections.items()}
-
-def extract_appendix_titles(full_text: str) -> Dict[str, str]:
-    """抽取"附表X -> 标题（可能含七、八…）"""
-    titles: Dict[str, str] = {}
-    text = normalize_multiline(full_text)
-    for raw in text.splitlines():
-        line = raw.strip()
-        if not line:
-            continue
-
-        # 1) 附表1：XXXX
-        m = re.search(r"(附表\s*\d+)\s*[:：]\s*(.+)$", line)
-        if m:
-            key = re.sub(r"\s+", "", m.group(1))
-            val = clean_text(m.group(2))
-            if val:
-                titles[key] = val
-            continue
-
-        # 2) 七、XXXX（附表1）
-        m = re.search(r"^(?P<title>.+?)\s*[（(]\s*(?P<key>附表\s*\d+)\s*[)）]\s*$", line)
-        if m:
-            key = re.sub(r"\s+", "", m.group("key"))
-            val = clean_text(m.group("title"))
-            if val:
-                titles[key] = val
-            continue
-
-        # 3) 行内出现（附表X）
-        m = re.search(r"(?P<title>.+?)\s*[（(]\s*(?P<key>附表\s*\d+)\s*[)）]", line)
-        if m:
-            key = re.sub(r"\s+", "", m.group("key"))
-            val = clean_text(m.group("title"))
-            if val and key not in titles:
-                titles[key] = val
-
-    return titles
-
-def parse_training_objectives(section_text: str) -> Dict[str, Any]:
-    """
-    提取"培养目标"条目。返回 items(list[str]) + raw。
-    尽量包容：1) / 1． / 1、 / （1）等。
-    """
-    raw = normalize_multiline(section_text)
-    lines = [ln.strip() for ln in raw.splitlines() if ln.strip()]
-    items: List[str] = []
+@st.cache_resource
+def get_extract_cache() -> ExtractCache:
+    """进程级单例：所有会话共享同一个磁盘缓存目录。"""
+    return ExtractCache()
+
+@st.cache_resource
+def get_template_store() -> TemplateStore:
+    """进程级单例：版式模板库（已学到的表格参数与附表页码映射）。"""
+    return TemplateStore()
+
+@st.cache_resource
+def get_session_store() -> SessionResultStore:
+    """进程级单例：会话结果落盘存储，session_state 中只保存句柄。"""
+    return SessionResultStore()
+
+def session_result() -> Optional[ExtractResult]:
+    """当前会话的抽取结果（按需从磁盘读回）；已超过保留期限被清理时提示并清除句柄。"""
+    handle: Optional[ResultHandle] = st.session_state.get("extract_handle")
+    result = get_session_store().get(handle)
+    if handle is not None and result is None:
+        st.session_state.pop("extract_handle", None)
+        st.info("上次的抽取结果已超过保留期限被清理，请重新抽取。")
+    return result
+
+def set_session_result(result: ExtractResult) -> None:
+    store = get_session_store()
+    store.drop(st.session_state.get("extract_handle"))
+    st.session_state["extract_handle"] = store.put(result, "extract", result.file_sha256)
+
+@st.cache_resource
+def get_plan_index() -> PlanIndex:
+    """进程级单例：跨方案检索库（SQLite FTS5）。"""
+    return PlanIndex()
 
-    pat = re.compile(r"^(?:（?\s*\d+\s*）?|\d+\s*[\.、．])\s*(.+)$")
-    for ln in lines:
-        m = pat.match(ln)
-        if m:
-            body = clean_text(m.group(1))
-            if body:
-                items.append(body)
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    """进程级单例：后台抽取任务池（所有会话共享，按会话轮转调度）。"""
+    return JobManager(max_workers=2, max_queue=16, max_per_owner=1)
 
-    # 如果没抓到编号条目，退化：取前若干行（不丢信息）
-    if not items:
-        items = lines[:30]
+def session_owner() -> str:
+    """任务归属：当前浏览器会话。"""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "anon"
 
-    return {"count": len(items), "items": items, "raw": raw}
+@st.cache_resource
+def get_prefetcher() -> Prefetcher:
+    """进程级单例：上传即开始的确定性抽取（按 SHA-256 + 抽取参数，所有会话共享）。"""
+    return Prefetcher()
 
-def parse_graduation_requirements(text_any: str) -> Dict[str, Any]:
+def _upload_key(uploaded: Any) -> Any:
+    return getattr(uploaded, "file_id", None) or (uploaded.name, getattr(uploaded, "size", None))
+
+def upload_source(uploaded: Any) -> PdfSource:
     """
-    抽取 12 条毕业要求及其分项 1.1/1.2…
-    返回结构：{"count":..,"items":[{"no":1,"title":"工程知识","body":"...","subitems":[...]}], "raw":...}
+    同一上传文件在多次重跑之间只读取、哈希一次。
+    会话中暂存 (文件, SHA-256, PdfSource)；PdfSource 交给任务 / 预抽取后由 release_upload() 放掉，
+    之后需要时按已知哈希重建（小文件零拷贝、不再哈希）。
     """
-    text = normalize_multiline(text_any or "")
-
-    # 定位"二、毕业要求"
-    start = re.search(r"(?m)^\s*(二\s*[、\.．]?\s*毕业要求|毕业要求)\s*$", text)
-    if start:
-        tail = text[start.start():]
+    file_key = _upload_key(uploaded)
+    cached = st.session_state.get("upload_source")
+    if cached is not None and cached[0] == file_key and cached[2] is not None:
+        return cached[2]
+    sha = cached[1] if cached is not None and cached[0] == file_key else None
+    source = PdfSource.from_upload(uploaded, sha256=sha)
+    st.session_state["upload_source"] = (file_key, source.sha256, source)
+    return source
+
+def upload_sha(uploaded: Any) -> Optional[str]:
+    """已读取过的上传文件的 SHA-256（不读文件）；未读取过返回 None。"""
+    cached = st.session_state.get("upload_source")
+    return cached[1] if cached is not None and cached[0] == _upload_key(uploaded) else None
+
+def release_upload(uploaded: Any) -> None:
+    """任务 / 预抽取已持有 PdfSource：会话只留 (文件, SHA-256)，整份上传不随会话常驻（任务结束即释放）。"""
+    cached = st.session_state.get("upload_source")
+    if cached is not None and cached[0] == _upload_key(uploaded):
+        st.session_state["upload_source"] = (cached[0], cached[1], None)
+
+def extract_prefetch_key(sha: str, use_ocr: bool, backend: str, use_cache: bool) -> Tuple[Any, ...]:
+    return ("extract", sha, bool(use_ocr), backend or DEFAULT_BACKEND, bool(use_cache))
+
+@st.cache_resource
+def get_analytics_store() -> AnalyticsStore:
+    """进程级单例：跨方案统计库（列式 Parquet）。"""
+    return AnalyticsStore()
+
+def render_plan_analytics() -> None:
+    """跨方案统计：课程体系学分、讲课/实验学时比、学期负荷。"""
+    store = get_analytics_store()
+    plans = store.plans()
+    if plans.empty:
+        st.info("统计库为空。勾选侧边栏“抽取后写入检索库 / 统计库”后抽取方案即可加入。")
+        return
+    st.caption(f"统计库已收录 {len(plans)} 份方案。")
+    with st.expander("方案摘要", expanded=False):
+        st.dataframe(plans, use_container_width=True)
+    view = st.radio("统计视图", ["课程体系学分", "学时比例", "学期负荷"], key="analytics_view", horizontal=True)
+    if view == "课程体系学分":
+        df = store.credits_by_system(by_direction=st.checkbox("按专业方向拆分", value=True, key="analytics_by_dir"))
+        st.dataframe(df.pivot_table(index=[c for c in df.columns if c not in ("system", "credits")],
+                                    columns="system", values="credits", aggfunc="sum", observed=True),
+                     use_container_width=True)
+    elif view == "学时比例":
+        st.dataframe(store.hour_ratios(), use_container_width=True)
     else:
-        tail = text
-
-    # 截断到下一大章
-    end = re.search(r"(?m)^\s*[三四五六七八九十]\s*[、\.．]", tail)
-    if end:
-        tail = tail[:end.start()]
-
-    lines = [ln.strip() for ln in tail.splitlines()]
-
-    main_pat = re.compile(r"^(?P<no>\d{1,2})\s*[\.、](?!\d)\s*(?P<body>.+)$")   # 1. xxx (排除 1.1)
-    sub_pat = re.compile(r"^(?P<no>\d{1,2}\.\d{1,2})\s+(?P<body>.+)$")       # 1.1 xxx
-
-    items: List[Dict[str, Any]] = []
-    cur: Optional[Dict[str, Any]] = None
-    cur_sub: Optional[Dict[str, Any]] = None
-
-    def flush_sub():
-        nonlocal cur_sub, cur
-        if cur is not None and cur_sub is not None:
-            cur.setdefault("subitems", []).append(cur_sub)
-        cur_sub = None
-
-    def flush_item():
-        nonlocal cur
-        if cur is not None:
-            cur["title"] = clean_text(cur.get("title", ""))
-            cur["body"] = clean_text(cur.get("body", ""))
-            for s in cur.get("subitems", []):
-                s["body"] = clean_text(s.get("body", ""))
-            items.append(cur)
-        cur = None
-
-    for ln in lines:
-        if not ln:
-            continue
-
-        m_main = main_pat.match(ln)
-        m_sub = sub_pat.match(ln)
-
-        if m_main:
-            flush_sub()
-            flush_item()
-            no = int(m_main.group("no"))
-            body_full = clean_text(m_main.group("body"))
-
-            # 处理"工程知识：..."这种
-            title = ""
-            body = body_full
-            if "：" in body_full:
-                title, body = body_full.split("：", 1)
-                title = clean_text(title)
-                body = clean_text(body)
-
-            cur = {"no": no, "title": title, "body": body, "subitems": []}
-            continue
-
-        if m_sub and cur is not None:
-            flush_sub()
-            cur_sub = {"no": m_sub.group("no"), "body": clean_text(m_sub.group("body"))}
-            continue
-
-        # 续行
-        if cur_sub is not None:
-            cur_sub["body"] += " " + ln
-        elif cur is not None:
-            cur["body"] += " " + ln
-
-    flush_sub()
-    flush_item()
-
-    items = sorted(items, key=lambda x: x.get("no", 999))
-    if len(items) > 12:
-        items = [x for x in items if 1 <= x.get("no", 0) <= 12]
-
-    return {"count": len(items), "items": items, "raw": tail.strip()}
+        plan = st.selectbox("方案", ["（全部）"] + plans["plan"].astype(str).tolist(), key="analytics_plan")
+        df = store.semester_load(None if plan == "（全部）" else plan)
+        st.dataframe(df.pivot_table(index=["plan", "direction"], columns="semester", values="credits",
+                                    aggfunc="sum", observed=True), use_container_width=True)
+
+def render_plan_search() -> None:
+    """跨方案检索：课程名称 / 课程编码 / 毕业要求全文。"""
+    index = get_plan_index()
+    plans = index.plans()
+    st.caption(f"检索库已收录 {len(plans)} 份方案。勾选侧边栏“抽取后写入检索库 / 统计库”即可把当前方案加入。")
+    sc1, sc2 = st.columns([4, 1])
+    q = sc1.text_input("关键词（课程名称 / 课程编码 / 毕业要求原文）", key="plan_search_q",
+                       placeholder="例如：焊接冶金与金属焊接性")
+    scope = sc2.radio("范围", ["课程", "毕业要求"], key="plan_search_scope", horizontal=True)
+    if q:
+        fn = "search_courses" if scope == "课程" else "search_requirements"
+        rows, ms = index.timed(fn, q, limit=200)
+        st.caption(f"{len(rows)} 条结果，用时 {ms:.1f} ms")
+        if rows:
+            st.dataframe(pd.DataFrame(rows).drop(columns=["file_sha256"]), use_container_width=True)
+    if plans:
+        with st.expander("已收录方案", expanded=False):
+            st.dataframe(pd.DataFrame(plans), use_container_width=True)
 
 # ----------------------------
-# 表格标题/方向识别
+# 后台抽取任务
 # ----------------------------
-def guess_table_appendix_by_page(page_no: int) -> Optional[str]:
-    """
-    针对常见培养方案（本样例 18 页）：
-    10-11 附表1，12 附表2，13-14 附表3，15 附表4，16 附表5
-    如果换不同模板，请自行调整或改为更智能的页内检测。
+def apply_extract_outcome(res: ExtractResult, hit: bool, prior: Optional[ExtractResult], warnings: List[str]) -> None:
+    """抽取结果写回会话；提示信息在下一次整页运行时展示。"""
+    set_session_result(res)
+    notices = [("warning", f"写入检索库失败：{w}") for w in warnings]
+    if hit:
+        notices.append(("toast", "命中抽取缓存，已直接载入结果。"))
+    elif prior is not None and prior.file_sha256 != res.file_sha256:
+        n_changed = len(changed_pages(prior, res))
+        notices.append(("toast", f"增量抽取：{res.page_count - n_changed} 页复用旧版本，{n_changed} 页重新抽取。"))
+    st.session_state["extract_notices"] = notices
+
+def ingest_result(index: PlanIndex, store: AnalyticsStore, res: ExtractResult, name: str) -> List[str]:
+    try:
+        index.ingest(res, name=name)
+        store.add(res, name=name)
+    except Exception as e:
+        return [str(e)]
+    return []
+
+def extract_job(report, cache: Optional[ExtractCache], pdf_bytes: PdfInput, use_ocr: bool,
+                prior: Optional[ExtractResult], backend: str, ingest_to: Optional[Tuple[PlanIndex, AnalyticsStore, str]],
+                templates: Optional[TemplateStore] = None, prefetched: Optional[Future] = None):
     """
-    mapping = {
-        10: "附表1", 11: "附表1",
-        12: "附表2",
-        13: "附表3", 14: "附表3",
-        15: "附表4",
-        16: "附表5",
-    }
-    return mapping.get(page_no)
-
-def infer_table_title_from_page_text(page_text: str, appendix: Optional[str], appendix_titles: Dict[str, str], page_no: int) -> str:
-    if appendix and appendix in appendix_titles:
-        return appendix_titles[appendix]
-
-    if appendix:
-        m = re.search(rf"(?P<title>[^\n\r]{{2,120}}?)\s*[（(]\s*{re.escape(appendix)}\s*[)）]", page_text)
-        if m:
-            return clean_text(m.group("title"))
-
-    m = re.search(r"(附表\s*\d+)\s*[:：]\s*([^\n\r]{2,120})", page_text)
-    if m:
-        return clean_text(m.group(2))
-
-    return appendix or f"第{page_no}页表格"
-
-def infer_direction_for_page(page_text: str) -> str:
-    has_weld = "焊接" in page_text
-    has_ndt = ("无损" in page_text) or ("无损检测" in page_text)
-    if has_weld and has_ndt:
-        return "混合（焊接+无损检测）"
-    if has_weld:
-        return "焊接"
-    if has_ndt:
-        return "无损检测"
-    return ""
-
-def add_direction_column_rowwise(df: pd.DataFrame, page_direction: str) -> pd.DataFrame:
+    后台线程中执行（不得调用 st.*，所需单例由脚本线程取好传入）：抽取 + 可选入库。
+    prefetched：上传时已开始的同参数抽取（Future），有则直接等它的结果。
     """
-    行级方向识别：若表内有"焊接方向/无损检测方向"分隔行，则从该行开始向下标注。
-    若识别不到，则使用 page_direction。
-    """
-    if df is None or df.empty:
-        return df
-
-    df = df.copy()
-    cur_dir = ""
-    dirs = []
-    for _, row in df.iterrows():
-        row_txt = " ".join([clean_text(x) for x in row.values.tolist()])
-        if re.search(r"焊接.*方向", row_txt):
-            cur_dir = "焊接"
-        elif re.search(r"无损.*方向", row_txt) or re.search(r"无损检测.*方向", row_txt):
-            cur_dir = "无损检测"
-
-        dirs.append(cur_dir or page_direction)
-
-    # 插到最前
-    if "专业方向" not in df.columns:
-        df.insert(0, "专业方向", dirs)
+    if prefetched is not None:
+        report(0.1, "复用上传时已开始的后台抽取…")
+    res, hit = wait_prefetched(prefetched, lambda: cached_run_full_extract(
+        cache, pdf_bytes, use_ocr=use_ocr, prior=prior, backend=backend,
+        progress=lambda f, msg: report(0.95 * f, msg), templates=templates))
+    warnings: List[str] = []
+    if ingest_to is not None:
+        report(0.97, "正在写入检索库 / 统计库")
+        warnings = ingest_result(*ingest_to[:2], res, ingest_to[2])
+    return res, hit, prior, warnings
+
+@st.fragment(run_every=1.0)
+def poll_extract_job() -> None:
+    """每秒刷新后台任务进度；完成后整页重跑以展示结果。"""
+    jobs = get_job_manager()
+    job = jobs.get(st.session_state.get("extract_job"))
+    if job is None:
+        st.session_state.pop("extract_job", None)
+        st.rerun()
+    if not job.finished:
+        if job.status == QUEUED:
+            text = f"排队中：前面约 {max(0, jobs.queue_position(job.id) - 1)} 个任务"
+        else:
+            text = f"{job.message}（已用时 {job.elapsed():.0f} 秒）"
+        st.progress(job.progress, text=f"{job.label} · {text}")
+        if job.status == QUEUED and st.button("取消排队", key="cancel_extract_job"):
+            jobs.cancel(job.id)
+        return
+    st.session_state.pop("extract_job", None)
+    if job.expired:
+        st.session_state["extract_notices"] = [("warning", "抽取结果保留时间已过，请重新抽取（会命中抽取缓存）。")]
+    elif job.status == DONE:
+        apply_extract_outcome(*jobs.take_result(job.id))
     else:
-        df["专业方向"] = [d or page_direction for d in dirs]
+        st.session_state["extract_notices"] = [("error", f"抽取失败：{job.message}")] if job.error else [("toast", "抽取已取消。")]
+    st.rerun()
 
-    return df
-
-# ----------------------------
-# 输出结构
-# ----------------------------
-@dataclass
-class TablePack:
-    page: int
-    title: str
-    appendix: str
-    direction: str
-    columns: List[str]
-    rows: List[List[Any]]
-
-@dataclass
-class ExtractResult:
-    page_count: int
-    table_count: int
-    ocr_used: bool
-    file_sha256: str
-    extracted_at: str
-    pages_data: List[Dict[str, Any]]
-    sections: Dict[str, str]
-    appendix_titles: Dict[str, str]
-    training_objectives: Dict[str, Any]
-    graduation_requirements: Dict[str, Any]
-    tables: List[Dict[str, Any]]  # TablePack as dict
-
-# ----------------------------
-# 主流程
-# ----------------------------
-def run_full_extract(pdf_bytes: bytes, use_ocr: bool = False) -> ExtractResult:
-    # 1) 提取页面文本和表格
-    pages_data, full_text = extract_pages_text_and_tables(pdf_bytes, enable_ocr=use_ocr)
-    
-    # 2) 结构化解析
-    sections = split_sections(full_text)
-    appendix_titles = extract_appendix_titles(full_text)
-    
-    # 3) 关键结构化：培养目标、毕业要求
-    obj_key = next((k for k in sections.keys() if "培养目标" in k), "")
-    obj = parse_training_objectives(sections.get(obj_key, "") or full_text)
-    grad = parse_graduation_requirements(full_text)
-    
-    # 4) 处理表格
-    tables: List[TablePack] = []
-    total_tables = 0
-    
-    for page_data in pages_data:
-        page_no = page_data["page"]
-        page_text = page_data["text"]
-        page_tables = page_data["tables"]
-        
-        total_tables += len(page_tables)
-        
-        appendix = guess_table_appendix_by_page(page_no) or ""
-        base_title = infer_table_title_from_page_text(page_text, appendix or None, appendix_titles, page_no)
-        title = f"{base_title}（{appendix}）" if appendix and appendix not in base_title else base_title
-        page_dir = infer_direction_for_page(page_text)
-        
-        for i, table_data in enumerate(page_tables):
-            df = table_to_df(table_data)
-            if df is not None and not df.empty:
-                df2 = add_direction_column_rowwise(df, page_dir)
-                sub_title = title if len(page_tables) == 1 else f"{title} - 表{i+1}"
-                pack = TablePack(
-                    page=page_no,
-                    title=sub_title,
-                    appendix=appendix,
-                    direction=page_dir,
-                    columns=[str(c) for c in df2.columns],
-                    rows=df2.values.tolist(),
-                )
-                tables.append(pack)
-    
-    result = ExtractResult(
-        page_count=len(pages_data),
-        table_count=total_tables,
-        ocr_used=use_ocr,
-        file_sha256=sha256_bytes(pdf_bytes),
-        extracted_at=datetime.now().isoformat(timespec="seconds"),
-        pages_data=pages_data,
-        sections=sections,
-        appendix_titles=appendix_titles,
-        training_objectives=obj,
-        graduation_requirements=grad,
-        tables=[asdict(t) for t in tables],
-    )
-    return result
-
-# ----------------------------
-# 导出功能
-# ----------------------------
-def safe_df_from_tablepack(t: Dict[str, Any]) -> pd.DataFrame:
-    """从 TablePack 字典创建 DataFrame"""
-    cols = t.get("columns") or []
-    rows = t.get("rows") or []
-    
-    if rows and len(rows) > 0:
-        df = pd.DataFrame(rows, columns=cols)
-        return postprocess_table_df(df)
-    return pd.DataFrame()
-
-def make_tables_zip(tables: List[Dict[str, Any]]) -> bytes:
-    """CSV + tables.json 打包"""
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr("tables.json", json.dumps(tables, ensure_ascii=False, indent=2))
-        for idx, t in enumerate(tables, start=1):
-            title = clean_text(t.get("title") or f"table_{idx}")
-            title_safe = re.sub(r"[^0-9A-Za-z\u4e00-\u9fff_\-]+", "_", title)[:80].strip("_") or f"table_{idx}"
-
-            df = safe_df_from_tablepack(t)
-
-            # 方向列
-            direction = clean_text(t.get("direction") or "")
-            if direction and "专业方向" not in df.columns:
-                df.insert(0, "专业方向", direction)
-
-            csv_bytes = df.to_csv(index=False, encoding="utf-8-sig")
-            zf.writestr(f"{idx:02d}_{title_safe}.csv", csv_bytes)
-    return buf.getvalue()
-
-def build_json_bytes(result: ExtractResult) -> bytes:
-    """构建 JSON 导出文件"""
-    return json.dumps(asdict(result), ensure_ascii=False, indent=2).encode("utf-8")
-
-# ----------------------------
-# Streamlit UI
-# ----------------------------
 st.set_page_config(page_title="培养方案PDF全量抽取（优化合成版）", layout="wide")
 
 st.markdown("""
@@ -631,151 +366,303 @@ st.info("上传培养方案 PDF → 一键抽取全文文本、章节结构、
 
 with st.sidebar:
     st.markdown("## 上传与抽取")
-    uploaded = st.file_uploader("上传培养方案 PDF", type=["pdf"])
+    uploaded = st.file_uploader("上传培养方案 PDF / Word（.docx）", type=["pdf", "docx"])
     use_ocr = st.checkbox("对无文本页启用 OCR（可选）", value=False, 
                          help="对于扫描版或图片版PDF，可以尝试启用OCR（需要安装pytesseract和tesseract-ocr）。")
+    pdf_backend = st.selectbox("PDF 解析后端", available_backends() or [DEFAULT_BACKEND],
+                               format_func=lambda k: BACKENDS[k]["label"],
+                               help="PyMuPDF 文本抽取更快；表格结果差异可用 benchmarks/bench_backends.py 对比。")
+    use_cache = st.checkbox("使用抽取缓存（同一文件秒级返回）", value=True,
+                            help="按文件 SHA-256 + 抽取器版本 + OCR/表格设置缓存结果，跨会话共享。")
+    ingest_index = st.checkbox("抽取后写入检索库 / 统计库（跨方案）", value=True,
+                               help="把课程行、毕业要求、正文章节写入本地 SQLite 全文索引和列式统计库，供“跨方案检索 / 统计”使用。")
+    profile_mode = st.checkbox("性能分析模式（仅下一次抽取）", value=profiling_enabled_by_env(),
+                               help="对本次抽取与渲染做 cProfile + 内存分析，生成可下载报告；分析期间不使用缓存。")
     run_btn = st.button("开始全量抽取", type="primary")
 
-if "extract_result" not in st.session_state:
-    st.session_state["extract_result"] = None
+profiler: Optional[RunProfiler] = None
+stage_timings: Dict[str, float] = {}
+
+if uploaded is not None and PREFETCH_ENABLED and not profile_mode and not run_btn:
+    # 上传即在后台开始抽取（参数取当前勾选）：点按钮时直接认领进行中或已完成的结果
+    sha = upload_sha(uploaded) or upload_source(uploaded).sha256
+    prefetch_key = extract_prefetch_key(sha, use_ocr, pdf_backend, use_cache)
+    if st.session_state.get("prefetch_key") != prefetch_key:   # 每个文件 + 参数只预抽取一次，认领后不再重复
+        st.session_state["prefetch_key"] = prefetch_key
+        get_prefetcher().start(session_owner(), prefetch_key, cached_run_full_extract,
+                               get_extract_cache() if use_cache else None, upload_source(uploaded), use_ocr=use_ocr,
+                               prior=session_result(), backend=pdf_backend,
+                               templates=get_template_store())
+    release_upload(uploaded)
 
-if run_btn:
-    if not uploaded:
-        st.warning("请先上传 PDF。")
-    else:
-        pdf_bytes = uploaded.getvalue()
-        with st.spinner("正在抽取…"):
-            st.session_state["extract_result"] = run_full_extract(pdf_bytes, use_ocr=use_ocr)
-
-result: Optional[ExtractResult] = st.session_state.get("extract_result")
-
-if result is None:
-    st.stop()
-
-# 概览指标
-c1, c2, c3, c4 = st.columns(4)
-c1.metric("总页数", result.page_count)
-c2.metric("表格总数", result.table_count)
-c3.metric("OCR启用", "是" if result.ocr_used else "否")
-c4.caption(f"SHA256: {result.file_sha256[:16]}...")
-
-tabs = st.tabs(["概览与下载", "章节大标题（全部）", "培养目标", "毕业要求（12条）", "附表表格（可下载CSV）", "分页原文与表格"])
-
-# ---- Tab 0 概览与下载
-with tabs[0]:
-    st.markdown("### 结构化识别结果（可先在这里校对）")
-
-    # 下载 JSON（全量）
-    json_bytes = build_json_bytes(result)
-    st.download_button(
-        "下载抽取结果 JSON（全量基础库）",
-        data=json_bytes,
-        file_name="training_plan_full_extract.json",
-        mime="application/json",
-        use_container_width=True,
-    )
-
-    if result.tables:
-        zip_bytes = make_tables_zip(result.tables)
+try:
+    if run_btn:
+        if not uploaded:
+            st.warning("请先上传 PDF。")
+        elif get_job_manager().get(st.session_state.get("extract_job")) is not None:
+            st.warning("已有抽取任务在进行中，请等待完成。")
+        else:
+            # 上传文件只取一次：小文件零拷贝、大文件溢出到临时文件，哈希在读入时算好
+            pdf_bytes = upload_source(uploaded)
+            # 上一次抽取结果作为“旧版本”，修订版只重抽变化的页面
+            prior = session_result()
+            if profile_mode:
+                # cProfile 只能看到脚本线程：性能分析模式保持同步执行、不使用缓存
+                profiler = RunProfiler("run_full_extract").start()
+                with st.spinner("正在抽取（性能分析）…"):
+                    res, hit = cached_run_full_extract(None, pdf_bytes, use_ocr=use_ocr, prior=prior,
+                                                       backend=pdf_backend, timings=stage_timings,
+                                                       templates=get_template_store())
+                profiler.mark("抽取")
+                warnings = ingest_result(get_plan_index(), get_analytics_store(), res, uploaded.name) if ingest_index else []
+                apply_extract_outcome(res, hit, prior, warnings)
+            else:
+                try:
+                    st.session_state["extract_job"] = get_job_manager().submit(
+                        session_owner(), extract_job, get_extract_cache() if use_cache else None, pdf_bytes,
+                        use_ocr, prior, pdf_backend,
+                        (get_plan_index(), get_analytics_store(), uploaded.name) if ingest_index else None,
+                        get_template_store(),
+                        get_prefetcher().claim(extract_prefetch_key(pdf_bytes.sha256, use_ocr, pdf_backend, use_cache)),
+                        label=f"抽取 {uploaded.name}",
+                    )
+                except QueueFullError as e:
+                    st.warning(str(e))
+            release_upload(uploaded)
+
+    if st.session_state.get("extract_job"):
+        poll_extract_job()
+
+    for level, notice in st.session_state.pop("extract_notices", []):
+        getattr(st, level)(notice)
+
+    result: Optional[ExtractResult] = session_result()
+
+    if result is None:
+        st.markdown("### 跨方案检索")
+        render_plan_search()
+        st.markdown("### 跨方案统计")
+        render_plan_analytics()
+        st.stop()
+
+    # 概览指标
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("总页数", result.page_count)
+    c2.metric("表格总数", result.table_count)
+    c3.metric("OCR启用", "是" if result.ocr_used else "否")
+    c4.caption(f"SHA256: {result.file_sha256[:16]}...")
+    if result.template_id:
+        st.caption(f"🧩 版式模板 {result.template_id}：" + ("沿用已学到的表格参数与附表页码" if result.template_reused
+                                                       else "新版式，已试探表格参数并建档"))
+
+    tabs = st.tabs(["概览与下载", "章节大标题（全部）", "培养目标", "毕业要求（12条）", "附表表格（可下载CSV）", "分页原文与表格", "跨方案检索", "跨方案统计"])
+
+    # ---- Tab 0 概览与下载
+    with tabs[0]:
+        st.markdown("### 结构化识别结果（可先在这里校对）")
+
+        # 下载 JSON（全量）
+        json_bytes = build_json_bytes(result)
         st.download_button(
-            "下载表格 ZIP（CSV + tables.json）",
-            data=zip_bytes,
-            file_name="training_plan_tables.zip",
-            mime="application/zip",
+            "下载抽取结果 JSON（全量基础库）",
+            data=json_bytes,
+            file_name="training_plan_full_extract.json",
+            mime="application/json",
             use_container_width=True,
         )
+
+        if result.tables:
+            # 点击时才在后台线程流式生成，普通 rerun 不再序列化整份表格
+            tables = result.tables
+            st.download_button(
+                "下载表格 ZIP（CSV + tables.json）",
+                data=lambda: tables_zip_file(tables),
+                file_name="training_plan_tables.zip",
+                mime="application/zip",
+                use_container_width=True,
+            )
+            if xlsxwriter is not None:
+                st.download_button(
+                    "下载表格 Excel（每个附表一个工作表）",
+                    data=lambda: tables_xlsx_file(tables),
+                    file_name="training_plan_tables.xlsx",
+                    mime=XLSX_MIME,
+                    use_container_width=True,
+                )
     
-    st.markdown("#### 附表标题映射（用于给表格命名）")
-    if result.appendix_titles:
-        st.json(result.appendix_titles)
-    else:
-        st.info("未在正文中检测到附表标题映射（不影响表格抽取，但表名可能不够精准）。")
-
-# ---- Tab 1 章节大标题
-with tabs[1]:
-    st.markdown("### 章节大标题（用于确保'三~六'等内容不丢）")
-    st.caption("这里展示 split_sections 抽到的全部大章标题，点击可展开查看正文（用于溯源和校对）。")
-    for k in result.sections.keys():
-        with st.expander(k, expanded=False):
-            st.text(result.sections.get(k, ""))
-
-# ---- Tab 2 培养目标
-with tabs[2]:
-    st.markdown("### 1）培养目标（可编辑/校对）")
-    st.caption("若培养目标有多方向版本（焊接/无损），后续可在此基础上增强为分方向抽取。")
-
-    obj = result.training_objectives
-    st.write(f"识别条目数：**{obj.get('count', 0)}**")
-    st.text_area("培养目标（逐条）", value="\n".join(obj.get("items", [])), height=220)
-    with st.expander("原始文本（培养目标段）"):
-        st.text(obj.get("raw", ""))
-
-# ---- Tab 3 毕业要求
-with tabs[3]:
-    st.markdown("### 2）毕业要求（12条 + 分项）")
-    grad = result.graduation_requirements
-    st.write(f"识别主条目数：**{grad.get('count', 0)}**（理想为 12）")
-
-    items = grad.get("items", [])
-    if not items:
-        st.warning("未识别到毕业要求，请在'分页原文'中确认 PDF 是否可提取文本。")
-    else:
-        for it in items:
-            no = it.get("no")
-            title = it.get("title") or ""
-            body = it.get("body") or ""
-            header = f"{no}. {title}".strip()
-            with st.expander(header, expanded=(no in [1, 2])):
-                st.write(body)
-                subs = it.get("subitems", [])
-                if subs:
-                    st.markdown("**分项：**")
-                    for s in subs:
-                        st.write(f"- {s.get('no')}: {s.get('body')}")
-    with st.expander("原始文本（毕业要求段）"):
-        st.text(grad.get("raw", ""))
-
-# ---- Tab 4 表格
-with tabs[4]:
-    st.markdown("### 3）附表表格（表名 + 方向尽量清晰）")
-    if not result.tables:
-        st.info("未检测到表格。请检查PDF是否有表格，或尝试启用OCR。")
-    else:
-        # 方向过滤
-        all_dirs = sorted({clean_text(t.get("direction") or "") for t in result.tables if clean_text(t.get("direction") or "")})
-        opt_dirs = ["全部"] + all_dirs
-        sel = st.selectbox("方向过滤", opt_dirs, index=0)
-
-        for t in result.tables:
-            direction = clean_text(t.get("direction") or "")
-            if sel != "全部" and direction != sel:
-                continue
-
-            st.subheader(f"第{t.get('page')}页｜{t.get('title')}")
-            if direction:
-                st.caption(f"页面方向提示：{direction}")
-
-            df = safe_df_from_tablepack(t)
-            st.dataframe(df, use_container_width=True, hide_index=True)
-
-# ---- Tab 5 分页原文与表格
-with tabs[5]:
-    st.markdown("### 4）分页原文与表格（用于溯源/调试抽取缺失）")
-    
-    for page_data in result.pages_data:
-        page_no = page_data["page"]
-        page_text = page_data["text"]
-        page_tables = page_data["tables"]
-        
-        with st.expander(f"第{page_no}页（{len(page_tables)}个表格）", expanded=False):
-            st.text(page_text)
-            
+        st.markdown("#### 附表标题映射（用于给表格命名）")
+        if result.appendix_titles:
+            st.json(result.appendix_titles)
+        else:
+            st.info("未在正文中检测到附表标题映射（不影响表格抽取，但表名可能不够精准）。")
+
+    # ---- Tab 1 章节大标题
+    with tabs[1]:
+        st.markdown("### 章节大标题（用于确保'三~六'等内容不丢）")
+        st.caption("这里展示 split_sections 抽到的全部大章标题，点击可展开查看正文（用于溯源和校对）。")
+        for k in result.sections.keys():
+            with st.expander(k, expanded=False):
+                st.text(result.sections.get(k, ""))
+
+    # ---- Tab 2 培养目标
+    with tabs[2]:
+        st.markdown("### 1）培养目标（可编辑/校对）")
+        st.caption("若培养目标有多方向版本（焊接/无损），后续可在此基础上增强为分方向抽取。")
+
+        obj = result.training_objectives
+        st.write(f"识别条目数：**{obj.get('count', 0)}**")
+        st.text_area("培养目标（逐条）", value="\n".join(obj.get("items", [])), height=220)
+        with st.expander("原始文本（培养目标段）"):
+            st.text(obj.get("raw", ""))
+
+    # ---- Tab 3 毕业要求
+    with tabs[3]:
+        st.markdown("### 2）毕业要求（12条 + 分项）")
+        grad = result.graduation_requirements
+        st.write(f"识别主条目数：**{grad.get('count', 0)}**（理想为 12）")
+
+        items = grad.get("items", [])
+        if not items:
+            st.warning("未识别到毕业要求，请在'分页原文'中确认 PDF 是否可提取文本。")
+        else:
+            for it in items:
+                no = it.get("no")
+                title = it.get("title") or ""
+                body = it.get("body") or ""
+                header = f"{no}. {title}".strip()
+                with st.expander(header, expanded=(no in [1, 2])):
+                    st.write(body)
+                    subs = it.get("subitems", [])
+                    if subs:
+                        st.markdown("**分项：**")
+                        for s in subs:
+                            st.write(f"- {s.get('no')}: {s.get('body')}")
+        with st.expander("原始文本（毕业要求段）"):
+            st.text(grad.get("raw", ""))
+
+        with st.expander("支撑矩阵覆盖分析（附表4）", expanded=False):
+            sm = cached_support_matrix(get_render_cache(result), result)
+            if not sm.courses:
+                st.info("未识别到支撑矩阵表（需含“课程名称”列和 x.y 指标点列）。")
+            else:
+                n_c, n_i = sm.shape
+                lacking_h = sm.indicators_lacking("H")
+                uncovered = sm.uncovered_indicators(expected_indicators(grad))
+                m1, m2, m3, m4 = st.columns(4)
+                m1.metric("课程数", n_c)
+                m2.metric("指标点数", n_i)
+                m3.metric("缺 H 支撑", len(lacking_h))
+                m4.metric("无支撑", len(uncovered))
+                if lacking_h:
+                    st.caption("缺 H 支撑的指标点：" + "、".join(lacking_h))
+                if uncovered:
+                    st.warning("无任何课程支撑的指标点：" + "、".join(uncovered))
+                st.markdown("**按毕业要求汇总**")
+                st.dataframe(sm.requirement_rollup(), use_container_width=True, hide_index=True)
+                st.markdown("**课程支撑负荷**")
+                st.dataframe(sm.course_load(), use_container_width=True, hide_index=True, height=300)
+
+    # ---- Tab 4 表格
+    cache = get_render_cache(result)
+
+    with tabs[4]:
+        st.markdown("### 3）附表表格（表名 + 方向尽量清晰）")
+        if not result.tables:
+            st.info("未检测到表格。请检查PDF是否有表格，或尝试启用OCR。")
+        else:
+            with st.expander("学分核对（附表1 / 附表2）", expanded=False):
+                required = required_credits(result.sections)
+                checks = credit_checks(cached_typed_role(cache, result, "table1"),
+                                       cached_typed_role(cache, result, "table2"), required)
+                st.caption(f"毕业要求：{required if required is not None else '未在正文中找到'} 学分")
+                if checks:
+                    st.dataframe(checks_frame(checks), use_container_width=True, hide_index=True)
+                else:
+                    st.info("未识别到附表2 的学分统计列，无法核对。")
+
+            # 方向过滤 + 附表选择：只物化当前选中附表的表格
+            all_dirs = sorted({d for d in cache.table_dirs if d})
+            opt_dirs = ["全部"] + all_dirs
+            fc1, fc2, fc3 = st.columns([2, 2, 1])
+            sel = fc1.selectbox("方向过滤", opt_dirs, index=0)
+            group_opts = [
+                g for g, idxs in cache.table_groups.items()
+                if sel == "全部" or any(cache.table_dirs[i] == sel for i in idxs)
+            ]
+            if not group_opts:
+                st.info("该方向下没有表格。")
+            else:
+                group = fc2.selectbox("选择附表", group_opts, index=0,
+                                      format_func=lambda g: f"{g}（{len(cache.table_groups[g])}个表格）")
+                page_size = fc3.selectbox("每页行数", PAGE_SIZE_OPTIONS, index=1, key="tbl_page_size")
+
+                for idx in cache.table_groups[group]:
+                    t = result.tables[idx]
+                    direction = cache.table_dirs[idx]
+                    if sel != "全部" and direction != sel:
+                        continue
+
+                    st.subheader(f"第{t.get('page')}页｜{t.get('title')}")
+                    if direction:
+                        st.caption(f"页面方向提示：{direction}")
+
+                    df = cached_table_df(cache, result, idx)
+                    render_df_paged(df, f"tbl_{idx}", page_size, hide_index=True)
+                    render_type_report(cached_typed_table(cache, result, idx), f"tbl_{idx}")
+
+    # ---- Tab 5 分页原文与表格
+    with tabs[5]:
+        st.markdown("### 4）分页原文与表格（用于溯源/调试抽取缺失）")
+
+        if result.pages_data:
+            page_labels = {p["page"]: f"第{p['page']}页（{len(p['tables'])}个表格）" for p in result.pages_data}
+            page_by_no = {p["page"]: p for p in result.pages_data}
+            pc1, pc2 = st.columns([4, 1])
+            page_no = pc1.selectbox("选择页面", list(page_labels.keys()), format_func=page_labels.get)
+            page_size = pc2.selectbox("每页行数", PAGE_SIZE_OPTIONS, index=0, key="page_tbl_page_size")
+
+            page_data = page_by_no[page_no]
+            page_tables = page_data["tables"]
+            st.text(page_data["text"])
+
             if page_tables:
                 st.markdown(f"**表格 ({len(page_tables)}个):**")
-                for i, table_data in enumerate(page_tables, start=1):
-                    df = table_to_df(table_data)
+                for i in range(len(page_tables)):
+                    df = cached_page_table_df(cache, page_data, i)
                     if not df.empty:
-                        st.markdown(f"**表格 {i}:**")
-                        st.dataframe(df, use_container_width=True, height=200)
+                        st.markdown(f"**表格 {i + 1}:**")
+                        render_df_paged(df, f"p{page_no}_t{i}", page_size, height=200)
                     else:
-                        st.info(f"表格 {i} 为空或无法解析")
\ No newline at end of file
+                        st.info(f"表格 {i + 1} 为空或无法解析")
+
+    # ---- Tab 6 跨方案检索
+    with tabs[6]:
+        st.markdown("### 跨方案检索（本地全文索引）")
+        render_plan_search()
+
+    # ---- Tab 7 跨方案统计
+    with tabs[7]:
+        st.markdown("### 跨方案统计（列式统计库）")
+        render_plan_analytics()
+
+    # ---- 性能分析报告（本次 rerun 的抽取 + 渲染）
+    if profiler is not None:
+        profiler.mark("渲染")
+        st.session_state["profile_report"] = profiler.stop(doc_sha256=result.file_sha256, stage_timings=stage_timings)
+finally:
+    # 抽取或渲染中途出错（包括 st.stop / st.rerun）也关掉 cProfile 与进程级 tracemalloc，已 stop() 时无作用
+    if profiler is not None:
+        profiler.abort()
+
+report = st.session_state.get("profile_report")
+if report is not None:
+    with st.sidebar:
+        st.markdown("## 性能分析报告")
+        st.caption(f"{report.label}｜{report.wall_s:.2f}s｜峰值 {report.peak_mb:.1f} MB｜SHA {report.doc_sha256[:12]}")
+        for k, v in report.marks.items():
+            st.caption(f"{k}：{v:.2f}s")
+        st.download_button("下载报告（文本）", data=report.text.encode("utf-8"),
+                           file_name=f"{report.file_stem()}.txt", mime="text/plain", use_container_width=True)
+        st.download_button("下载原始 .prof（snakeviz）", data=report.prof_bytes,
+                           file_name=f"{report.file_stem()}.prof", mime="application/octet-stream",
+                           use_container_width=True)
@@ -1,11 +1,23 @@
 import os
-import io, json, time, re
-import pandas as pd
+import copy, json, time, re
 import streamlit as st
-import pdfplumber
-import google.generativeai as genai
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from typing import Dict, List, Any
-from openai import OpenAI  # 用于适配 DeepSeek, Kimi, Yi, 智谱等
+# google.generativeai / openai（DeepSeek, Kimi, Yi, 智谱等）/ pandas / PDF 库均按需导入，见 providers.py
+
+from jobs import DONE, QUEUED, JobManager, QueueFullError
+from incremental import merge_partial, plan_refresh, read_page_texts, text_for_keys
+from pdf_backends import BACKENDS, DEFAULT_BACKEND, available_backends
+from pdf_source import PdfSource, pdf_sha256
+from prefetch import PREFETCH_ENABLED, Prefetcher, wait_prefetched
+from session_store import SessionResultStore
+from two_phase import LOCAL as LOCAL_SOURCE, SOURCE_LABELS, local_sources, merge_refined, preview_from_result
+from profiling import RunProfiler, profiling_enabled_by_env
+from prompt_cache import GEMINI_CONTEXT_CACHE, Prompt, as_prompt, last_usage, openai_messages, prefix_version, record_usage, system_text
+from llm_schema import compact_format_text, expand_tables, response_schema
+from providers import ProviderRegistry
+from singleflight import LLM_FLIGHTS, llm_flight_key
+from usage_ledger import BudgetExceededError, UsageLedger, key_id, tokens_from_usage
 
 # ============================================================
 # 1. 模型供应商配置
@@ -16,55 +28,118 @@ PROVIDERS = {
     "Kimi (Moonshot)": {"base_url": "https://api.moonshot.cn/v1", "model": "moonshot-v1-8k"},
     "智谱 AI (GLM)": {"base_url": "https://open.bigmodel.cn/api/paas/v4/", "model": "glm-4"},
     "零一万物 (Yi)": {"base_url": "https://api.lingyiwanwu.com/v1", "model": "yi-34b-chat-0205"},
-    "通义千问 (Qwen)": {"base_url": "https://dashscope.aliyuncs.com/compatible-mode/v1", "model": "qwen-plus"},
+    "通义千问 (Qwen)": {"base_url": "https://dashscope.aliyuncs.com/compatible-mode/v1", "model": "qwen-plus", "json_schema": True},
     "豆包 (字节)": {"base_url": "https://ark.cn-beijing.volces.com/api/v3", "model": "doubao-pro-32k"}
 }
 
+# 本地桩服务（benchmarks/stub_llm_server.py），用于离线验证提示词前缀与缓存行为
+if os.environ.get("TAS_LLM_STUB_URL"):
+    PROVIDERS["本地桩 (Stub)"] = {"base_url": os.environ["TAS_LLM_STUB_URL"], "model": "stub-json", "json_schema": True}
+
+# SDK 在首次调用时才导入；TAS_PROVIDER_WARMUP=0 关闭侧边栏选中供应商后的后台预热
+PROVIDER_REGISTRY = ProviderRegistry(PROVIDERS)
+WARMUP_ENABLED = os.environ.get("TAS_PROVIDER_WARMUP", "1") != "0"
+
+# 每次调用的 token / 费用按 日期 × 供应商 × Key 入账；预算见 usage_ledger.py（TAS_BUDGET_*）
+USAGE_LEDGER = UsageLedger()
+
 # ============================================================
 # 2. 核心路由：API Key 轮换与重试逻辑
 # ============================================================
 
 def call_llm_core(provider_name, api_key, prompt):
-    """最底层的 API 调用，不做重试，只负责发请求"""
+    """最底层的 API 调用，不做重试，只负责发请求。prompt 为 Prompt（稳定前缀 + 动态内容）或字符串"""
     config = PROVIDERS[provider_name]
-    
-    if "Gemini" in provider_name:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(config["model"])
-        response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+    prompt = as_prompt(prompt)
+    # 先按提示词长度预估并预占额度，超预算直接抛 BudgetExceededError，不发请求
+    reservation = USAGE_LEDGER.reserve(provider_name, api_key, config["model"], system_text(prompt) + prompt.body)
+    try:
+        return _send(provider_name, api_key, prompt, reservation)
+    except Exception as e:
+        # 429 / 配额 / 网络错误同样消耗请求配额：记为失败的请求（已入账的不重复计）
+        USAGE_LEDGER.fail(reservation, api_key, e)
+        raise
+    finally:
+        USAGE_LEDGER.release(reservation)
+
+def _account(provider_name, api_key, reservation, usage):
+    record_usage(provider_name, usage)
+    USAGE_LEDGER.settle(reservation, api_key, usage, cached_tokens=last_usage()["cached_tokens"])
+
+def _send(provider_name, api_key, prompt, reservation):
+    config = PROVIDERS[provider_name]
+    if PROVIDER_REGISTRY.is_gemini(provider_name):
+        gen_config = {"response_mime_type": "application/json"}
+        if prompt.schema:
+            gen_config["response_schema"] = prompt.schema
+        # 前缀足够长时走显式上下文缓存，句柄失效则丢弃并退回普通请求
+        cache_name = GEMINI_CONTEXT_CACHE.handle(api_key, config["model"], system_text(prompt))
+        if cache_name:
+            try:
+                model = GEMINI_CONTEXT_CACHE.model(api_key, cache_name)
+                response = model.generate_content(prompt.body, generation_config=gen_config)
+                _account(provider_name, api_key, reservation, getattr(response, "usage_metadata", None))
+                return json.loads(response.text)
+            except Exception as e:
+                if "cache" not in str(e).lower() and "404" not in str(e):
+                    raise
+                GEMINI_CONTEXT_CACHE.invalidate(api_key, config["model"], system_text(prompt))
+        model = PROVIDER_REGISTRY.gemini(provider_name, api_key, system_text(prompt))
+        response = model.generate_content(prompt.body, generation_config=gen_config)
+        _account(provider_name, api_key, reservation, getattr(response, "usage_metadata", None))
         return json.loads(response.text)
     else:
-        client = OpenAI(api_key=api_key, base_url=config["base_url"])
-        response = client.chat.completions.create(
-            model=config["model"],
-            messages=[
-                {"role": "system", "content": "你是一个只输出 JSON 的教务专家助手。"},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
+        client = PROVIDER_REGISTRY.openai_client(provider_name, api_key)
+        response_format = {"type": "json_object"}
+        if prompt.schema and config.get("json_schema"):
+            response_format = {"type": "json_schema",
+                               "json_schema": {"name": "plan_extract", "schema": prompt.schema}}
+        try:
+            response = client.chat.completions.create(
+                model=config["model"],
+                messages=openai_messages(prompt),
+                response_format=response_format
+            )
+        except Exception as e:
+            # 模型版本不支持 json_schema 时退回 json_object（格式仍由提示词约束）
+            if response_format["type"] != "json_schema" or "response_format" not in str(e):
+                raise
+            response = client.chat.completions.create(
+                model=config["model"],
+                messages=openai_messages(prompt),
+                response_format={"type": "json_object"}
+            )
+        _account(provider_name, api_key, reservation, getattr(response, "usage", None))
         return json.loads(response.choices[0].message.content)
 
-def call_llm_with_retry_and_rotation(provider_name, user_api_key, prompt):
-    all_keys = st.secrets.get("GEMINI_KEYS", [])
+def call_llm_with_retry_and_rotation(provider_name, user_api_key, prompt, rotation=None, log=None):
+    """
+    rotation：保存 Key 指针（api_key_index）的字典，默认 st.session_state；
+    log：输出回调 log(进度, 信息)，默认写到页面。后台任务中两者都必须显式传入（工作线程不能访问 st.session_state）。
+    """
+    rotation = st.session_state if rotation is None else rotation
+    say = log or (lambda p, m: st.write(m))
+    warn = log or (lambda p, m: st.warning(m))
     
-    # 场景 A: 非 Gemini 或用户手动输入了 Key
+    # 场景 A: 非 Gemini 或用户手动输入了 Key（不读取 Secrets，无 secrets.toml 的环境也能直接调用）
     if "Gemini" not in provider_name or user_api_key:
         target_key = user_api_key if user_api_key else st.secrets.get("GEMINI_API_KEY", "")
         return call_llm_core(provider_name, target_key, prompt)
 
+    all_keys = st.secrets.get("GEMINI_KEYS", [])
+
     # 场景 B: Gemini 多 Key 自动轮换
     if not all_keys:
         raise Exception("未在 Secrets 中配置 GEMINI_KEYS 列表")
 
-    if "api_key_index" not in st.session_state:
-        st.session_state.api_key_index = 0
+    if "api_key_index" not in rotation:
+        rotation["api_key_index"] = 0
 
-    last_exception = None
+    skipped = []
     
     # --- 关键修改点 1：每次调用该函数时，先主动跳到下一个 Key ---
     # 这样可以确保即便是成功的运行，下一次也会换 Key
-    start_idx = st.session_state.api_key_index % len(all_keys)
+    start_idx = rotation["api_key_index"] % len(all_keys)
 
     for i in range(len(all_keys)):
         # 计算当前尝试的索引
@@ -72,26 +147,33 @@ def call_llm_with_retry_and_rotation(provider_name, user_api_key, prompt):
         current_key = all_keys[current_attempt_idx]
         
         # 更新 session_state，确保 UI 显示的是当前正在尝试的那个
-        st.session_state.api_key_index = current_attempt_idx
+        rotation["api_key_index"] = current_attempt_idx
         
         try:
-            st.write(f"正在尝试使用 Key #{current_attempt_idx + 1}...")
+            say(None, f"正在尝试使用 Key #{current_attempt_idx + 1}...")
             result = call_llm_core(provider_name, current_key, prompt)
             
             # --- 关键修改点 2：成功运行后，将索引推到下一个，为下一次“全新运行”做准备 ---
-            st.session_state.api_key_index = (current_attempt_idx + 1) % len(all_keys)
+            rotation["api_key_index"] = (current_attempt_idx + 1) % len(all_keys)
             return result
             
+        except BudgetExceededError as e:
+            # 预检查拦下的请求没有发出，直接换下一个 Key
+            skipped.append(current_attempt_idx + 1)
+            warn(None, f"⚠️ Key #{current_attempt_idx + 1} 已达今日预算（{e}），自动尝试下一个...")
+            continue
         except Exception as e:
             err_msg = str(e).lower()
             # 如果是配额问题，记录错误并继续循环（尝试下一个 key）
             if any(x in err_msg for x in ["429", "quota", "limit"]):
-                st.warning(f"⚠️ Key #{current_attempt_idx + 1} 配额耗尽，自动尝试下一个...")
+                warn(None, f"⚠️ Key #{current_attempt_idx + 1} 配额耗尽，自动尝试下一个...")
                 continue 
             else:
                 # 如果是其他错误（比如内容安全拦截），直接抛出不再重试
                 raise e
     
+    if len(skipped) == len(all_keys):
+        raise BudgetExceededError(f"❌ 所有 {len(all_keys)} 个 Key 均已达到今日预算，请求未发出。")
     raise Exception(f"❌ 已尝试所有 {len(all_keys)} 个 Key，均无法完成请求。")
     
 # ============================================================
@@ -108,59 +190,312 @@ MEGA_PROMPT = """
    - 附表 2：(学分统计)必须清晰区分“焊接”和“无损检测”两个方向。
    - 附表 4：(支撑矩阵)提取课程对指标点的支撑强度（H/M/L）。
    
-### 输出格式： 
-必须严格输出一个 JSON 对象，结构如下：
-{
-  "sections": {
-    "1培养目标": "...",
-    "2毕业要求": "...",
-    "3专业定位与特色": "...",
-    "4主干学科/核心课程/实践环节": "...",
-    "5标准学制与授予学位": "...",
-    "6毕业条件": "..."
-  },
-  "table1": [{"课程体系": "...", "课程编码": "...", "课程名称": "...", "开课模式": "...", "考核方式": "...", "课内学分": "...", "课内总学时": "...", "课内讲课学时": "...", "课内实验学时": "...", "课内上机学时": "...", "课内实践学时": "...", "课外学分": "...", "课外学时": "...", "上课学期": "...", "专业方向": "...", "是否学位课": "...", "备注": "..."}],
-  "table2": [{"专业方向": "...", "课程体系": "...", "开课模式": "...", "学期一学分分配": "...", "学期二学分分配": "...", "学期三学分分配": "...", "学期四学分分配": "...", "学期五学分分配": "...", "学期六学分分配": "...", "学期七学分分配": "...", "学期八学分分配": "...", "学分统计": "...", "学分比例": "..."}],
-  "table4": [{"课程名称": "...", "指标点": "...", "强度": "..."}]
-}
+### 输出格式：
+""" + compact_format_text()
 
-"""
+MEGA_SCHEMA = response_schema()
 
-def parse_document_mega(user_api_key, pdf_bytes, provider_name):
-    """带有动态状态反馈和自动轮换的解析函数"""
+def build_full_prompt(all_text):
+    """全量抽取：MEGA_PROMPT 作为稳定前缀，原文放在其后"""
+    return Prompt(prefix=MEGA_PROMPT, body=f"原文：\n{all_text}", schema=MEGA_SCHEMA)
+
+def build_partial_prompt(keys, text):
+    """增量更新指令：前缀与全量抽取完全相同（可复用缓存），只在动态部分说明需要输出的字段。"""
+    fields = "、".join(keys)
+    return Prompt(
+        prefix=MEGA_PROMPT,
+        body=(
+            f"### 增量更新：\n本次仅需输出以下字段（其余字段不要输出）：{fields}。"
+            f"其中 sections.X 表示 sections 对象中的 X 栏目。\n\n原文（仅相关页面）：\n{text}"
+        ),
+        schema=MEGA_SCHEMA,
+    )
+
+def extract_mega(user_api_key, pdf_bytes, provider_name, prior=None, pdf_backend=None, log=None, rotation=None,
+                 prefetched=None):
+    """
+    不依赖页面的抽取主流程（可在后台线程执行），失败时抛出异常。
+    prior：上一版本 {"data": mega_data, "pages": 页面指纹}，修订版只重新请求变化的章节/附表。
+    log：log(进度 0~1 或 None, 信息)；rotation：见 call_llm_with_retry_and_rotation。
+    prefetched：上传时已开始的逐页文本预读（Future），有则直接等它的结果。
+    返回 (结果, 页面指纹列表)
+    """
+    log = log or (lambda p, m: None)
+    log(0.05, "♻️ 复用上传时已开始的文本预读..." if prefetched is not None else "🔍 正在读取 PDF 文本内容...")
+    prior_pages = prior["pages"] if prior else None
+    pages = wait_prefetched(prefetched, lambda: read_page_texts(pdf_bytes, prior_pages, backend=pdf_backend))
+    all_text = "\n".join(p["text"] for p in pages)
+    log(0.2, f"✅ 已读取 {len(all_text)} 字符。")
+
+    keys = plan_refresh(prior_pages, pages) if prior else None
+    if keys == []:
+        log(1.0, "✅ 文本与上一版本一致，直接复用结果")
+        return prior["data"], pages
+
+    def request():
+        if keys:
+            log(0.3, f"♻️ 增量更新：仅重新抽取 {'、'.join(keys)}")
+            partial = call_llm_with_retry_and_rotation(
+                provider_name, user_api_key, build_partial_prompt(keys, text_for_keys(pages, keys)),
+                rotation=rotation, log=log,
+            )
+            return merge_partial(prior["data"], expand_tables(partial), keys)
+        log(0.3, "📑 正在发送 AI 抽取请求 (支持 Key 自动轮换)...")
+        # --- 关键修改：调用带轮换重试的函数 ---
+        return expand_tables(call_llm_with_retry_and_rotation(provider_name, user_api_key, build_full_prompt(all_text),
+                                                              rotation=rotation, log=log))
+
+    # 同一文件 + 同一模型 + 同一提示词版本的并发请求只调用一次 LLM，其余请求共享结果
+    flight_key = llm_flight_key(
+        pdf_sha256(pdf_bytes), provider_name, PROVIDERS[provider_name]["model"],
+        prefix_version(MEGA_PROMPT), keys, prior["data"] if keys else None,
+    )
+    start_time = time.time()
+    result, shared = LLM_FLIGHTS.do(
+        flight_key, request, on_wait=lambda: log(0.3, "🤝 相同文件的抽取正在进行中，等待共享其结果（不重复消耗配额）...")
+    )
+    if shared:
+        result = copy.deepcopy(result)  # 各会话各持一份，避免后续编辑互相影响
+
+    duration = time.time() - start_time
+    log(0.95, f"✨ 解析完成，总耗时 {duration:.1f} 秒。")
+    usage = last_usage()
+    if not shared and usage:
+        prompt_tokens, completion_tokens = tokens_from_usage(usage["usage"])
+        if prompt_tokens or completion_tokens:
+            log(None, f"🧮 本次消耗输入 {prompt_tokens:,} / 输出 {completion_tokens:,} tokens。")
+        if usage["cached_tokens"]:
+            log(None, f"⚡ 指令前缀命中供应商缓存 {usage['cached_tokens']} tokens。")
+    return result, pages
+
+def parse_document_mega(user_api_key, pdf_bytes, provider_name, prior=None, pdf_backend=None):
+    """
+    同步版本（脚本线程内执行，带动态状态反馈），性能分析模式使用。
+    返回 (结果, 页面指纹列表)；失败时返回 (None, None)
+    """
     with st.status(f"🚀 正在通过 {provider_name} 提取数据...", expanded=True) as status:
         try:
-            st.write("🔍 正在读取 PDF 文本内容...")
-            with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-                all_text = "\n".join([p.extract_text() or "" for p in pdf.pages])
-            st.write(f"✅ 已读取 {len(all_text)} 字符。")
-
-            st.write("📑 正在发送 AI 抽取请求 (支持 Key 自动轮换)...")
-            start_time = time.time()
-            
-            # --- 关键修改：调用带轮换重试的函数 ---
-            full_prompt = f"{MEGA_PROMPT}\n\n原文：\n{all_text}"
-            result = call_llm_with_retry_and_rotation(provider_name, user_api_key, full_prompt)
-            
-            duration = time.time() - start_time
-            st.write(f"✨ 解析完成，总耗时 {duration:.1f} 秒。")
+            result, pages = extract_mega(user_api_key, pdf_bytes, provider_name, prior=prior,
+                                         pdf_backend=pdf_backend, log=lambda p, m: st.write(m))
             status.update(label="✅ 提取成功！", state="complete", expanded=False)
-            return result
+            return result, pages
 
         except Exception as e:
             status.update(label="❌ 提取失败", state="error", expanded=True)
             st.error(str(e))
-            return None
+            return None, None
+
+def mega_job(report, user_api_key, pdf_bytes, provider_name, prior, pdf_backend, rotation, prefetched=None,
+             preview=None, publish=None):
+    """
+    后台任务：rotation 为脚本线程传入的指针副本，完成后随结果带回由页面回写。
+    两阶段模式：preview 为本地解析预览（Future），一完成就交给 publish 先行展示；
+    LLM 结果到达后与预览逐字段合并，返回值附带各字段来源。
+    """
+    if preview is not None and publish is not None:
+        preview.add_done_callback(publish)
+    result, pages = extract_mega(user_api_key, pdf_bytes, provider_name, prior=prior,
+                                 pdf_backend=pdf_backend, log=report, rotation=rotation, prefetched=prefetched)
+    local = wait_prefetched(preview, lambda: None) if preview is not None else None
+    merged, sources = merge_refined(local, result)
+    return merged, pages, rotation.get("api_key_index", 0), sources
+
+def build_preview(cache, templates, pdf_bytes, pdf_backend):
+    """本地确定性抽取 → 与 LLM 结果同结构的预览（在预抽取线程池中执行）。"""
+    from extract_cache import cached_run_full_extract
+    res, _ = cached_run_full_extract(cache, pdf_bytes, backend=pdf_backend, templates=templates)
+    return preview_from_result(res)
+
+def publish_preview(store, slot):
+    """预览完成回调（工作线程中执行，不调用 st.*）：写入会话结果存储，句柄放进 slot 供轮询片段换上。"""
+    def publish(fut):
+        try:
+            data = fut.result()
+        except Exception:
+            return
+        slot["handle"] = store.put((data, None, local_sources(data)), "mega")
+    return publish
+
+@st.cache_resource
+def get_job_manager():
+    """进程级单例：后台抽取任务池（所有会话共享，按会话轮转调度）。"""
+    return JobManager(max_workers=2, max_queue=16, max_per_owner=1)
+
+def session_owner():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "anon"
+
+@st.cache_resource
+def get_session_store():
+    """进程级单例：会话结果落盘存储，session_state 中只保存句柄。"""
+    return SessionResultStore()
+
+def session_mega():
+    """(抽取结果, 页面指纹, 各字段来源)，按需从磁盘读回；已超过保留期限被清理时提示并返回 (None, None, None)。"""
+    handle = st.session_state.get("mega_handle")
+    saved = get_session_store().get(handle)
+    if handle is not None and saved is None:
+        st.session_state.pop("mega_handle", None)
+        st.info("上次的抽取结果已超过保留期限被清理，请重新抽取。")
+    return saved if saved is not None else (None, None, None)
+
+def set_session_mega(result, pages, sources=None):
+    store = get_session_store()
+    store.drop(st.session_state.get("mega_handle"))
+    st.session_state.mega_handle = store.put((result, pages, sources), "mega")
+
+@st.cache_resource
+def get_extract_cache():
+    """进程级单例：确定性抽取磁盘缓存（两阶段模式的本地预览使用）。"""
+    from extract_cache import ExtractCache
+    return ExtractCache()
+
+@st.cache_resource
+def get_template_store():
+    """进程级单例：版式模板库（两阶段模式的本地预览使用）。"""
+    from template_profiles import TemplateStore
+    return TemplateStore()
+
+@st.cache_resource
+def get_prefetcher():
+    """进程级单例：上传即开始的逐页文本预读（按 SHA-256 + 解析后端，所有会话共享）。"""
+    return Prefetcher()
+
+def _upload_key(file):
+    return getattr(file, "file_id", None) or (file.name, getattr(file, "size", None))
+
+def upload_source(file):
+    """
+    同一上传文件在多次重跑之间只读取、哈希一次。
+    会话中暂存 (文件, SHA-256, PdfSource)；PdfSource 交给任务 / 预读后由 release_upload() 放掉，
+    之后需要时按已知哈希重建（小文件零拷贝、不再哈希）。
+    """
+    file_key = _upload_key(file)
+    cached = st.session_state.get("upload_source")
+    if cached is not None and cached[0] == file_key and cached[2] is not None:
+        return cached[2]
+    sha = cached[1] if cached is not None and cached[0] == file_key else None
+    source = PdfSource.from_upload(file, sha256=sha)
+    st.session_state.upload_source = (file_key, source.sha256, source)
+    return source
+
+def upload_sha(file):
+    """已读取过的上传文件的 SHA-256（不读文件）；未读取过返回 None。"""
+    cached = st.session_state.get("upload_source")
+    return cached[1] if cached is not None and cached[0] == _upload_key(file) else None
+
+def release_upload(file):
+    """任务 / 预读已持有 PdfSource：会话只留 (文件, SHA-256)，整份上传不随会话常驻（任务结束即释放）。"""
+    cached = st.session_state.get("upload_source")
+    if cached is not None and cached[0] == _upload_key(file):
+        st.session_state.upload_source = (cached[0], cached[1], None)
+
+def pages_prefetch_key(sha, pdf_backend):
+    return ("pages", sha, pdf_backend or DEFAULT_BACKEND)
+
+def preview_prefetch_key(sha, pdf_backend):
+    return ("preview", sha, pdf_backend or DEFAULT_BACKEND)
+
+def render_source(sources, key):
+    """两阶段模式下标注字段来源（本地解析 / AI 抽取）。"""
+    src = (sources or {}).get(key)
+    if src:
+        st.caption(f"来源：{SOURCE_LABELS[src]}")
+
+@st.fragment(run_every=1.0)
+def poll_mega_job():
+    """每秒刷新后台抽取进度；结束后写回结果并整页重跑。"""
+    jobs = get_job_manager()
+    job = jobs.get(st.session_state.get("mega_job"))
+    slot = st.session_state.get("mega_preview")
+    if job is not None and not job.finished:
+        if slot and slot.get("handle") and not slot.get("shown"):
+            # 两阶段：本地预览已就绪，先换上并整页重跑展示，任务继续在后台等待 AI 结果
+            slot["shown"] = True
+            get_session_store().drop(st.session_state.get("mega_handle"))
+            st.session_state.mega_handle = slot["handle"]
+            st.rerun()
+        if job.status == QUEUED:
+            text = f"排队中：前面约 {max(0, jobs.queue_position(job.id) - 1)} 个任务"
+        else:
+            text = f"{job.message}（已用时 {job.elapsed():.0f} 秒）"
+        st.progress(job.progress, text=f"🚀 {job.label} · {text}")
+        if job.status == QUEUED and st.button("取消排队", key="cancel_mega_job"):
+            jobs.cancel(job.id)
+        return
+    st.session_state.pop("mega_job", None)
+    st.session_state.pop("mega_preview", None)
+    if slot and slot.get("handle") and not slot.get("shown"):
+        get_session_store().drop(slot["handle"])   # 预览尚未换上任务就结束了：直接丢弃
+    if job is not None and job.expired:
+        st.session_state.mega_notice = ("warning", "⚠️ 抽取结果保留时间已过，请重新抽取（同一文件的本地解析会命中缓存）。")
+    elif job is not None and job.status == DONE:
+        result, pages, key_index, sources = jobs.take_result(job.id)
+        set_session_mega(result, pages, sources)
+        st.session_state.api_key_index = key_index
+        st.session_state.mega_notice = ("success", f"✅ 提取成功！（{job.elapsed():.1f} 秒）")
+    elif job is not None and job.error:
+        shown = slot is not None and slot.get("shown")
+        st.session_state.mega_notice = ("error", f"❌ 提取失败：{job.message}" + ("（当前显示的是本地解析结果）" if shown else ""))
+    st.rerun()
 
 # ============================================================
 # 4. Streamlit UI
 # ============================================================
 
+def render_profile_report(report):
+    """侧边栏展示最近一次性能分析报告并提供下载"""
+    if report is None:
+        return
+    with st.sidebar:
+        st.markdown("### ⏱️ 性能分析报告")
+        st.caption(f"{report.label}｜{report.wall_s:.2f}s｜峰值 {report.peak_mb:.1f} MB｜SHA {report.doc_sha256[:12]}")
+        for k, v in report.marks.items():
+            st.caption(f"{k}：{v:.2f}s")
+        st.download_button("下载报告（文本）", data=report.text.encode("utf-8"),
+                           file_name=f"{report.file_stem()}.txt", mime="text/plain", use_container_width=True)
+        st.download_button("下载原始 .prof（snakeviz）", data=report.prof_bytes,
+                           file_name=f"{report.file_stem()}.prof", mime="application/octet-stream",
+                           use_container_width=True)
+
+def render_type_report(typed):
+    """类型化结果：数值 / 类别列数与解析失败明细（原表展示不变）。"""
+    kinds = list(typed.kinds.values())
+    n_cat = kinds.count("category")
+    st.caption(f"🔢 已类型化 {len(kinds) - n_cat} 个数值列、{n_cat} 个类别列；解析失败 {typed.failure_count} 处")
+    if typed.failure_count:
+        with st.expander("需要校对的单元格", expanded=False):
+            st.dataframe(typed.failure_report(), use_container_width=True, hide_index=True)
+
+def render_usage_panel(provider_name, user_api_key):
+    """侧边栏：所选供应商今日各 Key 的 token / 请求数 / 估算费用，以及预算占用。"""
+    rows = USAGE_LEDGER.usage(provider=provider_name)
+    budget = USAGE_LEDGER.budget
+    with st.expander(f"📊 今日用量（{provider_name}）", expanded=False):
+        if not rows:
+            st.caption("今日尚无调用记录。")
+            return
+        labels = {}
+        if "Gemini" in provider_name and not user_api_key:
+            labels = {key_id(k): f"Key #{i + 1}" for i, k in enumerate(st.secrets.get("GEMINI_KEYS", []))}
+        if user_api_key:
+            labels[key_id(user_api_key)] = "当前输入的 Key"
+        for r in rows:
+            tokens = r["prompt_tokens"] + r["completion_tokens"]
+            name = labels.get(r["key_id"], f"Key {r['key_id'][:6]}")
+            failed = f"（失败 {r['failures']} 次，其中限流 {r['rate_limited']} 次）" if r["failures"] else ""
+            st.caption(f"{name}：{r['requests']} 次{failed}｜输入 {r['prompt_tokens']:,} / 输出 {r['completion_tokens']:,} tokens"
+                       f"｜缓存命中 {r['cached_tokens']:,}｜约 ${r['cost_usd']:.3f}")
+            if budget.key_tokens:
+                st.progress(min(1.0, tokens / budget.key_tokens), text=f"token 预算 {tokens:,} / {budget.key_tokens:,.0f}")
+            if budget.key_requests:
+                st.progress(min(1.0, r["requests"] / budget.key_requests),
+                            text=f"请求预算 {r['requests']} / {budget.key_requests:.0f}")
+        total = sum(r["cost_usd"] for r in rows)
+        st.caption(f"合计约 ${total:.3f}" + (f"（每日预算 ${budget.daily_usd:.2f}）" if budget.daily_usd else ""))
+
 def main():
     st.set_page_config(layout="wide", page_title="智能教学工作台")
-    
-    if "mega_data" not in st.session_state:
-        st.session_state.mega_data = None
 
     with st.sidebar:
         st.title("🤖 模型配置")
@@ -176,32 +511,139 @@ def main():
             st.caption(f"当前指针：第 {idx + 1} 个 Key")
         
         st.warning("如果遇到并发限制，系统会自动尝试列表中下一个 Key。")
+        render_usage_panel(selected_provider, user_input_key)
+        if WARMUP_ENABLED:
+            # 后台预先导入所选供应商的 SDK 并建立连接，点击抽取时不再等待冷启动
+            PROVIDER_REGISTRY.warm_up_async(selected_provider, user_input_key)
+
+        pdf_backend = st.selectbox("PDF 解析后端", available_backends() or [DEFAULT_BACKEND],
+                                   format_func=lambda k: BACKENDS[k]["label"])
+        profile_mode = st.checkbox("性能分析模式（仅下一次抽取）", value=profiling_enabled_by_env(),
+                                   help="对本次抽取与渲染做 cProfile + 内存分析，生成可下载报告。")
+        two_phase = st.checkbox("两阶段：先显示本地解析结果，AI 结果到达后替换", value=True,
+                                help="本地确定性抽取一两秒即可给出章节与附表；AI 结果到达后逐字段替换，并标注每项的来源。")
 
     st.header("🧠 培养方案全量提取")
-    file = st.file_uploader("上传 PDF", type="pdf")
-
-    if file and st.button("🚀 执行一键全量抽取", type="primary"):
-        # 调用函数
-        result = parse_document_mega(user_input_key, file.getvalue(), selected_provider)
-        if result:
-            st.session_state.mega_data = result
-
-    # 结果展示部分
-    if st.session_state.mega_data:
-        d = st.session_state.mega_data
-        tab1, tab2, tab3, tab4 = st.tabs(["1-6 正文", "附表1: 计划表", "附表2: 学分统计", "附表4: 支撑矩阵"])
-        # ... (展示代码保持不变) ...
-        with tab1:
-            sections = d.get("sections", {})
-            if sections:
-                sec_pick = st.selectbox("选择栏目", list(sections.keys()))
-                st.text_area("内容", value=sections.get(sec_pick, ""), height=400)
-        with tab2:
-            st.dataframe(pd.DataFrame(d.get("table1", [])), use_container_width=True)
-        with tab3:
-            st.dataframe(pd.DataFrame(d.get("table2", [])), use_container_width=True)
-        with tab4:
-            st.dataframe(pd.DataFrame(d.get("table4", [])), use_container_width=True)
+    file = st.file_uploader("上传 PDF / Word（.docx）", type=["pdf", "docx"])
+    mega_data, mega_pages, mega_sources = session_mega()
+
+    profiler = None
+    source = None
+    run = bool(file) and st.button("🚀 执行一键全量抽取", type="primary")
+    if file is not None and PREFETCH_ENABLED and not profile_mode and not run:
+        # 上传即在后台预读逐页文本：用户选供应商 / Key 的这几秒里本地阶段往往已经做完
+        sha = upload_sha(file) or upload_source(file).sha256
+        started = st.session_state.setdefault("prefetch_started", set())   # 每个文件 + 参数只预读一次
+        key = pages_prefetch_key(sha, pdf_backend)
+        if key not in started:
+            started.add(key)
+            get_prefetcher().start(session_owner(), key, read_page_texts, upload_source(file), mega_pages, pdf_backend)
+        key = preview_prefetch_key(sha, pdf_backend)
+        if two_phase and key not in started:
+            started.add(key)
+            get_prefetcher().start(session_owner(), key, build_preview, get_extract_cache(), get_template_store(),
+                                   upload_source(file), pdf_backend)
+        release_upload(file)
+    try:
+        if run:
+            # 上传文件只取一次：小文件零拷贝、大文件溢出到临时文件，哈希在读入时算好
+            source = upload_source(file)
+            # 调用函数：已有结果时作为上一版本，修订版只重抽变化部分
+            prior = None
+            if mega_data and mega_pages:
+                prior = {"data": mega_data, "pages": mega_pages}
+            if get_job_manager().get(st.session_state.get("mega_job")) is not None:
+                st.warning("已有抽取任务在进行中，请等待完成。")
+            elif profile_mode:
+                # cProfile 只能看到脚本线程：性能分析模式保持同步执行
+                profiler = RunProfiler("parse_document_mega").start()
+                result, pages = parse_document_mega(user_input_key, source, selected_provider,
+                                                    prior=prior, pdf_backend=pdf_backend)
+                if result:
+                    mega_data, mega_sources = merge_refined(None, result)
+                    mega_pages = pages
+                    set_session_mega(mega_data, mega_pages, mega_sources)
+                profiler.mark("抽取")
+            else:
+                prefetcher = get_prefetcher()
+                # 先认领逐页文本，再认领 / 开始本地预览
+                pages_fut = prefetcher.claim(pages_prefetch_key(source.sha256, pdf_backend))
+                preview, slot = None, None
+                if two_phase:
+                    # 本地预览：上传时已开始则直接认领，否则现在放进预抽取线程池，与 LLM 请求并行
+                    key = preview_prefetch_key(source.sha256, pdf_backend)
+                    preview = prefetcher.claim(key)
+                    if preview is None:
+                        prefetcher.start(session_owner(), key, build_preview, get_extract_cache(), get_template_store(),
+                                         source, pdf_backend)
+                        preview = prefetcher.claim(key)
+                    slot = {}
+                try:
+                    st.session_state.mega_job = get_job_manager().submit(
+                        session_owner(), mega_job, user_input_key, source, selected_provider, prior,
+                        pdf_backend, {"api_key_index": st.session_state.get("api_key_index", 0)},
+                        pages_fut, preview, publish_preview(get_session_store(), slot) if slot is not None else None,
+                        label=f"{selected_provider} 抽取 {file.name}",
+                    )
+                    st.session_state.mega_preview = slot
+                except QueueFullError as e:
+                    st.warning(str(e))
+            release_upload(file)
+
+        if st.session_state.get("mega_job"):
+            poll_mega_job()
+        notice = st.session_state.pop("mega_notice", None)
+        if notice:
+            getattr(st, notice[0])(notice[1])
+
+        # 结果展示部分
+        if mega_data:
+            if st.session_state.get("mega_job") and LOCAL_SOURCE in (mega_sources or {}).values():
+                st.info("📄 当前为本地解析预览，AI 抽取结果到达后将逐项替换。")
+            import pandas as pd
+            from support_matrix import SupportMatrix
+            from llm_schema import TABLE_COLUMNS
+            from table_types import checks_frame, credit_checks, required_credits, type_rows
+            d = mega_data
+            typed = {t: type_rows(d.get(t, []), cols) for t, cols in TABLE_COLUMNS.items()}
+            tab1, tab2, tab3, tab4 = st.tabs(["1-6 正文", "附表1: 计划表", "附表2: 学分统计", "附表4: 支撑矩阵"])
+            # ... (展示代码保持不变) ...
+            with tab1:
+                sections = d.get("sections", {})
+                if sections:
+                    sec_pick = st.selectbox("选择栏目", list(sections.keys()))
+                    render_source(mega_sources, f"sections.{sec_pick}")
+                    st.text_area("内容", value=sections.get(sec_pick, ""), height=400)
+            with tab2:
+                render_source(mega_sources, "table1")
+                st.dataframe(pd.DataFrame(d.get("table1", [])), use_container_width=True)
+                render_type_report(typed["table1"])
+            with tab3:
+                render_source(mega_sources, "table2")
+                st.dataframe(pd.DataFrame(d.get("table2", [])), use_container_width=True)
+                render_type_report(typed["table2"])
+                required = required_credits(d.get("sections"))
+                checks = credit_checks(typed["table1"], typed["table2"], required)
+                if checks:
+                    st.markdown(f"**学分核对**（毕业要求：{required if required is not None else '未在正文中找到'} 学分）")
+                    st.dataframe(checks_frame(checks), use_container_width=True, hide_index=True)
+            with tab4:
+                render_source(mega_sources, "table4")
+                st.dataframe(pd.DataFrame(d.get("table4", [])), use_container_width=True)
+                sm = SupportMatrix.from_records(d.get("table4", []))
+                if sm.courses:
+                    lacking_h = sm.indicators_lacking("H")
+                    st.caption(f"{sm.shape[0]} 门课程 × {sm.shape[1]} 个指标点；缺 H 支撑：{'、'.join(lacking_h) or '无'}")
+                    st.dataframe(sm.requirement_rollup(), use_container_width=True, hide_index=True)
+
+        if profiler is not None:
+            profiler.mark("渲染")
+            st.session_state.profile_report = profiler.stop(doc_sha256=source.sha256)
+    finally:
+        # 抽取或渲染中途出错（包括 st.stop / st.rerun）也关掉 cProfile 与进程级 tracemalloc，已 stop() 时无作用
+        if profiler is not None:
+            profiler.abort()
+    render_profile_report(st.session_state.get("profile_report"))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
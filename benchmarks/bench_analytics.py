@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+多方案统计库：入库与聚合耗时、按方向分组是否正确（离线）
+
+用法：
+    python benchmarks/bench_analytics.py --plans 3
+
+1. 合成 PDF（medium / large，各 --plans 份）抽取后 AnalyticsStore.add() 入库，计时
+2. 新实例冷读 courses() 与 credits_by_system / hour_ratios / semester_load 的耗时
+3. 校验：每个方案的按方向分组都含“焊接”“无损检测”（行级方向，而不是共享页的“混合”）
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import plan_extract  # noqa: E402
+from bench_pipeline import corpus_pdf  # noqa: E402
+from plan_analytics import AnalyticsStore  # noqa: E402
+
+DIRECTIONS = {"焊接", "无损检测"}
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="多方案统计库")
+    ap.add_argument("--plans", type=int, default=3)
+    args = ap.parse_args()
+
+    results = [(f"{size}_{seed}", plan_extract.run_full_extract(corpus_pdf(size, seed=seed), use_ocr=False))
+               for size in ("medium", "large") for seed in range(args.plans)]
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        store = AnalyticsStore(tmp)
+        t0 = time.perf_counter()
+        for name, res in results:
+            store.add(res, name)
+        add_s = time.perf_counter() - t0
+
+        cold = AnalyticsStore(tmp)
+        t0 = time.perf_counter()
+        courses = cold.courses()
+        load_ms = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        queries = {
+            "credits_by_system": cold.credits_by_system(),
+            "hour_ratios": cold.hour_ratios(),
+            "semester_load": cold.semester_load(),
+        }
+        query_ms = (time.perf_counter() - t0) * 1000
+
+        print(f"{len(results)} 份方案、{len(courses)} 门课：入库 {add_s:.2f}s，冷读 {load_ms:.0f} ms，三项聚合 {query_ms:.0f} ms")
+        for qname, df in queries.items():
+            for plan, g in df.groupby("plan", observed=True):
+                dirs = set(g["direction"].astype(str))
+                if not DIRECTIONS <= dirs:
+                    ok = False
+                    print(f"  ✗ {qname} / {plan}：方向只有 {sorted(dirs)}")
+        print(f"  方向取值：{sorted(set(courses['direction'].astype(str)))}")
+
+    if not ok:
+        sys.exit(1)
+    print("\n✓ 各方案按方向分组均含焊接、无损检测")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+PDF 后端对比基准：速度 + 输出一致性
+
+用法：
+    python benchmarks/bench_backends.py 方案A.pdf 方案B.pdf --repeat 3
+    python benchmarks/bench_backends.py plans/*.pdf --json bench_backends.json
+
+以 pdfplumber 为参照，对每个后端统计：
+- 文本 / 表格阶段耗时（取多次运行的中位数）
+- 文本相似度（逐页 difflib ratio 的均值）
+- 表格一致性：表格数量一致的页面占比、单元格完全一致的比例（normalize_table 之后）
+最后给出“表格一致性达标的最快后端”建议。
+注意 pdfplumber 在文本阶段解析的页面对象会被表格阶段复用，应以两阶段之和比较。
+"""
+
+from __future__ import annotations
+
+import argparse
+import difflib
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_backends import available_backends, open_pages  # noqa: E402
+from plan_extract import DEFAULT_TABLE_SETTINGS, normalize_multiline, normalize_table  # noqa: E402
+
+REFERENCE = "pdfplumber"
+
+def run_backend(pdf_bytes: bytes, backend: str) -> Dict[str, Any]:
+    texts: List[str] = []
+    tables: List[List[List[List[str]]]] = []
+    t_text = t_table = 0.0
+    with open_pages(pdf_bytes, backend) as pages:
+        for page in pages:
+            t0 = time.perf_counter()
+            texts.append(normalize_multiline(page.text()))
+            t1 = time.perf_counter()
+            try:
+                raw = page.tables(DEFAULT_TABLE_SETTINGS)
+            except Exception:
+                raw = []
+            tables.append([ct for ct in (normalize_table(t) for t in raw) if ct])
+            t_table += time.perf_counter() - t1
+            t_text += t1 - t0
+    return {"texts": texts, "tables": tables, "text_s": t_text, "table_s": t_table}
+
+def compare(ref: Dict[str, Any], out: Dict[str, Any]) -> Dict[str, float]:
+    ratios = [
+        difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+        for a, b in zip(ref["texts"], out["texts"])
+    ]
+    pages_same_count = 0
+    cells_total = cells_equal = 0
+    for ref_tables, tables in zip(ref["tables"], out["tables"]):
+        if len(ref_tables) == len(tables):
+            pages_same_count += 1
+        for rt, t in zip(ref_tables, tables):
+            for i, row in enumerate(rt):
+                for j, cell in enumerate(row):
+                    cells_total += 1
+                    if i < len(t) and j < len(t[i]) and t[i][j] == cell:
+                        cells_equal += 1
+        # 参照后端多出的表格全部计为不一致
+        for rt in ref_tables[len(tables):]:
+            cells_total += sum(len(r) for r in rt)
+    n_pages = max(1, len(ref["tables"]))
+    return {
+        "text_similarity": round(statistics.mean(ratios), 4) if ratios else 1.0,
+        "table_count_match": round(pages_same_count / n_pages, 4),
+        "cell_match": round(cells_equal / cells_total, 4) if cells_total else 1.0,
+    }
+
+def bench_file(path: str, backends: List[str], repeat: int) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        pdf_bytes = f.read()
+    runs: Dict[str, Dict[str, Any]] = {}
+    report: Dict[str, Any] = {"file": path, "backends": {}}
+    for backend in backends:
+        samples = [run_backend(pdf_bytes, backend) for _ in range(repeat)]
+        runs[backend] = samples[-1]
+        report["backends"][backend] = {
+            "text_s": round(statistics.median(s["text_s"] for s in samples), 4),
+            "table_s": round(statistics.median(s["table_s"] for s in samples), 4),
+            "pages": len(samples[-1]["texts"]),
+            "tables": sum(len(t) for t in samples[-1]["tables"]),
+        }
+    ref = runs.get(REFERENCE)
+    for backend in backends:
+        if ref is not None:
+            report["backends"][backend].update(compare(ref, runs[backend]))
+    return report
+
+def recommend(reports: List[Dict[str, Any]], min_cell_match: float) -> str:
+    totals: Dict[str, float] = {}
+    ok: Dict[str, bool] = {}
+    for rep in reports:
+        for name, r in rep["backends"].items():
+            totals[name] = totals.get(name, 0.0) + r["text_s"] + r["table_s"]
+            ok[name] = ok.get(name, True) and r.get("cell_match", 1.0) >= min_cell_match
+    good = [n for n in totals if ok[n]]
+    return min(good, key=totals.get) if good else REFERENCE
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="对比 PDF 解析后端的速度与输出一致性")
+    ap.add_argument("pdfs", nargs="+")
+    ap.add_argument("--backends", nargs="*", default=None, help="默认：所有已安装后端")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--min-cell-match", type=float, default=0.98, help="表格单元格一致率阈值")
+    ap.add_argument("--json", default="", help="把完整报告写入 JSON 文件")
+    args = ap.parse_args()
+
+    backends = args.backends or available_backends()
+    if REFERENCE in backends:
+        backends = [REFERENCE] + [b for b in backends if b != REFERENCE]
+
+    reports = [bench_file(p, backends, max(1, args.repeat)) for p in args.pdfs]
+
+    header = f"{'file':<32} {'backend':<12} {'pages':>5} {'tables':>6} {'text_s':>8} {'table_s':>8} {'text_sim':>8} {'cnt_eq':>7} {'cell_eq':>7}"
+    print(header)
+    print("-" * len(header))
+    for rep in reports:
+        name = os.path.basename(rep["file"])[:32]
+        for backend, r in rep["backends"].items():
+            print(f"{name:<32} {backend:<12} {r['pages']:>5} {r['tables']:>6} {r['text_s']:>8.3f} {r['table_s']:>8.3f} "
+                  f"{r.get('text_similarity', 1):>8.3f} {r.get('table_count_match', 1):>7.3f} {r.get('cell_match', 1):>7.3f}")
+
+    best = recommend(reports, args.min_cell_match)
+    print(f"\n建议后端：{best}（单元格一致率 >= {args.min_cell_match} 中总耗时最短）")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"reports": reports, "recommended": best}, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
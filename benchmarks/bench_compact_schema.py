@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+紧凑表格输出格式的 token 对比与往返校验（离线）
+
+用法：
+    python benchmarks/bench_compact_schema.py --courses 60
+
+1. 用合成课程生成附表1 / 附表4 数据，分别按“对象数组”和“列头 + 位置数组”序列化，
+   估算输出 token（prompt_cache.estimate_tokens）
+2. 校验 expand_tables(compact) 与原对象数组逐行一致
+3. 校验 response_schema() 能被 google-generativeai 转成 response_schema（已安装时）
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from llm_schema import TABLE_COLUMNS, compact_table, expand_tables, response_schema  # noqa: E402
+from prompt_cache import estimate_tokens  # noqa: E402
+from synth_plan import indicator_points, make_courses  # noqa: E402
+
+# 合成课程字段 -> MEGA_PROMPT 附表1 列名
+FIELD_MAP = {
+    "学分": "课内学分", "总学时": "课内总学时", "讲课": "课内讲课学时", "实验": "课内实验学时",
+    "上机": "课内上机学时", "实践": "课内实践学时", "学位课": "是否学位课",
+}
+
+def sample_tables(n: int, seed: int):
+    rng = random.Random(seed)
+    table1 = []
+    for c in make_courses(n, rng):
+        row = {col: "" for col in TABLE_COLUMNS["table1"]}
+        for k, v in c.items():
+            row[FIELD_MAP.get(k, k)] = v
+        table1.append(row)
+    points = indicator_points(rng)
+    table4 = [
+        {"课程名称": r["课程名称"], "指标点": p, "强度": rng.choice("HML")}
+        for r in table1 for p in rng.sample(points, 3)
+    ]
+    return {"table1": table1, "table4": table4}
+
+def dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False)
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="紧凑表格格式 token 对比")
+    ap.add_argument("--courses", type=int, default=60)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    verbose = sample_tables(args.courses, args.seed)
+    compact = {t: compact_table(rows, t) for t, rows in verbose.items()}
+    ok = True
+    for t in verbose:
+        a, b = estimate_tokens(dumps(verbose[t])), estimate_tokens(dumps(compact[t]))
+        print(f"{t}: {len(verbose[t])} 行  对象数组 ≈{a} tokens  紧凑 ≈{b} tokens  节省 {1 - b / a:.0%}")
+    a, b = estimate_tokens(dumps(verbose)), estimate_tokens(dumps(compact))
+    print(f"合计：≈{a} → ≈{b} tokens（节省 {1 - b / a:.0%}）")
+
+    round_trip = expand_tables(compact) == verbose
+    print(f"往返还原一致：{round_trip}")
+    ok = ok and round_trip
+
+    try:
+        from google.generativeai.types import generation_types
+    except ImportError:
+        print("未安装 google-generativeai，跳过 Gemini schema 转换检查")
+    else:
+        generation_types.to_generation_config_dict(
+            {"response_mime_type": "application/json", "response_schema": response_schema()}
+        )
+        print("Gemini response_schema 转换：通过")
+
+    if not ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
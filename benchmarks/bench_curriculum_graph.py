@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+课程逻辑图行为验证（离线，curriculum_graph）
+
+用法：
+    python benchmarks/bench_curriculum_graph.py
+
+1. 连线：先修课程列、系列课（D1 → D2，A1 与 D1 不连）、专业先修规则三种来源；同名课程只保留一次
+2. 合成方案：只取附表1 的课程行；按方向过滤时保留通用课程、本方向和含本方向的“混合”课程
+3. DOT：每个学期一个 cluster；同一图的 digest / DOT 稳定
+4. SVG 缓存：按 DOT 哈希命中，磁盘条目重启后仍可用，内存按 max_items 淘汰（本机无 dot 时只验证缓存）
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from bench_pipeline import corpus_pdf  # noqa: E402
+from curriculum_graph import (  # noqa: E402
+    SvgCache,
+    build_graph,
+    direction_matches,
+    directions_in,
+    dot_available,
+    render_svg,
+    table1_rows,
+    to_dot,
+)
+from plan_extract import run_full_extract  # noqa: E402
+from plan_index import course_rows  # noqa: E402
+from template_profiles import TemplateStore  # noqa: E402
+
+ROWS = [
+    {"课程名称": "高等数学D1", "开课学期": "1"},
+    {"课程名称": "高等数学D2", "开课学期": "2"},
+    {"课程名称": "线性代数A1", "开课学期": "2"},
+    {"课程名称": "工程制图", "开课学期": "1"},
+    {"课程名称": "计算机绘图", "开课学期": "2"},
+    {"课程名称": "焊接结构", "开课学期": "5", "先修课程": "工程制图、高等数学D2", "学位课": "√"},
+    {"课程名称": "工程制图", "开课学期": "3"},      # 方向表重复的通用课程
+    {"课程名称": "形势与政策", "开课学期": "8"},
+]
+
+def check(ok: bool, label: str) -> bool:
+    print(f"  {'✓' if ok else '✗'} {label}")
+    return ok
+
+def main() -> None:
+    ok = True
+
+    print("连线：")
+    g = build_graph(ROWS)
+    names = {n.id: n.name for n in g.nodes}
+    edges = {(names[a], names[b]) for a, b in g.edges()}
+    ok = check(len(g.nodes) == 7, "同名课程只保留第一次出现") and ok
+    ok = check({("工程制图", "焊接结构"), ("高等数学D2", "焊接结构")} <= edges, "先修课程列") and ok
+    ok = check(("高等数学D1", "高等数学D2") in edges and not any("线性代数A1" in e for e in edges),
+               "系列课 D1 → D2，不同字母前缀不连") and ok
+    ok = check(("工程制图", "计算机绘图") in edges, "专业先修规则") and ok
+    slim = g.connected_or_core()
+    ok = check({n.name for n in slim.nodes} == set(names.values()) - {"线性代数A1", "形势与政策"},
+               "精简视图去掉无连线的非学位课") and ok
+
+    print("合成方案：")
+    tmp = tempfile.mkdtemp(prefix="tas-graph-")
+    result = run_full_extract(corpus_pdf("small", 0), templates=TemplateStore(os.path.join(tmp, "templates.json")))
+    rows = table1_rows(result)
+    ok = check(len(rows) == sum(1 for c in course_rows(result) if c["appendix"] == "附表1"),
+               f"只取附表1 课程行（{len(rows)} 行）") and ok
+    dirs = directions_in(rows)
+    ok = check(dirs == ["焊接", "无损检测"], f"识别出方向：{'、'.join(dirs)}") and ok
+    for d in dirs:
+        other = next(x for x in dirs if x != d)
+        kept = [r for r in rows if direction_matches(r["专业方向"], d)]
+        ok = check(any(r["专业方向"].startswith("混合") for r in kept) and any(not r["专业方向"] for r in kept)
+                   and all(r["专业方向"] != other for r in kept),
+                   f"{d}：保留 {len(kept)} 行（通用 + 本方向 + 混合），去掉{other}专属课程") and ok
+    g = build_graph(rows)
+    dot = to_dot(g)
+    ok = check(dot.count("subgraph cluster_") == len(g.layers()), f"DOT 按学期分 {len(g.layers())} 个 cluster") and ok
+    ok = check(build_graph(rows).digest() == g.digest() and to_dot(build_graph(rows)) == dot,
+               "同一图的 digest / DOT 稳定") and ok
+
+    print("SVG 缓存：")
+    cache_dir = os.path.join(tmp, "svg")
+    cache = SvgCache(cache_dir, max_items=2)
+    key = hashlib.sha256(dot.encode("utf-8")).hexdigest()
+    if dot_available():
+        svg = render_svg(dot, cache)
+        ok = check(bool(svg) and svg.lstrip().startswith("<"), "dot 渲染出 SVG") and ok
+    else:
+        print("  （本机没有 graphviz dot，跳过渲染，只验证缓存）")
+        svg = "<svg>stub</svg>"
+        cache.put(key, svg)
+    ok = check(render_svg(dot, cache) == svg, "同一 DOT 命中缓存") and ok
+    ok = check(render_svg(dot, SvgCache(cache_dir)) == svg, "新的缓存实例从磁盘命中") and ok
+    for k in ("a", "b"):
+        cache.put(k, k)
+    ok = check(key not in cache._mem and cache.get(key) == svg, "内存按 max_items 淘汰，磁盘条目仍可读回") and ok
+
+    if not ok:
+        sys.exit(1)
+    print("\n✓ 课程逻辑图连线、方向过滤与 SVG 缓存符合预期")
+
+if __name__ == "__main__":
+    main()
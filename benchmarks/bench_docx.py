@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Word 原生抽取：与“导出 PDF 再做版面分析”对比（离线）
+
+用法：
+    python benchmarks/bench_docx.py --repeat 3
+
+对 small / medium / large，用 synth_plan 生成同样内容的 PDF 与 .docx：
+1. run_full_extract 耗时（PDF 走 pdfplumber 版面分析，.docx 直接读文档模型），逐页文本（LLM 提示词）耗时
+2. 章节、毕业要求条数与 PDF 结果一致
+3. 各附表行数与生成器写入的行数一致；附表1“课程体系”列（Word 中纵向合并）逐行等于原值——
+   Word 路径不做按列名的向下填充，这一列完全由 w:vMerge 展开
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import plan_extract  # noqa: E402
+from bench_pipeline import corpus_pdf  # noqa: E402
+from incremental import read_page_texts  # noqa: E402
+from synth_plan import SIZES, generate_plan_docx, indicator_points, make_courses, plan_tables, write_body  # noqa: E402
+
+class _NullWriter:
+    def new_page(self) -> None:
+        pass
+
+    def line(self, *args, **kwargs) -> None:
+        pass
+
+def expected_tables(courses: int, seed: int):
+    """按生成器的随机序列重放，得到写入的附表：{附表N: 行}。"""
+    rng = random.Random(seed)
+    course_list = make_courses(courses, rng)
+    points = indicator_points(rng)
+    write_body(_NullWriter(), rng, points)
+    out = {}
+    for heading, _, _, rows, _, _ in plan_tables(course_list, points, rng):
+        out[heading[heading.index("附表"):].rstrip("）")] = rows
+    return out
+
+def best_of(repeat: int, fn):
+    best, value = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        value = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, value
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Word 原生抽取 vs PDF 版面分析")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    ok = True
+    for size in ("small", "medium", "large"):
+        pdf = corpus_pdf(size, seed=args.seed)
+        docx = generate_plan_docx(SIZES[size], seed=args.seed)
+
+        pdf_s, by_pdf = best_of(1, lambda: plan_extract.run_full_extract(pdf, use_ocr=False))
+        docx_s, by_docx = best_of(args.repeat, lambda: plan_extract.run_full_extract(docx, use_ocr=False))
+        pdf_text_s, _ = best_of(1, lambda: read_page_texts(pdf))
+        docx_text_s, _ = best_of(args.repeat, lambda: read_page_texts(docx))
+
+        print(f"{size}（{SIZES[size]} 门课）：PDF {by_pdf.page_count} 页 / Word {by_docx.page_count} 页")
+        print(f"  run_full_extract：PDF {pdf_s:6.2f}s，Word {docx_s:5.2f}s（{pdf_s / docx_s:4.0f}×）")
+        print(f"  逐页文本：        PDF {pdf_text_s:6.2f}s，Word {docx_text_s:5.2f}s（{pdf_text_s / docx_text_s:4.0f}×）")
+
+        same = (list(by_docx.sections) == list(by_pdf.sections)
+                and by_docx.graduation_requirements["count"] == by_pdf.graduation_requirements["count"]
+                and by_docx.training_objectives["count"] == by_pdf.training_objectives["count"])
+        print(f"  章节 / 毕业要求 / 培养目标与 PDF 一致：{'是' if same else '否'}")
+        ok = ok and same
+
+        expected = expected_tables(SIZES[size], args.seed)
+        got = {}
+        for t in by_docx.tables:
+            got.setdefault(t["appendix"], []).extend((t["columns"], r) for r in t["rows"])
+        counts = {k: (len(v), len(got.get(k, []))) for k, v in expected.items()}
+        rows_ok = all(a == b for a, b in counts.values())
+        print("  附表行数（写入 / 抽出）：" + "，".join(f"{k} {a}/{b}" for k, (a, b) in counts.items()))
+
+        want = [cells[0] for _, cells in expected["附表1"]]
+        have = [r[cols.index("课程体系")] for cols, r in got.get("附表1", [])]
+        merged_ok = want == have
+        print(f"  附表1 课程体系列（纵向合并）逐行一致：{'是' if merged_ok else '否'}"
+              f"（{sum(1 for a, b in zip(want[1:], want) if a == b)} 个续格）")
+        ok = ok and rows_ok and merged_ok
+
+    if not ok:
+        sys.exit(1)
+    print("\n✓ Word 路径结构与 PDF 一致，合并格按文档模型展开")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+抽取结果磁盘缓存行为验证（离线，extract_cache.ExtractCache）
+
+用法：
+    python benchmarks/bench_extract_cache.py
+
+1. 命中：同一文件第二次抽取命中缓存，结果与首次一致；换一个 ExtractCache 实例（模拟重启 / 其他用户）同样命中
+2. 未命中：表格参数或 PDF 后端不同、文件内容不同时各自抽取，不串用结果
+3. 淘汰：超过 max_bytes 时删除最久未访问的条目，刚读过的条目保留
+4. 损坏：读不出的条目当作未命中并删除
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from bench_pipeline import corpus_pdf  # noqa: E402
+from extract_cache import ExtractCache, cached_run_full_extract  # noqa: E402
+from pdf_backends import available_backends  # noqa: E402
+
+TEXT_SETTINGS = {"vertical_strategy": "text", "horizontal_strategy": "text"}
+
+def check(ok: bool, label: str) -> bool:
+    print(f"  {'✓' if ok else '✗'} {label}")
+    return ok
+
+def main() -> None:
+    ok = True
+    tmp = tempfile.mkdtemp(prefix="tas-extract-cache-")
+    pdf, other = corpus_pdf("small", 0), corpus_pdf("small", 1)
+
+    print("命中与未命中：")
+    cache = ExtractCache(os.path.join(tmp, "a"))
+    first, hit1 = cached_run_full_extract(cache, pdf)
+    t0 = time.perf_counter()
+    second, hit2 = cached_run_full_extract(cache, pdf)
+    warm_s = time.perf_counter() - t0
+    ok = check(not hit1 and hit2, f"第二次命中缓存（{warm_s * 1000:.0f} ms）") and ok
+    ok = check(asdict(first) == asdict(second), "命中结果与首次抽取一致") and ok
+    _, hit3 = cached_run_full_extract(ExtractCache(os.path.join(tmp, "a")), pdf)
+    ok = check(hit3, "新的缓存实例（重启 / 其他会话）同样命中") and ok
+    _, hit4 = cached_run_full_extract(cache, pdf, table_settings=TEXT_SETTINGS)
+    ok = check(not hit4, "表格参数不同则不命中") and ok
+    if "pymupdf" in available_backends():
+        _, hit5 = cached_run_full_extract(cache, pdf, backend="pymupdf")
+        ok = check(not hit5, "PDF 后端不同则不命中") and ok
+    third, hit6 = cached_run_full_extract(cache, other)
+    ok = check(not hit6 and third.file_sha256 != first.file_sha256, "文件内容不同则不命中") and ok
+
+    print("淘汰与损坏：")
+    cache = ExtractCache(os.path.join(tmp, "b"), max_bytes=1 << 30)
+    for i in range(3):
+        cache.put(f"k{i}", first)
+        time.sleep(0.02)
+    size = max(s for _, s, _ in cache.entries())
+    cache.get("k0")                                          # k0 变为最近访问，k1 最久未用
+    cache.max_bytes = size * 2 + size // 2
+    removed = cache.evict()
+    left = sorted(os.path.basename(p).split(".")[0] for p, _, _ in cache.entries())
+    ok = check(removed == 1 and left == ["k0", "k2"], f"超出容量淘汰最久未访问的条目（剩余 {', '.join(left)}）") and ok
+    path = os.path.join(cache.cache_dir, "k2" + ExtractCache.SUFFIX)
+    with open(path, "wb") as f:
+        f.write(b"not gzip")
+    ok = check(cache.get("k2") is None and not os.path.exists(path), "损坏条目当作未命中并删除") and ok
+
+    if not ok:
+        sys.exit(1)
+    print("\n✓ 抽取缓存命中、隔离与淘汰符合预期")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+修订版增量抽取行为验证（离线，run_full_extract(prior=...) 与 incremental.plan_refresh）
+
+用法：
+    python benchmarks/bench_incremental.py
+
+在合成方案的某一页页脚加一行“修订”文字模拟修订版：
+1. 确定性抽取：只有改动的页重新抽取，其余页按内容指纹复用；结果与对修订版全量抽取一致
+2. 抽取参数不同时不复用旧页面
+3. LLM 路径：只重新请求改动页所在章节 / 附表对应的字段，文本无变化时不请求；合并时其余字段保留旧值
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import fitz  # noqa: E402
+
+from bench_pipeline import corpus_pdf  # noqa: E402
+from incremental import merge_partial, plan_refresh, read_page_texts  # noqa: E402
+from plan_extract import changed_pages, run_full_extract  # noqa: E402
+
+TEXT_SETTINGS = {"vertical_strategy": "text", "horizontal_strategy": "text"}
+
+def revise(pdf: bytes, page_no: int) -> bytes:
+    """在第 page_no 页（从 1 起）页脚加一行文字。"""
+    doc = fitz.open(stream=pdf, filetype="pdf")
+    doc[page_no - 1].insert_text((60, 820), "修订：学分调整", fontname="china-s", fontsize=9)
+    return doc.tobytes()
+
+def check(ok: bool, label: str) -> bool:
+    print(f"  {'✓' if ok else '✗'} {label}")
+    return ok
+
+def main() -> None:
+    ok = True
+    pdf = corpus_pdf("small", 0)
+    prior = run_full_extract(pdf)
+    old_pages = read_page_texts(pdf)
+
+    print("确定性抽取：")
+    for page_no, what in ((2, "正文页"), (4, "附表1 页")):
+        revised = revise(pdf, page_no)
+        inc = run_full_extract(revised, prior=prior)
+        full = run_full_extract(revised)
+        changed = changed_pages(prior, inc)
+        ok = check(changed == [page_no], f"改动{what}：只重新抽取第 {changed} 页") and ok
+        ok = check(inc.tables == full.tables and inc.sections == full.sections
+                   and inc.graduation_requirements == full.graduation_requirements,
+                   "增量结果与全量抽取一致") and ok
+    other = run_full_extract(revised, prior=prior, table_settings=TEXT_SETTINGS)
+    ok = check(len(changed_pages(prior, other)) == other.page_count, "抽取参数不同时不复用旧页面") and ok
+
+    print("LLM 路径：")
+    ok = check(plan_refresh(old_pages, read_page_texts(pdf, old_pages)) == [], "文本无变化：不请求大模型") and ok
+    keys = plan_refresh(old_pages, read_page_texts(revise(pdf, 2), old_pages))
+    ok = check(keys == ["sections.1培养目标", "sections.2毕业要求"], f"改动正文页：只请求 {keys}") and ok
+    keys = plan_refresh(old_pages, read_page_texts(revise(pdf, 4), old_pages))
+    ok = check(keys == ["table1"], f"改动附表1 页：只请求 {keys}") and ok
+    prior_data = {"sections": {"1培养目标": "旧", "6毕业条件": "保留"}, "table1": [{"课程名称": "旧"}], "table4": [{"x": 1}]}
+    merged = merge_partial(prior_data, {"table1": [{"课程名称": "新"}]}, ["table1"])
+    ok = check(merged["table1"] == [{"课程名称": "新"}] and merged["table4"] == prior_data["table4"]
+               and merged["sections"] == prior_data["sections"], "合并时只替换重新请求的字段") and ok
+
+    if not ok:
+        sys.exit(1)
+    print("\n✓ 修订版只重新处理改动的页面与字段")
+
+if __name__ == "__main__":
+    main()
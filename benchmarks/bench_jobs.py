@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+后台任务池行为验证（离线，jobs.JobManager）
+
+用法：
+    python benchmarks/bench_jobs.py
+
+1. 公平调度：用户 A 先排 6 个任务、B 后排 2 个，单工作线程下 B 的两个任务在前 4 个内执行完
+2. 上限：同一用户超过 max_per_owner、排队总数超过 max_queue 时 QueueFullError
+3. 取消：排队中的任务可取消且不会执行，执行中的任务取消返回 False；排队位置随轮转估算
+4. 失败：任务抛异常记为 failed，message 为异常信息
+5. 结果保留：take_result 取走后释放；无人认领的结果超过 result_ttl_s 丢弃并记为 expired
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from jobs import CANCELLED, DONE, FAILED, JobManager, QueueFullError  # noqa: E402
+
+def wait_finished(jobs: JobManager, job_ids, timeout: float = 10.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if all(jobs.get(j).finished for j in job_ids):
+            return
+        time.sleep(0.01)
+    raise TimeoutError("任务未在时限内结束")
+
+def check(ok: bool, label: str) -> bool:
+    print(f"  {'✓' if ok else '✗'} {label}")
+    return ok
+
+def main() -> None:
+    ok = True
+    started, gate = [], threading.Event()
+
+    def blocker(report):
+        gate.wait()
+
+    def record(report, name):
+        started.append(name)
+        time.sleep(0.01)
+        return name
+
+    print("公平调度 / 上限 / 取消：")
+    jobs = JobManager(max_workers=1, max_queue=8, max_per_owner=6, result_ttl_s=60)
+    first = jobs.submit("X", blocker)                        # 占住唯一的工作线程，让队列排满
+    time.sleep(0.05)
+    a = [jobs.submit("A", record, f"A{i}") for i in range(6)]
+    try:
+        jobs.submit("A", record, "A6")
+        ok = check(False, "同一用户第 7 个任务应被拒绝") and ok
+    except QueueFullError:
+        ok = check(True, "同一用户超过 max_per_owner 被拒绝") and ok
+    b = [jobs.submit("B", record, f"B{i}") for i in range(2)]
+    ok = check(jobs.queue_position(b[0]) == 2 and jobs.queue_position(a[5]) == 8,
+               f"排队位置按轮转估算（B0 第 {jobs.queue_position(b[0])}，A5 第 {jobs.queue_position(a[5])}）") and ok
+    try:
+        jobs.submit("C", record, "C0")
+        ok = check(False, "排队总数超过 max_queue 应被拒绝") and ok
+    except QueueFullError:
+        ok = check(True, "排队总数超过 max_queue 被拒绝") and ok
+    ok = check(jobs.cancel(a[5]) and jobs.get(a[5]).status == CANCELLED, "排队中的任务可取消") and ok
+    ok = check(not jobs.cancel(first), "执行中的任务不能取消") and ok
+    gate.set()
+    wait_finished(jobs, [first] + a + b)
+    print(f"  执行顺序：{' '.join(started)}")
+    ok = check("A5" not in started, "已取消的任务没有执行") and ok
+    ok = check(max(started.index(x) for x in ("B0", "B1")) < 4, "后提交的 B 没有被 A 的批量任务饿死") and ok
+
+    print("失败与结果保留：")
+    jobs = JobManager(max_workers=2, max_per_owner=4, result_ttl_s=0.3)
+
+    def boom(report):
+        raise RuntimeError("boom")
+
+    bad = jobs.submit("A", boom)
+    kept = jobs.submit("A", record, "kept")
+    left = jobs.submit("B", record, "left")
+    wait_finished(jobs, [bad, kept, left])
+    ok = check(jobs.get(bad).status == FAILED and jobs.get(bad).message == "boom", "异常任务记为 failed") and ok
+    ok = check(jobs.take_result(kept) == "kept" and jobs.get(kept).result is None, "take_result 取走后任务表不再持有结果") and ok
+    time.sleep(0.4)
+    job = jobs.get(left)
+    ok = check(job.status == DONE and job.expired and job.result is None,
+               "无人认领的结果超过 result_ttl_s 被丢弃（expired）") and ok
+    ok = check(not jobs.get(kept).expired, "已取走结果的任务不记为 expired") and ok
+
+    if not ok:
+        sys.exit(1)
+    print("\n✓ 任务池调度、取消与结果保留符合预期")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+PdfSource 内存占用对比
+
+用法：
+    python benchmarks/bench_pdf_source.py --mb 40
+
+以一个 N MB 的请求体为例（模拟 HTTP 上传流），比较：
+- 旧做法：rfile.read() 得到 bytes，再 hashlib.sha256(bytes)，交给进程池时 pickle 一份
+- PdfSource：分块读入 + 流式哈希，超过阈值写入临时文件，pickle 只含路径
+输出 tracemalloc 统计的 Python 堆峰值与序列化后的大小。
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import os
+import pickle
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_source import PdfSource  # noqa: E402
+
+class _Stream(io.RawIOBase):
+    """按需生成内容的只读流，避免测试数据本身占用内存。"""
+    def __init__(self, size: int):
+        self.remaining = size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), self.remaining)
+        b[:n] = bytes(n)
+        self.remaining -= n
+        return n
+
+def _stream(size: int) -> io.BufferedReader:
+    return io.BufferedReader(_Stream(size), buffer_size=1 << 16)
+
+def measure(fn):
+    tracemalloc.start()
+    out = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, peak / 1024 / 1024
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="PdfSource 内存占用对比")
+    ap.add_argument("--mb", type=int, default=40)
+    args = ap.parse_args()
+    size = args.mb * 1024 * 1024
+
+    def legacy():
+        body = _stream(size).read(size)
+        sha = hashlib.sha256(body).hexdigest()
+        return sha, len(pickle.dumps(body))
+
+    def spilled():
+        src = PdfSource.from_stream(_stream(size), length=size, threshold=1 << 20)
+        sha = src.sha256
+        n = len(pickle.dumps(src))
+        src.close()
+        return sha, n
+
+    (sha_a, pickled_a), peak_a = measure(legacy)
+    (sha_b, pickled_b), peak_b = measure(spilled)
+    print(f"请求体 {args.mb} MB")
+    print(f"  bytes：   堆峰值 {peak_a:7.1f} MB，传给工作进程 {pickled_a / 1024 / 1024:7.1f} MB")
+    print(f"  PdfSource：堆峰值 {peak_b:7.1f} MB，传给工作进程 {pickled_b / 1024:7.1f} KB")
+    if sha_a != sha_b:
+        sys.exit("哈希不一致")
+    print("\n✓ 哈希一致")
+
+if __name__ == "__main__":
+    main()
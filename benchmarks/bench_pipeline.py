@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+run_full_extract 分阶段基准 + 回归门禁
+
+用法：
+    python benchmarks/bench_pipeline.py                    # small + medium，与基线比较
+    python benchmarks/bench_pipeline.py --sizes large --repeat 5
+    python benchmarks/bench_pipeline.py --update-baseline  # 改进性能后刷新基线
+
+流程：
+1. 用 synth_plan 生成（或复用 benchmarks/corpus/ 中的）合成方案 PDF
+2. 每个规模运行 --repeat 次，记录 plan_extract.stage() 的分阶段耗时（取最小值，抗机器噪声）
+3. 额外在 tracemalloc 下运行一次，记录 Python 堆峰值
+4. 与 baselines.json 比较：任一阶段 / 总耗时 / 峰值内存超出容差即以退出码 1 失败
+   - 基线低于 --stage-floor 校准单位的小阶段（几十毫秒）不单独门禁，只计入总耗时：它们的相对波动常超过 50%
+   - --repeat 少于 MIN_GATE_REPEAT 次时只提示、不失败（单次测量受机器负载影响太大）
+
+不同机器速度不同，耗时以“校准单位”（一段固定纯 Python 负载的耗时）记录和比较，
+输出中的 u 即校准单位。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from plan_extract import run_full_extract  # noqa: E402
+from synth_plan import SIZES, generate_plan_pdf  # noqa: E402
+
+CORPUS_DIR = os.path.join(HERE, "corpus")
+BASELINE_PATH = os.path.join(HERE, "baselines.json")
+
+# ----------------------------
+# 校准与样本
+# ----------------------------
+def calibrate(rounds: int = 5) -> float:
+    """固定纯 Python 负载（字符串 + 正则 + dict），用于把耗时归一化到“机器单位”。"""
+    import re
+    pat = re.compile(r"^(\d+)\s*[\.、](.+)$")
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        acc: Dict[str, int] = {}
+        for i in range(60000):
+            m = pat.match(f"{i % 13}. 课程{i}")
+            if m:
+                acc[m.group(1)] = acc.get(m.group(1), 0) + len(m.group(2))
+        samples.append(time.perf_counter() - t0)
+    return min(samples)
+
+def corpus_pdf(size: str, seed: int) -> bytes:
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    path = os.path.join(CORPUS_DIR, f"{size}_{seed}.pdf")
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.write(generate_plan_pdf(SIZES[size], seed))
+    with open(path, "rb") as f:
+        return f.read()
+
+# ----------------------------
+# 测量
+# ----------------------------
+def bench_case(pdf_bytes: bytes, repeat: int, backend: str) -> Dict[str, Any]:
+    """
+    每次重复前紧挨着跑一次校准负载，耗时以“校准单位”记录（该次耗时 / 该次校准），
+    再取各次的最小值：相邻测量受同一段机器负载影响，比值比绝对秒数稳定得多。
+    """
+    runs: List[Dict[str, float]] = []
+    totals: List[float] = []
+    calibs: List[float] = []
+    run_full_extract(pdf_bytes, backend=backend)  # 预热：导入、正则编译等一次性开销
+    result = None
+    for _ in range(repeat):
+        calib = calibrate(rounds=3)
+        timings: Dict[str, float] = {}
+        t0 = time.perf_counter()
+        result = run_full_extract(pdf_bytes, backend=backend, timings=timings)
+        totals.append((time.perf_counter() - t0) / calib)
+        runs.append({k: v / calib for k, v in timings.items()})
+        calibs.append(calib)
+
+    stages = sorted({k for r in runs for k in r})
+    tracemalloc.start()
+    try:
+        run_full_extract(pdf_bytes, backend=backend)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "pages": result.page_count if result else 0,
+        "tables": result.table_count if result else 0,
+        "stages": {k: min(r.get(k, 0.0) for r in runs) for k in stages},
+        "total": min(totals),
+        "calib_s": min(calibs),
+        "peak_mb": peak / (1024 * 1024),
+    }
+
+MIN_GATE_REPEAT = 3
+
+def compare(name: str, cur: Dict[str, Any], base: Dict[str, Any],
+            tol: float, mem_tol: float, min_abs_units: float, stage_floor: float = 0.0) -> List[str]:
+    """
+    返回回归描述列表；耗时均为校准单位，忽略小于 min_abs_units 的绝对差，
+    基线低于 stage_floor 的阶段不单独比较（仍计入 total）。
+    """
+    problems = []
+    pairs = [(f"stage:{k}", v, base.get("stages", {}).get(k)) for k, v in cur["stages"].items()]
+    pairs.append(("total", cur["total"], base.get("total")))
+    for label, units, base_units in pairs:
+        if base_units is None:
+            continue
+        if label != "total" and base_units < stage_floor:
+            continue
+        if units > base_units * (1 + tol) and units - base_units > min_abs_units:
+            problems.append(f"{name} {label}: {units:.2f} > 基线 {base_units:.2f} 校准单位 (+{units / base_units - 1:.0%})")
+    if base.get("peak_mb") and cur["peak_mb"] > base["peak_mb"] * (1 + mem_tol):
+        problems.append(f"{name} peak_mb: {cur['peak_mb']:.1f}MB > 基线 {base['peak_mb']:.1f}MB (+{mem_tol:.0%})")
+    return problems
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="run_full_extract 分阶段基准与回归检测")
+    ap.add_argument("--sizes", nargs="*", default=["small", "medium"], choices=sorted(SIZES))
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--backend", default="pdfplumber")
+    ap.add_argument("--tolerance", type=float, default=0.35, help="耗时回归容差（比例）")
+    ap.add_argument("--mem-tolerance", type=float, default=0.15, help="峰值内存回归容差（比例）")
+    ap.add_argument("--min-abs-units", type=float, default=0.25, help="忽略小于该值的耗时差（校准单位）")
+    ap.add_argument("--stage-floor", type=float, default=2.0, help="基线低于该值（校准单位）的阶段只计入总耗时，不单独门禁")
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--update-baseline", action="store_true")
+    args = ap.parse_args()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for size in args.sizes:
+        case = f"{size}:{args.backend}"
+        results[case] = bench_case(corpus_pdf(size, args.seed), max(1, args.repeat), args.backend)
+        r = results[case]
+        ms = r["calib_s"] * 1000  # 1 校准单位 ≈ ms 毫秒（本机）
+        print(f"\n== {case}  pages={r['pages']} tables={r['tables']} "
+              f"total={r['total']:.2f}u (≈{r['total'] * ms:.0f}ms) peak={r['peak_mb']:.1f}MB")
+        for k, v in sorted(r["stages"].items(), key=lambda kv: -kv[1]):
+            print(f"   {k:<26} {v:>8.3f}u  {v / r['total']:>6.1%}")
+
+    baseline: Dict[str, Any] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        cases = baseline.setdefault("cases", {})
+        for case, r in results.items():
+            cases[case] = {
+                "pages": r["pages"],
+                "tables": r["tables"],
+                "stages": {k: round(v, 4) for k, v in r["stages"].items()},
+                "total": round(r["total"], 4),
+                "peak_mb": round(r["peak_mb"], 2),
+            }
+        baseline["seed"] = args.seed
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"\n已更新基线：{args.baseline}")
+        return
+
+    problems: List[str] = []
+    for case, r in results.items():
+        base = baseline.get("cases", {}).get(case)
+        if base is None:
+            print(f"\n{case}：无基线（使用 --update-baseline 建立）")
+            continue
+        problems += compare(case, r, base, args.tolerance, args.mem_tolerance, args.min_abs_units, args.stage_floor)
+
+    if problems:
+        print("\n性能回归：")
+        for p in problems:
+            print(f"  ✗ {p}")
+        if args.repeat < MIN_GATE_REPEAT:
+            print(f"\n（--repeat {args.repeat} 少于 {MIN_GATE_REPEAT} 次，结果仅供参考，不判失败）")
+            return
+        sys.exit(1)
+    print("\n✓ 未发现性能回归")
+
+if __name__ == "__main__":
+    main()
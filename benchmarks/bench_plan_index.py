@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+培养方案检索库行为验证（离线，plan_index.PlanIndex）
+
+用法：
+    python benchmarks/bench_plan_index.py
+
+两份合成方案入库后：
+1. 检索：课程名称（>=3 字走 FTS5 trigram，更短走 LIKE）、课程编码、毕业要求全文，命中数与抽取结果逐行比对
+2. 含引号 / AND / OR / - 的输入按短语处理，不报 FTS 语法错误
+3. 重复入库：同一 SHA 覆盖旧记录，不产生重复行；新版本删掉的课程不再被检索到（FTS 索引同步）
+4. remove() 后该方案的课程与毕业要求都检索不到
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from bench_pipeline import corpus_pdf  # noqa: E402
+from plan_extract import run_full_extract  # noqa: E402
+from plan_index import PlanIndex, course_rows, requirement_rows  # noqa: E402
+from template_profiles import TemplateStore  # noqa: E402
+
+def check(ok: bool, label: str) -> bool:
+    print(f"  {'✓' if ok else '✗'} {label}")
+    return ok
+
+def expected_courses(results, q: str) -> int:
+    return sum(1 for r in results for c in course_rows(r) if q in c["course_name"] or q in c["course_code"])
+
+def main() -> None:
+    ok = True
+    tmp = tempfile.mkdtemp(prefix="tas-plan-index-")
+    templates = TemplateStore(os.path.join(tmp, "templates.json"))
+    a = run_full_extract(corpus_pdf("small", 0), templates=templates)
+    b = run_full_extract(corpus_pdf("small", 1), templates=templates)
+    index = PlanIndex(os.path.join(tmp, "plans.sqlite3"))
+    index.ingest(a, "方案A")
+    index.ingest(b, "方案B")
+
+    print("检索：")
+    ok = check([p["course_rows"] for p in sorted(index.plans(), key=lambda p: p["name"])]
+               == [len(course_rows(a)), len(course_rows(b))], "两份方案的课程行全部入库") and ok
+    for q in ("线性代数", "体育"):
+        rows, ms = index.timed("search_courses", q)
+        want = expected_courses([a, b], q)
+        ok = check(want > 0 and len(rows) == want and all(r["page"] and r["plan"] for r in rows),
+                   f"课程名称「{q}」：{len(rows)} 条（应为 {want}），{ms:.1f} ms") and ok
+    code = course_rows(a)[0]["course_code"]
+    rows = index.search_courses(code)
+    ok = check(len(rows) == expected_courses([a, b], code) and rows[0]["course_code"] == code,
+               f"课程编码 {code}：{len(rows)} 条") and ok
+    q = "复杂工程问题"
+    rows = index.search_requirements(q)
+    want = sum(1 for r in (a, b) for it in requirement_rows(r) if q in it["body"] or q in it["title"])
+    ok = check(want > 0 and len(rows) == want and all("【" in r["snippet"] for r in rows),
+               f"毕业要求「{q}」：{len(rows)} 条，摘要高亮命中词") and ok
+    try:
+        rows = index.search_courses('"线性" OR -代数 AND')
+        ok = check(rows == [], "含引号 / OR / - 的输入按短语处理") and ok
+    except Exception as e:
+        ok = check(False, f"特殊字符输入报错：{e}") and ok
+
+    print("重复入库与删除：")
+    index.ingest(a, "方案A")
+    ok = check(len(index.plans()) == 2 and len(index.search_courses("线性代数")) == expected_courses([a, b], "线性代数"),
+               "同一 SHA 重复入库不产生重复行") and ok
+    revised = dataclasses.replace(a, tables=[])
+    index.ingest(revised, "方案A（修订）")
+    rows = index.search_courses("线性代数")
+    ok = check({r["plan"] for r in rows} == {"方案B"} and len(rows) == expected_courses([b], "线性代数"),
+               "新版本删掉的课程不再被检索到") and ok
+    index.remove(b.file_sha256)
+    ok = check(index.search_courses("线性代数") == []
+               and {r["plan"] for r in index.search_requirements(q)} == {"方案A（修订）"},
+               "remove() 后该方案检索不到") and ok
+
+    if not ok:
+        sys.exit(1)
+    print("\n✓ 检索库全文检索与覆盖入库符合预期")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP 抽取服务端到端验证（离线）
+
+用法：
+    python benchmarks/bench_service.py --docs 4 --workers 2
+
+1. 启动 extract_service（进程池）与 LLM 桩服务
+2. 并发提交 N 份不同 PDF 的确定性抽取，轮询到完成，统计吞吐
+3. 重复提交同一文件：合并到同一任务 / 命中缓存
+4. 超过大小上限返回 413；LLM 抽取经桩服务返回结果
+5. LLM 抽取缺少 X-API-Key 返回 401；换一个 Key 提交同一文件不复用前一个 Key 的任务与缓存
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from bench_pipeline import corpus_pdf  # noqa: E402
+from stub_llm_server import serve as serve_stub  # noqa: E402
+
+def request(base: str, method: str, path: str, body: bytes = None, headers: dict = None):
+    req = urllib.request.Request(base + path, data=body, method=method, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req, timeout=120) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+
+def wait_result(base: str, job_id: str, timeout: float = 300.0):
+    t0 = time.time()
+    while time.time() - t0 < timeout:
+        code, payload = request(base, "GET", f"/v1/jobs/{job_id}/result")
+        if code != 409:
+            return code, payload
+        time.sleep(0.2)
+    raise TimeoutError(job_id)
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="HTTP 抽取服务端到端验证")
+    ap.add_argument("--docs", type=int, default=4)
+    ap.add_argument("--workers", type=int, default=2)
+    args = ap.parse_args()
+
+    stub, _ = serve_stub(0)
+    os.environ["TAS_LLM_STUB_URL"] = f"http://127.0.0.1:{stub.server_address[1]}/v1"
+    tmp = tempfile.mkdtemp(prefix="tas-service-")   # --cache-dir：确定性与 LLM 缓存都在其下，冷缓存
+
+    from extract_service import ExtractService, serve
+    service = ExtractService(workers=args.workers, max_bytes=8 * 1024 * 1024, cache_dir=tmp)
+    server, _ = serve(0, service)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    pdf_headers = {"Content-Type": "application/pdf"}
+    ok = True
+
+    docs = [corpus_pdf("small", seed=100 + i) for i in range(args.docs)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(args.docs) as ex:
+        subs = list(ex.map(lambda d: request(base, "POST", "/v1/extract", d, pdf_headers), docs))
+        results = list(ex.map(lambda s: wait_result(base, s[1]["job_id"]), subs))
+    wall = time.perf_counter() - t0
+    pages = sum(r[1]["result"]["page_count"] for r in results)
+    good = all(s[0] == 202 for s in subs) and all(r[0] == 200 for r in results)
+    print(f"{args.docs} 份 PDF（{pages} 页）：{wall:.2f}s，{pages / wall:.1f} 页/s，全部成功：{good}")
+    ok = ok and good
+
+    code1, a = request(base, "POST", "/v1/extract", docs[0], pdf_headers)
+    code2, b = request(base, "POST", "/v1/extract?backend=pdfplumber", docs[0], pdf_headers)
+    same = a["job_id"] == subs[0][1]["job_id"]
+    _, rb = wait_result(base, b["job_id"])
+    print(f"重复提交：复用已完成任务 {same}；参数不同的新任务命中磁盘缓存 {rb.get('cached')}")
+    ok = ok and same and rb.get("cached") is True
+
+    code, payload = request(base, "POST", "/v1/extract", b"%PDF" + b"0" * (9 * 1024 * 1024), pdf_headers)
+    print(f"超过大小上限：HTTP {code} {payload.get('error', '')}")
+    ok = ok and code == 413
+
+    code, sub = request(base, "POST", "/v1/llm-extract?provider=" + urllib.request.quote("本地桩 (Stub)"),
+                        docs[1], {**pdf_headers, "X-API-Key": "stub-key"})
+    code, res = wait_result(base, sub["job_id"])
+    print(f"LLM 抽取（桩服务）：HTTP {code}，字段 {sorted(res.get('result', {}))}")
+    ok = ok and code == 200
+
+    llm_path = "/v1/llm-extract?provider=" + urllib.request.quote("本地桩 (Stub)")
+    code, payload = request(base, "POST", llm_path, docs[1], pdf_headers)
+    print(f"LLM 抽取缺少 Key：HTTP {code} {payload.get('error', '')}")
+    ok = ok and code == 401
+    _, again = request(base, "POST", llm_path, docs[1], {**pdf_headers, "X-API-Key": "stub-key"})
+    _, other = request(base, "POST", llm_path, docs[1], {**pdf_headers, "X-API-Key": "other-key"})
+    _, res2 = wait_result(base, other["job_id"])
+    print(f"同一 Key 复用任务 {again['job_id'] == sub['job_id']}；"
+          f"换 Key 新任务 {other['job_id'] != sub['job_id']}，命中缓存 {res2.get('cached')}")
+    ok = ok and again["job_id"] == sub["job_id"] and other["job_id"] != sub["job_id"] and res2.get("cached") is False
+    ok = ok and os.path.isdir(os.path.join(tmp, "extract"))
+
+    print(f"任务统计：{request(base, 'GET', '/v1/stats')[1]}")
+    server.shutdown()
+    service.shutdown()
+    stub.shutdown()
+    if not ok:
+        sys.exit(1)
+    print("\n✓ 服务行为符合预期")
+
+if __name__ == "__main__":
+    main()
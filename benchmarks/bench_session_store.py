@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+会话结果存储：闲置会话的内存占用（离线）
+
+用法：
+    python benchmarks/bench_session_store.py --sessions 40 --size large
+
+1. 用合成 PDF 抽取 --sessions 份结果，模拟同样数量的打开着的标签页
+2. 比较常驻内存（tracemalloc）：
+   - 旧做法：每个会话的 session_state 持有整份 ExtractResult
+   - SessionResultStore：session_state 只有句柄，热缓存保留最近 hot 个
+3. 冷读回耗时；TTL 与容量淘汰后句柄返回 None
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import pickle
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import plan_extract  # noqa: E402
+from bench_pipeline import corpus_pdf  # noqa: E402
+from session_store import SessionResultStore  # noqa: E402
+
+def retained(build):
+    """build() 返回的对象常驻的 Python 堆字节数。"""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="会话结果存储：闲置会话的内存占用")
+    ap.add_argument("--sessions", type=int, default=40)
+    ap.add_argument("--size", default="large")
+    ap.add_argument("--hot", type=int, default=8)
+    args = ap.parse_args()
+
+    base = plan_extract.run_full_extract(corpus_pdf(args.size, seed=0), use_ocr=False)
+    blob = pickle.dumps(base)
+    fresh = lambda: pickle.loads(blob)  # noqa: E731  每个会话各持一份（与各自抽取时一样）
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        _, legacy = retained(lambda: [{"extract_result": fresh()} for _ in range(args.sessions)])
+
+        store = SessionResultStore(tmp, hot_entries=args.hot)
+
+        def with_store():
+            return [{"extract_handle": store.put(fresh(), "extract", base.file_sha256)} for _ in range(args.sessions)]
+
+        sessions, spilled = retained(with_store)
+        handles = [s["extract_handle"] for s in sessions]
+
+        t0 = time.perf_counter()
+        back = SessionResultStore(tmp).get(handles[0])   # 新实例、热缓存为空：从磁盘读回
+        cold_ms = (time.perf_counter() - t0) * 1000
+        ok = ok and back is not None and back.tables == base.tables
+
+        print(f"{args.sessions} 个会话，每份结果 {args.size}（{base.page_count} 页，{len(blob) / 1024:.0f} KB pickle）")
+        print(f"  session_state 持有结果：{legacy / 1024 / 1024:7.1f} MB")
+        print(f"  句柄 + 热缓存 {args.hot} 个：{spilled / 1024 / 1024:7.1f} MB"
+              f"（磁盘 {store.stats()['bytes'] / 1024 / 1024:.1f} MB）")
+        print(f"  冷读回一份：{cold_ms:.1f} ms")
+
+        store.ttl_s = 0
+        time.sleep(0.01)
+        store.evict()
+        ok = ok and store.get(handles[1]) is None and store.stats()["files"] == 0
+
+        small = SessionResultStore(os.path.join(tmp, "cap"), max_bytes=3 * handles[0].size, hot_entries=args.hot)
+        capped = [small.put(fresh(), "extract") for _ in range(6)]
+        ok = ok and small.stats()["files"] <= 3 and small.get(capped[0]) is None and small.get(capped[-1]) is not None
+        print(f"  淘汰：TTL 到期后 0 个文件；容量 3 份时保留 {small.stats()['files']} 份（最新的可读、最早的已删）")
+
+    if not ok:
+        sys.exit(1)
+    print("\n✓ 读回一致，淘汰正常")
+
+if __name__ == "__main__":
+    main()
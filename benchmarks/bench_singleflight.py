@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+并发相同抽取请求的单飞合并验证（离线，基于本地桩服务）
+
+用法：
+    python benchmarks/bench_singleflight.py --users 12 --pdf 培养方案.pdf
+
+N 个线程同时对同一份 PDF 调用 app.extract_mega（模拟多位老师同时上传），
+检查桩服务只收到 1 次请求、所有线程拿到相同结果；再换一个供应商名 / 文件，确认不会被误合并；
+最后让领头者用无效 Key（桩服务返回 401），确认等待中的跟随者用自己的 Key 重试成功，而不是一起失败。
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from bench_pipeline import corpus_pdf  # noqa: E402
+from stub_llm_server import StubState, serve  # noqa: E402
+
+def run_concurrent(app, pdf_bytes: bytes, provider: str, users: int, keys=None):
+    results, errors = [None] * users, []
+    barrier = threading.Barrier(users)
+    keys = keys or ["stub-key"] * users
+
+    def worker(i: int) -> None:
+        barrier.wait()
+        if i:
+            time.sleep(0.1)   # 第 0 个线程先成为领头者
+        try:
+            results[i], _ = app.extract_mega(keys[i], pdf_bytes, provider)
+        except Exception as e:  # pragma: no cover - 打印即可
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(users)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors, time.perf_counter() - t0
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="单飞合并离线验证")
+    ap.add_argument("--users", type=int, default=12)
+    ap.add_argument("--pdf", help="培养方案 PDF（缺省时生成合成样本）")
+    args = ap.parse_args()
+
+    server, state = serve(0, StubState(base_latency_s=0.5))
+    os.environ["TAS_LLM_STUB_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    import app  # noqa: E402  （导入时读取 TAS_LLM_STUB_URL 注册桩供应商）
+    from singleflight import LLM_FLIGHTS
+
+    if args.pdf:
+        with open(args.pdf, "rb") as f:
+            pdf_a = f.read()
+    else:
+        pdf_a = corpus_pdf("small", seed=1)
+    pdf_b = corpus_pdf("small", seed=2)
+    provider = "本地桩 (Stub)"
+
+    ok = True
+    results, errors, wall = run_concurrent(app, pdf_a, provider, args.users)
+    n = state.requests
+    same = all(r == results[0] for r in results) and len({id(r) for r in results}) == args.users
+    print(f"{args.users} 个并发相同请求：LLM 调用 {n} 次，耗时 {wall:.2f}s，结果一致且互相独立：{same}，错误 {len(errors)}")
+    ok = ok and n == 1 and same and not errors
+
+    before = state.requests
+    run_concurrent(app, pdf_b, provider, 2)
+    print(f"不同文件：新增 LLM 调用 {state.requests - before} 次（应为 1）")
+    ok = ok and state.requests - before == 1
+
+    state.rejected_keys.add("bad-key")
+    before = state.requests
+    results, errors, _ = run_concurrent(app, corpus_pdf("small", seed=3), provider, 3, ["bad-key", "stub-key", "stub-key"])
+    followers_ok = results[0] is None and len(errors) == 1 and all(r is not None for r in results[1:])
+    print(f"领头者 Key 无效（401 {state.rejected} 次）：领头者失败 {results[0] is None}，"
+          f"跟随者自行重试成功 {followers_ok}，新增 LLM 调用 {state.requests - before} 次（应为 1）")
+    ok = ok and followers_ok and state.requests - before == 1
+
+    print(f"合并统计：{LLM_FLIGHTS.stats()}")
+    server.shutdown()
+    if not ok:
+        sys.exit(1)
+    print("\n✓ 相同请求已合并，不同请求互不影响")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+app.py 冷启动耗时（导入阶段）对比
+
+用法：
+    python benchmarks/bench_startup.py --runs 7
+
+每次在全新子进程中计时：
+- 改造前（预先导入）：先 import google.generativeai / openai / pandas / pdfplumber，再 import app，
+  等价于旧版 app.py 顶部一次性导入全部依赖
+- 改造后（按需导入）：只 import app
+另外给出首次调用时各 SDK 的导入耗时（providers.IMPORT_TIMINGS）与后台预热效果。
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EAGER = "import google.generativeai, openai, pandas, pdfplumber"
+
+TIMER = """
+import time, warnings
+warnings.filterwarnings("ignore")
+t0 = time.perf_counter()
+{pre}
+import app
+print(time.perf_counter() - t0)
+"""
+
+FIRST_CALL = """
+import time, warnings
+warnings.filterwarnings("ignore")
+import app
+from providers import IMPORT_TIMINGS
+name = "{provider}"
+if {warm}:
+    app.PROVIDER_REGISTRY.warm_up_async(name).join()
+t0 = time.perf_counter()
+app.PROVIDER_REGISTRY.sdk(name)
+print(time.perf_counter() - t0, IMPORT_TIMINGS.get(app.PROVIDER_REGISTRY.spec(name).sdk, 0.0))
+"""
+
+def run(code: str) -> list:
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr[-2000:])
+    return [float(x) for x in out.stdout.strip().splitlines()[-1].split()]
+
+def median_of(code: str, runs: int) -> float:
+    return statistics.median(run(code)[0] for _ in range(runs))
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="app.py 冷启动耗时对比")
+    ap.add_argument("--runs", type=int, default=7)
+    args = ap.parse_args()
+
+    before = median_of(TIMER.format(pre=EAGER), args.runs)
+    after = median_of(TIMER.format(pre=""), args.runs)
+    print(f"导入 app（改造前，全部依赖预先导入）：{before * 1000:7.0f} ms")
+    print(f"导入 app（改造后，按需导入）：        {after * 1000:7.0f} ms   （减少 {1 - after / before:.0%}）")
+
+    for provider in ("Gemini (Google)", "DeepSeek"):
+        cold_wait, cold_import = run(FIRST_CALL.format(provider=provider, warm=False))
+        warm_wait, _ = run(FIRST_CALL.format(provider=provider, warm=True))
+        print(f"{provider}：首次调用前导入 SDK {cold_import * 1000:.0f} ms；"
+              f"预热后首次调用等待 {warm_wait * 1000:.1f} ms（未预热 {cold_wait * 1000:.0f} ms）")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+附表4 支撑矩阵查询行为验证（离线，support_matrix.SupportMatrix）
+
+用法：
+    python benchmarks/bench_support_matrix.py
+
+1. 手写小矩阵（LLM 路径的 table4 记录）：强度别名、重复格取最大、整列为 0 的指标点保留为列，
+   缺 H / 未覆盖 / 课程负载 / 按毕业要求汇总的结果与手算一致，to_records() 可还原
+2. 合成方案（确定性路径的宽表）：各项查询与逐单元格扫描原始表格的结果一致
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from collections import defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from bench_pipeline import corpus_pdf  # noqa: E402
+from plan_extract import run_full_extract  # noqa: E402
+from support_matrix import SupportMatrix, expected_indicators, parse_indicator, parse_level  # noqa: E402
+from template_profiles import TemplateStore  # noqa: E402
+
+RECORDS = [
+    {"课程名称": "高等数学", "指标点": "1.1", "强度": "H"},
+    {"课程名称": "高等数学", "指标点": "指标点1.2", "强度": "中"},
+    {"课程名称": "高等数学", "指标点": "1.2", "强度": "●"},       # 同一格重复出现：取最大强度 H
+    {"课程名称": "焊接冶金学", "指标点": "1.2", "强度": "√"},
+    {"课程名称": "焊接冶金学", "指标点": "2.1", "强度": "M"},
+    {"课程名称": "", "指标点": "2.2", "强度": ""},                # 无课程支撑的指标点
+]
+
+def check(ok: bool, label: str) -> bool:
+    print(f"  {'✓' if ok else '✗'} {label}")
+    return ok
+
+def naive_scan(result):
+    """逐单元格扫描原始表格：{指标点: {课程: 最大权重}}，全部指标点列。"""
+    support, indicators = defaultdict(dict), set()
+    for t in result.tables:
+        cols = t.get("columns") or []
+        if "课程名称" not in cols or sum(1 for c in cols if parse_indicator(c)) < 3:
+            continue
+        name_at = cols.index("课程名称")
+        for row in t.get("rows") or []:
+            for c, cell in zip(cols, row):
+                ind, w = parse_indicator(c), parse_level(cell)
+                if not ind:
+                    continue
+                indicators.add(ind)
+                if w and row[name_at]:
+                    support[ind][row[name_at]] = max(w, support[ind].get(row[name_at], 0))
+    return support, indicators
+
+def main() -> None:
+    ok = True
+
+    print("手写矩阵（table4 记录）：")
+    m = SupportMatrix.from_records(RECORDS)
+    ok = check(m.courses == ["高等数学", "焊接冶金学"] and m.indicators == ["1.1", "1.2", "2.1", "2.2"],
+               f"形状 {m.shape}，无支撑的 2.2 保留为列") and ok
+    ok = check(int(m.weights[m.course_index["高等数学"], m.indicator_index["1.2"]]) == 3, "重复格取最大强度") and ok
+    ok = check(m.indicators_lacking("H") == ["2.1", "2.2"], f"缺 H 支撑：{m.indicators_lacking('H')}") and ok
+    uncovered = m.uncovered_indicators(["1.1", "1.2", "2.1", "2.2", "3.1"])
+    ok = check(uncovered == ["3.1", "2.2"], f"未覆盖（含矩阵中没有的 3.1）：{uncovered}") and ok
+    load = m.course_load()
+    ok = check(load["课程名称"].tolist() == ["高等数学", "焊接冶金学"] and load["加权和"].tolist() == [6, 3],
+               "课程负载按加权和降序") and ok
+    roll = m.requirement_rollup(3).set_index("毕业要求")
+    ok = check(roll.loc[1, "H支撑数"] == 2 and roll.loc[2, "缺H的指标点"] == "2.1、2.2" and roll.loc[3, "指标点数"] == 0,
+               "按毕业要求汇总") and ok
+    again = SupportMatrix.from_records(m.to_records())
+    ok = check(again.indicators == m.indicators and (again.weights == m.weights).all(), "to_records() 可还原") and ok
+
+    print("合成方案（宽表）：")
+    tmp = tempfile.mkdtemp(prefix="tas-support-")
+    result = run_full_extract(corpus_pdf("small", 0), templates=TemplateStore(os.path.join(tmp, "templates.json")))
+    m = SupportMatrix.from_result(result)
+    support, indicators = naive_scan(result)
+    ok = check(m.shape[0] > 0 and set(m.indicators) == indicators, f"形状 {m.shape}") and ok
+    sup = m.indicator_support().set_index("指标点")
+    ok = check(all(sup.loc[k, lv] == sum(1 for w in support[k].values() if w == n)
+                   for k in indicators for lv, n in (("H", 3), ("M", 2), ("L", 1))),
+               "各指标点 H / M / L 支撑课程数与逐格扫描一致") and ok
+    lacking = sorted((k for k in indicators if max(support[k].values(), default=0) < 3), key=lambda k: tuple(map(int, k.split("."))))
+    ok = check(m.indicators_lacking("H") == lacking, f"缺 H 支撑：{lacking or '无'}") and ok
+    load = m.course_load().set_index("课程名称")["加权和"].to_dict()
+    per_course = defaultdict(int)
+    for k in indicators:
+        for course, w in support[k].items():
+            per_course[course] += w
+    ok = check(load == dict(per_course), "课程加权和与逐格扫描一致") and ok
+    expected = expected_indicators(result.graduation_requirements)
+    uncovered = m.uncovered_indicators(expected)
+    ok = check(uncovered == [k for k in expected if k not in indicators] + [k for k in lacking if not support[k]],
+               f"对照毕业要求分项未覆盖：{'、'.join(uncovered) or '无'}") and ok
+
+    if not ok:
+        sys.exit(1)
+    print("\n✓ 支撑矩阵查询结果符合预期")
+
+if __name__ == "__main__":
+    main()
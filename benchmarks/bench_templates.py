@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+版式模板复用：首份试探、后续沿用（离线）
+
+用法：
+    python benchmarks/bench_templates.py --plans 5
+
+1. 用临时模板库依次抽取同一版式、课程数不同的合成 PDF（medium / large / small 交替）
+2. 首份方案试探表格参数并建档，后续方案应命中同一模板、“layout” 阶段接近 0
+3. 校验：每张表都分到了附表号，附表1~5 均出现；与固定参数抽取的表格数一致
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import plan_extract  # noqa: E402
+from bench_pipeline import corpus_pdf  # noqa: E402
+from template_profiles import TemplateStore  # noqa: E402
+
+SIZES = ("medium", "large", "small")
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="版式模板复用")
+    ap.add_argument("--plans", type=int, default=5)
+    args = ap.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TemplateStore(os.path.join(tmp, "templates.json"))
+        for seed in range(args.plans):
+            size = SIZES[seed % len(SIZES)]
+            pdf = corpus_pdf(size, seed=seed)
+            timings: dict = {}
+            res = plan_extract.run_full_extract(pdf, use_ocr=False, timings=timings, templates=store)
+            base = plan_extract.run_full_extract(pdf, use_ocr=False)
+            appendices = sorted({t.get("appendix") for t in res.tables if t.get("appendix")})
+            missing = [t["title"] for t in res.tables if not t.get("appendix")]
+            print(f"  {size:6s} {res.page_count:3d} 页  模板 {res.template_id}  "
+                  f"{'沿用' if res.template_reused else '新建'}  layout {timings.get('layout', 0):.2f}s  "
+                  f"表格 {res.table_count}/{base.table_count}  附表 {','.join(appendices)}")
+            ok = ok and not missing and res.table_count == base.table_count
+            ok = ok and appendices == [f"附表{i}" for i in range(1, 6)]
+            ok = ok and res.template_reused == (seed > 0)
+        print(f"模板库中共 {len(store.profiles())} 个模板")
+        ok = ok and len(store.profiles()) == 1
+
+    if not ok:
+        sys.exit(1)
+    print("\n✓ 同一版式只试探一次，后续方案沿用参数与附表页码")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+用量台账与预算行为验证（离线，usage_ledger.UsageLedger）
+
+用法：
+    python benchmarks/bench_usage_ledger.py
+
+1. 预占：并发请求的预占量计入预算，超出单 Key token / 请求数、供应商每日费用时 BudgetExceededError
+2. 结算：settle() 以实际 usage（OpenAI 与 Gemini 两种格式）入账并释放预占，之后的 fail() 不重复计数
+3. 失败：fail() 计 1 次请求与 1 次失败，429 / quota 另计 rate_limited，失败的请求同样占请求预算
+4. 旧版台账文件（无 failures / rate_limited 列）打开时自动补列
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from usage_ledger import Budget, BudgetExceededError, UsageLedger, cost_usd, estimate_request, key_id  # noqa: E402
+
+PROMPT = "培养方案" * 500
+
+def check(ok: bool, label: str) -> bool:
+    print(f"  {'✓' if ok else '✗'} {label}")
+    return ok
+
+def raises_budget(fn) -> bool:
+    try:
+        fn()
+    except BudgetExceededError:
+        return True
+    return False
+
+def main() -> None:
+    ok = True
+    tmp = tempfile.mkdtemp(prefix="tas-ledger-")
+    per_request = sum(estimate_request(PROMPT))
+
+    print("预占与结算：")
+    ledger = UsageLedger(os.path.join(tmp, "a.sqlite3"), Budget(key_tokens=per_request * 2.5))
+    r1 = ledger.reserve("DeepSeek", "k1", "deepseek-chat", PROMPT)
+    r2 = ledger.reserve("DeepSeek", "k1", "deepseek-chat", PROMPT)
+    ok = check(raises_budget(lambda: ledger.reserve("DeepSeek", "k1", "deepseek-chat", PROMPT)),
+               "两个进行中的预占 + 本次超过单 Key token 预算，请求不发出") and ok
+    ok = check(not raises_budget(lambda: ledger.release(ledger.reserve("DeepSeek", "k2", "deepseek-chat", PROMPT))),
+               "其他 Key 不受影响") and ok
+    ledger.settle(r1, "k1", {"prompt_tokens": 100, "completion_tokens": 50})
+    ledger.settle(r2, "k1", {"prompt_token_count": 200, "candidates_token_count": 20})
+    used = ledger.key_usage(r1.day, "DeepSeek", key_id("k1"))
+    ok = check(used["requests"] == 2 and used["prompt_tokens"] == 300 and used["completion_tokens"] == 70,
+               f"按实际 usage 入账（OpenAI / Gemini 格式）：{used['requests']} 次，{used['prompt_tokens']} / {used['completion_tokens']} tokens") and ok
+    ok = check(not raises_budget(lambda: ledger.release(ledger.reserve("DeepSeek", "k1", "deepseek-chat", PROMPT))),
+               "结算后释放预占，按实际用量重新计算余量") and ok
+    ok = check(ledger.fail(r1, "k1", RuntimeError("late")) is None, "已结算的请求之后出错不重复计数") and ok
+
+    print("失败的请求：")
+    ledger = UsageLedger(os.path.join(tmp, "b.sqlite3"), Budget(key_requests=3))
+    for err in (RuntimeError("Error code: 429 - rate limit"), RuntimeError("quota exceeded"), RuntimeError("timeout")):
+        ledger.fail(ledger.reserve("Kimi", "k", "moonshot-v1-8k", PROMPT), "k", err)
+    row = ledger.usage(provider="Kimi")[0]
+    ok = check(row["requests"] == 3 and row["failures"] == 3 and row["rate_limited"] == 2 and row["prompt_tokens"] == 0,
+               f"失败计入请求数与 failures（{row['failures']} 次，限流 {row['rate_limited']} 次），不计 token") and ok
+    ok = check(raises_budget(lambda: ledger.reserve("Kimi", "k", "moonshot-v1-8k", PROMPT)),
+               "失败的请求同样占用单 Key 请求预算") and ok
+
+    print("供应商每日费用：")
+    p, c = estimate_request(PROMPT)
+    ledger = UsageLedger(os.path.join(tmp, "c.sqlite3"), Budget(daily_usd=cost_usd("deepseek-chat", p, c) * 1.5))
+    ledger.settle(ledger.reserve("DeepSeek", "a", "deepseek-chat", PROMPT), "a",
+                  {"prompt_tokens": p, "completion_tokens": c})
+    ok = check(raises_budget(lambda: ledger.reserve("DeepSeek", "b", "deepseek-chat", PROMPT)),
+               "其他 Key 的当日费用也计入供应商预算") and ok
+
+    print("旧版台账文件：")
+    path = os.path.join(tmp, "old.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE usage (day TEXT NOT NULL, provider TEXT NOT NULL, key_id TEXT NOT NULL, "
+                     "model TEXT NOT NULL DEFAULT '', requests INTEGER NOT NULL DEFAULT 0, "
+                     "prompt_tokens INTEGER NOT NULL DEFAULT 0, completion_tokens INTEGER NOT NULL DEFAULT 0, "
+                     "cached_tokens INTEGER NOT NULL DEFAULT 0, cost_usd REAL NOT NULL DEFAULT 0, "
+                     "PRIMARY KEY (day, provider, key_id))")
+    ledger = UsageLedger(path, Budget())
+    ledger.fail(ledger.reserve("DeepSeek", "k", "deepseek-chat", PROMPT), "k", RuntimeError("429"))
+    row = ledger.usage(provider="DeepSeek")[0]
+    ok = check(row["failures"] == 1 and row["rate_limited"] == 1, "打开时补上 failures / rate_limited 列") and ok
+
+    if not ok:
+        sys.exit(1)
+    print("\n✓ 预占、结算与失败计数符合预期")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+本地 LLM 桩服务（OpenAI 兼容 /chat/completions，仅标准库）
+
+模拟服务端前缀缓存：system 消息出现过即视为命中，usage 中同时给出
+DeepSeek 风格（prompt_cache_hit_tokens / prompt_cache_miss_tokens）与
+OpenAI 风格（prompt_tokens_details.cached_tokens）的命中统计；
+响应延迟 = 基础延迟 + 未命中 token 数 × 单价，用于观察缓存对耗时的影响。
+
+用法：
+    python benchmarks/stub_llm_server.py --port 8765
+    TAS_LLM_STUB_URL=http://127.0.0.1:8765/v1 streamlit run app.py   # 侧边栏选择“本地桩 (Stub)”
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_cache import estimate_tokens  # noqa: E402
+
+EMPTY_RESULT = {"sections": {}, **{t: {"columns": [], "rows": []} for t in ("table1", "table2", "table4")}}   # 紧凑表格格式
+
+class StubState:
+    def __init__(self, base_latency_s: float = 0.05, s_per_1k_tokens: float = 0.2):
+        self.base_latency_s = base_latency_s
+        self.s_per_1k_tokens = s_per_1k_tokens
+        self.seen_prefixes: set = set()
+        self.requests = 0
+        self.rejected_keys: set = set()   # 这些 Key 的请求在基础延迟后返回 401（模拟无效 Key）
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def usage(self, messages: list) -> Tuple[Dict[str, Any], int]:
+        system = "".join(m.get("content", "") for m in messages if m.get("role") == "system")
+        rest = "".join(m.get("content", "") for m in messages if m.get("role") != "system")
+        sys_tokens, rest_tokens = estimate_tokens(system), estimate_tokens(rest)
+        key = hashlib.sha256(system.encode("utf-8")).hexdigest()
+        with self.lock:
+            self.requests += 1
+            hit = key in self.seen_prefixes
+            self.seen_prefixes.add(key)
+        cached = sys_tokens if hit else 0
+        prompt_tokens = sys_tokens + rest_tokens
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": 16,
+            "total_tokens": prompt_tokens + 16,
+            "prompt_cache_hit_tokens": cached,
+            "prompt_cache_miss_tokens": prompt_tokens - cached,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+        return usage, prompt_tokens - cached
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):  # 静默
+            pass
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            api_key = (self.headers.get("Authorization") or "").partition(" ")[2]
+            if api_key in state.rejected_keys:
+                time.sleep(state.base_latency_s)
+                with state.lock:
+                    state.rejected += 1
+                raw = json.dumps({"error": {"message": "invalid api key", "code": 401}}).encode("utf-8")
+                self.send_response(401)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+                return
+            usage, uncached = state.usage(body.get("messages") or [])
+            time.sleep(state.base_latency_s + uncached / 1000 * state.s_per_1k_tokens)
+            payload = {
+                "id": f"stub-{state.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub-json"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": json.dumps(EMPTY_RESULT, ensure_ascii=False)},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+            raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+    return Handler
+
+def serve(port: int = 0, state: StubState = None) -> Tuple[ThreadingHTTPServer, StubState]:
+    """后台线程启动桩服务，返回 (server, state)；port=0 时自动分配端口。"""
+    state = state or StubState()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="OpenAI 兼容的本地 LLM 桩服务（模拟前缀缓存）")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--base-latency", type=float, default=0.05)
+    ap.add_argument("--s-per-1k-tokens", type=float, default=0.2)
+    args = ap.parse_args()
+    server, _ = serve(args.port, StubState(args.base_latency, args.s_per_1k_tokens))
+    print(f"stub listening on http://127.0.0.1:{server.server_address[1]}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
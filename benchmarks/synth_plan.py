@@ -0,0 +1,435 @@
+# -*- coding: utf-8 -*-
+"""
+合成培养方案 PDF 生成器（基准测试 / 回归用的固定样本）
+
+生成结构与真实方案一致：
+- 封面 + 正文一~六（培养目标条目、12 条毕业要求及 N.M 分项、毕业条件 174 学分等）
+- 附表1 教学计划表：跨页、课程体系列纵向合并、“焊接方向 / 无损检测方向”分隔行
+- 附表2 学分统计（两个方向，纵向合并）、附表3 实践环节、附表4 支撑矩阵（H/M/L）、附表5 先修关系
+
+generate_plan_docx() 用同样的内容生成 Word 版（python-docx）：附表为原生表格，
+纵向合并写成 w:vMerge、方向分隔行写成 w:gridSpan，附表之间手动分页，供 Word 原生抽取路径对比。
+
+用法：
+    python benchmarks/synth_plan.py --size medium --seed 7 -o corpus/medium.pdf
+    python benchmarks/synth_plan.py --courses 600 -o corpus/huge.pdf
+    python benchmarks/synth_plan.py --size medium -o corpus/medium.docx
+
+同一 (courses, seed) 生成的 PDF 字节级一致，可直接作为基准输入；Word 版内容一致（压缩包时间戳不固定）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import random
+from typing import Any, List, Optional, Sequence, Tuple
+
+try:
+    import pymupdf as fitz
+except Exception:
+    import fitz
+
+SIZES = {"small": 40, "medium": 120, "large": 400}
+
+FONT = "china-s"
+PORTRAIT = (595, 842)
+LANDSCAPE = (842, 595)
+MARGIN = 40
+
+GRAD_TITLES = [
+    "工程知识", "问题分析", "设计/开发解决方案", "研究", "使用现代工具", "工程与社会",
+    "环境和可持续发展", "职业规范", "个人和团队", "沟通", "项目管理", "终身学习",
+]
+SYSTEMS = ["通识教育课程", "学科基础课程", "专业教育课程", "集中实践环节"]
+DIRECTIONS = ["焊接", "无损检测"]
+MODES = ["必修", "选修", "限选"]
+EXAMS = ["考试", "考查"]
+STEMS = {
+    "通识教育课程": ["大学外语", "高等数学", "大学物理", "思想道德与法治", "形势与政策", "体育", "线性代数", "概率论与数理统计"],
+    "学科基础课程": ["工程制图", "工程力学", "材料科学基础", "电工与电子技术", "材料物理化学", "机械设计基础", "热流体"],
+    "专业教育课程": {
+        "焊接": ["焊接方法及工艺", "焊接冶金与金属焊接性", "焊接结构", "焊接质量检验与评价", "焊接自动化"],
+        "无损检测": ["射线检测", "超声检测", "磁粉检测", "渗透检测", "涡流检测"],
+    },
+    "集中实践环节": ["认识实习", "生产实习", "课程设计", "工程训练", "毕业设计"],
+}
+PLAN_COLUMNS = ["课程体系", "课程编码", "课程名称", "开课模式", "考核方式", "学分", "总学时",
+                "讲课", "实验", "上机", "实践", "上课学期", "学位课"]
+PLAN_WIDTHS = [70, 60, 170, 45, 45, 35, 40, 35, 35, 35, 35, 45, 40]
+
+# ----------------------------
+# 版面工具
+# ----------------------------
+def _fit(text: str, width: float, size: float) -> str:
+    """按近似字宽截断（CJK 记 1 个字号，ASCII 记 0.55 个字号）。"""
+    out, used = "", 0.0
+    for ch in text:
+        w = size if ord(ch) > 0x2E80 else size * 0.55
+        if used + w > width - 3:
+            break
+        out += ch
+        used += w
+    return out
+
+class TextWriter:
+    """顺序写正文，自动换行 / 换页。"""
+
+    def __init__(self, doc: "fitz.Document", size: float = 10.5, line_gap: float = 6):
+        self.doc = doc
+        self.size = size
+        self.line_h = size + line_gap
+        self.page: Optional["fitz.Page"] = None
+        self.y = 0.0
+
+    def new_page(self) -> None:
+        self.page = self.doc.new_page(width=PORTRAIT[0], height=PORTRAIT[1])
+        self.y = MARGIN + self.size
+
+    def line(self, text: str, size: Optional[float] = None, indent: float = 0) -> None:
+        size = size or self.size
+        width = PORTRAIT[0] - 2 * MARGIN - indent
+        chunks = []
+        while text:
+            part = _fit(text, width, size)
+            if not part:
+                break
+            chunks.append(part)
+            text = text[len(part):]
+        for part in chunks or [""]:
+            if self.page is None or self.y > PORTRAIT[1] - MARGIN:
+                self.new_page()
+            self.page.insert_text((MARGIN + indent, self.y), part, fontname=FONT, fontsize=size)
+            self.y += max(self.line_h, size + 6)
+
+def draw_grid_page(
+    page: "fitz.Page",
+    top: float,
+    widths: Sequence[float],
+    header: Sequence[str],
+    rows: Sequence[Tuple[str, Sequence[str]]],
+    merge_col0: bool = True,
+    size: float = 7,
+    row_h: float = 14,
+) -> None:
+    """
+    画一页表格。rows: [("row", cells) | ("span", [文本])]。
+    "span" 行横跨整行（方向分隔行）；merge_col0 时第一列相同值纵向合并。
+    """
+    x0 = MARGIN
+    total_w = sum(widths)
+
+    def cell(x: float, y: float, w: float, h: float, text: str) -> None:
+        page.draw_rect(fitz.Rect(x, y, x + w, y + h), color=(0, 0, 0), width=0.5)
+        if text:
+            page.insert_text((x + 2, y + h / 2 + size / 2 - 1), _fit(text, w, size), fontname=FONT, fontsize=size)
+
+    y = top
+    x = x0
+    for w, h in zip(widths, header):
+        cell(x, y, w, row_h, h)
+        x += w
+    y += row_h
+
+    i = 0
+    while i < len(rows):
+        kind, cells = rows[i]
+        if kind == "span":
+            cell(x0, y, total_w, row_h, cells[0])
+            y += row_h
+            i += 1
+            continue
+        # 第一列纵向合并：统计连续相同值的行数
+        span = 1
+        if merge_col0:
+            while (i + span < len(rows) and rows[i + span][0] == "row"
+                   and rows[i + span][1][0] == cells[0]):
+                span += 1
+        cell(x0, y, widths[0], row_h * span, cells[0])
+        for k in range(span):
+            x = x0 + widths[0]
+            for w, v in zip(widths[1:], rows[i + k][1][1:]):
+                cell(x, y, w, row_h, v)
+                x += w
+            y += row_h
+        i += span
+
+class DocxWriter:
+    """与 TextWriter 接口相同，写入 python-docx 文档（换行交给 Word）。"""
+
+    def __init__(self, doc: Any, size: float = 10.5):
+        self.doc = doc
+        self.size = size
+        self.started = False
+
+    def new_page(self) -> None:
+        if self.started:
+            self.doc.add_page_break()
+
+    def line(self, text: str, size: Optional[float] = None, indent: float = 0) -> None:
+        from docx.shared import Pt
+
+        para = self.doc.add_paragraph()
+        if indent:
+            para.paragraph_format.left_indent = Pt(indent)
+        para.add_run(text).font.size = Pt(size or self.size)
+        self.started = True
+
+def add_docx_table(
+    w: DocxWriter,
+    heading: str,
+    header: Sequence[str],
+    rows: Sequence[Tuple[str, Sequence[str]]],
+    merge_col0: bool = True,
+) -> None:
+    """原生表格：标题段落 + 表头行（跨页重复）+ 数据行；合并方式与 draw_grid_page 相同。"""
+    w.new_page()
+    w.line(heading, size=12)
+    table = w.doc.add_table(rows=1 + len(rows), cols=len(header))
+    table.style = "Table Grid"
+    from docx.oxml import OxmlElement
+
+    table.rows[0]._tr.get_or_add_trPr().append(OxmlElement("w:tblHeader"))   # 表头跨页重复
+    for c, h in zip(table.rows[0].cells, header):
+        c.text = h
+    merges = []
+    group = None   # 第一列当前纵向合并组：[起始行, 值, 结束行]
+
+    def close_group() -> None:
+        if group is not None and group[2] > group[0]:
+            merges.append(((group[0], 0), (group[2], 0)))
+
+    for r, ((kind, cells), row) in enumerate(zip(rows, table.rows[1:]), start=1):
+        tcs = row.cells
+        if kind == "span":
+            close_group()
+            group = None
+            tcs[0].text = cells[0]
+            merges.append(((r, 0), (r, len(header) - 1)))
+            continue
+        cont = merge_col0 and group is not None and cells[0] == group[1]
+        for k, (c, v) in enumerate(zip(tcs, cells)):
+            if not (k == 0 and cont):   # 纵向合并的续格：文本只写在起始格
+                c.text = v
+        if cont:
+            group[2] = r
+        else:
+            close_group()
+            group = [r, cells[0], r]
+    close_group()
+    for (r0, c0), (r1, c1) in merges:
+        table.cell(r0, c0).merge(table.cell(r1, c1))
+
+def add_table(
+    doc: "fitz.Document",
+    heading: str,
+    widths: Sequence[float],
+    header: Sequence[str],
+    rows: Sequence[Tuple[str, Sequence[str]]],
+    merge_col0: bool = True,
+    size: float = 7,
+    row_h: float = 14,
+) -> None:
+    """跨页表格：每页重复表头，标题只出现在第一页。"""
+    per_page = int((LANDSCAPE[1] - 2 * MARGIN - 30) // row_h) - 1
+    for start in range(0, max(1, len(rows)), per_page):
+        page = doc.new_page(width=LANDSCAPE[0], height=LANDSCAPE[1])
+        top = MARGIN
+        if start == 0:
+            page.insert_text((MARGIN, MARGIN + 10), heading, fontname=FONT, fontsize=12)
+            top += 24
+        draw_grid_page(page, top, widths, header, rows[start:start + per_page], merge_col0, size, row_h)
+
+# ----------------------------
+# 内容生成
+# ----------------------------
+def make_courses(n: int, rng: random.Random) -> List[dict]:
+    courses = []
+    shares = {"通识教育课程": 0.3, "学科基础课程": 0.25, "专业教育课程": 0.3, "集中实践环节": 0.15}
+    code = 1000000
+    for system in SYSTEMS:
+        k = max(2, int(n * shares[system]))
+        for i in range(k):
+            if system == "专业教育课程":
+                direction = DIRECTIONS[i % 2]
+                stem = rng.choice(STEMS[system][direction])
+            else:
+                direction = ""
+                stem = rng.choice(STEMS[system])
+            credit = rng.choice([1, 1.5, 2, 2.5, 3, 3.5, 4])
+            hours = int(credit * 16)
+            lab = rng.choice([0, 0, 4, 8])
+            comp = rng.choice([0, 0, 0, 8])
+            code += rng.randint(1, 97)
+            courses.append({
+                "课程体系": system,
+                "课程编码": f"B{code}",
+                "课程名称": f"{stem}{chr(ord('A') + i % 4)}{i // 4 + 1}",
+                "开课模式": rng.choice(MODES),
+                "考核方式": rng.choice(EXAMS),
+                "学分": str(credit),
+                "总学时": str(hours),
+                "讲课": str(hours - lab - comp),
+                "实验": str(lab),
+                "上机": str(comp),
+                "实践": "0",
+                "上课学期": str(rng.randint(1, 8)),
+                "学位课": "√" if rng.random() < 0.35 else "",
+                "专业方向": direction,
+            })
+    return courses
+
+def indicator_points(rng: random.Random) -> List[str]:
+    points = []
+    for no in range(1, 13):
+        for sub in range(1, rng.choice([2, 3]) + 1):
+            points.append(f"{no}.{sub}")
+    return points
+
+def write_body(w: "TextWriter | DocxWriter", rng: random.Random, points: List[str]) -> None:
+    w.new_page()
+    w.line("某某大学", size=20)
+    w.line("材料成型及控制工程专业（焊接方向 / 无损检测方向）", size=16)
+    w.line("本科人才培养方案（2024版）", size=16)
+
+    w.new_page()
+    w.line("一、培养目标", size=13)
+    w.line("本专业培养德智体美劳全面发展，具备材料成型及控制工程领域扎实基础知识和实践能力的高素质工程技术人才。")
+    for i in range(1, 6):
+        w.line(f"{i}. 目标{i}：能够在焊接或无损检测相关领域从事工程设计、生产制造、质量检验与技术管理工作，"
+               f"具备持续学习与团队协作能力（毕业后五年左右）。", indent=10)
+
+    w.line("二、毕业要求", size=13)
+    subs_by_no: dict = {}
+    for p in points:
+        no, sub = p.split(".")
+        subs_by_no.setdefault(int(no), []).append(p)
+    for no, title in enumerate(GRAD_TITLES, start=1):
+        w.line(f"{no}. {title}：能够将数学、自然科学、工程基础和专业知识用于解决材料成型领域的复杂工程问题。")
+        for p in subs_by_no[no]:
+            w.line(f"{p} 能够针对复杂工程问题的第{p.split('.')[1]}个方面进行{title}相关的分析、表达与论证。", indent=14)
+
+    w.line("三、专业定位与特色", size=13)
+    for _ in range(rng.randint(3, 6)):
+        w.line("面向石油化工装备制造行业，突出焊接与无损检测两个方向的工程实践与智能化特色。")
+    w.line("四、主干学科、核心课程与主要实践环节", size=13)
+    w.line("主干学科：材料科学与工程、机械工程。")
+    w.line("核心课程：材料科学基础、焊接方法及工艺、焊接冶金与金属焊接性、射线检测、超声检测。")
+    w.line("主要实践环节：认识实习、生产实习、课程设计、毕业设计。")
+    w.line("五、标准学制与授予学位", size=13)
+    w.line("标准学制：四年。授予学位：工学学士。")
+    w.line("六、毕业条件", size=13)
+    w.line("学生须修满本方案规定的全部课程，至少修满 174 学分，方可准予毕业。")
+
+def build_plan_rows(courses: List[dict]) -> List[Tuple[str, Sequence[str]]]:
+    rows: List[Tuple[str, Sequence[str]]] = []
+    for system in SYSTEMS:
+        group = [c for c in courses if c["课程体系"] == system]
+        if system == "专业教育课程":
+            for d in DIRECTIONS:
+                rows.append(("span", [f"{d}方向"]))
+                rows += [("row", [c[k] for k in PLAN_COLUMNS]) for c in group if c["专业方向"] == d]
+        else:
+            rows += [("row", [c[k] for k in PLAN_COLUMNS]) for c in group]
+    return rows
+
+def plan_tables(course_list: List[dict], points: List[str], rng: random.Random) -> List[Tuple[Any, ...]]:
+    """附表1~5：[(标题, 列宽, 表头, 行, 第一列纵向合并, 字号)]。"""
+    tables: List[Tuple[Any, ...]] = []
+
+    # 附表1 教学计划表
+    tables.append(("七、教学计划表（附表1）", PLAN_WIDTHS, PLAN_COLUMNS, build_plan_rows(course_list), True, 7))
+
+    # 附表2 学分统计（方向纵向合并）
+    terms = ["一", "二", "三", "四", "五", "六", "七", "八"]
+    header2 = ["专业方向", "课程体系", "开课模式"] + [f"学期{t}" for t in terms] + ["学分统计", "学分比例"]
+    rows2 = []
+    for d in DIRECTIONS:
+        for system in SYSTEMS:
+            for mode in MODES[:2]:
+                per = [str(rng.choice([0, 0, 2, 3.5, 4, 6])) for _ in terms]
+                total = sum(float(x) for x in per)
+                rows2.append(("row", [f"{d}方向", system, mode] + per + [f"{total:g}", f"{total / 174:.1%}"]))
+    tables.append(("八、学分统计表（附表2）", [70, 90, 50] + [45] * 8 + [50, 50], header2, rows2, True, 7))
+
+    # 附表3 实践环节
+    practice = [c for c in course_list if c["课程体系"] == "集中实践环节"]
+    rows3 = [("row", ["集中实践", c["课程名称"], c["学分"], c["上课学期"], "校内外基地"]) for c in practice]
+    tables.append(("九、集中实践环节安排表（附表3）", [80, 200, 60, 60, 160], ["类别", "实践环节", "学分", "学期", "地点"],
+                   rows3, True, 7))
+
+    # 附表4 支撑矩阵
+    cols4 = ["课程名称"] + points
+    widths4 = [150] + [(LANDSCAPE[0] - 2 * MARGIN - 150) / len(points)] * len(points)
+    rows4 = []
+    for c in rng.sample(course_list, k=min(len(course_list), max(10, len(course_list) // 2))):
+        cells = [rng.choice(["H", "M", "L", "", "", ""]) for _ in points]
+        rows4.append(("row", [c["课程名称"]] + cells))
+    tables.append(("十、课程对毕业要求指标点的支撑矩阵（附表4）", widths4, cols4, rows4, False, 6))
+
+    # 附表5 先修关系
+    rows5 = []
+    for a, b in zip(course_list, course_list[1:]):
+        if a["课程体系"] == b["课程体系"] and rng.random() < 0.4:
+            rows5.append(("row", [a["课程体系"], b["课程名称"], a["课程名称"]]))
+    tables.append(("十一、课程先修关系表（附表5）", [120, 250, 250], ["课程体系", "课程名称", "先修课程"], rows5, True, 7))
+    return tables
+
+def generate_plan_pdf(courses: int = SIZES["medium"], seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    doc = fitz.open()
+    course_list = make_courses(courses, rng)
+    points = indicator_points(rng)
+
+    write_body(TextWriter(doc), rng, points)
+    for heading, widths, header, rows, merge_col0, size in plan_tables(course_list, points, rng):
+        add_table(doc, heading, widths, header, rows, merge_col0=merge_col0, size=size)
+
+    # 每页合并为单个内容流（与 Word 等导出的真实 PDF 一致，避免解析成本失真）
+    for page in doc:
+        page.clean_contents()
+
+    # 固定元数据与文件 ID，保证同参数输出字节级一致
+    doc.set_metadata({"title": "合成培养方案", "producer": "synth_plan",
+                      "creationDate": "D:20240101000000", "modDate": "D:20240101000000"})
+    data = doc.tobytes(garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+    return data
+
+def generate_plan_docx(courses: int = SIZES["medium"], seed: int = 0) -> bytes:
+    """与 generate_plan_pdf() 同样内容的 Word 版（需要 python-docx）。"""
+    import docx
+
+    rng = random.Random(seed)
+    doc = docx.Document()
+    course_list = make_courses(courses, rng)
+    points = indicator_points(rng)
+
+    w = DocxWriter(doc)
+    write_body(w, rng, points)
+    for heading, _, header, rows, merge_col0, _ in plan_tables(course_list, points, rng):
+        add_docx_table(w, heading, header, rows, merge_col0=merge_col0)
+
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="生成合成培养方案 PDF")
+    ap.add_argument("--size", choices=sorted(SIZES), default="medium")
+    ap.add_argument("--courses", type=int, default=0, help="覆盖 --size 的课程数")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("-o", "--output", default="")
+    args = ap.parse_args()
+
+    n = args.courses or SIZES[args.size]
+    out = args.output or f"synth_plan_{n}_{args.seed}.pdf"
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    generate = generate_plan_docx if out.lower().endswith(".docx") else generate_plan_pdf
+    with open(out, "wb") as f:
+        f.write(generate(n, args.seed))
+    print(out)
+
+if __name__ == "__main__":
+    main()
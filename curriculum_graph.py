@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""
+课程逻辑图（由附表1 教学计划表自动生成，服务端 graphviz 渲染 + SVG 缓存）
+
+- 节点：每门课程，按上课学期分层（graphviz cluster + rank=same）
+- 边（邻接表）：
+  1) 表中有“先修课程”列时直接使用
+  2) 同名系列课（高等数学D1 → D2、大学物理F1 → F2、形势与政策1 → 2 …）按学期顺序串联
+  3) PREREQ_RULES 中的专业先修关系（关键词匹配，两端课程都存在且学期不倒序才连线）
+- 渲染：DOT 源码的 SHA-256 作为缓存键，SVG 同时缓存在进程内和磁盘上；
+  未安装 graphviz 可执行文件（dot）时返回 None，由调用方改用 st.graphviz_chart
+  （浏览器端渲染，同样不依赖外网）。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from plan_extract import ExtractResult, clean_text
+from plan_index import COURSE_NAME_KEYS, SEMESTER_KEYS, course_rows, find_col
+
+# 依赖：graphviz（Python 包 + 系统 dot 可执行文件，见 packages.txt）
+try:
+    import graphviz
+except Exception:
+    graphviz = None
+
+DEFAULT_GRAPH_CACHE_DIR = os.environ.get(
+    "TAS_GRAPH_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "teaching-agent-suite", "graphs"),
+)
+
+PREREQ_KEYS = ["先修课程", "先修"]
+CORE_KEYS = ["是否学位课", "学位课"]
+SYSTEM_KEYS = ["课程体系", "课程模块", "课程类别"]
+
+# 专业先修关系（前置关键词, 后续关键词）；由原焊接方向手绘逻辑图整理而来
+PREREQ_RULES: List[Tuple[str, str]] = [
+    ("工程制图", "计算机绘图"),
+    ("普通化学", "材料物理化学"),
+    ("材料物理化学", "材料科学基础"),
+    ("材料科学基础", "焊接冶金"),
+    ("材料科学基础", "工程材料及热处理"),
+    ("大学物理", "电工与电子技术"),
+    ("电工与电子技术", "智能控制基础"),
+    ("智能控制基础", "焊接方法及工艺"),
+    ("材料成型方法及工艺", "焊接方法及工艺"),
+    ("工程力学", "机械设计基础"),
+    ("计算机绘图", "机械设计基础"),
+    ("机械设计基础", "焊接结构"),
+    ("焊接结构", "焊接结构课程设计"),
+    ("焊接方法及工艺", "焊接工艺课程设计"),
+    ("焊接冶金", "焊接工艺课程设计"),
+    ("焊接结构", "焊接工艺课程设计"),
+    ("认识实习", "生产实习"),
+    ("生产实习", "毕业设计"),
+    ("焊接结构课程设计", "毕业设计"),
+    ("焊接工艺课程设计", "毕业设计"),
+    ("工业机器人", "毕业设计"),
+]
+
+# 系列课后缀：D1 / F2 / 1 / (1) / Ⅱ / II 等
+_SERIES_RE = re.compile(r"^(?P<base>.+?)\s*[（(]?(?P<tag>[A-Za-z]?\d{1,2}|[ⅠⅡⅢⅣⅤⅥⅦⅧ]|I{1,3}|IV|V)[）)]?$")
+_ROMAN = {"Ⅰ": 1, "Ⅱ": 2, "Ⅲ": 3, "Ⅳ": 4, "Ⅴ": 5, "Ⅵ": 6, "Ⅶ": 7, "Ⅷ": 8,
+          "I": 1, "II": 2, "III": 3, "IV": 4, "V": 5}
+
+# ----------------------------
+# 图结构
+# ----------------------------
+@dataclass
+class CourseNode:
+    id: str
+    name: str
+    semester: int          # 0 = 学期未知
+    core: bool = False     # 学位课 / ★
+    system: str = ""
+
+@dataclass
+class CurriculumGraph:
+    title: str
+    nodes: List[CourseNode]
+    adj: Dict[str, List[str]] = field(default_factory=dict)   # 节点 id → 后续课程 id
+
+    def layers(self) -> Dict[int, List[CourseNode]]:
+        out: Dict[int, List[CourseNode]] = {}
+        for n in self.nodes:
+            out.setdefault(n.semester, []).append(n)
+        return dict(sorted(out.items()))
+
+    def edges(self) -> List[Tuple[str, str]]:
+        return [(a, b) for a, outs in self.adj.items() for b in outs]
+
+    def edge_count(self) -> int:
+        return sum(len(v) for v in self.adj.values())
+
+    def connected_or_core(self) -> "CurriculumGraph":
+        """只保留学位课和有连线的课程（大专业精简视图）。"""
+        linked = {a for a, b in self.edges()} | {b for a, b in self.edges()}
+        keep = [n for n in self.nodes if n.core or n.id in linked]
+        ids = {n.id for n in keep}
+        return CurriculumGraph(self.title, keep, {a: [b for b in v if b in ids] for a, v in self.adj.items() if a in ids})
+
+    def digest(self) -> str:
+        payload = {"title": self.title, "nodes": [asdict(n) for n in self.nodes], "adj": self.adj}
+        return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+# ----------------------------
+# 构建
+# ----------------------------
+def _semester(x: Any) -> int:
+    m = re.search(r"\d{1,2}", str(x or ""))
+    return int(m.group()) if m else 0
+
+def _is_core(name: str, flag: Any) -> bool:
+    f = clean_text(flag)
+    return name.endswith("★") or f in ("√", "✓", "是", "★", "Y", "y", "学位课")
+
+def _series_key(name: str) -> Optional[Tuple[str, int]]:
+    m = _SERIES_RE.match(name.rstrip("★"))
+    if not m:
+        return None
+    tag = m.group("tag")
+    num = _ROMAN.get(tag)
+    if num is None:
+        num = int(re.sub(r"\D", "", tag) or 0)
+        prefix = re.sub(r"\d", "", tag)
+        base = m.group("base") + prefix   # 高等数学D1/D2 同系列，A1 与 D1 不同系列
+    else:
+        base = m.group("base")
+    return (base, num)
+
+def build_graph(rows: Sequence[Dict[str, Any]], title: str = "课程逻辑图",
+                rules: Sequence[Tuple[str, str]] = PREREQ_RULES) -> CurriculumGraph:
+    """
+    rows：附表1 的课程行（列名 → 单元格），LLM table1 或确定性抽取的行均可。
+    同名课程只保留第一次出现（方向表常重复通用课程）。
+    """
+    nodes: List[CourseNode] = []
+    by_name: Dict[str, CourseNode] = {}
+    prereq_text: Dict[str, str] = {}
+    for row in rows:
+        cols = list(row.keys())
+        name_col = find_col(cols, COURSE_NAME_KEYS)
+        if not name_col:
+            continue
+        name = clean_text(row.get(name_col, ""))
+        if not name or name in by_name:
+            continue
+        sem_col = find_col(cols, SEMESTER_KEYS)
+        core_col = find_col(cols, CORE_KEYS)
+        sys_col = find_col(cols, SYSTEM_KEYS)
+        node = CourseNode(
+            id=f"c{len(nodes)}",
+            name=name,
+            semester=_semester(row.get(sem_col)) if sem_col else 0,
+            core=_is_core(name, row.get(core_col) if core_col else ""),
+            system=clean_text(row.get(sys_col, "")) if sys_col else "",
+        )
+        nodes.append(node)
+        by_name[name] = node
+        pre_col = find_col(cols, PREREQ_KEYS)
+        if pre_col and clean_text(row.get(pre_col, "")):
+            prereq_text[node.id] = clean_text(row.get(pre_col, ""))
+
+    edges: List[Tuple[str, str]] = []
+
+    # 1) 先修课程列
+    for nid, text in prereq_text.items():
+        for part in re.split(r"[、，,;；/\s]+", text):
+            pre = by_name.get(part.strip())
+            if pre is not None and pre.id != nid:
+                edges.append((pre.id, nid))
+
+    # 2) 系列课
+    series: Dict[str, List[Tuple[int, CourseNode]]] = {}
+    for n in nodes:
+        key = _series_key(n.name)
+        if key:
+            series.setdefault(key[0], []).append((key[1], n))
+    for members in series.values():
+        if len(members) < 2:
+            continue
+        members.sort(key=lambda x: (x[1].semester, x[0]))
+        for (_, a), (_, b) in zip(members, members[1:]):
+            edges.append((a.id, b.id))
+
+    # 3) 专业先修规则：每条规则在每个前置课程上连到最早的后续课程
+    for pre_kw, post_kw in rules:
+        pres = [n for n in nodes if pre_kw in n.name]
+        posts = [n for n in nodes if post_kw in n.name]
+        for a in pres:
+            cands = [b for b in posts if b is not a and post_kw not in a.name
+                     and (not a.semester or not b.semester or b.semester >= a.semester)]
+            if cands:
+                # 最早开课、名称最贴近关键词的后续课程
+                b = min(cands, key=lambda n: (n.semester or 99, len(n.name)))
+                edges.append((a.id, b.id))
+
+    adj: Dict[str, List[str]] = {}
+    for a, b in edges:
+        outs = adj.setdefault(a, [])
+        if b not in outs:
+            outs.append(b)
+    return CurriculumGraph(title=title, nodes=nodes, adj=adj)
+
+def table1_rows(result: ExtractResult) -> List[Dict[str, Any]]:
+    """
+    确定性抽取结果 → 附表1（教学计划表）课程行；附表2~5 的课程名不进图。
+    行的“专业方向”写入解析后的方向（行级优先、页面级兜底），供 direction_matches 过滤。
+    """
+    rows = []
+    for c in course_rows(result):
+        if c["appendix"] != "附表1":
+            continue
+        row = dict(c["row"])
+        row["专业方向"] = c["direction"]
+        rows.append(row)
+    return rows
+
+def _direction_parts(d: str) -> List[str]:
+    """“混合（焊接+无损检测）”→ [焊接, 无损检测]；单一方向原样返回。"""
+    m = re.match(r"^混合\s*[（(](?P<parts>.+)[)）]$", d)
+    if not m:
+        return [d]
+    return [p for p in (clean_text(x) for x in re.split(r"[+＋、/]", m.group("parts"))) if p]
+
+def direction_matches(value: Any, direction: str) -> bool:
+    """未选方向、通用课程（方向为空）、本方向，以及含本方向的“混合”课程都保留。"""
+    v = clean_text(value)
+    return not direction or not v or direction in _direction_parts(v)
+
+def directions_in(rows: Iterable[Dict[str, Any]]) -> List[str]:
+    out: List[str] = []
+    for r in rows:
+        col = find_col(list(r.keys()), ["专业方向"])
+        d = clean_text(r.get(col, "")) if col else ""
+        for part in (_direction_parts(d) if d else []):
+            if part not in out:
+                out.append(part)
+    return out
+
+# ----------------------------
+# DOT 与渲染
+# ----------------------------
+def _dot_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace('"', '\\"')
+
+def to_dot(g: CurriculumGraph) -> str:
+    """学期分层：每个学期一个 cluster，rank=same；学位课加粗着色。"""
+    lines = [
+        "digraph curriculum {",
+        '  graph [rankdir=LR, newrank=true, nodesep=0.15, ranksep=0.6, fontname="Noto Sans CJK SC", '
+        f'label="{_dot_escape(g.title)}", labelloc=t, fontsize=18];',
+        '  node [shape=box, style="rounded,filled", fillcolor="#ffffff", fontname="Noto Sans CJK SC", fontsize=11];',
+        '  edge [color="#7a869a", arrowsize=0.6];',
+    ]
+    for sem, members in g.layers().items():
+        label = f"第{sem}学期 - {len(members)}门" if sem else f"学期未标注 - {len(members)}门"
+        lines.append(f"  subgraph cluster_s{sem} {{")
+        lines.append(f'    label="{label}"; style="rounded,filled"; fillcolor="#f5f7fa"; color="#c9d1dc"; rank=same;')
+        for n in members:
+            attrs = f'label="{_dot_escape(n.name)}"'
+            if n.core:
+                attrs += ', fillcolor="#dde6ff", penwidth=1.6'
+            if "毕业设计" in n.name:
+                attrs += ', fillcolor="#ffcc99", penwidth=2.5'
+            lines.append(f"    {n.id} [{attrs}];")
+        lines.append("  }")
+    for a, b in g.edges():
+        lines.append(f"  {a} -> {b};")
+    lines.append("}")
+    return "\n".join(lines)
+
+def dot_available() -> bool:
+    if graphviz is None:
+        return False
+    try:
+        graphviz.version()
+        return True
+    except Exception:
+        return False
+
+class SvgCache:
+    """DOT 源码 SHA-256 → SVG；进程内 LRU + 磁盘文件（原子写入）。"""
+
+    def __init__(self, cache_dir: str = DEFAULT_GRAPH_CACHE_DIR, max_items: int = 64):
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self._mem: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".svg")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                return self._mem[key]
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                svg = f.read()
+        except OSError:
+            return None
+        self._remember(key, svg)
+        return svg
+
+    def put(self, key: str, svg: str) -> None:
+        self._remember(key, svg)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(svg)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            pass  # 磁盘不可写时只用内存缓存
+
+    def _remember(self, key: str, svg: str) -> None:
+        with self._lock:
+            self._mem[key] = svg
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_items:
+                self._mem.popitem(last=False)
+
+def render_svg(dot_source: str, cache: Optional[SvgCache] = None) -> Optional[str]:
+    """DOT → SVG（命中缓存直接返回）；dot 不可用时返回 None。"""
+    key = hashlib.sha256(dot_source.encode("utf-8")).hexdigest()
+    if cache is not None:
+        svg = cache.get(key)
+        if svg is not None:
+            return svg
+    if not dot_available():
+        return None
+    svg = graphviz.Source(dot_source).pipe(format="svg").decode("utf-8")
+    if cache is not None:
+        cache.put(key, svg)
+    return svg
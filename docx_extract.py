@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+"""
+Word（.docx）原生抽取：跳过 PDF 版面分析
+
+很多学院的培养方案本来就是 Word 写的，导出 PDF 之后我们再花几秒做 pdfplumber 版面分析，
+把本来就结构化的表格重新拼回来。上传的是 .docx 时直接读文档模型：
+- 段落按文档顺序读出文本；自动编号（“一、”“（1）”等由编号定义生成、不在正文里）按 numbering.xml 还原，
+  章节切分因此与 PDF 文本一致
+- 原生表格逐行读单元格：横向合并（w:gridSpan）只在首列保留文本，与 pdfplumber 的表格结构一致；
+  纵向合并（w:vMerge）的续格取起始格的值；行首空位（w:gridBefore）补空格。
+  合并格由文档模型给出，不再依赖按列名关键字的向下填充
+- 分页：优先用 Word 保存时记录的渲染分页（w:lastRenderedPageBreak），再加手动分页符、
+  段前分页与分节符；表格整体归入起始页（不会像 PDF 那样被跨页截断）
+- 每个表格所属附表取文档中其前面最近的附表标题行（“附表1：…”“七、…（附表1）”），不按页码推测
+
+页面对象实现与 pdf_backends 相同的页面接口（text / tables / content_fingerprint / ruling_signature /
+ruling_count），pdf_backends.open_pages 遇到 .docx 时直接交给这里，LLM 抽取的逐页文本
+（incremental.read_page_texts）因此不用改动；确定性抽取见 extract_docx_pages()。
+
+依赖：python-docx（可选，缺失时 .docx 无法解析）。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import re
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pdf_source import PdfInput, pdf_buffer, pdf_path
+
+DOCX_BACKEND = "docx"   # 写入 settings_digest，与 PDF 后端的抽取结果区分
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_P, _TBL, _TR, _TC, _SDT = _W + "p", _W + "tbl", _W + "tr", _W + "tc", _W + "sdt"
+_T, _TAB, _BR, _CR, _LRPB = _W + "t", _W + "tab", _W + "br", _W + "cr", _W + "lastRenderedPageBreak"
+_VAL, _TYPE = _W + "val", _W + "type"
+
+# ----------------------------
+# 识别
+# ----------------------------
+def is_docx(data: PdfInput) -> bool:
+    """ZIP 容器且含 word/document.xml。PDF 只看前 4 个字节即返回。"""
+    if bytes(pdf_buffer(data)[:4]) != b"PK\x03\x04":
+        return False
+    try:
+        with zipfile.ZipFile(pdf_path(data) or io.BytesIO(pdf_buffer(data))) as z:
+            return "word/document.xml" in z.namelist()
+    except (zipfile.BadZipFile, OSError):
+        return False
+
+# ----------------------------
+# 自动编号
+# ----------------------------
+_ZH_DIGITS = "零一二三四五六七八九"
+
+def _zh_number(n: int) -> str:
+    if n < 10:
+        return _ZH_DIGITS[n]
+    if n < 20:
+        return "十" + (_ZH_DIGITS[n % 10] if n % 10 else "")
+    if n < 100:
+        return _ZH_DIGITS[n // 10] + "十" + (_ZH_DIGITS[n % 10] if n % 10 else "")
+    return str(n)
+
+def _roman(n: int) -> str:
+    out = ""
+    for v, s in ((1000, "m"), (900, "cm"), (500, "d"), (400, "cd"), (100, "c"), (90, "xc"),
+                 (50, "l"), (40, "xl"), (10, "x"), (9, "ix"), (5, "v"), (4, "iv"), (1, "i")):
+        while n >= v:
+            out += s
+            n -= v
+    return out
+
+def format_number(n: int, fmt: str) -> str:
+    """numFmt → 编号文本；未覆盖的格式按阿拉伯数字处理。"""
+    if fmt in ("chineseCounting", "chineseCountingThousand", "chineseLegalSimplified",
+               "taiwanCounting", "taiwanCountingThousand", "ideographDigital"):
+        return _zh_number(n)
+    if fmt in ("lowerLetter", "upperLetter"):
+        s = chr(ord("a") + (n - 1) % 26) * ((n - 1) // 26 + 1)
+        return s.upper() if fmt == "upperLetter" else s
+    if fmt in ("lowerRoman", "upperRoman"):
+        return _roman(n).upper() if fmt == "upperRoman" else _roman(n)
+    if fmt in ("decimalEnclosedCircle", "decimalEnclosedCircleChinese") and 1 <= n <= 20:
+        return chr(0x2460 + n - 1)
+    if fmt in ("bullet", "none"):
+        return ""
+    return str(n)
+
+class _Numbering:
+    """按 numbering.xml 与段落样式还原自动编号文本，计数器按抽象编号共享（与 Word 一致）。"""
+
+    def __init__(self, doc: Any):
+        self.levels: Dict[str, Dict[int, Tuple[int, str, str, str]]] = {}   # abstractNumId → ilvl → (start, numFmt, lvlText, suff)
+        self.nums: Dict[str, str] = {}                                 # numId → abstractNumId
+        self.style_num: Dict[str, Tuple[str, int]] = {}                # styleId → (numId, ilvl)
+        self.counts: Dict[str, Dict[int, int]] = {}
+        try:
+            root = doc.part.numbering_part.element
+        except Exception:
+            root = None
+        if root is not None:
+            for an in root.iter(_W + "abstractNum"):
+                lv: Dict[int, Tuple[int, str, str, str]] = {}
+                for lvl in an.iter(_W + "lvl"):
+                    start = lvl.find(_W + "start")
+                    fmt = lvl.find(_W + "numFmt")
+                    text = lvl.find(_W + "lvlText")
+                    suff = lvl.find(_W + "suff")
+                    lv[int(lvl.get(_W + "ilvl", "0"))] = (
+                        int(start.get(_VAL, "1")) if start is not None else 1,
+                        fmt.get(_VAL, "decimal") if fmt is not None else "decimal",
+                        text.get(_VAL, "") if text is not None else "",
+                        suff.get(_VAL, "tab") if suff is not None else "tab",
+                    )
+                self.levels[an.get(_W + "abstractNumId", "")] = lv
+            for num in root.iter(_W + "num"):
+                ref = num.find(_W + "abstractNumId")
+                if ref is not None:
+                    self.nums[num.get(_W + "numId", "")] = ref.get(_VAL, "")
+        try:
+            styles = doc.styles.element
+        except Exception:
+            styles = None
+        if styles is not None:
+            based: Dict[str, str] = {}
+            for st in styles.iter(_W + "style"):
+                sid = st.get(_W + "styleId", "")
+                num = st.find(f"{_W}pPr/{_W}numPr")
+                if num is not None:
+                    self.style_num[sid] = _num_pr(num)
+                b = st.find(_W + "basedOn")
+                if b is not None:
+                    based[sid] = b.get(_VAL, "")
+            for sid, parent in based.items():   # 样式继承一层即可覆盖常见的“标题 1 → 带编号的标题样式”
+                if sid not in self.style_num and parent in self.style_num:
+                    self.style_num[sid] = self.style_num[parent]
+
+    def label(self, p: Any) -> str:
+        ppr = p.find(_W + "pPr")
+        ref: Optional[Tuple[str, int]] = None
+        if ppr is not None:
+            num = ppr.find(_W + "numPr")
+            if num is not None:
+                ref = _num_pr(num)
+            else:
+                style = ppr.find(_W + "pStyle")
+                if style is not None:
+                    ref = self.style_num.get(style.get(_VAL, ""))
+        if ref is None:
+            return ""
+        num_id, ilvl = ref
+        abs_id = self.nums.get(num_id)
+        levels = self.levels.get(abs_id or "")
+        if not levels or ilvl not in levels:
+            return ""
+        counts = self.counts.setdefault(abs_id, {})
+        counts[ilvl] = counts.get(ilvl, levels[ilvl][0] - 1) + 1
+        for deeper in [k for k in counts if k > ilvl]:
+            del counts[deeper]
+
+        def sub(m: "re.Match[str]") -> str:
+            k = int(m.group(1)) - 1
+            start, fmt = levels[k][:2] if k in levels else (1, "decimal")
+            return format_number(counts.get(k, start), fmt)
+
+        text = re.sub(r"%(\d)", sub, levels[ilvl][2])
+        # 编号后的制表符 / 空格按一个空格计
+        return text + " " if text and levels[ilvl][3] != "nothing" else text
+
+def _num_pr(num: Any) -> Tuple[str, int]:
+    nid = num.find(_W + "numId")
+    lvl = num.find(_W + "ilvl")
+    return (nid.get(_VAL, "") if nid is not None else "",
+            int(lvl.get(_VAL, "0")) if lvl is not None else 0)
+
+# ----------------------------
+# 段落与表格
+# ----------------------------
+def _run_text(el: Any) -> str:
+    """段落（或单元格内段落）的文本：w:t 原样，制表符为空格，换行符保留，分页符不产生文本。"""
+    parts: List[str] = []
+    for node in el.iter(_T, _TAB, _BR, _CR):
+        if node.tag == _T:
+            parts.append(node.text or "")
+        elif node.tag == _TAB:
+            parts.append(" ")
+        elif node.get(_TYPE) not in ("page", "column"):
+            parts.append("\n")
+    return "".join(parts)
+
+def _cell_text(tc: Any, numbering: _Numbering) -> str:
+    lines = []
+    for p in tc.iter(_P):
+        text = (numbering.label(p) + _run_text(p)).strip()
+        if text:
+            lines.append(text)
+    return "\n".join(lines)
+
+def _int_attr(parent: Any, path: str, default: int) -> int:
+    el = parent.find(path) if parent is not None else None
+    try:
+        return int(el.get(_VAL)) if el is not None else default
+    except (TypeError, ValueError):
+        return default
+
+def read_table(tbl: Any, numbering: _Numbering) -> List[List[Optional[str]]]:
+    """
+    w:tbl → 规则网格（列数 = 表格网格列数）。
+    横向合并：文本在首列，其余列为 None（与 pdfplumber 一致）；纵向合并：续格复制上一行同列的值。
+    """
+    grid: List[List[Optional[str]]] = []
+    for tr in tbl.iterchildren(_TR):
+        row: List[Optional[str]] = [""] * _int_attr(tr.find(_W + "trPr"), _W + "gridBefore", 0)
+        for tc in tr.iterchildren(_TC):
+            pr = tc.find(_W + "tcPr")
+            span = max(1, _int_attr(pr, _W + "gridSpan", 1))
+            vm = pr.find(_W + "vMerge") if pr is not None else None
+            col = len(row)
+            if vm is not None and vm.get(_VAL, "continue") == "continue" and grid:
+                above = grid[-1]
+                row.extend(above[col + k] if col + k < len(above) else None for k in range(span))
+            else:
+                row.append(_cell_text(tc, numbering))
+                row.extend([None] * (span - 1))
+        grid.append(row)
+    width = max((len(r) for r in grid), default=0)
+    return [r + [""] * (width - len(r)) for r in grid]
+
+def table_lines(table: List[List[Optional[str]]]) -> List[str]:
+    """表格按行展开为文本（供全文与 LLM 提示词），单元格以空格分隔。"""
+    out = []
+    for row in table:
+        cells = [c.replace("\n", " ") for c in row if c]
+        if cells:
+            out.append(" ".join(cells))
+    return out
+
+# ----------------------------
+# 页面
+# ----------------------------
+# 与 template_profiles 的附表标记、章标题规则一致
+_APPENDIX_MARK_RE = re.compile(r"^\s*附表\s*(\d+)\s*[:：\s]|[（(]\s*附表\s*(\d+)\s*[)）]\s*$")
+_CHAPTER_RE = re.compile(r"^\s*[一二三四五六七八九十]+\s*[、\.．]")
+
+@dataclass
+class DocxPage:
+    """一“页” Word 内容：与 PDF 页面对象接口相同。"""
+    lines: List[str] = field(default_factory=list)
+    raw_tables: List[List[List[Optional[str]]]] = field(default_factory=list)
+    table_appendix: List[str] = field(default_factory=list)   # 与 raw_tables 一一对应
+    _hash: Any = field(default_factory=hashlib.sha256, repr=False)
+
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+    def tables(self, table_settings: Optional[Dict[str, Any]] = None) -> List[List[List[Optional[str]]]]:
+        return [[list(r) for r in t] for t in self.raw_tables]
+
+    def content_fingerprint(self) -> str:
+        return "docx:" + self._hash.hexdigest()[:32]
+
+    def ruling_signature(self) -> str:
+        return "docx:" + ",".join(f"{len(t)}x{len(t[0]) if t else 0}" for t in self.raw_tables)
+
+    def ruling_count(self) -> int:
+        return sum(len(t) + 1 for t in self.raw_tables)
+
+    def to_image(self, resolution: int = 220) -> Any:
+        raise NotImplementedError("Word 文档没有页面图像")
+
+    def empty(self) -> bool:
+        return not self.lines and not self.raw_tables
+
+def _body_blocks(parent: Any) -> Iterator[Any]:
+    """正文中的段落与表格（按文档顺序，展开内容控件 w:sdt）。"""
+    for child in parent.iterchildren():
+        if child.tag in (_P, _TBL):
+            yield child
+        elif child.tag == _SDT:
+            content = child.find(_W + "sdtContent")
+            if content is not None:
+                yield from _body_blocks(content)
+
+def _para_breaks(p: Any) -> Tuple[bool, bool]:
+    """(段前分页, 段后分页)：分页标记出现在段落文字之前算段前，否则算段后。"""
+    before = after = False
+    ppr = p.find(_W + "pPr")
+    if ppr is not None:
+        pb = ppr.find(_W + "pageBreakBefore")
+        if pb is not None and pb.get(_VAL, "true") not in ("0", "false", "off"):
+            before = True
+    seen_text = False
+    for node in p.iter(_T, _BR, _LRPB):
+        if node.tag == _T:
+            seen_text = seen_text or bool((node.text or "").strip())
+        elif node.tag == _LRPB or node.get(_TYPE) == "page":
+            if seen_text:
+                after = True
+            else:
+                before = True
+    return before, after
+
+def docx_pages(doc: Any) -> List[DocxPage]:
+    body = doc.element.body
+    numbering = _Numbering(doc)
+    # 分节符：段落里的 w:sectPr 结束一节，下一节的 w:type 决定是否换页（默认 nextPage）
+    sect_types = [(s.find(_TYPE).get(_VAL, "nextPage") if s.find(_TYPE) is not None else "nextPage")
+                  for s in body.iter(_W + "sectPr")]
+    sect_idx = 0
+
+    pages = [DocxPage()]
+    appendix = ""
+
+    def new_page() -> None:
+        if not pages[-1].empty():
+            pages.append(DocxPage())
+
+    for block in _body_blocks(body):
+        if block.tag == _TBL:
+            table = read_table(block, numbering)
+            if not table:
+                continue
+            page = pages[-1]
+            page.raw_tables.append(table)
+            page.table_appendix.append(appendix)
+            page.lines.extend(table_lines(table))
+            page._hash.update(b"T" + repr(table).encode("utf-8"))
+            continue
+
+        before, after = _para_breaks(block)
+        if before:
+            new_page()
+        text = (numbering.label(block) + _run_text(block)).strip()
+        if text:
+            page = pages[-1]
+            page.lines.extend(text.split("\n"))
+            page._hash.update(b"P" + text.encode("utf-8"))
+            for ln in text.split("\n"):
+                m = _APPENDIX_MARK_RE.search(ln)
+                if m and len(ln) <= 60:
+                    appendix = f"附表{m.group(1) or m.group(2)}"
+                elif _CHAPTER_RE.match(ln) and len(ln) <= 60:
+                    appendix = ""
+        sect = block.find(f"{_W}pPr/{_W}sectPr")
+        if sect is not None:
+            sect_idx += 1
+            if sect_idx < len(sect_types) and sect_types[sect_idx] != "continuous":
+                after = True
+        if after:
+            new_page()
+
+    if len(pages) > 1 and pages[-1].empty():
+        pages.pop()
+    return pages
+
+def read_docx_pages(data: PdfInput) -> List[DocxPage]:
+    try:
+        import docx  # python-docx
+    except Exception as e:
+        raise RuntimeError("解析 Word 文档需要 python-docx") from e
+    return docx_pages(docx.Document(pdf_path(data) or io.BytesIO(pdf_buffer(data))))
+
+@contextmanager
+def open_docx_pages(data: PdfInput) -> Iterator[List[DocxPage]]:
+    """with open_docx_pages(data) as pages: ...（与 pdf_backends.open_pages 用法相同）"""
+    yield read_docx_pages(data)
+
+# ----------------------------
+# 确定性抽取
+# ----------------------------
+def extract_docx_pages(
+    data: PdfInput,
+    timings: Optional[Dict[str, float]] = None,
+    progress: Optional[Callable[[float, str], None]] = None,
+) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    与 plan_extract.extract_pages_text_and_tables() 返回相同的 (pages_data, 全文)；
+    页面数据另带 "table_appendix"（与 "tables" 一一对应），run_full_extract 据此给表格归附表。
+    """
+    from plan_extract import normalize_multiline, normalize_table, page_text_fingerprint, stage
+
+    pages_data: List[Dict[str, Any]] = []
+    with stage(timings, "docx_read"):
+        pages = read_docx_pages(data)
+    for idx, page in enumerate(pages, start=1):
+        if progress is not None:
+            progress((idx - 1) / max(1, len(pages)), f"正在读取 Word 第 {idx}/{len(pages)} 页")
+        with stage(timings, "page_text"):
+            text = normalize_multiline(page.text())
+        tables: List[List[List[str]]] = []
+        labels: List[str] = []
+        with stage(timings, "normalize_table"):
+            for raw, label in zip(page.raw_tables, page.table_appendix):
+                ct = normalize_table(raw)
+                if ct:
+                    tables.append(ct)
+                    labels.append(label)
+        pages_data.append({
+            "page": idx,
+            "text": text,
+            "tables": tables,
+            "tables_count": len(tables),
+            "table_appendix": labels,
+            "fingerprint": page.content_fingerprint(),
+            "text_fingerprint": page_text_fingerprint(page, text),
+            "reused": "",
+        })
+    return pages_data, "\n".join(p["text"] for p in pages_data)
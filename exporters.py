@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+表格导出（流式）
+
+- ZIP：tables.json + 每表一个 CSV，逐表写入压缩流，落在 SpooledTemporaryFile 上
+  （小于 SPOOL_MAX_BYTES 时在内存，超过后自动转存临时文件）
+- Excel：单个工作簿，每个附表一个工作表，xlsxwriter constant_memory 模式逐行落盘
+
+导出期间同一时刻只持有一张表的 DataFrame，峰值内存与单表大小相关，而不是整份文档。
+返回的文件对象已 seek(0)，可直接交给 st.download_button。
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import re
+import tempfile
+import zipfile
+from typing import IO, Any, Dict, Iterator, List, Tuple
+
+import pandas as pd
+
+from plan_extract import clean_text, postprocess_table_df
+
+# 依赖：xlsxwriter（可选，缺失时 Excel 导出不可用）
+try:
+    import xlsxwriter
+except Exception:
+    xlsxwriter = None
+
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# ----------------------------
+# 单表
+# ----------------------------
+def safe_df_from_tablepack(t: Dict[str, Any]) -> pd.DataFrame:
+    """从 TablePack 字典创建 DataFrame"""
+    cols = t.get("columns") or []
+    rows = t.get("rows") or []
+
+    if rows and len(rows) > 0:
+        df = pd.DataFrame(rows, columns=cols)
+        return postprocess_table_df(df)
+    return pd.DataFrame()
+
+def export_df(t: Dict[str, Any]) -> pd.DataFrame:
+    """导出用 DataFrame：后处理 + 方向列"""
+    df = safe_df_from_tablepack(t)
+    direction = clean_text(t.get("direction") or "")
+    if direction and "专业方向" not in df.columns:
+        df.insert(0, "专业方向", direction)
+    return df
+
+def table_file_stem(idx: int, t: Dict[str, Any]) -> str:
+    title = clean_text(t.get("title") or f"table_{idx}")
+    title_safe = re.sub(r"[^0-9A-Za-z\u4e00-\u9fff_\-]+", "_", title)[:80].strip("_") or f"table_{idx}"
+    return f"{idx:02d}_{title_safe}"
+
+# ----------------------------
+# ZIP（CSV + tables.json）
+# ----------------------------
+def write_tables_zip(tables: List[Dict[str, Any]], fileobj: IO[bytes]) -> None:
+    """逐表写入 ZIP：json.dump / to_csv 直接写到压缩条目流，不拼接整段字符串。"""
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        with zf.open("tables.json", "w") as raw, io.TextIOWrapper(raw, encoding="utf-8") as fp:
+            json.dump(tables, fp, ensure_ascii=False, indent=2)
+        for idx, t in enumerate(tables, start=1):
+            df = export_df(t)
+            with zf.open(f"{table_file_stem(idx, t)}.csv", "w") as raw, \
+                    io.TextIOWrapper(raw, encoding="utf-8-sig", newline="") as fp:
+                df.to_csv(fp, index=False)
+            del df
+
+def tables_zip_file(tables: List[Dict[str, Any]]) -> IO[bytes]:
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    write_tables_zip(tables, out)
+    out.seek(0)
+    return out
+
+# ----------------------------
+# Excel（每个附表一个工作表）
+# ----------------------------
+def _sheet_name(name: str, used: set) -> str:
+    base = re.sub(r"[\[\]:*?/\\]+", "_", clean_text(name))[:31] or "Sheet"
+    cand, n = base, 2
+    while cand.lower() in used:
+        suffix = f"_{n}"
+        cand, n = base[:31 - len(suffix)] + suffix, n + 1
+    used.add(cand.lower())
+    return cand
+
+def group_tables_by_appendix(tables: List[Dict[str, Any]]) -> Iterator[Tuple[str, List[Tuple[int, Dict[str, Any]]]]]:
+    """按附表分组（保持首次出现顺序）；未识别附表的表格归入“其他表格”。"""
+    groups: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+    for idx, t in enumerate(tables, start=1):
+        key = clean_text(t.get("appendix") or "") or "其他表格"
+        groups.setdefault(key, []).append((idx, t))
+    return iter(groups.items())
+
+def write_tables_xlsx(tables: List[Dict[str, Any]], fileobj: IO[bytes]) -> None:
+    """
+    constant_memory 模式下每行写完即落盘，因此每个工作表严格按行顺序写：
+    同一附表的多张表依次纵向排列，每张表前一行标题、表间空一行。
+    """
+    if xlsxwriter is None:
+        raise RuntimeError("缺少依赖 xlsxwriter，无法导出 Excel。")
+    wb = xlsxwriter.Workbook(fileobj, {"constant_memory": True, "in_memory": False,
+                                       "strings_to_numbers": False, "strings_to_urls": False})
+    try:
+        title_fmt = wb.add_format({"bold": True, "font_size": 12})
+        head_fmt = wb.add_format({"bold": True, "bg_color": "#EFEFEF", "border": 1, "text_wrap": True})
+        used: set = set()
+        for appendix, items in group_tables_by_appendix(tables):
+            ws = wb.add_worksheet(_sheet_name(appendix, used))
+            r = 0
+            for idx, t in items:
+                df = export_df(t)
+                ws.write_string(r, 0, clean_text(t.get("title") or f"table_{idx}") + f"（第{t.get('page', '?')}页）", title_fmt)
+                r += 1
+                for c, name in enumerate(df.columns):
+                    ws.write_string(r, c, str(name), head_fmt)
+                r += 1
+                for row in df.itertuples(index=False, name=None):
+                    # 一律按文本写入：避免 "=..." 被当作公式、学号/代码类数字丢前导零
+                    for c, v in enumerate(row):
+                        ws.write_string(r, c, str(v))
+                    r += 1
+                r += 1
+                del df
+    finally:
+        wb.close()
+
+def tables_xlsx_file(tables: List[Dict[str, Any]]) -> IO[bytes]:
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    write_tables_xlsx(tables, out)
+    out.seek(0)
+    return out
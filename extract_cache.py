@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+抽取结果磁盘缓存（跨会话、跨用户、重启后仍有效）
+
+键 = 文件 SHA-256 + 抽取器版本 + use_ocr + table_settings + PDF 后端，
+抽取器源码变化时版本号随之变化，旧条目自然失效并被淘汰。
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pdf_backends import DEFAULT_BACKEND
+from pdf_source import PdfInput, as_source
+from plan_extract import (
+    DEFAULT_TABLE_SETTINGS,
+    TEMPLATE_AUTO,
+    ExtractResult,
+    extractor_version,
+    result_from_dict,
+    run_full_extract,
+)
+from template_profiles import TemplateStore
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "TAS_EXTRACT_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "teaching-agent-suite", "extract"),
+)
+DEFAULT_CACHE_MAX_BYTES = int(os.environ.get("TAS_EXTRACT_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# ----------------------------
+# 缓存键
+# ----------------------------
+def extract_cache_key(
+    file_sha256: str,
+    use_ocr: bool,
+    table_settings: Optional[Dict[str, Any]] = None,
+    version: Optional[str] = None,
+    backend: Optional[str] = None,
+) -> str:
+    payload = {
+        "sha256": file_sha256,
+        "extractor": version or extractor_version(),
+        "use_ocr": bool(use_ocr),
+        "table_settings": table_settings or DEFAULT_TABLE_SETTINGS,
+        "backend": backend or DEFAULT_BACKEND,
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+# ----------------------------
+# 磁盘缓存
+# ----------------------------
+class ExtractCache:
+    """
+    gzip 压缩的 JSON 文件，一键一文件；写入走临时文件 + os.replace 保证原子性，
+    多进程共享同一目录也不会读到半截文件。超过 max_bytes 时按最近访问时间淘汰。
+    """
+
+    SUFFIX = ".json.gz"
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.SUFFIX)
+
+    def get(self, key: str) -> Optional[ExtractResult]:
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # 损坏的条目直接丢弃
+            self._remove(path)
+            return None
+        try:
+            os.utime(path, None)  # 记录访问时间，供 LRU 淘汰
+        except OSError:
+            pass
+        return result_from_dict(data)
+
+    def put(self, key: str, result: ExtractResult) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+                f.write(json.dumps(asdict(result), ensure_ascii=False).encode("utf-8"))
+            os.replace(tmp, self._path(key))
+        except Exception:
+            self._remove(tmp)
+            raise
+        self.evict()
+
+    def entries(self) -> List[Tuple[str, int, float]]:
+        """[(path, size, atime)]，按最近访问从旧到新排序。"""
+        out = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st_ = os.stat(path)
+            except OSError:
+                continue
+            out.append((path, st_.st_size, max(st_.st_atime, st_.st_mtime)))
+        out.sort(key=lambda x: x[2])
+        return out
+
+    def evict(self) -> int:
+        """超出容量时从最久未访问的条目开始删除，返回删除条数。"""
+        with self._lock:
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+                removed += 1
+            return removed
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+# ----------------------------
+# 带缓存的主流程
+# ----------------------------
+def cached_run_full_extract(
+    cache: Optional[ExtractCache],
+    pdf_bytes: PdfInput,
+    use_ocr: bool = False,
+    table_settings: Optional[Dict[str, Any]] = None,
+    prior: Optional[ExtractResult] = None,
+    backend: Optional[str] = None,
+    timings: Optional[Dict[str, float]] = None,
+    progress: Optional[Callable[[float, str], None]] = None,
+    templates: Optional[TemplateStore] = None,
+) -> Tuple[ExtractResult, bool]:
+    """
+    返回 (结果, 是否命中缓存)。cache 为 None 时等价于 run_full_extract。
+    未命中时把 prior（上一版本）传给 run_full_extract 做按页增量抽取。
+    pdf_bytes 为 bytes 时包成 PdfSource，文件哈希只计算一次。
+    templates：版式模板库（见 run_full_extract）；按模板选参数的结果与固定参数的结果分开缓存。
+    """
+    pdf_bytes = as_source(pdf_bytes)
+    if cache is None:
+        return run_full_extract(pdf_bytes, use_ocr=use_ocr, table_settings=table_settings, prior=prior,
+                                backend=backend, timings=timings, progress=progress, templates=templates), False
+
+    auto = templates is not None and table_settings is None
+    key = extract_cache_key(pdf_bytes.sha256, use_ocr, TEMPLATE_AUTO if auto else table_settings, backend=backend)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit, True
+
+    result = run_full_extract(pdf_bytes, use_ocr=use_ocr, table_settings=table_settings, prior=prior,
+                              backend=backend, timings=timings, progress=progress, templates=templates)
+    try:
+        cache.put(key, result)
+    except OSError:
+        pass  # 磁盘不可写时退化为无缓存
+    return result, False
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+独立的 HTTP 抽取服务（仅标准库 + 现有依赖）
+
+供选课目录同步、专业认证材料等其他校内系统以编程方式调用，不经过 Streamlit 界面。
+
+接口（请求体为 PDF 或 Word .docx 原始字节，Content-Type: application/pdf）：
+    POST /v1/extract?ocr=0&backend=pdfplumber        确定性抽取（run_full_extract）
+    POST /v1/llm-extract?provider=DeepSeek           LLM 全量抽取（Key 放在请求头 X-API-Key，缺少时 401）
+        → 202 {"job_id", "status", "sha256"}；相同文件 + 参数 + Key 的任务正在进行或已完成时直接返回该任务
+    GET  /v1/jobs/<job_id>                           任务状态 / 进度
+    GET  /v1/jobs/<job_id>/result                    结果 JSON（未完成 409，失败 500，超过 TAS_JOB_RESULT_TTL_S 未取 410）
+    GET  /v1/stats  /healthz
+
+- 计算在进程池中执行（--workers），HTTP 线程只负责收发；排队上限与按客户端 IP 的并发上限沿用 jobs.JobManager
+- 请求体超过 --max-mb 返回 413；请求体边读边哈希，超过 --spill-mb 的直接流式写入临时文件，
+  工作进程按路径打开（PdfSource 序列化时只传路径），不再把整份 PDF 复制给每个进程
+- 确定性抽取按版式模板（template_profiles.TemplateStore，各工作进程共用同一 JSON 文件）选表格参数与附表页码
+- 结果缓存（均在 --cache-dir / TAS_SERVICE_CACHE_DIR 下）：确定性抽取复用 ExtractCache（extract/，按 SHA-256 + 抽取参数）；
+  LLM 抽取按 (SHA-256, 供应商, 模型, 提示词版本, Key 指纹) 缓存到 llm/——
+  没有有效 Key 的请求拿不到别人用自己的 Key 付费抽取的结果
+
+用法：
+    python extract_service.py --port 8601 --workers 4
+    curl --data-binary @培养方案.pdf -H "Content-Type: application/pdf" http://127.0.0.1:8601/v1/extract
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from docx_extract import is_docx
+from jobs import CANCELLED, DONE, FAILED, STATUS_LABELS, JobManager, QueueFullError
+from pdf_source import PdfInput, PdfSource, pdf_buffer, pdf_sha256
+from usage_ledger import key_id
+
+DEFAULT_SERVICE_CACHE_DIR = os.environ.get(
+    "TAS_SERVICE_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "teaching-agent-suite", "service"),
+)
+DEFAULT_MAX_MB = int(os.environ.get("TAS_SERVICE_MAX_MB", "50"))
+DEFAULT_SPILL_MB = float(os.environ.get("TAS_SERVICE_SPILL_MB", "1"))
+
+_JOB_PATH = re.compile(r"^/v1/jobs/([0-9a-f]+)(/result)?$")
+
+# ----------------------------
+# 进程池中执行的任务（模块级函数，spawn 启动的子进程可直接导入）
+# ----------------------------
+def run_deterministic(pdf_bytes: PdfInput, use_ocr: bool, backend: Optional[str], cache_dir: Optional[str]) -> Dict[str, Any]:
+    from extract_cache import ExtractCache, cached_run_full_extract
+    from template_profiles import TemplateStore
+
+    cache = ExtractCache(cache_dir) if cache_dir else ExtractCache()
+    result, hit = cached_run_full_extract(cache, pdf_bytes, use_ocr=use_ocr, backend=backend,
+                                          templates=TemplateStore())
+    return {"cached": hit, "result": asdict(result)}
+
+def _llm_cache_path(cache_dir: str, key: Tuple[str, ...]) -> str:
+    digest = hashlib.sha256(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, "llm", f"{digest}.json.gz")
+
+def run_llm(pdf_bytes: PdfInput, provider: str, api_key: str, backend: Optional[str], cache_dir: str) -> Dict[str, Any]:
+    import app
+    from prompt_cache import prefix_version
+
+    if provider not in app.PROVIDERS:
+        raise ValueError(f"未知的供应商：{provider}")
+    if not api_key:
+        raise ValueError("缺少 API Key")
+    key = (pdf_sha256(pdf_bytes), provider, app.PROVIDERS[provider]["model"],
+           prefix_version(app.MEGA_PROMPT), key_id(api_key))
+    path = _llm_cache_path(cache_dir, key)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return {"cached": True, "result": json.load(f)}
+    except (OSError, ValueError):
+        pass
+
+    data, _ = app.extract_mega(api_key, pdf_bytes, provider, pdf_backend=backend, rotation={})
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # 缓存目录不可写时只是不缓存
+    return {"cached": False, "result": data}
+
+# ----------------------------
+# 服务状态
+# ----------------------------
+class ExtractService:
+    def __init__(self, workers: int = 2, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+                 cache_dir: str = DEFAULT_SERVICE_CACHE_DIR, max_queue: int = 64, max_per_client: int = 8,
+                 spill_bytes: int = int(DEFAULT_SPILL_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self.spill_bytes = spill_bytes
+        self.cache_dir = cache_dir
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        # 任务表 / 排队上限 / 按客户端轮转：每个任务在线程中提交到进程池并等待
+        self.jobs = JobManager(max_workers=workers, max_queue=max_queue, max_per_owner=max_per_client)
+        self._by_request: Dict[Tuple[Any, ...], str] = {}   # (类型, SHA-256, 参数) → job_id
+        self._lock = threading.Lock()
+
+    def _run_in_pool(self, report, fn, *args):
+        report(0.1, "执行中")
+        return self.pool.submit(fn, *args).result()
+
+    def submit(self, client: str, kind: str, pdf_bytes: PdfInput, params: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        返回 (job_id, sha256)。相同请求未失败的任务直接复用（进行中则合并，已完成则命中）；
+        LLM 任务以 Key 指纹区分，不同 Key 的请求互不复用。
+        """
+        sha = pdf_sha256(pdf_bytes)
+        req = (kind, sha) + tuple(sorted((k, key_id(v) if k == "api_key" else v) for k, v in params.items()))
+        with self._lock:
+            job = self.jobs.get(self._by_request.get(req))
+            if job is not None and job.status not in (FAILED, CANCELLED) and not job.expired:
+                return job.id, sha
+            if len(self._by_request) > 2 * self.jobs.keep_finished:
+                # 任务表已淘汰的条目不再保留（结果仍在磁盘缓存中）
+                self._by_request = {k: v for k, v in self._by_request.items() if self.jobs.get(v) is not None}
+            if kind == "extract":
+                args = (run_deterministic, pdf_bytes, params["use_ocr"], params["backend"],
+                        os.path.join(self.cache_dir, "extract"))
+            else:
+                args = (run_llm, pdf_bytes, params["provider"], params["api_key"], params["backend"], self.cache_dir)
+            job_id = self.jobs.submit(client, self._run_in_pool, *args, label=f"{kind}:{sha[:12]}")
+            self._by_request[req] = job_id
+            return job_id, sha
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+def job_status(job) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "label": job.label,
+        "status": job.status,
+        "status_label": STATUS_LABELS[job.status],
+        "progress": round(job.progress, 3),
+        "message": job.message,
+        "elapsed_s": round(job.elapsed(), 3),
+    }
+
+# ----------------------------
+# HTTP
+# ----------------------------
+def make_handler(service: ExtractService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):  # 静默
+            pass
+
+        def _send(self, code: int, payload: Any) -> None:
+            raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def _error(self, code: int, message: str) -> None:
+            self._send(code, {"error": message})
+
+        def handle_expect_100(self):
+            """带 Expect: 100-continue 的客户端在发送文件前即可收到 413。"""
+            if int(self.headers.get("Content-Length") or 0) > service.max_bytes:
+                self.send_response_only(413)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                self.close_connection = True
+                return False
+            return super().handle_expect_100()
+
+        def _discard(self, length: int, chunk: int = 1 << 20) -> None:
+            """超限的请求体分块读掉丢弃（不占内存），客户端才能正常收到 413；过大时直接断开。"""
+            self.close_connection = True
+            if length > 4 * service.max_bytes:
+                return
+            while length > 0:
+                n = len(self.rfile.read(min(chunk, length)))
+                if not n:
+                    break
+                length -= n
+
+        def do_GET(self):
+            path = urlparse(self.path).path.rstrip("/")
+            if path == "/healthz":
+                return self._send(200, {"ok": True})
+            if path == "/v1/stats":
+                return self._send(200, service.jobs.stats())
+            m = _JOB_PATH.match(path)
+            if not m:
+                return self._error(404, "not found")
+            job = service.jobs.get(m.group(1))
+            if job is None:
+                return self._error(404, "任务不存在或已过期")
+            if not m.group(2):
+                return self._send(200, job_status(job))
+            if job.expired:
+                return self._error(410, "结果保留时间已过，请重新提交（将命中磁盘缓存）")
+            if job.status == DONE:
+                return self._send(200, {**job_status(job), **job.result})
+            if job.status == FAILED:
+                return self._send(500, {**job_status(job), "error": job.message})
+            return self._send(409, job_status(job))
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            path = url.path.rstrip("/")
+            if path not in ("/v1/extract", "/v1/llm-extract"):
+                return self._error(404, "not found")
+            length = self.headers.get("Content-Length")
+            if length is None:
+                return self._error(411, "需要 Content-Length")
+            if int(length) > service.max_bytes:
+                self._discard(int(length))
+                return self._error(413, f"文件超过上限 {service.max_bytes // (1024 * 1024)} MB")
+            body = PdfSource.from_stream(self.rfile, length=int(length), threshold=service.spill_bytes)
+            if len(body) != int(length):
+                self.close_connection = True
+                return self._error(400, "请求体不完整")
+            if bytes(pdf_buffer(body)[:4]) != b"%PDF" and not is_docx(body):
+                return self._error(400, "请求体不是 PDF 或 Word 文档")
+
+            q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            params: Dict[str, Any] = {"backend": q.get("backend") or None}
+            if path == "/v1/extract":
+                kind = "extract"
+                params["use_ocr"] = q.get("ocr", "0") in ("1", "true", "yes")
+            else:
+                kind = "llm"
+                params["provider"] = q.get("provider") or "Gemini (Google)"
+                params["api_key"] = self.headers.get("X-API-Key", "")
+                if not params["api_key"]:
+                    return self._error(401, "缺少请求头 X-API-Key")
+            try:
+                job_id, sha = service.submit(self.client_address[0], kind, body, params)
+            except QueueFullError as e:
+                return self._error(429, str(e))
+            job = service.jobs.get(job_id)
+            self._send(202, {**job_status(job), "sha256": sha})
+
+    return Handler
+
+def serve(port: int = 0, service: Optional[ExtractService] = None, host: str = "127.0.0.1"):
+    """后台线程启动服务，返回 (server, service)；port=0 时自动分配端口。"""
+    service = service or ExtractService()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, service
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="培养方案抽取 HTTP 服务")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8601)
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="进程池大小")
+    ap.add_argument("--max-mb", type=int, default=DEFAULT_MAX_MB, help="单个 PDF 上限（MB）")
+    ap.add_argument("--spill-mb", type=float, default=DEFAULT_SPILL_MB, help="超过该大小的请求体写入临时文件")
+    ap.add_argument("--max-queue", type=int, default=64)
+    ap.add_argument("--max-per-client", type=int, default=8, help="单个客户端 IP 同时排队 / 执行的任务上限")
+    ap.add_argument("--cache-dir", default=DEFAULT_SERVICE_CACHE_DIR)
+    args = ap.parse_args()
+    service = ExtractService(workers=args.workers, max_bytes=args.max_mb * 1024 * 1024, cache_dir=args.cache_dir,
+                             max_queue=args.max_queue, max_per_client=args.max_per_client,
+                             spill_bytes=int(args.spill_mb * 1024 * 1024))
+    server, _ = serve(args.port, service, host=args.host)
+    print(f"extract service listening on http://{args.host}:{server.server_address[1]} ({args.workers} workers)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        service.shutdown()
+
+if __name__ == "__main__":
+    main()
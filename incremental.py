@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+LLM 路径的增量更新
+
+培养方案修订通常只改几页：按页面指纹找出变化的页面，映射到受影响的
+正文章节（一~六）和附表（1/2/4），只把这些部分重新发给大模型，
+其余字段沿用上一版本的结果。
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Set
+
+from pdf_source import PdfInput
+
+# MEGA_PROMPT 输出字段 <-> 原文区域
+SECTION_KEYS = {
+    "一": "1培养目标",
+    "二": "2毕业要求",
+    "三": "3专业定位与特色",
+    "四": "4主干学科/核心课程/实践环节",
+    "五": "5标准学制与授予学位",
+    "六": "6毕业条件",
+}
+APPENDIX_KEYS = {"1": "table1", "2": "table2", "4": "table4"}
+ALL_KEYS = [f"sections.{v}" for v in SECTION_KEYS.values()] + list(APPENDIX_KEYS.values())
+
+_CHAPTER_PAT = re.compile(r"^\s*([一二三四五六七八九十]+)\s*[、\.．]")
+_APPENDIX_HEAD_PAT = re.compile(r"^\s*附表\s*(\d+)")
+_APPENDIX_PAT = re.compile(r"附表\s*(\d+)")
+
+# ----------------------------
+# 页面文本 + 指纹
+# ----------------------------
+def text_fingerprint(text: str) -> str:
+    from plan_extract import normalize_multiline  # 延迟导入：plan_extract 依赖 pandas / PDF 库
+    return hashlib.sha256(normalize_multiline(text).encode("utf-8")).hexdigest()[:32]
+
+def read_page_texts(
+    pdf_bytes: PdfInput,
+    prior_pages: Optional[List[Dict[str, Any]]] = None,
+    backend: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    逐页读取文本并记录指纹：[{"page","fingerprint","text_fingerprint","text"}]。
+    内容流指纹与旧版本一致的页面直接复用旧文本，不再抽取文本。
+    """
+    from pdf_backends import open_pages
+    from plan_extract import page_content_fingerprint
+    prior_by_fp = {p["fingerprint"]: p for p in prior_pages or [] if p.get("fingerprint")}
+    pages: List[Dict[str, Any]] = []
+    with open_pages(pdf_bytes, backend) as pdf_pages:
+        for idx, page in enumerate(pdf_pages, start=1):
+            fp = page_content_fingerprint(page)
+            old = prior_by_fp.get(fp)
+            text = old["text"] if old is not None else page.text()
+            pages.append({
+                "page": idx,
+                "fingerprint": fp,
+                "text_fingerprint": text_fingerprint(text),
+                "text": text,
+            })
+    return pages
+
+# ----------------------------
+# 页面 -> 区域 -> 输出字段
+# ----------------------------
+def line_region(line: str) -> Optional[str]:
+    """识别区域起始行：“二、毕业要求” -> 章二；“附表1：…”/“七、…（附表1）” -> 附表1。"""
+    m = _CHAPTER_PAT.match(line)
+    if m:
+        a = _APPENDIX_PAT.search(line)
+        return f"附表{a.group(1)}" if a else f"章{m.group(1)}"
+    a = _APPENDIX_HEAD_PAT.match(line)
+    if a:
+        return f"附表{a.group(1)}"
+    return None
+
+def page_regions(texts: List[str]) -> List[Set[str]]:
+    """每页覆盖的区域集合（页首延续上一页的区域 + 本页新出现的区域）。"""
+    from plan_extract import normalize_multiline
+    current = "封面"
+    out: List[Set[str]] = []
+    for text in texts:
+        regions: Set[str] = set()
+        lines = [ln for ln in normalize_multiline(text).splitlines() if ln.strip()]
+        # 页首即为新标题时，本页不含上一区域的续写内容
+        if not lines or line_region(lines[0]) is None:
+            regions.add(current)
+        for ln in lines:
+            r = line_region(ln)
+            if r:
+                current = r
+                regions.add(r)
+        out.append(regions)
+    return out
+
+def region_key(region: str) -> Optional[str]:
+    if region.startswith("章"):
+        name = SECTION_KEYS.get(region[1:])
+        return f"sections.{name}" if name else None
+    if region.startswith("附表"):
+        return APPENDIX_KEYS.get(region[2:])
+    return None
+
+def plan_refresh(prior_pages: Optional[List[Dict[str, Any]]], new_pages: List[Dict[str, Any]]) -> Optional[List[str]]:
+    """
+    计算需要重新请求的字段。
+    返回 None 表示需要全量抽取（无旧版本 / 无法定位区域 / 改动过大）；
+    返回 [] 表示文本无变化，可直接复用旧结果。
+    """
+    if not prior_pages or not new_pages:
+        return None
+
+    new_regions = page_regions([p["text"] for p in new_pages])
+    old_regions = page_regions([p["text"] for p in prior_pages])
+    if not any(region_key(r) for regions in new_regions for r in regions):
+        return None
+
+    old_fps = {p["text_fingerprint"] for p in prior_pages}
+    new_fps = {p["text_fingerprint"] for p in new_pages}
+    affected: Set[str] = set()
+    for p, regions in zip(new_pages, new_regions):
+        if p["text_fingerprint"] not in old_fps:
+            affected |= regions
+    for p, regions in zip(prior_pages, old_regions):
+        if p["text_fingerprint"] not in new_fps:
+            affected |= regions
+
+    keys = {region_key(r) for r in affected} - {None}
+    if len(keys) > len(ALL_KEYS) // 2:
+        return None
+    return [k for k in ALL_KEYS if k in keys]
+
+def text_for_keys(pages: List[Dict[str, Any]], keys: List[str]) -> str:
+    """只拼接与目标字段相关的页面原文（整段章节/整张附表，而非仅变化页）。"""
+    wanted = set(keys)
+    regions = page_regions([p["text"] for p in pages])
+    parts = [p["text"] for p, rs in zip(pages, regions) if any(region_key(r) in wanted for r in rs)]
+    return "\n".join(parts)
+
+def merge_partial(prior_data: Dict[str, Any], partial: Dict[str, Any], keys: List[str]) -> Dict[str, Any]:
+    """把增量结果合并进旧版本结果；增量中缺失的字段保留旧值。"""
+    out = copy.deepcopy(prior_data)
+    for k in keys:
+        if k.startswith("sections."):
+            name = k.split(".", 1)[1]
+            new_val = (partial.get("sections") or {}).get(name)
+            if new_val is not None:
+                out.setdefault("sections", {})[name] = new_val
+        elif k in partial:
+            out[k] = partial[k]
+    return out
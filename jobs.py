@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+后台任务执行器（进程级，所有会话共享）
+
+长耗时的抽取（LLM 全量抽取、大 PDF 的确定性抽取）不再占用 Streamlit 脚本线程：
+- submit() 立即返回 job_id，任务在有界工作线程池中执行
+- 进度 / 结果 / 错误写入进程级任务表，界面按 job_id 轮询（st.fragment(run_every=...)）
+- 队列上限：排队任务总数超过 max_queue 时拒绝（QueueFullError），避免无限堆积
+- 每用户上限：同一 owner 同时在排队 / 执行的任务不超过 max_per_owner
+- 公平调度：空闲工作线程按 owner 轮转取任务，单个用户批量上传不会饿死其他用户
+- 结果保留：界面取走结果（take_result）即释放；无人认领的结果（任务中途关掉了页面）
+  结束 result_ttl_s 秒后丢弃（任务记为 expired），任务表里不会堆着整份抽取结果
+
+任务函数签名：fn(report, *args, **kwargs)，report(progress: float 0~1 或 None, message: str) 用于上报进度 / 说明。
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+STATUS_LABELS = {QUEUED: "排队中", RUNNING: "执行中", DONE: "已完成", FAILED: "失败", CANCELLED: "已取消"}
+
+DEFAULT_RESULT_TTL_S = float(os.environ.get("TAS_JOB_RESULT_TTL_S", "900"))
+
+class QueueFullError(RuntimeError):
+    """队列已满或该用户的并发任务已达上限。"""
+
+@dataclass
+class Job:
+    id: str
+    owner: str
+    label: str
+    fn: Callable[..., Any] = field(repr=False)
+    args: tuple = field(default=(), repr=False)
+    kwargs: Dict[str, Any] = field(default_factory=dict, repr=False)
+    status: str = QUEUED
+    progress: float = 0.0
+    message: str = ""
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    result: Any = field(default=None, repr=False)
+    error: str = ""
+    expired: bool = False   # 已完成但结果超过保留时间未被取走，已丢弃
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def elapsed(self) -> float:
+        if not self.started_at:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+class JobManager:
+    def __init__(self, max_workers: int = 2, max_queue: int = 32, max_per_owner: int = 2,
+                 keep_finished: int = 200, result_ttl_s: float = DEFAULT_RESULT_TTL_S):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_per_owner = max_per_owner
+        self.keep_finished = keep_finished
+        self.result_ttl_s = result_ttl_s
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queues: "OrderedDict[str, Deque[Job]]" = OrderedDict()   # owner → 待执行任务
+        self._cv = threading.Condition()
+        self._rr = itertools.count()
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for t in self._workers:
+            t.start()
+
+    # ---- 提交 / 查询
+    def submit(self, owner: str, fn: Callable[..., Any], *args: Any, label: str = "", **kwargs: Any) -> str:
+        with self._cv:
+            queued = sum(len(q) for q in self._queues.values())
+            if queued >= self.max_queue:
+                raise QueueFullError(f"当前排队任务已达上限（{self.max_queue}），请稍后再试。")
+            active = sum(1 for j in self._jobs.values() if j.owner == owner and not j.finished)
+            if active >= self.max_per_owner:
+                raise QueueFullError(f"您已有 {active} 个任务在排队或执行中，请等待完成后再提交。")
+            job = Job(id=uuid.uuid4().hex[:12], owner=owner, label=label or getattr(fn, "__name__", "job"),
+                      fn=fn, args=args, kwargs=kwargs, message="排队中")
+            self._jobs[job.id] = job
+            self._queues.setdefault(owner, deque()).append(job)
+            self._prune()
+            self._expire_results()
+            self._cv.notify()
+            return job.id
+
+    def get(self, job_id: Optional[str]) -> Optional[Job]:
+        with self._cv:
+            self._expire_results()
+            return self._jobs.get(job_id or "")
+
+    def take_result(self, job_id: str) -> Any:
+        """取走已完成任务的结果并释放引用（界面已另行保存结果时使用，任务表不再占着整份结果）。"""
+        with self._cv:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            result, job.result = job.result, None
+            return result
+
+    def queue_position(self, job_id: str) -> int:
+        """估算排队位置（1 = 下一批执行）：轮转调度下，每个 owner 在本任务之前最多各执行 depth+1 个。"""
+        with self._cv:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return 0
+            depth = list(self._queues.get(job.owner) or ()).index(job)
+            return sum(min(len(q), depth + 1) for q in self._queues.values())
+
+    def cancel(self, job_id: str) -> bool:
+        """只能取消尚未开始的任务。"""
+        with self._cv:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return False
+            q = self._queues.get(job.owner)
+            if q is not None and job in q:
+                q.remove(job)
+            job.status, job.message, job.finished_at = CANCELLED, "已取消", time.time()
+            return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._cv:
+            out = {s: 0 for s in STATUS_LABELS}
+            for j in self._jobs.values():
+                out[j.status] += 1
+            out["workers"] = self.max_workers
+            return out
+
+    # ---- 执行
+    def _next_job(self) -> Job:
+        """在锁内调用：按 owner 轮转取下一个任务。"""
+        while True:
+            owners = [o for o, q in self._queues.items() if q]
+            if owners:
+                owner = owners[next(self._rr) % len(owners)]
+                job = self._queues[owner].popleft()
+                if not self._queues[owner]:
+                    del self._queues[owner]
+                return job
+            self._cv.wait()
+
+    def _worker(self) -> None:
+        while True:
+            with self._cv:
+                job = self._next_job()
+                job.status, job.started_at, job.message = RUNNING, time.time(), "执行中"
+
+            def report(progress: Optional[float], message: str = "", _job: Job = job) -> None:
+                if progress is not None:
+                    _job.progress = max(0.0, min(1.0, float(progress)))
+                if message:
+                    _job.message = message
+
+            try:
+                result = job.fn(report, *job.args, **job.kwargs)
+            except Exception as e:
+                job.error = f"{e}\n{traceback.format_exc(limit=5)}"
+                job.status, job.message = FAILED, str(e) or e.__class__.__name__
+            else:
+                job.result = result
+                job.status, job.progress, job.message = DONE, 1.0, "已完成"
+            finally:
+                job.finished_at = time.time()
+                job.fn, job.args, job.kwargs = None, (), {}   # 释放入参（PDF 字节等）
+
+    def _prune(self) -> None:
+        """在锁内调用：只保留最近 keep_finished 个已结束任务。"""
+        finished = [jid for jid, j in self._jobs.items() if j.finished]
+        for jid in finished[: max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[jid]
+
+    def _expire_results(self) -> None:
+        """在锁内调用：丢弃结束超过 result_ttl_s 仍未被取走的结果。"""
+        deadline = time.time() - self.result_ttl_s
+        for j in self._jobs.values():
+            if j.result is not None and j.finished_at and j.finished_at < deadline:
+                j.result, j.expired = None, True
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+LLM 输出的紧凑表格格式
+
+附表 1 每行有 17 个中文列名（“课程体系”“课内讲课学时”……），按“对象数组”输出时
+每门课程都要重复一遍列名，60 门课的计划表里列名占了生成 token 的一大半，直接拖慢响应。
+
+线上格式（wire format）改为“列头一次 + 位置数组”：
+    "table1": {"columns": ["课程体系", "课程编码", ...], "rows": [["通识教育课程", "B1000012", ...], ...]}
+
+- compact_format_text()：写进 MEGA_PROMPT 的输出格式说明（由 TABLE_COLUMNS 生成，逐字节稳定）
+- response_schema()：同一结构的 JSON Schema，供 Gemini response_schema / OpenAI json_schema 强制约束
+- expand_tables()：解析后还原为原有的“每行一个 dict”，界面与增量合并逻辑不变；
+  旧格式（对象数组，例如会话里缓存的上一版本结果）原样通过
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+from incremental import SECTION_KEYS
+
+TABLE_COLUMNS: Dict[str, List[str]] = {
+    "table1": [
+        "课程体系", "课程编码", "课程名称", "开课模式", "考核方式", "课内学分", "课内总学时",
+        "课内讲课学时", "课内实验学时", "课内上机学时", "课内实践学时", "课外学分", "课外学时",
+        "上课学期", "专业方向", "是否学位课", "备注",
+    ],
+    "table2": [
+        "专业方向", "课程体系", "开课模式", "学期一学分分配", "学期二学分分配", "学期三学分分配",
+        "学期四学分分配", "学期五学分分配", "学期六学分分配", "学期七学分分配", "学期八学分分配",
+        "学分统计", "学分比例",
+    ],
+    "table4": ["课程名称", "指标点", "强度"],
+}
+
+SECTION_NAMES: List[str] = list(SECTION_KEYS.values())
+
+# ----------------------------
+# 提示词中的格式说明 / JSON Schema
+# ----------------------------
+def compact_format_text() -> str:
+    sections = ",\n".join(f'    "{name}": "..."' for name in SECTION_NAMES)
+    tables = ",\n".join(
+        f'  "{t}": {{"columns": {json.dumps(cols, ensure_ascii=False)}, "rows": [["...", "...", ...], ...]}}'
+        for t, cols in TABLE_COLUMNS.items()
+    )
+    return (
+        "必须严格输出一个 JSON 对象，结构如下：\n"
+        "{\n"
+        '  "sections": {\n' + sections + "\n  },\n" + tables + "\n}\n\n"
+        "表格采用紧凑格式：columns 原样照抄上面给出的列名（顺序不变），rows 中每门课程 / 每条记录是一个字符串数组，"
+        "按 columns 的顺序逐列填写，没有内容的列填空字符串 \"\"，不要省略，也不要在 rows 中重复列名。\n"
+    )
+
+def response_schema() -> Dict[str, Any]:
+    """
+    输出结构的 JSON Schema（只用 Gemini / OpenAI 都支持的子集：type / properties / items / required）。
+    顶层字段不设 required：增量更新只要求输出部分字段。
+    """
+    string = {"type": "string"}
+    table = {
+        "type": "object",
+        "properties": {
+            "columns": {"type": "array", "items": string},
+            "rows": {"type": "array", "items": {"type": "array", "items": string}},
+        },
+        "required": ["columns", "rows"],
+    }
+    return {
+        "type": "object",
+        "properties": {
+            "sections": {"type": "object", "properties": {name: string for name in SECTION_NAMES}},
+            **{t: table for t in TABLE_COLUMNS},
+        },
+    }
+
+# ----------------------------
+# 紧凑格式 <-> 每行一个 dict
+# ----------------------------
+def _cell(v: Any) -> str:
+    return "" if v is None else str(v)
+
+def expand_table(value: Any, table: str) -> List[Dict[str, Any]]:
+    """{"columns", "rows"} → [dict]。列头缺失时按 TABLE_COLUMNS 的顺序；行过短补 ""，过长的多余值丢弃。"""
+    if isinstance(value, list):
+        if value and all(isinstance(r, (list, tuple)) for r in value):
+            return expand_table({"rows": value}, table)   # 只给了 rows
+        return value                                       # 旧格式：对象数组
+    if not isinstance(value, dict):
+        return []
+    cols = [str(c) for c in value.get("columns") or []] or TABLE_COLUMNS.get(table, [])
+    out = []
+    for row in value.get("rows") or []:
+        if isinstance(row, dict):
+            out.append(row)
+            continue
+        cells = list(row) if isinstance(row, (list, tuple)) else [row]
+        cells = (cells + [""] * len(cols))[: len(cols)]
+        out.append({c: _cell(v) for c, v in zip(cols, cells)})
+    return out
+
+def expand_tables(data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """把 LLM 返回中的紧凑表格还原为对象数组（浅拷贝，其余字段不动）。"""
+    if not isinstance(data, dict):
+        return data
+    out = dict(data)
+    for t in TABLE_COLUMNS:
+        if t in out:
+            out[t] = expand_table(out[t], t)
+    return out
+
+def compact_table(rows: List[Dict[str, Any]], table: str) -> Dict[str, Any]:
+    """对象数组 → 紧凑格式（expand_table 的逆操作，用于对比 token 量与示例生成）。"""
+    cols = list(TABLE_COLUMNS.get(table, []))
+    for r in rows:
+        cols += [k for k in r if k not in cols]
+    return {"columns": cols, "rows": [[_cell(r.get(c)) for c in cols] for r in rows]}
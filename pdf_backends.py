@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+PDF 解析后端（文本 + 表格）
+
+- pdfplumber：纯 Python，表格识别成熟，速度较慢（默认）
+- pymupdf：基于 MuPDF 的 C 实现，文本抽取快一个数量级；find_tables 移植自
+  pdfplumber 的表格算法，表格设置参数名兼容
+
+两个后端对外暴露同样的页面接口，抽取主流程按名称选择，见 BACKENDS。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+import importlib.util
+import io
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from pdf_source import PdfInput, pdf_buffer, pdf_path
+from docx_extract import is_docx, open_docx_pages
+
+# 依赖：pdfplumber / PyMuPDF（均为可选，缺失时对应后端不可用）
+# 首次使用时才导入（LLM 页面冷启动不必为 PDF 库付费）；模块属性 pdfplumber / fitz 仍可直接访问，缺失时为 None
+_LAZY_DEPS = {"pdfplumber": ("pdfplumber",), "fitz": ("pymupdf", "fitz")}
+_loaded: Dict[str, Any] = {}
+
+def _dep(name: str) -> Any:
+    if name not in _loaded:
+        mod = None
+        for candidate in _LAZY_DEPS[name]:
+            try:
+                mod = importlib.import_module(candidate)
+                break
+            except Exception:
+                continue
+        _loaded[name] = mod
+    return _loaded[name]
+
+def _dep_available(name: str) -> bool:
+    """未导入时只查找模块规格（不执行导入）。"""
+    if name in _loaded:
+        return _loaded[name] is not None
+    return any(importlib.util.find_spec(c) is not None for c in _LAZY_DEPS[name])
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_DEPS:
+        return _dep(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+DEFAULT_BACKEND = "pdfplumber"
+
+# PyMuPDF find_tables 支持的表格设置（与 pdfplumber table_settings 同名）
+_FITZ_TABLE_KEYS = {
+    "vertical_strategy", "horizontal_strategy", "vertical_lines", "horizontal_lines",
+    "snap_tolerance", "snap_x_tolerance", "snap_y_tolerance",
+    "join_tolerance", "join_x_tolerance", "join_y_tolerance",
+    "edge_min_length", "min_words_vertical", "min_words_horizontal",
+    "intersection_tolerance", "intersection_x_tolerance", "intersection_y_tolerance",
+    "text_tolerance", "text_x_tolerance", "text_y_tolerance",
+}
+
+# ----------------------------
+# pdfplumber
+# ----------------------------
+class PlumberPage:
+    def __init__(self, page: Any):
+        self.page = page
+
+    def text(self) -> str:
+        return self.page.extract_text() or ""
+
+    def tables(self, table_settings: Dict[str, Any]) -> List[List[List[Any]]]:
+        return self.page.extract_tables(table_settings=table_settings) or []
+
+    def content_fingerprint(self) -> str:
+        """页面尺寸 + 内容流原始字节，不做版面分析。"""
+        h = hashlib.sha256(f"{float(self.page.width):.2f}x{float(self.page.height):.2f}".encode("utf-8"))
+        try:
+            from pdfminer.pdftypes import resolve1
+            for stream in self.page.page_obj.contents or []:
+                h.update(resolve1(stream).get_data())
+        except Exception:
+            h.update(self.text().encode("utf-8"))
+        return h.hexdigest()[:32]
+
+    def ruling_signature(self) -> str:
+        return f"r{len(self.page.rects)}|l{len(self.page.lines)}"
+
+    def ruling_count(self) -> int:
+        return len(self.page.rects) + len(self.page.lines) + len(self.page.curves)
+
+    def to_image(self, resolution: int = 220) -> Any:
+        return self.page.to_image(resolution=resolution).original
+
+# ----------------------------
+# PyMuPDF
+# ----------------------------
+class MuPage:
+    def __init__(self, page: Any):
+        self.page = page
+
+    def text(self) -> str:
+        return self.page.get_text("text", sort=True) or ""
+
+    def tables(self, table_settings: Dict[str, Any]) -> List[List[List[Any]]]:
+        kwargs = {k: v for k, v in table_settings.items() if k in _FITZ_TABLE_KEYS}
+        return [t.extract() for t in self.page.find_tables(**kwargs).tables]
+
+    def content_fingerprint(self) -> str:
+        r = self.page.rect
+        h = hashlib.sha256(f"{r.width:.2f}x{r.height:.2f}".encode("utf-8"))
+        h.update(self.page.read_contents() or b"")
+        return h.hexdigest()[:32]
+
+    def ruling_signature(self) -> str:
+        paths = self.page.get_cdrawings()
+        return f"p{len(paths)}"
+
+    def ruling_count(self) -> int:
+        return len(self.page.get_cdrawings())
+
+    def to_image(self, resolution: int = 220) -> Any:
+        from PIL import Image
+        pix = self.page.get_pixmap(dpi=resolution)
+        return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+# ----------------------------
+# 后端注册表
+# ----------------------------
+@contextmanager
+def _open_plumber(pdf_input: PdfInput) -> Iterator[List[PlumberPage]]:
+    # 溢出到磁盘的大文件按路径打开（按需读取）；内存中的 bytes 由 BytesIO 共享，不复制
+    path = pdf_path(pdf_input)
+    with _dep("pdfplumber").open(path or io.BytesIO(pdf_buffer(pdf_input))) as pdf:
+        yield [PlumberPage(p) for p in pdf.pages]
+
+@contextmanager
+def _open_mupdf(pdf_input: PdfInput) -> Iterator[List[MuPage]]:
+    path = pdf_path(pdf_input)
+    doc = _dep("fitz").open(path) if path else _dep("fitz").open(stream=pdf_buffer(pdf_input), filetype="pdf")
+    try:
+        yield [MuPage(p) for p in doc]
+    finally:
+        doc.close()
+
+BACKENDS = {
+    "pdfplumber": {"label": "pdfplumber（默认，表格稳健）", "open": _open_plumber, "dep": "pdfplumber", "available": lambda: _dep_available("pdfplumber")},
+    "pymupdf": {"label": "PyMuPDF（更快）", "open": _open_mupdf, "dep": "fitz", "available": lambda: _dep_available("fitz")},
+}
+
+def available_backends() -> List[str]:
+    return [name for name, b in BACKENDS.items() if b["available"]()]
+
+def open_pages(pdf_bytes: PdfInput, backend: Optional[str] = None):
+    """with open_pages(pdf_bytes, "pymupdf") as pages: ... 逐页调用 text()/tables()。pdf_bytes 可为 bytes 或 PdfSource。"""
+    if is_docx(pdf_bytes):
+        # Word 原生文档：不论所选后端，直接读文档模型（见 docx_extract）
+        return open_docx_pages(pdf_bytes)
+    name = backend or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"未知的 PDF 后端：{name}")
+    if _dep(BACKENDS[name]["dep"]) is None:
+        raise RuntimeError(f"PDF 后端 {name} 的依赖未安装")
+    return BACKENDS[name]["open"](pdf_bytes)
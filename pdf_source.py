@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+PDF 输入源：一份字节，处处共享
+
+上传文件以前在各环节反复变成 bytes：getvalue()、io.BytesIO(...)、各处 sha256_bytes(...)，
+交给工作进程时还要再序列化一份。PdfSource 把“这份 PDF”固定下来：
+- 小文件：直接持有 bytes（Streamlit 的 UploadedFile.getvalue() 在 CPython 中不复制）
+- 超过阈值（TAS_PDF_SPILL_MB，默认 16 MB）：读取时分块写入临时文件（只落盘一次），
+  之后以只读 mmap 访问；PDF 后端直接按路径打开，工作进程只需拿到路径
+- SHA-256 在读入时流式计算并记住，之后任何环节都不再重新哈希
+
+下游函数统一接受 PdfInput（bytes 或 PdfSource），见 pdf_sha256() / pdf_path() / pdf_buffer()。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import tempfile
+import weakref
+from typing import Any, BinaryIO, Optional, Union
+
+SPILL_THRESHOLD = int(float(os.environ.get("TAS_PDF_SPILL_MB", "16")) * 1024 * 1024)
+CHUNK = 1 << 20
+
+def _unlink(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+class PdfSource:
+    def __init__(self, data: Optional[bytes] = None, path: Optional[str] = None,
+                 sha256: Optional[str] = None, owns_file: bool = False):
+        if (data is None) == (path is None):
+            raise ValueError("data 与 path 必须且只能给出一个")
+        self._data = data
+        self.path = path
+        self._sha256 = sha256
+        self._mm: Optional[mmap.mmap] = None
+        self.size = len(data) if data is not None else os.path.getsize(path)
+        # 临时文件随对象回收删除（任务结束释放入参后即清理）
+        self._finalizer = weakref.finalize(self, _unlink, path) if owns_file and path else None
+
+    # ---- 构造
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "PdfSource":
+        return cls(data=data)
+
+    @classmethod
+    def from_path(cls, path: str, sha256: Optional[str] = None) -> "PdfSource":
+        """已有文件（例如工作进程收到的溢出文件路径），不接管删除。"""
+        return cls(path=path, sha256=sha256)
+
+    @classmethod
+    def from_stream(cls, fp: BinaryIO, length: Optional[int] = None, threshold: int = SPILL_THRESHOLD,
+                    spill_dir: Optional[str] = None) -> "PdfSource":
+        """
+        分块读取并流式哈希。总长超过 threshold 时写入临时文件，内存中只保留一个块；
+        length 给出时（HTTP Content-Length）只读这么多字节。
+        """
+        h = hashlib.sha256()
+        remaining = length
+        head = bytearray()
+        spill = None
+        try:
+            while remaining is None or remaining > 0:
+                chunk = fp.read(CHUNK if remaining is None else min(CHUNK, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                h.update(chunk)
+                if spill is None and len(head) + len(chunk) > threshold:
+                    spill = tempfile.NamedTemporaryFile(prefix="tas-pdf-", suffix=".pdf", dir=spill_dir, delete=False)
+                    spill.write(head)
+                    head = bytearray()
+                if spill is not None:
+                    spill.write(chunk)
+                else:
+                    head += chunk
+        except BaseException:
+            if spill is not None:
+                spill.close()
+                _unlink(spill.name)
+            raise
+        if spill is None:
+            return cls(data=bytes(head), sha256=h.hexdigest())
+        spill.close()
+        return cls(path=spill.name, sha256=h.hexdigest(), owns_file=True)
+
+    @classmethod
+    def from_upload(cls, uploaded: Any, threshold: int = SPILL_THRESHOLD, sha256: Optional[str] = None) -> "PdfSource":
+        """Streamlit UploadedFile：小文件零拷贝取 bytes，大文件溢出到临时文件；sha256：已知的哈希，小文件不再重算。"""
+        size = getattr(uploaded, "size", None)
+        if size is None or size <= threshold:
+            return cls(data=uploaded.getvalue(), sha256=sha256)
+        uploaded.seek(0)
+        try:
+            return cls.from_stream(uploaded, threshold=threshold)
+        finally:
+            uploaded.seek(0)
+
+    # ---- 访问
+    @property
+    def sha256(self) -> str:
+        if self._sha256 is None:
+            h = hashlib.sha256()
+            buf = self.buffer()
+            for i in range(0, len(buf), CHUNK):
+                h.update(buf[i:i + CHUNK])
+            self._sha256 = h.hexdigest()
+        return self._sha256
+
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+
+    def buffer(self) -> Union[bytes, memoryview]:
+        """零拷贝的只读视图：内存中为 bytes 本身，溢出文件为 mmap 上的 memoryview。"""
+        if self._data is not None:
+            return self._data
+        if self._mm is None:
+            with open(self.path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        return memoryview(self._mm) if self._mm is not None else b""
+
+    def close(self) -> None:
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # 仍有 memoryview 引用，随对象回收释放
+            self._mm = None
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def __enter__(self) -> "PdfSource":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __reduce__(self):
+        # 传给工作进程时只传路径 + 哈希（小文件仍传 bytes）；接收方不接管临时文件
+        if self.path is not None:
+            return (PdfSource.from_path, (self.path, self._sha256))
+        return (PdfSource, (self._data, None, self._sha256))
+
+PdfInput = Union[bytes, PdfSource]
+
+def as_source(pdf: PdfInput) -> PdfSource:
+    return pdf if isinstance(pdf, PdfSource) else PdfSource.from_bytes(pdf)
+
+def pdf_sha256(pdf: PdfInput) -> str:
+    if isinstance(pdf, PdfSource):
+        return pdf.sha256
+    return hashlib.sha256(pdf).hexdigest()
+
+def pdf_path(pdf: PdfInput) -> Optional[str]:
+    return pdf.path if isinstance(pdf, PdfSource) else None
+
+def pdf_buffer(pdf: PdfInput) -> Union[bytes, memoryview]:
+    return pdf.buffer() if isinstance(pdf, PdfSource) else pdf
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+多方案统计库（列式存储 + 向量化聚合）
+
+每份抽取结果入库时把课程行解析成带类型的列（学分 / 学时为 float32，学期为 Int8，
+课程体系 / 方向等为 category），按文件 SHA-256 各存一个 Parquet 文件，
+同时写入一行“方案摘要”。查询时把全部方案拼成一张列式 DataFrame 常驻内存，
+group-by 在数百份方案上都是亚秒级，且不再需要重新解析任何 PDF。
+
+pyarrow 缺失时退回 pickle（功能相同，仅文件不可被其他工具直接读取）。
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from plan_extract import ExtractResult, clean_text
+from plan_index import course_rows, find_col
+
+# 依赖：pyarrow（可选，用于 Parquet；streamlit 自带）
+try:
+    import pyarrow  # noqa: F401
+except Exception:
+    pyarrow = None
+
+DEFAULT_ANALYTICS_DIR = os.environ.get(
+    "TAS_ANALYTICS_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "teaching-agent-suite", "analytics"),
+)
+
+# 列名关键词（按优先级）
+SYSTEM_KEYS = ["课程体系", "课程模块", "课程类别", "课程类型"]
+NATURE_KEYS = ["课程性质", "开课模式", "修读性质", "选修/必修"]
+TOTAL_HOURS_KEYS = ["总学时", "学时"]
+LECTURE_KEYS = ["讲课", "理论"]
+LAB_KEYS = ["实验"]
+COMPUTER_KEYS = ["上机"]
+PRACTICE_KEYS = ["实践"]
+
+NUMERIC_COLS = ["credits", "total_hours", "lecture_hours", "lab_hours", "computer_hours", "practice_hours"]
+CATEGORY_COLS = ["plan", "direction", "appendix", "system", "nature"]
+COURSE_COLUMNS = [
+    "plan_sha256", "plan", "direction", "appendix", "system", "nature", "course_code", "course_name",
+    "semester", *NUMERIC_COLS,
+]
+
+_NUM_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+# ----------------------------
+# 解析与类型化
+# ----------------------------
+def parse_number(x: Any) -> float:
+    """'2.5' / '2.5学分' / '32(16)' → 首个数字；无法解析为 NaN。"""
+    m = _NUM_RE.search(str(x or ""))
+    return float(m.group()) if m else np.nan
+
+def parse_semester(x: Any) -> float:
+    """'3' / '第3学期' / '3-4' → 3；无法解析为 NaN。"""
+    m = re.search(r"\d{1,2}", str(x or ""))
+    return float(m.group()) if m else np.nan
+
+def courses_frame(result: ExtractResult, name: str = "") -> pd.DataFrame:
+    """一份抽取结果 → 带类型的课程列式表（每行一门课）。"""
+    recs: List[Dict[str, Any]] = []
+    for c in course_rows(result):
+        row = c["row"]
+        cols = list(row.keys())
+
+        def pick(keys: Sequence[str]) -> str:
+            col = find_col(cols, keys)
+            return clean_text(row.get(col, "")) if col else ""
+
+        recs.append({
+            "plan_sha256": result.file_sha256,
+            "plan": name or result.file_sha256[:12],
+            "direction": c["direction"] or "（通用）",
+            "appendix": c["appendix"],
+            "system": pick(SYSTEM_KEYS),
+            "nature": pick(NATURE_KEYS),
+            "course_code": c["course_code"],
+            "course_name": c["course_name"],
+            "semester": parse_semester(c["semester"]),
+            "credits": parse_number(c["credits"]),
+            "total_hours": parse_number(pick(TOTAL_HOURS_KEYS)),
+            "lecture_hours": parse_number(pick(LECTURE_KEYS)),
+            "lab_hours": parse_number(pick(LAB_KEYS)),
+            "computer_hours": parse_number(pick(COMPUTER_KEYS)),
+            "practice_hours": parse_number(pick(PRACTICE_KEYS)),
+        })
+    return typed_courses(pd.DataFrame(recs, columns=COURSE_COLUMNS))
+
+def typed_courses(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    for c in NUMERIC_COLS:
+        df[c] = pd.to_numeric(df[c], errors="coerce").astype("float32")
+    df["semester"] = pd.to_numeric(df["semester"], errors="coerce").astype("Int8")
+    for c in CATEGORY_COLS:
+        df[c] = df[c].astype("category")
+    return df
+
+def plan_summary(df: pd.DataFrame, result: ExtractResult, name: str = "") -> Dict[str, Any]:
+    """方案级摘要（入库时预计算一次）。"""
+    total_hours = float(np.nansum(df["total_hours"].to_numpy())) if len(df) else 0.0
+    lecture = float(np.nansum(df["lecture_hours"].to_numpy())) if len(df) else 0.0
+    lab = float(np.nansum((df["lab_hours"].fillna(0) + df["computer_hours"].fillna(0)).to_numpy())) if len(df) else 0.0
+    by_sem = df.groupby("semester", observed=True)["credits"].sum() if len(df) else pd.Series(dtype="float32")
+    return {
+        "plan_sha256": result.file_sha256,
+        "plan": name or result.file_sha256[:12],
+        "ingested_at": datetime.now().isoformat(timespec="seconds"),
+        "page_count": result.page_count,
+        "courses": int(len(df)),
+        "directions": int(df["direction"].nunique()) if len(df) else 0,
+        "total_credits": float(np.nansum(df["credits"].to_numpy())) if len(df) else 0.0,
+        "total_hours": total_hours,
+        "lecture_hours": lecture,
+        "lab_hours": lab,
+        "lab_ratio": lab / lecture if lecture else np.nan,
+        "max_semester_credits": float(by_sem.max()) if len(by_sem) else 0.0,
+        "max_semester": int(by_sem.idxmax()) if len(by_sem) else 0,
+    }
+
+# ----------------------------
+# 统计库
+# ----------------------------
+class AnalyticsStore:
+    """
+    目录结构：<root>/courses/<sha256>.parquet + <root>/plans.parquet（方案摘要）
+    + <root>/corpus.parquet（全部课程的合并表，按需重建）。
+    写入走临时文件 + os.replace；内存中的合并表在课程目录变化后失效、下次查询时重建。
+    """
+
+    def __init__(self, root: str = DEFAULT_ANALYTICS_DIR):
+        self.root = root
+        self.course_dir = os.path.join(root, "courses")
+        self.ext = ".parquet" if pyarrow is not None else ".pkl"
+        self._lock = threading.Lock()
+        self._courses: Optional[pd.DataFrame] = None
+        self._courses_stamp = 0
+        self._plans: Optional[pd.DataFrame] = None
+        os.makedirs(self.course_dir, exist_ok=True)
+
+    # ---- 存取
+    def _write(self, df: pd.DataFrame, path: str) -> None:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            if self.ext == ".parquet":
+                df.to_parquet(tmp, index=False)
+            else:
+                df.to_pickle(tmp)
+            os.replace(tmp, path)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def _read(self, path: str) -> pd.DataFrame:
+        return pd.read_parquet(path) if self.ext == ".parquet" else pd.read_pickle(path)
+
+    @property
+    def plans_path(self) -> str:
+        return os.path.join(self.root, "plans" + self.ext)
+
+    def add(self, result: ExtractResult, name: str = "") -> Dict[str, Any]:
+        """入库（同一 SHA 覆盖），返回方案摘要。"""
+        df = courses_frame(result, name)
+        summary = plan_summary(df, result, name)
+        with self._lock:
+            self._write(df, os.path.join(self.course_dir, result.file_sha256 + self.ext))
+            plans = self.plans()
+            plans = plans[plans["plan_sha256"] != result.file_sha256] if len(plans) else plans
+            plans = pd.concat([plans, pd.DataFrame([summary])], ignore_index=True) if len(plans) else pd.DataFrame([summary])
+            self._write(plans, self.plans_path)
+            self._plans = plans
+        return summary
+
+    def plans(self) -> pd.DataFrame:
+        if self._plans is None:
+            self._plans = self._read(self.plans_path) if os.path.exists(self.plans_path) else pd.DataFrame()
+        return self._plans
+
+    @property
+    def corpus_path(self) -> str:
+        return os.path.join(self.root, "corpus" + self.ext)
+
+    def _stamp(self) -> int:
+        # 新增 / 覆盖方案文件都会更新目录 mtime（os.replace）
+        return os.stat(self.course_dir).st_mtime_ns
+
+    def courses(self) -> pd.DataFrame:
+        """
+        全部方案的课程列式表。首次查询把各方案文件合并成 corpus 文件，
+        之后冷启动只读这一个文件；其他进程写入新方案时按目录 mtime 自动重建。
+        """
+        stamp = self._stamp()
+        if self._courses is not None and self._courses_stamp == stamp:
+            return self._courses
+        with self._lock:
+            corpus = self.corpus_path
+            if os.path.exists(corpus) and os.stat(corpus).st_mtime_ns >= stamp:
+                df = self._read(corpus)
+            else:
+                frames = [
+                    self._read(os.path.join(self.course_dir, n))
+                    for n in sorted(os.listdir(self.course_dir)) if n.endswith(self.ext)
+                ]
+                df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COURSE_COLUMNS)
+                df = typed_courses(df)
+                self._write(df, corpus)
+            self._courses = typed_courses(df)
+            self._courses_stamp = stamp
+        return self._courses
+
+    # ---- 聚合查询
+    def credits_by_system(self, by_direction: bool = True) -> pd.DataFrame:
+        """课程体系 ×（方向）× 方案 的学分合计。"""
+        keys = ["plan", "direction", "system"] if by_direction else ["plan", "system"]
+        return (self.courses().groupby(keys, observed=True)["credits"].sum()
+                .reset_index().sort_values(keys, ignore_index=True))
+
+    def hour_ratios(self) -> pd.DataFrame:
+        """每个方案（×方向）讲课 / 实验+上机 / 实践学时及比例。"""
+        df = self.courses()
+        g = df.groupby(["plan", "direction"], observed=True)[
+            ["lecture_hours", "lab_hours", "computer_hours", "practice_hours", "total_hours"]
+        ].sum().reset_index()
+        lecture = g["lecture_hours"].to_numpy(dtype="float64")
+        lab = g["lab_hours"].to_numpy(dtype="float64") + g["computer_hours"].to_numpy(dtype="float64")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            g["lab_to_lecture"] = np.where(lecture > 0, lab / lecture, np.nan)
+        return g
+
+    def semester_load(self, plan: Optional[str] = None) -> pd.DataFrame:
+        """学期 ×（方案、方向）的学分与门数；plan 指定时只看单个方案。"""
+        df = self.courses()
+        if plan:
+            df = df[df["plan"] == plan]
+        g = df.dropna(subset=["semester"]).groupby(["plan", "direction", "semester"], observed=True)
+        return g.agg(credits=("credits", "sum"), courses=("course_name", "size")).reset_index()
@@ -0,0 +1,805 @@
+# -*- coding: utf-8 -*-
+"""
+培养方案 PDF 确定性抽取核心（文本 + 表格 + 结构化解析）
+不依赖 Streamlit，可被 UI、缓存、基准测试等复用。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from docx_extract import DOCX_BACKEND, extract_docx_pages, is_docx
+# 依赖：pdfplumber / PyMuPDF，由 pdf_backends 按需选择
+from pdf_backends import BACKENDS, DEFAULT_BACKEND, available_backends, open_pages
+from pdf_source import PdfInput, pdf_sha256
+from template_profiles import TemplateStore, explore_table_settings, layout_fingerprint, page_appendix_map
+
+# ----------------------------
+# 基础工具
+# ----------------------------
+def sha256_bytes(data: bytes) -> str:
+    h = hashlib.sha256()
+    h.update(data)
+    return h.hexdigest()
+
+def clean_text(s: str) -> str:
+    if s is None:
+        return ""
+    s = str(s)
+    s = s.replace("\u00a0", " ")
+    s = re.sub(r"[ \t]+", " ", s)
+    return s.strip()
+
+def normalize_multiline(text: str) -> str:
+    """保留换行，做基础清理，便于正则分段。"""
+    if text is None:
+        return ""
+    text = str(text).replace("\r\n", "\n").replace("\r", "\n")
+    lines = [clean_text(ln) for ln in text.split("\n")]
+    out: List[str] = []
+    blank = 0
+    for ln in lines:
+        if ln.strip() == "":
+            blank += 1
+            if blank <= 2:
+                out.append("")
+        else:
+            blank = 0
+            out.append(ln)
+    return "\n".join(out).strip()
+
+def make_unique_columns(cols: List[str]) -> List[str]:
+    seen: Dict[str, int] = {}
+    out: List[str] = []
+    for c in cols:
+        c0 = clean_text(c) or "col"
+        if c0 not in seen:
+            seen[c0] = 1
+            out.append(c0)
+        else:
+            seen[c0] += 1
+            out.append(f"{c0}_{seen[c0]}")
+    return out
+
+def postprocess_table_df(df: pd.DataFrame, fill_down: bool = True) -> pd.DataFrame:
+    """
+    表格后处理：去空白、去 NaN、合并格造成的空白做向下填充。
+    fill_down=False：合并格已由文档模型展开（Word 原生表格），不做按列名猜测的填充。
+    """
+    if df is None or df.empty:
+        return df
+
+    df = df.copy()
+    df = df.replace({None: ""}).fillna("")
+    for c in df.columns:
+        df[c] = df[c].astype(str).map(lambda x: clean_text(x))
+
+    # 1) 删除完全空行
+    mask_all_empty = df.apply(lambda r: all((clean_text(x) == "" for x in r.values.tolist())), axis=1)
+    df = df.loc[~mask_all_empty].reset_index(drop=True)
+
+    # 2) 向下填充（合并格常见列）
+    if not fill_down:
+        return df
+    fill_down_keywords = ["课程体系", "课程模块", "课程性质", "课程类别", "类别", "模块", "环节", "学期", "方向"]
+    for c in df.columns:
+        if any(k in str(c) for k in fill_down_keywords):
+            last = ""
+            new_col = []
+            for v in df[c].tolist():
+                if v != "":
+                    last = v
+                    new_col.append(v)
+                else:
+                    new_col.append(last)
+            df[c] = new_col
+
+    return df
+
+def normalize_table(raw_table: List[List[Any]]) -> List[List[str]]:
+    """
+    pdfplumber.extract_tables() 返回 list[list[str|None]]
+    这里做基础清洗：去空行、补齐列数、去掉全空列
+    """
+    if not raw_table:
+        return []
+
+    rows = []
+    max_cols = 0
+    for r in raw_table:
+        if r is None:
+            continue
+        rr = [clean_text(c) for c in r]
+        # 跳过全空行
+        if all(c == "" for c in rr):
+            continue
+        rows.append(rr)
+        max_cols = max(max_cols, len(rr))
+
+    if not rows or max_cols == 0:
+        return []
+
+    # 补齐列数
+    for i in range(len(rows)):
+        if len(rows[i]) < max_cols:
+            rows[i] = rows[i] + [""] * (max_cols - len(rows[i]))
+
+    # 去掉全空列
+    keep_cols = []
+    for j in range(max_cols):
+        col = [rows[i][j] for i in range(len(rows))]
+        if any(c != "" for c in col):
+            keep_cols.append(j)
+
+    if not keep_cols:
+        return []
+
+    cleaned = [[row[j] for j in keep_cols] for row in rows]
+    return cleaned
+
+def table_to_df(cleaned_table: List[List[str]], fill_down: bool = True) -> pd.DataFrame:
+    """
+    尝试把第一行当表头；如果表头太差就用默认列名。
+    fill_down：见 postprocess_table_df()。
+    """
+    if not cleaned_table or len(cleaned_table) == 0:
+        return pd.DataFrame()
+    
+    if len(cleaned_table) == 1:
+        # 只有一行，做单行df
+        return pd.DataFrame([cleaned_table[0]])
+
+    header = cleaned_table[0]
+    body = cleaned_table[1:]
+
+    # 表头判定：至少有一半单元格非空
+    non_empty = sum(1 for x in header if clean_text(x) != "")
+    if non_empty >= max(1, len(header) // 2):
+        cols = [h if h else f"col_{i+1}" for i, h in enumerate(header)]
+        df = pd.DataFrame(body, columns=cols)
+    else:
+        # 否则不用表头
+        df = pd.DataFrame(cleaned_table)
+
+    return postprocess_table_df(df, fill_down=fill_down)
+
+# ----------------------------
+# PDF 抽取：文本 + 表格 (pdfplumber / PyMuPDF 表格提取)
+# ----------------------------
+# 表格设置：偏"宽松"，提升跨页/复杂表格提取成功率
+DEFAULT_TABLE_SETTINGS: Dict[str, Any] = {
+    "vertical_strategy": "lines",
+    "horizontal_strategy": "lines",
+    "intersection_tolerance": 5,
+    "snap_tolerance": 3,
+    "join_tolerance": 3,
+    "edge_min_length": 3,
+    "min_words_vertical": 1,
+    "min_words_horizontal": 1,
+    "text_tolerance": 2,
+}
+
+TEMPLATE_AUTO: Dict[str, Any] = {"template": "auto"}   # 表格参数由版式模板决定
+
+def settings_digest(
+    enable_ocr: bool,
+    table_settings: Optional[Dict[str, Any]] = None,
+    backend: Optional[str] = None,
+) -> str:
+    """抽取参数摘要：只有参数一致时，旧版本的页面结果才允许复用。"""
+    raw = json.dumps({"ocr": bool(enable_ocr), "ts": table_settings or DEFAULT_TABLE_SETTINGS,
+                      "backend": backend or DEFAULT_BACKEND}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+# ----------------------------
+# 页面指纹：修订版 PDF 只重抽变化的页面
+# ----------------------------
+def page_content_fingerprint(page: Any) -> str:
+    """
+    第一级指纹：页面尺寸 + 内容流原始字节，不做任何版面分析，几乎零成本。
+    同一份文件重新上传、或只改了其他页时，这一级即可命中。
+    """
+    return page.content_fingerprint()
+
+def page_text_fingerprint(page: Any, text: str) -> str:
+    """
+    第二级指纹：规范化文本 + 线框数量。
+    Word 重新导出时字体子集变化会使内容流不同，但文本与表格线框不变，此时仍可复用表格。
+    """
+    h = hashlib.sha256(normalize_multiline(text).encode("utf-8"))
+    try:
+        h.update(f"|{page.ruling_signature()}".encode("utf-8"))
+    except Exception:
+        pass
+    return h.hexdigest()[:32]
+
+@contextmanager
+def stage(timings: Optional[Dict[str, float]], name: str) -> Iterator[None]:
+    """分阶段计时（累加）；timings 为 None 时不计时。供基准测试/性能分析使用。"""
+    if timings is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + (time.perf_counter() - t0)
+
+def extract_pages_text_and_tables(
+    pdf_bytes: PdfInput,
+    enable_ocr: bool = False,
+    table_settings: Optional[Dict[str, Any]] = None,
+    prior_pages: Optional[List[Dict[str, Any]]] = None,
+    backend: Optional[str] = None,
+    timings: Optional[Dict[str, float]] = None,
+    progress: Optional[Callable[[float, str], None]] = None,
+    choose_settings: Optional[Callable[[List[Any], List[str]], Tuple[Dict[str, Any], Dict[int, List[Any]]]]] = None,
+) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    提取每页的文本和表格
+    返回：页面数据列表（含文本和表格），全文文本
+    prior_pages：旧版本的 pages_data（须为相同抽取参数），指纹一致的页面直接复用。
+    backend：PDF 解析后端名称（见 pdf_backends.BACKENDS），默认 pdfplumber。
+    timings：传入 dict 时按阶段累计耗时（秒）。
+    progress：逐页回调 progress(已完成比例, 说明)，供后台任务上报进度。
+    choose_settings：全部页面文本读完、表格抽取开始前调用 choose_settings(pages, 各页文本)，
+    返回 (表格参数, {页下标: 已按该参数抽出的原始表格})，用于按版式模板选参数（见 run_full_extract）。
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend in BACKENDS and backend not in available_backends():
+        raise RuntimeError(f"解析 PDF 需要 {backend}（未安装该 PDF 解析后端）")
+    
+    pages_data = []
+    full_text_parts = []
+    table_settings = table_settings or DEFAULT_TABLE_SETTINGS
+
+    prior_by_content: Dict[str, Dict[str, Any]] = {}
+    prior_by_text: Dict[str, Dict[str, Any]] = {}
+    for p in prior_pages or []:
+        if p.get("fingerprint"):
+            prior_by_content.setdefault(p["fingerprint"], p)
+        if p.get("text_fingerprint"):
+            prior_by_text.setdefault(p["text_fingerprint"], p)
+    
+    with open_pages(pdf_bytes, backend) as pages:
+        n = max(1, len(pages))
+        # 第一遍：指纹 + 文本（可复用的页面直接定稿）
+        states: List[Dict[str, Any]] = []
+        for idx, page in enumerate(pages, start=1):
+            if progress is not None:
+                progress(0.2 * (idx - 1) / n, f"正在读取第 {idx}/{len(pages)} 页文本")
+            with stage(timings, "fingerprint"):
+                fp = page_content_fingerprint(page)
+            old = prior_by_content.get(fp)
+            if old is not None:
+                # 内容流完全一致：文本与表格整页复用
+                states.append({"text": old["text"], "done": {**old, "page": idx, "reused": "content"}})
+                continue
+
+            # 提取文本
+            with stage(timings, "page_text"):
+                text = page.text()
+                text = normalize_multiline(text)
+            
+            # 如果需要OCR且文本太少
+            if enable_ocr and len(text) < 50:
+                with stage(timings, "ocr"):
+                    try:
+                        import pytesseract
+                        from PIL import Image
+                        img = page.to_image(resolution=220)
+                        ocr_text = pytesseract.image_to_string(img, lang="chi_sim+eng")
+                        if len(ocr_text) > len(text):
+                            text = normalize_multiline(ocr_text)
+                    except Exception:
+                        pass
+
+            with stage(timings, "fingerprint"):
+                text_fp = page_text_fingerprint(page, text)
+            old = prior_by_text.get(text_fp)
+            done = None
+            if old is not None:
+                # 文本与线框一致：跳过最耗时的表格版面分析
+                done = {**old, "page": idx, "text": text, "fingerprint": fp, "reused": "text"}
+            states.append({"text": text, "fingerprint": fp, "text_fingerprint": text_fp, "done": done})
+
+        pre_tables: Dict[int, List[Any]] = {}
+        if choose_settings is not None:
+            with stage(timings, "layout"):
+                table_settings, pre_tables = choose_settings(pages, [state["text"] for state in states])
+
+        # 第二遍：表格
+        for idx, (page, state) in enumerate(zip(pages, states), start=1):
+            full_text_parts.append(state["text"])
+            if state["done"] is not None:
+                pages_data.append(state["done"])
+                continue
+            if progress is not None:
+                progress(0.2 + 0.8 * (idx - 1) / n, f"正在抽取第 {idx}/{len(pages)} 页表格")
+            
+            # 提取表格
+            raw_tables = pre_tables.get(idx - 1)
+            if raw_tables is None:
+                with stage(timings, "page_tables"):
+                    try:
+                        raw_tables = page.tables(table_settings)
+                    except Exception:
+                        raw_tables = []
+            
+            # 清洗表格
+            cleaned_tables = []
+            with stage(timings, "normalize_table"):
+                for t in raw_tables:
+                    ct = normalize_table(t)
+                    if ct:
+                        cleaned_tables.append(ct)
+            
+            pages_data.append({
+                "page": idx,
+                "text": state["text"],
+                "tables": cleaned_tables,
+                "tables_count": len(cleaned_tables),
+                "fingerprint": state["fingerprint"],
+                "text_fingerprint": state["text_fingerprint"],
+                "reused": "",
+            })
+    
+    full_text = "\n".join(full_text_parts)
+    return pages_data, full_text
+
+# ----------------------------
+# 结构化解析：章节/毕业要求/培养目标/附表标题
+# ----------------------------
+def split_sections(full_text: str) -> Dict[str, str]:
+    """
+    按 "一、/二、/三、..." 大章切分。
+    兼容：三、 / 三. / 三．
+    """
+    text = normalize_multiline(full_text)
+    lines = text.splitlines()
+    pat = re.compile(r"^\s*([一二三四五六七八九十]+)\s*[、\.．]\s*([^\n\r]+?)\s*$")
+
+    sections: Dict[str, List[str]] = {}
+    cur_key = "封面/前言"
+
+    for ln in lines:
+        m = pat.match(ln)
+        if m:
+            num = m.group(1)
+            title = clean_text(m.group(2))
+            cur_key = f"{num}、{title}"
+            sections.setdefault(cur_key, [])
+        else:
+            sections.setdefault(cur_key, []).append(ln)
+
+    return {k: "\n".join(v).strip() for k, v in sections.items()}
+
+def extract_appendix_titles(full_text: str) -> Dict[str, str]:
+    """抽取"附表X -> 标题（可能含七、八…）"""
+    titles: Dict[str, str] = {}
+    text = normalize_multiline(full_text)
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+
+        # 1) 附表1：XXXX
+        m = re.search(r"(附表\s*\d+)\s*[:：]\s*(.+)$", line)
+        if m:
+            key = re.sub(r"\s+", "", m.group(1))
+            val = clean_text(m.group(2))
+            if val:
+                titles[key] = val
+            continue
+
+        # 2) 七、XXXX（附表1）
+        m = re.search(r"^(?P<title>.+?)\s*[（(]\s*(?P<key>附表\s*\d+)\s*[)）]\s*$", line)
+        if m:
+            key = re.sub(r"\s+", "", m.group("key"))
+            val = clean_text(m.group("title"))
+            if val:
+                titles[key] = val
+            continue
+
+        # 3) 行内出现（附表X）
+        m = re.search(r"(?P<title>.+?)\s*[（(]\s*(?P<key>附表\s*\d+)\s*[)）]", line)
+        if m:
+            key = re.sub(r"\s+", "", m.group("key"))
+            val = clean_text(m.group("title"))
+            if val and key not in titles:
+                titles[key] = val
+
+    return titles
+
+def parse_training_objectives(section_text: str) -> Dict[str, Any]:
+    """
+    提取"培养目标"条目。返回 items(list[str]) + raw。
+    尽量包容：1) / 1． / 1、 / （1）等。
+    """
+    raw = normalize_multiline(section_text)
+    lines = [ln.strip() for ln in raw.splitlines() if ln.strip()]
+    items: List[str] = []
+
+    pat = re.compile(r"^(?:（?\s*\d+\s*）?|\d+\s*[\.、．])\s*(.+)$")
+    for ln in lines:
+        m = pat.match(ln)
+        if m:
+            body = clean_text(m.group(1))
+            if body:
+                items.append(body)
+
+    # 如果没抓到编号条目，退化：取前若干行（不丢信息）
+    if not items:
+        items = lines[:30]
+
+    return {"count": len(items), "items": items, "raw": raw}
+
+def parse_graduation_requirements(text_any: str) -> Dict[str, Any]:
+    """
+    抽取 12 条毕业要求及其分项 1.1/1.2…
+    返回结构：{"count":..,"items":[{"no":1,"title":"工程知识","body":"...","subitems":[...]}], "raw":...}
+    """
+    text = normalize_multiline(text_any or "")
+
+    # 定位"二、毕业要求"
+    start = re.search(r"(?m)^\s*(二\s*[、\.．]?\s*毕业要求|毕业要求)\s*$", text)
+    if start:
+        tail = text[start.start():]
+    else:
+        tail = text
+
+    # 截断到下一大章
+    end = re.search(r"(?m)^\s*[三四五六七八九十]\s*[、\.．]", tail)
+    if end:
+        tail = tail[:end.start()]
+
+    lines = [ln.strip() for ln in tail.splitlines()]
+
+    main_pat = re.compile(r"^(?P<no>\d{1,2})\s*[\.、](?!\d)\s*(?P<body>.+)$")   # 1. xxx (排除 1.1)
+    sub_pat = re.compile(r"^(?P<no>\d{1,2}\.\d{1,2})\s+(?P<body>.+)$")       # 1.1 xxx
+
+    items: List[Dict[str, Any]] = []
+    cur: Optional[Dict[str, Any]] = None
+    cur_sub: Optional[Dict[str, Any]] = None
+
+    def flush_sub():
+        nonlocal cur_sub, cur
+        if cur is not None and cur_sub is not None:
+            cur.setdefault("subitems", []).append(cur_sub)
+        cur_sub = None
+
+    def flush_item():
+        nonlocal cur
+        if cur is not None:
+            cur["title"] = clean_text(cur.get("title", ""))
+            cur["body"] = clean_text(cur.get("body", ""))
+            for s in cur.get("subitems", []):
+                s["body"] = clean_text(s.get("body", ""))
+            items.append(cur)
+        cur = None
+
+    for ln in lines:
+        if not ln:
+            continue
+
+        m_main = main_pat.match(ln)
+        m_sub = sub_pat.match(ln)
+
+        if m_main:
+            flush_sub()
+            flush_item()
+            no = int(m_main.group("no"))
+            body_full = clean_text(m_main.group("body"))
+
+            # 处理"工程知识：..."这种
+            title = ""
+            body = body_full
+            if "：" in body_full:
+                title, body = body_full.split("：", 1)
+                title = clean_text(title)
+                body = clean_text(body)
+
+            cur = {"no": no, "title": title, "body": body, "subitems": []}
+            continue
+
+        if m_sub and cur is not None:
+            flush_sub()
+            cur_sub = {"no": m_sub.group("no"), "body": clean_text(m_sub.group("body"))}
+            continue
+
+        # 续行
+        if cur_sub is not None:
+            cur_sub["body"] += " " + ln
+        elif cur is not None:
+            cur["body"] += " " + ln
+
+    flush_sub()
+    flush_item()
+
+    items = sorted(items, key=lambda x: x.get("no", 999))
+    if len(items) > 12:
+        items = [x for x in items if 1 <= x.get("no", 0) <= 12]
+
+    return {"count": len(items), "items": items, "raw": tail.strip()}
+
+# ----------------------------
+# 表格标题/方向识别
+# ----------------------------
+def guess_table_appendix_by_page(page_no: int) -> Optional[str]:
+    """
+    针对常见培养方案（本样例 18 页）：
+    10-11 附表1，12 附表2，13-14 附表3，15 附表4，16 附表5
+    启用模板库（run_full_extract(templates=...)）时改为按附表标题行推断 / 沿用模板映射，这里只作兜底。
+    """
+    mapping = {
+        10: "附表1", 11: "附表1",
+        12: "附表2",
+        13: "附表3", 14: "附表3",
+        15: "附表4",
+        16: "附表5",
+    }
+    return mapping.get(page_no)
+
+def infer_table_title_from_page_text(page_text: str, appendix: Optional[str], appendix_titles: Dict[str, str], page_no: int) -> str:
+    if appendix and appendix in appendix_titles:
+        return appendix_titles[appendix]
+
+    if appendix:
+        m = re.search(rf"(?P<title>[^\n\r]{{2,120}}?)\s*[（(]\s*{re.escape(appendix)}\s*[)）]", page_text)
+        if m:
+            return clean_text(m.group("title"))
+
+    m = re.search(r"(附表\s*\d+)\s*[:：]\s*([^\n\r]{2,120})", page_text)
+    if m:
+        return clean_text(m.group(2))
+
+    return appendix or f"第{page_no}页表格"
+
+def infer_direction_for_page(page_text: str) -> str:
+    has_weld = "焊接" in page_text
+    has_ndt = ("无损" in page_text) or ("无损检测" in page_text)
+    if has_weld and has_ndt:
+        return "混合（焊接+无损检测）"
+    if has_weld:
+        return "焊接"
+    if has_ndt:
+        return "无损检测"
+    return ""
+
+def add_direction_column_rowwise(df: pd.DataFrame, page_direction: str) -> pd.DataFrame:
+    """
+    行级方向识别：若表内有"焊接方向/无损检测方向"分隔行，则从该行开始向下标注。
+    若识别不到，则使用 page_direction。
+    """
+    if df is None or df.empty:
+        return df
+
+    df = df.copy()
+    cur_dir = ""
+    dirs = []
+    for _, row in df.iterrows():
+        row_txt = " ".join([clean_text(x) for x in row.values.tolist()])
+        if re.search(r"焊接.*方向", row_txt):
+            cur_dir = "焊接"
+        elif re.search(r"无损.*方向", row_txt) or re.search(r"无损检测.*方向", row_txt):
+            cur_dir = "无损检测"
+
+        dirs.append(cur_dir or page_direction)
+
+    # 插到最前
+    if "专业方向" not in df.columns:
+        df.insert(0, "专业方向", dirs)
+    else:
+        df["专业方向"] = [d or page_direction for d in dirs]
+
+    return df
+
+# ----------------------------
+# 输出结构
+# ----------------------------
+@dataclass
+class TablePack:
+    page: int
+    title: str
+    appendix: str
+    direction: str
+    columns: List[str]
+    rows: List[List[Any]]
+
+@dataclass
+class ExtractResult:
+    page_count: int
+    table_count: int
+    ocr_used: bool
+    file_sha256: str
+    extracted_at: str
+    pages_data: List[Dict[str, Any]]
+    sections: Dict[str, str]
+    appendix_titles: Dict[str, str]
+    training_objectives: Dict[str, Any]
+    graduation_requirements: Dict[str, Any]
+    tables: List[Dict[str, Any]]  # TablePack as dict
+    settings_digest: str = ""
+    template_id: str = ""         # 版式模板（见 template_profiles.py），未启用模板库时为空
+    template_reused: bool = False  # True：命中已知模板，沿用其表格参数与附表映射
+
+def result_from_dict(d: Dict[str, Any]) -> ExtractResult:
+    """asdict(ExtractResult) 的逆操作（用于缓存/磁盘反序列化）。"""
+    return ExtractResult(**d)
+
+# ----------------------------
+# 抽取器版本：源码变化即视为新版本，缓存自动失效
+# ----------------------------
+EXTRACTOR_SCHEMA = 1
+EXTRACTOR_MODULES = [__file__] + [os.path.join(os.path.dirname(os.path.abspath(__file__)), m)
+                                   for m in ("pdf_backends.py", "template_profiles.py", "docx_extract.py")]
+
+def extractor_version() -> str:
+    h = hashlib.sha256(f"schema={EXTRACTOR_SCHEMA}".encode("utf-8"))
+    for path in EXTRACTOR_MODULES:
+        try:
+            with open(path, "rb") as f:
+                h.update(f.read())
+        except OSError:
+            h.update(os.path.basename(path).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+def changed_pages(prior: Optional[ExtractResult], result: ExtractResult) -> List[int]:
+    """新版本中未从旧版本复用的页码。"""
+    if prior is None:
+        return [p["page"] for p in result.pages_data]
+    return [p["page"] for p in result.pages_data if not p.get("reused")]
+
+# ----------------------------
+# 主流程
+# ----------------------------
+def run_full_extract(
+    pdf_bytes: PdfInput,
+    use_ocr: bool = False,
+    table_settings: Optional[Dict[str, Any]] = None,
+    prior: Optional[ExtractResult] = None,
+    backend: Optional[str] = None,
+    timings: Optional[Dict[str, float]] = None,
+    progress: Optional[Callable[[float, str], None]] = None,
+    templates: Optional[TemplateStore] = None,
+) -> ExtractResult:
+    """
+    pdf_bytes：bytes 或 PdfSource（大文件溢出到磁盘，哈希已在读入时算好）。
+    内容是 Word（.docx）时直接读文档模型（见 docx_extract），不做版面分析；OCR、后端与模板参数不起作用。
+    prior：同一方案的上一版本抽取结果。抽取参数一致时按页面指纹增量复用，
+    只有内容变化的页面才重新做文本/表格抽取。
+    timings：传入 dict 时按阶段累计耗时（秒），见 stage()。
+    progress：逐页进度回调，见 extract_pages_text_and_tables()。
+    templates：版式模板库。给出且未指定 table_settings 时，按版式指纹选用模板的表格参数与附表映射，
+    未知模板先试跑候选参数，抽取成功后建档。
+    """
+    docx = is_docx(pdf_bytes)
+    if docx:
+        use_ocr, table_settings, backend, templates = False, None, DOCX_BACKEND, None
+    auto = templates is not None and table_settings is None
+    digest = settings_digest(use_ocr, TEMPLATE_AUTO if auto else table_settings, backend)
+    prior_pages = prior.pages_data if prior is not None and prior.settings_digest == digest else None
+
+    layout: Dict[str, Any] = {}
+
+    def choose_settings(pages: List[Any], texts: List[str]) -> Tuple[Dict[str, Any], Dict[int, List[Any]]]:
+        rulings = [p.ruling_count() for p in pages]
+        fp = layout_fingerprint(texts, rulings)
+        profile, _ = templates.match(fp)
+        layout.update(fp=fp, profile=profile)
+        if profile is not None:
+            layout.update(name=profile.settings_name, settings={**DEFAULT_TABLE_SETTINGS, **profile.table_settings})
+            return layout["settings"], {}
+        name, settings, pre = explore_table_settings(pages, rulings, DEFAULT_TABLE_SETTINGS, normalize_table)
+        layout.update(name=name, settings=settings)
+        return settings, pre
+
+    # 1) 提取页面文本和表格（Word：段落与原生表格，每个表格自带所属附表）
+    if docx:
+        pages_data, full_text = extract_docx_pages(pdf_bytes, timings=timings, progress=progress)
+    else:
+        pages_data, full_text = extract_pages_text_and_tables(
+            pdf_bytes, enable_ocr=use_ocr, table_settings=table_settings, prior_pages=prior_pages,
+            backend=backend, timings=timings, progress=progress,
+            choose_settings=choose_settings if auto else None,
+        )
+    
+    # 2) 结构化解析
+    with stage(timings, "split_sections"):
+        sections = split_sections(full_text)
+    with stage(timings, "appendix_titles"):
+        appendix_titles = extract_appendix_titles(full_text)
+    
+    # 3) 关键结构化：培养目标、毕业要求
+    with stage(timings, "training_objectives"):
+        obj_key = next((k for k in sections.keys() if "培养目标" in k), "")
+        obj = parse_training_objectives(sections.get(obj_key, "") or full_text)
+    with stage(timings, "graduation_requirements"):
+        grad = parse_graduation_requirements(full_text)
+    
+    # 4) 页码 → 附表：已知模板（页数一致）直接沿用；否则按附表标题行推断，缺失时退回固定映射
+    page_map: Dict[int, str] = {}
+    profile = layout.get("profile")
+    if layout:
+        fp = layout["fp"]
+        if profile is not None and int(profile.fingerprint["page_count"]) == fp.page_count:
+            page_map = profile.page_map(fp.page_count)
+        else:
+            page_map = page_appendix_map(fp, [p["page"] for p in pages_data if p["tables"]])
+            if profile is not None:
+                page_map = {**profile.page_map(fp.page_count), **page_map}
+
+    # 5) 处理表格
+    tables: List[TablePack] = []
+    total_tables = 0
+    
+    for page_data in pages_data:
+        page_no = page_data["page"]
+        page_text = page_data["text"]
+        page_tables = page_data["tables"]
+        
+        total_tables += len(page_tables)
+        
+        table_appendix = page_data.get("table_appendix")
+        if table_appendix is None:
+            page_appendix = (page_map.get(page_no) if page_map else guess_table_appendix_by_page(page_no)) or ""
+            table_appendix = [page_appendix] * len(page_tables)
+        page_dir = infer_direction_for_page(page_text)
+        
+        for i, table_data in enumerate(page_tables):
+            appendix = table_appendix[i]
+            base_title = infer_table_title_from_page_text(page_text, appendix or None, appendix_titles, page_no)
+            title = f"{base_title}（{appendix}）" if appendix and appendix not in base_title else base_title
+            with stage(timings, "table_to_df"):
+                df = table_to_df(table_data, fill_down=not docx)
+            if df is not None and not df.empty:
+                with stage(timings, "direction_rows"):
+                    df2 = add_direction_column_rowwise(df, page_dir)
+                sub_title = title if len(page_tables) == 1 else f"{title} - 表{i+1}"
+                pack = TablePack(
+                    page=page_no,
+                    title=sub_title,
+                    appendix=appendix,
+                    direction=page_dir,
+                    columns=[str(c) for c in df2.columns],
+                    rows=df2.values.tolist(),
+                )
+                tables.append(pack)
+    
+    with stage(timings, "sha256"):
+        file_sha256 = pdf_sha256(pdf_bytes)
+
+    # 抽取成功（有表格）后把学到的参数与映射写回模板库
+    template_id = ""
+    if layout and tables:
+        learned = templates.learn(layout["fp"], layout["name"], layout["settings"], page_map,
+                                  template_id=profile.template_id if profile is not None else None)
+        template_id = learned.template_id
+
+    result = ExtractResult(
+        page_count=len(pages_data),
+        table_count=total_tables,
+        ocr_used=use_ocr,
+        file_sha256=file_sha256,
+        extracted_at=datetime.now().isoformat(timespec="seconds"),
+        pages_data=pages_data,
+        sections=sections,
+        appendix_titles=appendix_titles,
+        training_objectives=obj,
+        graduation_requirements=grad,
+        tables=[asdict(t) for t in tables],
+        settings_digest=digest,
+        template_id=template_id,
+        template_reused=profile is not None,
+    )
+    return result
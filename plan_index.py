@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+培养方案检索库（SQLite + FTS5，跨方案、跨会话）
+
+每份抽取结果按文件 SHA-256 入库一次（重复入库会覆盖旧记录）：
+- courses：附表中的课程行（课程名称 / 课程编码 / 学期 / 学分 / 专业方向 / 来源页 + 原始整行 JSON）
+- requirements：毕业要求及其分项
+- sections：正文大章
+
+FTS5 使用 trigram 分词：中文没有空格分词，trigram 支持任意 >=3 字的子串匹配；
+更短的关键词退回 LIKE 扫描（数据量为数百份方案时仍在毫秒级）。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from exporters import safe_df_from_tablepack
+from plan_extract import ExtractResult, clean_text
+
+DEFAULT_INDEX_PATH = os.environ.get(
+    "TAS_PLAN_INDEX_DB",
+    os.path.join(os.path.expanduser("~"), ".cache", "teaching-agent-suite", "plans.sqlite3"),
+)
+
+# 列名关键词（按优先级）
+COURSE_NAME_KEYS = ["课程名称", "课程名"]
+COURSE_CODE_KEYS = ["课程编码", "课程代码", "课程编号", "课程号"]
+SEMESTER_KEYS = ["开课学期", "建议修读学期", "学期"]
+CREDIT_KEYS = ["学分"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    plan_id     INTEGER PRIMARY KEY,
+    file_sha256 TEXT UNIQUE NOT NULL,
+    name        TEXT NOT NULL DEFAULT '',
+    ingested_at TEXT NOT NULL,
+    page_count  INTEGER NOT NULL DEFAULT 0,
+    table_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS courses (
+    id          INTEGER PRIMARY KEY,
+    plan_id     INTEGER NOT NULL REFERENCES plans(plan_id) ON DELETE CASCADE,
+    table_idx   INTEGER NOT NULL,
+    page        INTEGER NOT NULL DEFAULT 0,
+    appendix    TEXT NOT NULL DEFAULT '',
+    direction   TEXT NOT NULL DEFAULT '',
+    course_name TEXT NOT NULL DEFAULT '',
+    course_code TEXT NOT NULL DEFAULT '',
+    semester    TEXT NOT NULL DEFAULT '',
+    credits     TEXT NOT NULL DEFAULT '',
+    row_json    TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_courses_plan ON courses(plan_id);
+CREATE TABLE IF NOT EXISTS requirements (
+    id      INTEGER PRIMARY KEY,
+    plan_id INTEGER NOT NULL REFERENCES plans(plan_id) ON DELETE CASCADE,
+    no      TEXT NOT NULL,
+    title   TEXT NOT NULL DEFAULT '',
+    body    TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_requirements_plan ON requirements(plan_id);
+CREATE TABLE IF NOT EXISTS sections (
+    id      INTEGER PRIMARY KEY,
+    plan_id INTEGER NOT NULL REFERENCES plans(plan_id) ON DELETE CASCADE,
+    title   TEXT NOT NULL,
+    body    TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_sections_plan ON sections(plan_id);
+
+-- 外部内容 FTS 表：正文只存一份，由触发器同步
+CREATE VIRTUAL TABLE IF NOT EXISTS courses_fts USING fts5(
+    course_name, course_code, content='courses', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS courses_ai AFTER INSERT ON courses BEGIN
+    INSERT INTO courses_fts(rowid, course_name, course_code) VALUES (new.id, new.course_name, new.course_code);
+END;
+CREATE TRIGGER IF NOT EXISTS courses_ad AFTER DELETE ON courses BEGIN
+    INSERT INTO courses_fts(courses_fts, rowid, course_name, course_code)
+    VALUES ('delete', old.id, old.course_name, old.course_code);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS requirements_fts USING fts5(
+    title, body, content='requirements', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS requirements_ai AFTER INSERT ON requirements BEGIN
+    INSERT INTO requirements_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS requirements_ad AFTER DELETE ON requirements BEGIN
+    INSERT INTO requirements_fts(requirements_fts, rowid, title, body)
+    VALUES ('delete', old.id, old.title, old.body);
+END;
+"""
+
+# ----------------------------
+# 行抽取
+# ----------------------------
+def find_col(columns: Sequence[Any], keys: Sequence[str]) -> Optional[str]:
+    """按关键词优先级找列名（列名可能带换行 / 括号说明）。"""
+    cols = [str(c) for c in columns]
+    for k in keys:
+        for c in cols:
+            if k in c.replace("\n", "").replace(" ", ""):
+                return c
+    return None
+
+def course_rows(result: ExtractResult) -> List[Dict[str, Any]]:
+    """
+    从附表中取出课程行（有课程名称列，且至少有编码 / 学期 / 学分之一）；合并格已由 postprocess_table_df 向下填充。
+    row 为整行原始单元格（列名 → 文本），供检索库存档和统计库按列解析。
+    """
+    out: List[Dict[str, Any]] = []
+    for idx, t in enumerate(result.tables):
+        name_col = find_col(t.get("columns") or [], COURSE_NAME_KEYS)
+        if name_col is None:
+            continue
+        df = safe_df_from_tablepack(t)
+        if df.empty:
+            continue
+        code_col = find_col(df.columns, COURSE_CODE_KEYS)
+        sem_col = find_col(df.columns, SEMESTER_KEYS)
+        credit_col = find_col(df.columns, CREDIT_KEYS)
+        if not (code_col or sem_col or credit_col):
+            continue  # 支撑矩阵等只有课程名称、没有课程属性的表
+        for rec in df.to_dict("records"):
+            name = clean_text(rec.get(name_col, ""))
+            if not name or name in COURSE_NAME_KEYS:
+                continue
+            out.append({
+                "table_idx": idx,
+                "page": int(t.get("page") or 0),
+                "appendix": clean_text(t.get("appendix") or ""),
+                # 行级方向（add_direction_column_rowwise）优先；页面级方向在共享页上是“混合”，只作兜底
+                "direction": clean_text(rec.get("专业方向") or t.get("direction") or ""),
+                "course_name": name,
+                "course_code": clean_text(rec.get(code_col, "")) if code_col else "",
+                "semester": clean_text(rec.get(sem_col, "")) if sem_col else "",
+                "credits": clean_text(rec.get(credit_col, "")) if credit_col else "",
+                "row": {str(k): v for k, v in rec.items()},
+            })
+    return out
+
+def requirement_rows(result: ExtractResult) -> List[Dict[str, str]]:
+    out: List[Dict[str, str]] = []
+    for it in (result.graduation_requirements or {}).get("items", []):
+        out.append({"no": str(it.get("no", "")), "title": it.get("title", ""), "body": it.get("body", "")})
+        for s in it.get("subitems", []) or []:
+            out.append({"no": str(s.get("no", "")), "title": it.get("title", ""), "body": s.get("body", "")})
+    return out
+
+def _fts_phrase(q: str) -> str:
+    """用户输入 → FTS5 短语查询（整体加引号，避免 AND/OR/- 等被当作语法）。"""
+    return '"' + q.replace('"', '""') + '"'
+
+# ----------------------------
+# 检索库
+# ----------------------------
+class PlanIndex:
+    """
+    单文件 SQLite；WAL 模式下多个会话可并发读、串行写。
+    连接按线程创建（Streamlit 每个会话在各自线程里运行脚本）。
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---- 写入
+    def ingest(self, result: ExtractResult, name: str = "") -> int:
+        """整份结果入库（同一 SHA 先删后插，单事务），返回 plan_id。"""
+        courses = course_rows(result)
+        reqs = requirement_rows(result)
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM plans WHERE file_sha256 = ?", (result.file_sha256,))
+            cur = conn.execute(
+                "INSERT INTO plans(file_sha256, name, ingested_at, page_count, table_count) VALUES (?, ?, ?, ?, ?)",
+                (result.file_sha256, name or result.file_sha256[:12],
+                 datetime.now().isoformat(timespec="seconds"), result.page_count, result.table_count),
+            )
+            plan_id = int(cur.lastrowid)
+            conn.executemany(
+                "INSERT INTO courses(plan_id, table_idx, page, appendix, direction, course_name, course_code, "
+                "semester, credits, row_json) VALUES (:plan_id, :table_idx, :page, :appendix, :direction, "
+                ":course_name, :course_code, :semester, :credits, :row_json)",
+                [dict(c, plan_id=plan_id, row_json=json.dumps(c["row"], ensure_ascii=False)) for c in courses],
+            )
+            conn.executemany(
+                "INSERT INTO requirements(plan_id, no, title, body) VALUES (:plan_id, :no, :title, :body)",
+                [dict(r, plan_id=plan_id) for r in reqs],
+            )
+            conn.executemany(
+                "INSERT INTO sections(plan_id, title, body) VALUES (?, ?, ?)",
+                [(plan_id, k, v) for k, v in (result.sections or {}).items()],
+            )
+        return plan_id
+
+    def remove(self, file_sha256: str) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM plans WHERE file_sha256 = ?", (file_sha256,))
+
+    # ---- 查询
+    def plans(self) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT p.*, (SELECT COUNT(*) FROM courses c WHERE c.plan_id = p.plan_id) AS course_rows "
+            "FROM plans p ORDER BY p.ingested_at DESC"
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def search_courses(self, q: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """按课程名称 / 课程编码检索，返回 方案 + 方向 + 学期 + 学分 + 来源页。"""
+        q = clean_text(q)
+        if not q:
+            return []
+        cols = ("p.name AS plan, p.file_sha256, c.direction, c.appendix, c.course_code, c.course_name, "
+                "c.semester, c.credits, c.page")
+        if len(q) >= 3:
+            sql = (f"SELECT {cols} FROM courses_fts f JOIN courses c ON c.id = f.rowid "
+                   f"JOIN plans p ON p.plan_id = c.plan_id WHERE courses_fts MATCH ? ORDER BY f.rank LIMIT ?")
+            args: tuple = (_fts_phrase(q), limit)
+        else:
+            sql = (f"SELECT {cols} FROM courses c JOIN plans p ON p.plan_id = c.plan_id "
+                   f"WHERE c.course_name LIKE ? OR c.course_code LIKE ? LIMIT ?")
+            args = (f"%{q}%", f"%{q}%", limit)
+        return [dict(r) for r in self._conn().execute(sql, args).fetchall()]
+
+    def search_requirements(self, q: str, limit: int = 100) -> List[Dict[str, Any]]:
+        q = clean_text(q)
+        if not q:
+            return []
+        cols = "p.name AS plan, p.file_sha256, r.no, r.title, r.body"
+        if len(q) >= 3:
+            sql = (f"SELECT {cols}, snippet(requirements_fts, 1, '【', '】', '…', 24) AS snippet "
+                   f"FROM requirements_fts f JOIN requirements r ON r.id = f.rowid "
+                   f"JOIN plans p ON p.plan_id = r.plan_id WHERE requirements_fts MATCH ? ORDER BY f.rank LIMIT ?")
+            args: tuple = (_fts_phrase(q), limit)
+        else:
+            sql = (f"SELECT {cols}, r.body AS snippet FROM requirements r JOIN plans p ON p.plan_id = r.plan_id "
+                   f"WHERE r.title LIKE ? OR r.body LIKE ? LIMIT ?")
+            args = (f"%{q}%", f"%{q}%", limit)
+        return [dict(r) for r in self._conn().execute(sql, args).fetchall()]
+
+    def timed(self, fn_name: str, q: str, limit: int = 100):
+        """(结果, 毫秒)，供界面展示检索耗时。"""
+        t0 = time.perf_counter()
+        rows = getattr(self, fn_name)(q, limit)
+        return rows, (time.perf_counter() - t0) * 1000
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+上传即预抽取（投机执行）
+
+以前要等用户点“执行一键全量抽取 / 开始全量抽取”才开始读 PDF。而上传之后用户通常还要花几秒钟
+选供应商、勾选 OCR，这段时间可以先把本地阶段（逐页文本 / 表格）做掉：
+- 上传控件一给出文件就 start()：按 (阶段, SHA-256, 抽取参数) 为键，在后台线程里开始抽取
+- 点按钮时 claim()：取走进行中或已完成的 Future，后台任务直接等它，不再重复读 PDF；
+  参数已改（例如改了 OCR）则键不同，照常抽取
+- 同一会话在同一阶段再次 start() 不同的键时（换了文件 / 参数），该阶段尚未开始的旧预抽取直接取消
+  （只浪费正在执行的那一个）；阶段取键的第一个元素，不同阶段（逐页文本与本地预览）互不取消
+- 没人认领的结果只保留最近 max_entries 个（LRU），预抽取失败时静默丢弃，由正式抽取重新执行
+
+进程级单例，所有会话共享：两个人上传同一份方案，只预抽取一次。
+TAS_PREFETCH=0 可关闭。
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+PREFETCH_ENABLED = os.environ.get("TAS_PREFETCH", "1") != "0"
+
+def stage_of(key: Hashable) -> Hashable:
+    """键的阶段：元组键取第一个元素（"pages" / "preview" / "extract"），其他键整体视为一个阶段。"""
+    return key[0] if isinstance(key, tuple) and key else None
+
+class Prefetcher:
+    def __init__(self, max_workers: int = 1, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._futures: "OrderedDict[Hashable, Future]" = OrderedDict()
+        self._latest: Dict[Tuple[str, Hashable], Hashable] = {}   # (owner, 阶段) → 该会话该阶段最近一次预抽取的键
+        self._lock = threading.Lock()
+        self.started = 0
+        self.claimed = 0
+        self.cancelled = 0
+
+    def start(self, owner: str, key: Hashable, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> bool:
+        """开始预抽取；同键已在进行或已完成时不重复执行。返回是否新开了任务。"""
+        with self._lock:
+            slot = (owner, stage_of(key))
+            old = self._latest.get(slot)
+            self._latest[slot] = key
+            if key in self._futures:
+                self._futures.move_to_end(key)
+                return False
+            if old is not None and old != key and old in self._futures and self._futures[old].cancel():
+                del self._futures[old]
+                self.cancelled += 1
+            self._futures[key] = self._pool.submit(fn, *args, **kwargs)
+            self.started += 1
+            self._prune()
+            return True
+
+    def claim(self, key: Hashable) -> Optional[Future]:
+        """认领预抽取（进行中或已完成）并从表中移除；没有或已失败时返回 None。"""
+        with self._lock:
+            fut = self._futures.pop(key, None)
+            if fut is None or fut.cancelled() or (fut.done() and fut.exception() is not None):
+                return None
+            self.claimed += 1
+            return fut
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            running = sum(1 for f in self._futures.values() if not f.done())
+            return {"entries": len(self._futures), "running": running, "started": self.started,
+                    "claimed": self.claimed, "cancelled": self.cancelled}
+
+    def _prune(self) -> None:
+        """在锁内调用：超过 max_entries 时丢弃最早的已结束 / 未开始条目（执行中的保留）。"""
+        for key in list(self._futures):
+            if len(self._futures) <= self.max_entries:
+                break
+            fut = self._futures[key]
+            if fut.done() or fut.cancel():
+                del self._futures[key]
+
+def wait_prefetched(fut: Optional[Future], fallback: Callable[[], Any]) -> Any:
+    """后台任务中使用：等预抽取结果；没有预抽取或预抽取失败时执行 fallback。"""
+    if fut is not None:
+        try:
+            return fut.result()
+        except Exception:
+            pass
+    return fallback()
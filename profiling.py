@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+性能分析模式（按需开启，对普通运行零开销）
+
+开启方式：侧边栏“性能分析模式”勾选，或环境变量 TAS_PROFILE=1（作为勾选框默认值）。
+开启后对单次抽取（以及同一次 rerun 中的结果渲染）做确定性分析：
+- cProfile：按累计耗时 / 自身耗时排序的热点函数
+- tracemalloc：峰值内存与分配次数最多的代码行
+- 分段计时（mark）与 run_full_extract 的分阶段耗时
+报告附带文档 SHA-256，可下载为文本，也可下载原始 .prof 用 snakeviz 等工具查看。
+
+注意：tracemalloc 是进程级的，峰值内存与分配最多的代码行包含分析期间同一进程里其他会话（及后台任务线程）
+的分配；cProfile 只记录脚本线程。多人同时使用时内存数字只能作为上限参考。
+调用方须保证分析段中途出错时也调用 stop() 或 abort()（try/finally），否则 tracemalloc 会一直开着。
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import os
+import pstats
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+PROFILE_ENV = "TAS_PROFILE"
+
+def profiling_enabled_by_env() -> bool:
+    return os.environ.get(PROFILE_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+@dataclass
+class ProfileReport:
+    label: str
+    doc_sha256: str
+    created_at: str
+    wall_s: float
+    peak_mb: float
+    marks: Dict[str, float]
+    stage_timings: Dict[str, float]
+    text: str
+    prof_bytes: bytes = field(repr=False, default=b"")
+
+    def file_stem(self) -> str:
+        return f"profile_{self.doc_sha256[:12] or 'nodoc'}_{self.created_at.replace(':', '')}"
+
+class RunProfiler:
+    """
+    p = RunProfiler("run_full_extract"); p.start()
+    ...抽取...; p.mark("抽取")
+    ...渲染...; p.mark("渲染")
+    report = p.stop(doc_sha256=sha, stage_timings=timings)
+    """
+
+    def __init__(self, label: str, top_n: int = 40, trace_alloc: bool = True):
+        self.label = label
+        self.top_n = top_n
+        self.trace_alloc = trace_alloc
+        self._prof = cProfile.Profile()
+        self._t0 = 0.0
+        self._last = 0.0
+        self._marks: Dict[str, float] = {}
+        self._started_tracemalloc = False
+        self.active = False
+
+    def start(self) -> "RunProfiler":
+        if self.trace_alloc and not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+            self._started_tracemalloc = True
+        self._t0 = self._last = time.perf_counter()
+        self._prof.enable()
+        self.active = True
+        return self
+
+    def mark(self, name: str) -> None:
+        now = time.perf_counter()
+        self._marks[name] = self._marks.get(name, 0.0) + (now - self._last)
+        self._last = now
+
+    def abort(self) -> None:
+        """不出报告，只关掉 cProfile 与本对象开启的 tracemalloc；可重复调用（stop 之后调用无作用）。"""
+        if not self.active:
+            return
+        self.active = False
+        self._prof.disable()
+        if self._started_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def stop(self, doc_sha256: str = "", stage_timings: Optional[Dict[str, float]] = None) -> ProfileReport:
+        self._prof.disable()
+        wall = time.perf_counter() - self._t0
+
+        peak_mb = 0.0
+        alloc_lines: List[str] = []
+        try:
+            if tracemalloc.is_tracing():
+                # 进程级统计：包含同一进程其他会话在此期间的分配
+                _, peak = tracemalloc.get_traced_memory()
+                peak_mb = peak / (1024 * 1024)
+                snap = tracemalloc.take_snapshot().filter_traces([
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                ])
+                for stat in snap.statistics("lineno")[:20]:
+                    frame = stat.traceback[0]
+                    alloc_lines.append(
+                        f"{stat.count:>10,d} 块 {stat.size / 1024:>10.1f} KiB  {frame.filename}:{frame.lineno}"
+                    )
+        finally:
+            self.abort()   # 统计出错也要关掉 tracemalloc
+
+        created = datetime.now().isoformat(timespec="seconds")
+        text = self._format(doc_sha256, created, wall, peak_mb, stage_timings or {}, alloc_lines)
+
+        fd, path = tempfile.mkstemp(suffix=".prof")
+        os.close(fd)
+        try:
+            self._prof.dump_stats(path)
+            with open(path, "rb") as f:
+                prof_bytes = f.read()
+        finally:
+            os.remove(path)
+
+        return ProfileReport(
+            label=self.label,
+            doc_sha256=doc_sha256,
+            created_at=created,
+            wall_s=wall,
+            peak_mb=peak_mb,
+            marks=dict(self._marks),
+            stage_timings=dict(stage_timings or {}),
+            text=text,
+            prof_bytes=prof_bytes,
+        )
+
+    def _format(self, sha: str, created: str, wall: float, peak_mb: float,
+                stages: Dict[str, float], alloc_lines: List[str]) -> str:
+        out = io.StringIO()
+        out.write(f"# 性能分析报告：{self.label}\n")
+        out.write(f"文档 SHA-256：{sha or '-'}\n生成时间：{created}\n")
+        out.write(f"总耗时：{wall:.3f}s    Python 堆峰值：{peak_mb:.1f} MB（进程级，含同期其他会话的分配）\n")
+
+        if self._marks:
+            out.write("\n## 分段耗时\n")
+            for k, v in self._marks.items():
+                out.write(f"{k:<24} {v:>9.3f}s  {v / wall if wall else 0:>6.1%}\n")
+        if stages:
+            out.write("\n## run_full_extract 分阶段耗时\n")
+            for k, v in sorted(stages.items(), key=lambda kv: -kv[1]):
+                out.write(f"{k:<24} {v:>9.3f}s\n")
+
+        for title, key in (("累计耗时 Top", "cumulative"), ("自身耗时 Top", "tottime")):
+            out.write(f"\n## {title} {self.top_n}\n")
+            buf = io.StringIO()
+            pstats.Stats(self._prof, stream=buf).strip_dirs().sort_stats(key).print_stats(self.top_n)
+            out.write(buf.getvalue())
+
+        if alloc_lines:
+            out.write("\n## 分配最多的代码行（分析结束时仍存活；进程级，含同期其他会话）\n")
+            out.write("\n".join(alloc_lines) + "\n")
+        return out.getvalue()
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+提示词前缀稳定化 + 供应商上下文缓存
+
+请求统一拆成两段（Prompt）：
+- prefix：静态指令（MEGA_PROMPT 等），逐字节不变，放在最前面（system / system_instruction）
+- body：本次文档相关内容（原文、增量字段说明）
+
+这样同一版本的指令在所有请求中都是同一个前缀：
+- DeepSeek / Kimi / Qwen / 豆包 等 OpenAI 兼容接口：服务端自动前缀缓存，前缀一致即命中，
+  命中量见 usage.prompt_cache_hit_tokens 或 usage.prompt_tokens_details.cached_tokens
+- Gemini：前缀足够长（>= GEMINI_CACHE_MIN_TOKENS）时创建显式缓存（CachedContent），
+  句柄按 (API Key, 模型, 前缀哈希) 进程内共享，临近过期自动续期，失效后自动重建；
+  前缀较短时仍以稳定的 system_instruction 发送（可命中隐式缓存）
+
+供应商调用通过可注入的 backend 完成，本地可用 benchmarks/stub_llm_server.py 验证。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+GEMINI_CACHE_TTL_S = 3600
+GEMINI_CACHE_REFRESH_MARGIN_S = 300
+GEMINI_CACHE_MIN_TOKENS = 1024
+
+SYSTEM_ROLE = "你是一个只输出 JSON 的教务专家助手。"
+
+# ----------------------------
+# 提示词
+# ----------------------------
+@dataclass(frozen=True)
+class Prompt:
+    prefix: str   # 静态指令（可缓存）
+    body: str     # 动态内容
+    schema: Optional[Dict[str, Any]] = field(default=None, compare=False)   # 输出 JSON Schema（供应商支持时强制约束）
+
+def prefix_version(prefix: str) -> str:
+    """前缀内容哈希，亦作为“提示词版本号”。"""
+    return hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算：中日韩字符约 1 token/字，其余约 4 字符/token。"""
+    cjk = sum(1 for ch in text if "\u4e00" <= ch <= "\u9fff")
+    return cjk + (len(text) - cjk) // 4
+
+def as_prompt(prompt: Any) -> Prompt:
+    """兼容旧调用：整段字符串视为无前缀的 body。"""
+    return prompt if isinstance(prompt, Prompt) else Prompt(prefix="", body=str(prompt))
+
+def system_text(prompt: Prompt) -> str:
+    """system / system_instruction 的完整内容：角色说明 + 静态指令，逐字节稳定。"""
+    return f"{SYSTEM_ROLE}\n\n{prompt.prefix}" if prompt.prefix else SYSTEM_ROLE
+
+def openai_messages(prompt: Prompt) -> list:
+    """OpenAI 兼容接口：system 消息承载稳定前缀，user 消息为动态内容。"""
+    return [
+        {"role": "system", "content": system_text(prompt)},
+        {"role": "user", "content": prompt.body},
+    ]
+
+# ----------------------------
+# 缓存命中统计（从各家 usage 中取出“命中缓存的 token 数”）
+# ----------------------------
+def cached_tokens_from_usage(usage: Any) -> int:
+    if usage is None:
+        return 0
+    get = usage.get if isinstance(usage, dict) else (lambda k, d=None: getattr(usage, k, d))
+    for key in ("prompt_cache_hit_tokens", "cached_content_token_count"):
+        v = get(key)
+        if v:
+            return int(v)
+    details = get("prompt_tokens_details")
+    if details is not None:
+        v = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", 0)
+        return int(v or 0)
+    return 0
+
+_last_usage = threading.local()
+
+def record_usage(provider: str, usage: Any) -> None:
+    _last_usage.value = {"provider": provider, "usage": usage, "cached_tokens": cached_tokens_from_usage(usage)}
+
+def last_usage() -> Optional[Dict[str, Any]]:
+    """当前线程最近一次调用的 usage（供界面展示缓存命中）。"""
+    return getattr(_last_usage, "value", None)
+
+# ----------------------------
+# Gemini 显式上下文缓存
+# ----------------------------
+class GenaiCacheBackend:
+    """
+    google.generativeai 的 CachedContent 封装；测试时可替换为桩实现（同样三个方法）。
+    每个请求都走该 Key 自己的服务客户端（providers.gemini_client），不改动进程级的 genai.configure。
+    """
+
+    def create(self, api_key: str, model: str, system_instruction: str, ttl_s: int) -> Tuple[str, float]:
+        from google.ai import generativelanguage as glm
+        from providers import gemini_client
+        cc = gemini_client(api_key, "cache").create_cached_content(glm.CreateCachedContentRequest(
+            cached_content=glm.CachedContent(
+                model=model if model.startswith("models/") else f"models/{model}",
+                display_name=f"tas-{prefix_version(system_instruction)}",
+                system_instruction=glm.Content(parts=[glm.Part(text=system_instruction)]),
+                ttl=timedelta(seconds=ttl_s),
+            )))
+        return cc.name, cc.expire_time.timestamp()
+
+    def refresh(self, api_key: str, name: str, ttl_s: int) -> float:
+        from google.ai import generativelanguage as glm
+        from google.protobuf import field_mask_pb2
+        from providers import gemini_client
+        cc = gemini_client(api_key, "cache").update_cached_content(glm.UpdateCachedContentRequest(
+            cached_content=glm.CachedContent(name=name, ttl=timedelta(seconds=ttl_s)),
+            update_mask=field_mask_pb2.FieldMask(paths=["ttl"]),
+        ))
+        return cc.expire_time.timestamp()
+
+    def model(self, api_key: str, name: str) -> Any:
+        import google.generativeai as genai
+        from google.ai import generativelanguage as glm
+        from google.generativeai import caching
+        from providers import bind_gemini_key, gemini_client
+        cc = gemini_client(api_key, "cache").get_cached_content(glm.GetCachedContentRequest(name=name))
+        model = genai.GenerativeModel.from_cached_content(cached_content=caching.CachedContent._from_obj(cc))
+        return bind_gemini_key(model, api_key)
+
+@dataclass
+class _Handle:
+    name: str
+    expires_at: float
+
+class ContextCacheManager:
+    """
+    (API Key 哈希, 模型, 前缀哈希) → 缓存句柄。
+    - 未创建 / 已过期：创建
+    - 剩余时间 < refresh_margin_s：续期
+    - 续期或使用时报错（被服务端清理等）：丢弃句柄，下次重建
+    """
+
+    def __init__(self, backend: Any = None, ttl_s: int = GEMINI_CACHE_TTL_S,
+                 refresh_margin_s: int = GEMINI_CACHE_REFRESH_MARGIN_S,
+                 min_tokens: int = GEMINI_CACHE_MIN_TOKENS, clock: Callable[[], float] = time.time):
+        self.backend = backend or GenaiCacheBackend()
+        self.ttl_s = ttl_s
+        self.refresh_margin_s = refresh_margin_s
+        self.min_tokens = min_tokens
+        self.clock = clock
+        self._handles: Dict[Tuple[str, str, str], _Handle] = {}
+        self._failed: Dict[Tuple[str, str, str], float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(api_key: str, model: str, prefix: str) -> Tuple[str, str, str]:
+        return (hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12], model, prefix_version(prefix))
+
+    def eligible(self, prefix: str) -> bool:
+        return estimate_tokens(prefix) >= self.min_tokens
+
+    def handle(self, api_key: str, model: str, prefix: str) -> Optional[str]:
+        """返回可用的缓存名；前缀过短或创建失败时返回 None（调用方走普通请求）。"""
+        if not self.eligible(prefix):
+            return None
+        key = self._key(api_key, model, prefix)
+        with self._lock:
+            now = self.clock()
+            if self._failed.get(key, 0.0) > now:
+                return None  # 最近创建失败（配额 / 模型不支持等），冷却期内不再重试
+            h = self._handles.get(key)
+            try:
+                if h is None or h.expires_at <= now:
+                    name, exp = self.backend.create(api_key, model, prefix, self.ttl_s)
+                    h = self._handles[key] = _Handle(name, exp)
+                elif h.expires_at - now < self.refresh_margin_s:
+                    h.expires_at = self.backend.refresh(api_key, h.name, self.ttl_s)
+            except Exception:
+                self._handles.pop(key, None)
+                self._failed[key] = now + self.refresh_margin_s
+                return None
+            return h.name
+
+    def invalidate(self, api_key: str, model: str, prefix: str) -> None:
+        with self._lock:
+            self._handles.pop(self._key(api_key, model, prefix), None)
+
+    def model(self, api_key: str, name: str) -> Any:
+        return self.backend.model(api_key, name)
+
+# 进程级单例（所有会话共享句柄）
+GEMINI_CONTEXT_CACHE = ContextCacheManager()
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+模型供应商注册表（SDK 按需加载）
+
+google.generativeai 与 openai 两个 SDK 的导入各要 0.8 s 左右，而一个会话通常只用一家供应商。
+这里按 app.PROVIDERS 建立注册表：
+- SDK 在第一次真正调用（或预热）时才导入，进程内只导入一次，耗时记入 IMPORT_TIMINGS
+- OpenAI 兼容客户端按 (base_url, Key 哈希) 复用，连接池跨请求保持
+- Gemini 同样按 Key 建独立的服务客户端并绑定到模型，不调用 genai.configure：
+  那是进程级设置，后台任务池里并发的两个 Gemini 任务会互相用错 Key，用量也会记到别人的 Key 上
+- warm_up() / warm_up_async()：在后台预先导入当前选中供应商的 SDK 并建立连接，
+  用户点击“抽取”时不再为冷启动付费
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+GEMINI = "gemini"
+OPENAI = "openai"
+
+SDK_MODULES = {GEMINI: "google.generativeai", OPENAI: "openai"}
+
+_sdk_lock = threading.Lock()
+_sdks: Dict[str, Any] = {}
+IMPORT_TIMINGS: Dict[str, float] = {}   # SDK → 导入耗时（秒）
+
+def load_sdk(sdk: str) -> Any:
+    """导入并返回 SDK 模块（进程内只导入一次）。"""
+    mod = _sdks.get(sdk)
+    if mod is not None:
+        return mod
+    with _sdk_lock:
+        if sdk not in _sdks:
+            t0 = time.perf_counter()
+            _sdks[sdk] = importlib.import_module(SDK_MODULES[sdk])
+            IMPORT_TIMINGS[sdk] = time.perf_counter() - t0
+        return _sdks[sdk]
+
+# ----------------------------
+# 注册表
+# ----------------------------
+@dataclass(frozen=True)
+class ProviderSpec:
+    name: str
+    sdk: str
+    model: str
+    base_url: Optional[str] = None
+    json_schema: bool = False
+
+def spec_from_config(name: str, config: Dict[str, Any]) -> ProviderSpec:
+    sdk = config.get("sdk") or (GEMINI if config.get("base_url") is None else OPENAI)
+    return ProviderSpec(name=name, sdk=sdk, model=config["model"], base_url=config.get("base_url"),
+                        json_schema=bool(config.get("json_schema")))
+
+_clients: Dict[Tuple[str, str], Any] = {}
+_clients_lock = threading.Lock()
+_warming: Dict[str, threading.Thread] = {}
+
+def _key_hash(api_key: str) -> str:
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+
+def gemini_client(api_key: str, service: str = "generative") -> Any:
+    """按 Key 独立的 google.ai.generativelanguage 服务客户端（generative / cache），按 Key 哈希复用。"""
+    load_sdk(GEMINI)
+    key = (f"gemini:{service}", _key_hash(api_key))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            glm = importlib.import_module("google.ai.generativelanguage")
+            cls = getattr(glm, f"{service.title()}ServiceClient")
+            client = _clients[key] = cls(client_options={"api_key": api_key})
+        return client
+
+def bind_gemini_key(model: Any, api_key: str) -> Any:
+    """GenerativeModel 首次调用时才取进程级默认客户端；预先放入该 Key 的客户端，请求只用这把 Key。"""
+    model._client = gemini_client(api_key)
+    return model
+
+class ProviderRegistry:
+    def __init__(self, providers: Dict[str, Dict[str, Any]]):
+        self.specs: Dict[str, ProviderSpec] = {name: spec_from_config(name, cfg) for name, cfg in providers.items()}
+
+    def spec(self, name: str) -> ProviderSpec:
+        return self.specs[name]
+
+    def is_gemini(self, name: str) -> bool:
+        return self.specs[name].sdk == GEMINI
+
+    def sdk(self, name: str) -> Any:
+        return load_sdk(self.specs[name].sdk)
+
+    def gemini(self, name: str, api_key: str, system_instruction: Optional[str] = None) -> Any:
+        """绑定 api_key 的 GenerativeModel（不改动进程级的 genai.configure）。"""
+        model = self.sdk(name).GenerativeModel(self.specs[name].model, system_instruction=system_instruction)
+        return bind_gemini_key(model, api_key)
+
+    def openai_client(self, name: str, api_key: str) -> Any:
+        """OpenAI 兼容客户端（按 base_url + Key 复用，保持连接池）。"""
+        spec = self.specs[name]
+        key = (spec.base_url or "", _key_hash(api_key))
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = self.sdk(name).OpenAI(api_key=api_key, base_url=spec.base_url)
+            return client
+
+    # ---- 预热
+    def warm_up(self, name: str, api_key: str = "", connect: bool = True) -> float:
+        """导入 SDK；connect=True 且有 Key 时预建 HTTPS 连接（忽略任何网络错误）。返回耗时（秒）。"""
+        t0 = time.perf_counter()
+        spec = self.specs[name]
+        self.sdk(name)
+        if connect and api_key:
+            try:
+                if spec.sdk == OPENAI:
+                    self.openai_client(name, api_key).with_options(timeout=5.0, max_retries=0).models.list()
+                else:
+                    gemini_client(api_key)
+            except Exception:
+                pass
+        return time.perf_counter() - t0
+
+    def warm_up_async(self, name: str, api_key: str = "") -> threading.Thread:
+        """后台线程预热；同一供应商 + Key 正在预热时不重复启动，预热结束即移出 _warming。"""
+        tag = f"{name}:{_key_hash(api_key)}"
+
+        def run() -> None:
+            try:
+                self.warm_up(name, api_key)
+            finally:
+                with _clients_lock:
+                    _warming.pop(tag, None)
+
+        with _clients_lock:
+            t = _warming.get(tag)
+            if t is None:
+                t = _warming[tag] = threading.Thread(target=run, name=f"warm-up-{name}", daemon=True)
+                t.start()
+            return t
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+会话结果存储：session_state 里只放句柄，完整结果落盘
+
+以前两个界面把整份结果（逐页全文、全部表格，外加渲染用的 DataFrame）放在 st.session_state 里，
+浏览器标签页不关就一直占着内存；全院老师各开几个闲置标签页，服务器常驻内存只增不减。现在：
+- put() 把结果写入本地目录（gzip 压缩的 pickle，一结果一文件，临时文件 + os.replace 原子写入），
+  返回一个很小的 ResultHandle 存进 session_state
+- get() 先查进程内的热缓存（最近使用的 hot_entries 个结果，LRU），未命中再从磁盘读回
+- derived()：挂在热缓存条目上的派生对象（例如渲染用的 DataFrame 缓存），随条目一起淘汰，需要时再重建
+- 淘汰：超过 TTL 未访问的文件删除；总大小超过 max_bytes 时从最久未访问的开始删除。
+  句柄对应的文件已被淘汰时 get() 返回 None，界面提示重新抽取
+
+内存因此只随“正在操作的会话数”（热缓存）增长，而不是随打开的标签页数增长。
+
+配置：
+- TAS_SESSION_STORE_DIR：存储目录（默认 ~/.cache/teaching-agent-suite/sessions）
+- TAS_SESSION_TTL_HOURS：未访问多久后删除（默认 24）
+- TAS_SESSION_STORE_MAX_MB：目录总大小上限（默认 1024）
+- TAS_SESSION_HOT：进程内热缓存条目数（默认 8）
+"""
+
+from __future__ import annotations
+
+import gzip
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_SESSION_STORE_DIR = os.environ.get(
+    "TAS_SESSION_STORE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "teaching-agent-suite", "sessions"),
+)
+DEFAULT_SESSION_TTL_S = float(os.environ.get("TAS_SESSION_TTL_HOURS", "24")) * 3600
+DEFAULT_SESSION_MAX_BYTES = int(os.environ.get("TAS_SESSION_STORE_MAX_MB", "1024")) * 1024 * 1024
+DEFAULT_SESSION_HOT = int(os.environ.get("TAS_SESSION_HOT", "8"))
+
+# 两次过期扫描的最小间隔（秒）：get() 顺带扫描，避免每次 rerun 都列目录
+SWEEP_INTERVAL_S = 60.0
+
+@dataclass(frozen=True)
+class ResultHandle:
+    """存进 session_state 的句柄（几十字节）。"""
+    id: str
+    kind: str             # "extract"（ExtractResult）/ "mega"（LLM 抽取结果 + 页面指纹）
+    sha256: str = ""      # 来源 PDF，便于提示与排查
+    size: int = 0         # 落盘后的字节数
+
+@dataclass
+class _Hot:
+    value: Any
+    derived: Dict[str, Any] = field(default_factory=dict)
+
+class SessionResultStore:
+    SUFFIX = ".pkl.gz"
+
+    def __init__(self, store_dir: str = DEFAULT_SESSION_STORE_DIR, ttl_s: float = DEFAULT_SESSION_TTL_S,
+                 max_bytes: int = DEFAULT_SESSION_MAX_BYTES, hot_entries: int = DEFAULT_SESSION_HOT):
+        self.store_dir = store_dir
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.hot_entries = hot_entries
+        self._hot: "OrderedDict[str, _Hot]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self.loads = 0   # 从磁盘读回的次数
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    def _path(self, handle_id: str) -> str:
+        return os.path.join(self.store_dir, handle_id + self.SUFFIX)
+
+    # ---- 读写
+    def put(self, value: Any, kind: str, sha256: str = "") -> ResultHandle:
+        handle_id = uuid.uuid4().hex
+        fd, tmp = tempfile.mkstemp(dir=self.store_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=1) as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(tmp)
+            os.replace(tmp, self._path(handle_id))
+        except Exception:
+            self._remove(tmp)
+            raise
+        with self._lock:
+            self._remember(handle_id, _Hot(value))
+        self.evict()
+        return ResultHandle(handle_id, kind, sha256, size)
+
+    def get(self, handle: Optional[ResultHandle]) -> Any:
+        """句柄对应的结果；句柄为空或文件已被淘汰时返回 None。"""
+        hot = self._hot_entry(handle)
+        return hot.value if hot is not None else None
+
+    def derived(self, handle: ResultHandle, name: str, factory: Callable[[Any], Any]) -> Any:
+        """挂在热缓存条目上的派生对象：首次调用 factory(结果) 构建，条目被挤出热缓存时一并丢弃。"""
+        hot = self._hot_entry(handle)
+        if hot is None:
+            raise KeyError(handle.id)
+        if name not in hot.derived:
+            hot.derived[name] = factory(hot.value)
+        return hot.derived[name]
+
+    def drop(self, handle: Optional[ResultHandle]) -> None:
+        if handle is None:
+            return
+        with self._lock:
+            self._hot.pop(handle.id, None)
+        self._remove(self._path(handle.id))
+
+    def _hot_entry(self, handle: Optional[ResultHandle]) -> Optional[_Hot]:
+        if handle is None:
+            return None
+        path = self._path(handle.id)
+        with self._lock:
+            hot = self._hot.get(handle.id)
+            if hot is not None:
+                self._hot.move_to_end(handle.id)
+        if time.time() - self._last_sweep > SWEEP_INTERVAL_S:
+            self.evict()
+        try:
+            os.utime(path, None)   # 记录访问时间，供 TTL / LRU 淘汰
+        except OSError:
+            # 文件已被淘汰：热缓存里的副本也不再使用，与其他进程看到的状态保持一致
+            with self._lock:
+                self._hot.pop(handle.id, None)
+            return None
+        if hot is not None:
+            return hot
+        try:
+            with gzip.open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self._remove(path)
+            return None
+        with self._lock:
+            self.loads += 1
+            hot = self._hot.get(handle.id) or _Hot(value)
+            self._remember(handle.id, hot)
+        return hot
+
+    def _remember(self, handle_id: str, hot: _Hot) -> None:
+        """在锁内调用：放入热缓存并挤出最久未用的条目。"""
+        self._hot[handle_id] = hot
+        self._hot.move_to_end(handle_id)
+        while len(self._hot) > self.hot_entries:
+            self._hot.popitem(last=False)
+
+    # ---- 淘汰
+    def entries(self) -> List[Tuple[str, int, float]]:
+        """[(path, size, 最近访问时间)]，按最近访问从旧到新排序。"""
+        out = []
+        for name in os.listdir(self.store_dir):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.store_dir, name)
+            try:
+                st_ = os.stat(path)
+            except OSError:
+                continue
+            out.append((path, st_.st_size, max(st_.st_atime, st_.st_mtime)))
+        out.sort(key=lambda x: x[2])
+        return out
+
+    def evict(self) -> int:
+        """删除超过 TTL 未访问的条目，再按容量从最久未访问的开始删除，返回删除条数。"""
+        with self._lock:
+            self._last_sweep = now = time.time()
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for path, size, atime in entries:
+                if now - atime <= self.ttl_s and total <= self.max_bytes:
+                    break
+                self._remove(path)
+                self._hot.pop(os.path.basename(path)[: -len(self.SUFFIX)], None)
+                total -= size
+                removed += 1
+            return removed
+
+    def stats(self) -> Dict[str, int]:
+        entries = self.entries()
+        with self._lock:
+            return {"files": len(entries), "bytes": sum(size for _, size, _ in entries),
+                    "hot": len(self._hot), "loads": self.loads}
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+单飞（single-flight）合并：相同的并发请求只执行一次
+
+招生 / 培养方案修订期间，多位老师会在几分钟内上传同一份官方方案。
+每次上传都各自调用一次 LLM，等于用多把 Key 并行做同一件事。
+
+SingleFlight.do(key, fn)：
+- 同一 key 没有进行中的调用：当前线程成为“领头者”，执行 fn
+- 已有进行中的调用：当前线程挂到该调用上等待，直接拿到同一份结果
+- 领头者失败时不把它的异常传给跟随者：跟随者重新竞争领头、用自己的 fn（自己的 Key）重试——
+  一位老师的 Key 无效 / 429 / 超出预算，不应连带同时上传同一文件的其他人一起失败
+- 调用结束即移除 key，不做结果缓存（结果缓存由各自的缓存层负责）
+
+LLM 抽取的 key 见 llm_flight_key()：(PDF 哈希, 供应商, 模型, 提示词版本, 请求范围)。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+@dataclass
+class _Call:
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: Optional[BaseException] = None
+    waiters: int = 0
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0    # 实际执行次数
+        self.coalesced = 0   # 被合并（未重复执行）的次数
+
+    def do(self, key: Hashable, fn: Callable[[], Any],
+           on_wait: Optional[Callable[[], None]] = None) -> Tuple[Any, bool]:
+        """
+        返回 (结果, 是否为共享结果)。on_wait：成为跟随者时回调一次（用于提示用户）。
+        跟随的调用失败时重新进入：成为新的领头者执行自己的 fn，或跟随别人的重试；
+        自己执行 fn 失败时才抛出异常。
+        """
+        waited = False
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self.executed += 1
+                else:
+                    call.waiters += 1
+            if leader:
+                break
+            if on_wait is not None and not waited:
+                on_wait()
+            waited = True
+            call.done.wait()
+            if call.error is None:
+                with self._lock:
+                    self.coalesced += 1
+                return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"in_flight": len(self._calls), "executed": self.executed, "coalesced": self.coalesced}
+
+def llm_flight_key(pdf_sha256: str, provider: str, model: str, prompt_version: str,
+                   keys: Optional[Sequence[str]] = None, prior_data: Any = None) -> Tuple[str, ...]:
+    """
+    LLM 抽取的合并键。增量更新（keys 非空）时结果还取决于请求的字段和上一版本结果，
+    二者一并计入，保证只有真正相同的请求才会合并。
+    """
+    scope = "full" if not keys else ",".join(keys)
+    prior_digest = ""
+    if keys and prior_data is not None:
+        raw = json.dumps(prior_data, ensure_ascii=False, sort_keys=True, default=str)
+        prior_digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+    return (pdf_sha256, provider, model, prompt_version, scope, prior_digest)
+
+# 进程级单例（所有会话共享）
+LLM_FLIGHTS = SingleFlight()
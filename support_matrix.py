@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+附表4 课程—指标点支撑矩阵（NumPy）
+
+两条抽取路径的产物统一装进同一个结构：
+- LLM 路径：table4 = [{"课程名称": ..., "指标点": "1.2", "强度": "H"}, ...]
+- 确定性路径：宽表（课程名称 + 若干 "1.1"/"1.2"… 列，单元格为 H/M/L）
+
+强度编码为 uint8 权重（H=3, M=2, L=1, 空=0），矩阵形状 = 课程数 × 指标点数，
+课程 / 指标点各有一张 名称 → 下标 的索引表。覆盖类问题都是整列 / 整行的向量运算，
+不再逐条扫描字典列表。
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from plan_extract import ExtractResult, clean_text
+
+LEVELS = {"H": 3, "M": 2, "L": 1}
+LEVEL_NAMES = {3: "H", 2: "M", 1: "L", 0: ""}
+
+# 其他常见写法 → 标准强度
+_LEVEL_ALIASES = {
+    "H": "H", "高": "H", "强": "H", "3": "H", "●": "H", "★": "H",
+    "M": "M", "中": "M", "2": "M", "◐": "M", "◎": "M",
+    "L": "L", "低": "L", "弱": "L", "1": "L", "○": "L", "√": "L", "✓": "L",
+}
+
+_INDICATOR_RE = re.compile(r"(\d{1,2})\s*[\.．]\s*(\d{1,2})")
+
+# ----------------------------
+# 解析
+# ----------------------------
+def parse_level(x: Any) -> int:
+    s = clean_text(x).upper()
+    if not s:
+        return 0
+    return LEVELS.get(_LEVEL_ALIASES.get(s, _LEVEL_ALIASES.get(s[:1], "")), 0)
+
+def parse_indicator(x: Any) -> str:
+    """'1.2' / '指标点1.2' / '毕业要求1\\n1.2' → '1.2'；不是指标点返回空串。"""
+    m = _INDICATOR_RE.search(str(x or ""))
+    return f"{int(m.group(1))}.{int(m.group(2))}" if m else ""
+
+def indicator_sort_key(ind: str):
+    a, _, b = ind.partition(".")
+    return (int(a), int(b or 0))
+
+# ----------------------------
+# 矩阵
+# ----------------------------
+@dataclass
+class SupportMatrix:
+    courses: List[str]
+    indicators: List[str]
+    weights: np.ndarray  # uint8，shape = (len(courses), len(indicators))
+    course_index: Dict[str, int] = field(default_factory=dict)
+    indicator_index: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.course_index = {c: i for i, c in enumerate(self.courses)}
+        self.indicator_index = {k: j for j, k in enumerate(self.indicators)}
+        # 指标点所属毕业要求（"3.2" → 3），供按要求汇总
+        self.requirement_of = np.array([indicator_sort_key(k)[0] for k in self.indicators], dtype=np.int16)
+
+    @property
+    def shape(self):
+        return self.weights.shape
+
+    # ---- 构建
+    @classmethod
+    def from_triples(cls, triples: Iterable[tuple], indicators: Iterable[str] = ()) -> "SupportMatrix":
+        """
+        (课程, 指标点, 强度权重) 三元组；同一格重复出现时取最大强度。
+        出现过的指标点（含权重为 0 / 课程为空的三元组、indicators 给出的列）都保留为列，
+        整列为 0 的指标点才能被 indicators_lacking / uncovered_indicators 报出来。
+        """
+        rows: List[str] = []
+        cols: List[str] = []
+        vals: List[int] = []
+        seen = set(indicators)
+        for course, ind, w in triples:
+            if ind:
+                seen.add(ind)
+            if course and ind and w:
+                rows.append(course)
+                cols.append(ind)
+                vals.append(w)
+        courses = list(dict.fromkeys(rows))
+        indicators = sorted(seen, key=indicator_sort_key)
+        m = cls(courses, indicators, np.zeros((len(courses), len(indicators)), dtype=np.uint8))
+        if vals:
+            ri = np.fromiter((m.course_index[c] for c in rows), dtype=np.intp, count=len(rows))
+            ci = np.fromiter((m.indicator_index[k] for k in cols), dtype=np.intp, count=len(cols))
+            np.maximum.at(m.weights, (ri, ci), np.asarray(vals, dtype=np.uint8))
+        return m
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]]) -> "SupportMatrix":
+        """LLM 路径：[{"课程名称","指标点","强度"}]。"""
+        return cls.from_triples(
+            (clean_text(r.get("课程名称")), parse_indicator(r.get("指标点")), parse_level(r.get("强度")))
+            for r in records or []
+        )
+
+    @classmethod
+    def from_wide_df(cls, df: pd.DataFrame, course_col: Optional[str] = None) -> "SupportMatrix":
+        """确定性路径：宽表，列名中带 x.y 的列视为指标点列。"""
+        if df is None or df.empty:
+            return cls.from_triples([])
+        course_col = course_col or next((c for c in df.columns if "课程名称" in str(c)), df.columns[0])
+        ind_cols = [(c, parse_indicator(c)) for c in df.columns if c != course_col and parse_indicator(c)]
+        if not ind_cols:
+            return cls.from_triples([])
+        names = [clean_text(x) for x in df[course_col].tolist()]
+        # 整块单元格一次性映射成权重，再按非零位置展开成三元组
+        levels = np.vectorize(parse_level, otypes=[np.uint8])(df[[c for c, _ in ind_cols]].to_numpy(dtype=object))
+        ri, ci = np.nonzero(levels)
+        return cls.from_triples(((names[i], ind_cols[j][1], int(levels[i, j])) for i, j in zip(ri, ci)),
+                                indicators=[k for _, k in ind_cols])
+
+    @classmethod
+    def from_result(cls, result: ExtractResult, direction: Optional[str] = None) -> "SupportMatrix":
+        """从确定性抽取结果中找出支撑矩阵表（课程名称列 + 至少 3 个指标点列）并合并。"""
+        frames = []
+        for t in result.tables:
+            cols = t.get("columns") or []
+            if not any("课程名称" in str(c) for c in cols):
+                continue
+            if sum(1 for c in cols if parse_indicator(c)) < 3:
+                continue
+            if direction and clean_text(t.get("direction") or "") not in ("", direction):
+                continue
+            frames.append(pd.DataFrame(t.get("rows") or [], columns=cols))
+        if not frames:
+            return cls.from_triples([])
+        triples, indicators = [], []
+        for df in frames:
+            m = cls.from_wide_df(df)
+            triples.extend(m.triples())
+            indicators.extend(m.indicators)
+        return cls.from_triples(triples, indicators=indicators)
+
+    def triples(self) -> List[tuple]:
+        ri, ci = np.nonzero(self.weights)
+        return [(self.courses[i], self.indicators[j], int(self.weights[i, j])) for i, j in zip(ri, ci)]
+
+    # ---- 查询
+    def indicators_lacking(self, level: str = "H") -> List[str]:
+        """没有任何课程以 >= level 强度支撑的指标点。"""
+        if not self.indicators:
+            return []
+        col_max = self.weights.max(axis=0) if self.courses else np.zeros(len(self.indicators), dtype=np.uint8)
+        return [self.indicators[j] for j in np.flatnonzero(col_max < LEVELS[level])]
+
+    def uncovered_indicators(self, expected: Optional[Iterable[str]] = None) -> List[str]:
+        """完全没有课程支撑的指标点；expected 给出应有的指标点全集（如毕业要求分项）。"""
+        missing = [k for k in (expected or []) if k not in self.indicator_index]
+        return missing + self.indicators_lacking("L")
+
+    def course_load(self) -> pd.DataFrame:
+        """每门课支撑的指标点数（按强度）与加权和，按加权和降序。"""
+        w = self.weights
+        df = pd.DataFrame({
+            "课程名称": self.courses,
+            "H": (w == 3).sum(axis=1),
+            "M": (w == 2).sum(axis=1),
+            "L": (w == 1).sum(axis=1),
+            "指标点数": (w > 0).sum(axis=1),
+            "加权和": w.sum(axis=1, dtype=np.int32),
+        })
+        return df.sort_values("加权和", ascending=False, ignore_index=True)
+
+    def indicator_support(self) -> pd.DataFrame:
+        """每个指标点的支撑课程数（按强度）、最高强度、加权和。"""
+        w = self.weights
+        return pd.DataFrame({
+            "指标点": self.indicators,
+            "毕业要求": self.requirement_of,
+            "H": (w == 3).sum(axis=0),
+            "M": (w == 2).sum(axis=0),
+            "L": (w == 1).sum(axis=0),
+            "最高强度": [LEVEL_NAMES[int(x)] for x in (w.max(axis=0) if len(self.courses) else np.zeros(len(self.indicators), dtype=np.uint8))],
+            "加权和": w.sum(axis=0, dtype=np.int32),
+        })
+
+    def requirement_rollup(self, n_requirements: int = 12) -> pd.DataFrame:
+        """按毕业要求（1..n）汇总：指标点数、支撑课程数、H 支撑数、缺 H 的指标点。"""
+        sup = self.indicator_support()
+        w = self.weights
+        rows = []
+        for no in range(1, n_requirements + 1):
+            cols = np.flatnonzero(self.requirement_of == no)
+            sub = w[:, cols]
+            lacking = [self.indicators[j] for j in cols if sup.at[j, "H"] == 0]
+            rows.append({
+                "毕业要求": no,
+                "指标点数": int(len(cols)),
+                "支撑课程数": int((sub > 0).any(axis=1).sum()) if len(cols) else 0,
+                "H支撑数": int((sub == 3).sum()),
+                "加权和": int(sub.sum(dtype=np.int64)),
+                "缺H的指标点": "、".join(lacking),
+            })
+        return pd.DataFrame(rows)
+
+    def to_records(self) -> List[Dict[str, str]]:
+        """还原为 LLM 路径的 [{"课程名称","指标点","强度"}]；无支撑的指标点记一条课程、强度为空的记录以保留该列。"""
+        out = [{"课程名称": c, "指标点": k, "强度": LEVEL_NAMES[w]} for c, k, w in self.triples()]
+        out += [{"课程名称": "", "指标点": k, "强度": ""} for k in self.indicators_lacking("L")]
+        return out
+
+def expected_indicators(graduation_requirements: Dict[str, Any]) -> List[str]:
+    """毕业要求解析结果中的全部分项编号（作为支撑矩阵应覆盖的指标点全集）。"""
+    out = []
+    for it in (graduation_requirements or {}).get("items", []):
+        for s in it.get("subitems", []) or []:
+            k = parse_indicator(s.get("no"))
+            if k:
+                out.append(k)
+    return out
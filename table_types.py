@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+附表列类型化（数值 / 类别）与学分核对
+
+两条抽取路径产出的单元格都是字符串（确定性路径经 clean_text，LLM 路径按 schema 输出 "..."），
+学分、学时、学期不重新解析就无法求和或校验，“课程体系”“考核方式”这类重复值也是每行一个 str。
+这里按列名把已知列转换为紧凑类型：
+- 学分 / 学时 / 比例：float32（"2.5学分"、"12.5%" 也可解析）
+- 学期：Int8（"3"、"第3学期"、"第三学期"、"3-4" 取首个学期）
+- 课程体系、考核方式、开课模式、专业方向、强度等：category
+空单元格（含 "-" "—" "/"）记为缺失；非空却解析不了的单元格逐列记录（行号 + 原值），
+界面据此提示需要人工校对的位置。原表不改动，界面展示仍用原始文本。
+
+credit_checks()：在类型化后的附表1 / 附表2 上做向量化学分核对
+（附表2 每行学期分配之和 = 学分统计；各方向总学分 = 毕业条件中的“修满 N 学分”；
+附表1 必修课学分按课程体系汇总 = 附表2 对应行）。
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from plan_extract import clean_text
+
+CREDITS = "credits"
+HOURS = "hours"
+RATIO = "ratio"
+SEMESTER = "semester"
+CATEGORY = "category"
+
+KIND_LABELS = {CREDITS: "学分", HOURS: "学时", RATIO: "比例", SEMESTER: "学期", CATEGORY: "类别"}
+
+# 列名关键词 → 类型（按顺序匹配，先到先得：“学期一学分分配”是学分，“学分比例”是比例；
+# “学期一”“第3学期”这类具体学期列是学分分配，“上课学期”才是学期）
+COLUMN_KIND_KEYS: List[Tuple[str, List[str]]] = [
+    (RATIO, ["比例", "占比"]),
+    (CREDITS, ["学分"]),
+    (HOURS, ["学时"]),
+    (SEMESTER, ["学期"]),
+    (CATEGORY, ["课程体系", "课程模块", "课程类别", "课程性质", "考核方式", "开课模式", "修读性质",
+                "专业方向", "是否学位课", "强度", "指标点"]),
+]
+
+NA_TOKENS = {"", "-", "—", "–", "/", "无", "nan", "None"}
+
+_NUMBER_RE = r"^\s*(-?\d+(?:\.\d+)?)\s*(?:学分|学时|%|％)?\s*$"
+_SEMESTER_RE = r"^\s*第?\s*(\d{1,2})"
+_CN_DIGITS = str.maketrans("一二三四五六七八九", "123456789")
+
+_SEMESTER_COL_RE = re.compile(r"第\s*[一二三四五六七八九\d]{1,2}\s*学期|学期\s*[一二三四五六七八九\d]")
+
+_REQUIRED_RE = re.compile(r"修满\s*(\d+(?:\.\d+)?)\s*学分")
+_TOTAL_RE = re.compile(r"合计|总计|小计|总学分")
+
+def column_kind(col: Any) -> Optional[str]:
+    name = str(col).replace("\n", "").replace(" ", "")
+    if _SEMESTER_COL_RE.search(name) and not any(k in name for k in COLUMN_KIND_KEYS[0][1]):
+        return CREDITS
+    for kind, keys in COLUMN_KIND_KEYS:
+        if any(k in name for k in keys):
+            return kind
+    return None
+
+# ----------------------------
+# 类型化
+# ----------------------------
+@dataclass
+class TypedTable:
+    frame: pd.DataFrame
+    kinds: Dict[str, str]                                                   # 列 → 类型
+    failures: Dict[str, List[Tuple[int, str]]] = field(default_factory=dict)  # 列 → [(行号, 原值)]
+
+    @property
+    def failure_count(self) -> int:
+        return sum(len(v) for v in self.failures.values())
+
+    def failure_report(self) -> pd.DataFrame:
+        """解析失败明细：列 / 类型 / 行（从 1 起）/ 原值。"""
+        recs = [{"列": c, "类型": KIND_LABELS[self.kinds[c]], "行": i + 1, "原值": raw}
+                for c, items in self.failures.items() for i, raw in items]
+        return pd.DataFrame(recs, columns=["列", "类型", "行", "原值"])
+
+    def col(self, keys: Sequence[str], kind: Optional[str] = None) -> Optional[str]:
+        """按关键词优先级找列（可限定类型）。"""
+        for k in keys:
+            for c in self.frame.columns:
+                if k in str(c).replace("\n", "").replace(" ", "") and (kind is None or self.kinds.get(c) == kind):
+                    return c
+        return None
+
+def _text(s: pd.Series) -> pd.Series:
+    s = s.fillna("").astype(str).str.strip()
+    return s.mask(s.isin(NA_TOKENS), "")
+
+def _parse(s: pd.Series, kind: str) -> Tuple[pd.Series, pd.Series]:
+    """返回 (类型化后的列, 解析失败的掩码)。"""
+    text = _text(s)
+    if kind == CATEGORY:
+        return text.replace("", np.nan).astype("category"), pd.Series(False, index=s.index)
+    if kind == SEMESTER:
+        num = text.str.translate(_CN_DIGITS).str.extract(_SEMESTER_RE, expand=False)
+        out = pd.to_numeric(num, errors="coerce").astype("Int8")
+    else:
+        num = text.str.replace("，", ",").str.replace(",", "").str.extract(_NUMBER_RE, expand=False)
+        out = pd.to_numeric(num, errors="coerce").astype("float32")
+    return out, (text != "") & out.isna().to_numpy()
+
+def type_frame(df: pd.DataFrame) -> TypedTable:
+    """按列名类型化；无法识别类型的列保持原样（object）。"""
+    if df is None or df.empty:
+        return TypedTable(pd.DataFrame() if df is None else df.copy(), {})
+    df = df.reset_index(drop=True)
+    out: Dict[Any, pd.Series] = {}
+    kinds: Dict[str, str] = {}
+    failures: Dict[str, List[Tuple[int, str]]] = {}
+    for c in df.columns:
+        kind = column_kind(c)
+        if kind is None:
+            out[c] = df[c]
+            continue
+        out[c], bad = _parse(df[c], kind)
+        kinds[c] = kind
+        if bad.any():
+            idx = np.flatnonzero(bad.to_numpy())
+            failures[c] = [(int(i), str(df[c].iat[i])) for i in idx]
+    return TypedTable(pd.DataFrame(out, index=df.index), kinds, failures)
+
+def type_rows(rows: List[Dict[str, Any]], columns: Optional[Sequence[str]] = None) -> TypedTable:
+    """LLM 表格（每行一个 dict）→ TypedTable；columns 给出时按该顺序排列，其余列附在后面。"""
+    cols = list(columns or [])
+    for r in rows or []:
+        cols += [k for k in r if k not in cols]
+    return type_frame(pd.DataFrame(rows or [], columns=cols))
+
+def table_role(columns: Sequence[Any]) -> Optional[str]:
+    """
+    按列名判断表格角色（确定性路径的附表编号按页码推断，不一定可靠）：
+    课程名称 + 学分列 → "table1"（教学计划表）；无课程名称、有学期学分分配与学分合计 → "table2"（学分统计）。
+    """
+    kinds = {str(c): column_kind(c) for c in columns}
+    names = [str(c).replace("\n", "").replace(" ", "") for c in columns]
+    has_course = any("课程名称" in n or n == "课程名" for n in names)
+    credit_cols = [n for n, (c, k) in zip(names, kinds.items()) if k == CREDITS]
+    if has_course:
+        return "table1" if credit_cols else None
+    per_semester = [n for n in credit_cols if _SEMESTER_COL_RE.search(n)]
+    return "table2" if per_semester and len(credit_cols) > len(per_semester) else None
+
+def memory_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum()) if df is not None else 0
+
+# ----------------------------
+# 学分核对
+# ----------------------------
+@dataclass
+class CreditCheck:
+    item: str
+    expected: float
+    actual: float
+    ok: bool
+    note: str = ""
+
+def required_credits(sections: Optional[Dict[str, str]]) -> Optional[float]:
+    """从正文（优先“毕业条件/学位”相关栏目）中找“修满 N 学分”。"""
+    items = list((sections or {}).items())
+    items.sort(key=lambda kv: 0 if ("毕业" in kv[0] or "学位" in kv[0]) else 1)
+    for _, text in items:
+        m = _REQUIRED_RE.search(clean_text(text or ""))
+        if m:
+            return float(m.group(1))
+    return None
+
+def _directions(t: TypedTable) -> Tuple[pd.Series, List[str]]:
+    col = t.col(["专业方向", "方向"])
+    if col is None:
+        return pd.Series("", index=t.frame.index), []
+    d = t.frame[col].astype(object).where(t.frame[col].notna(), "").astype(str)
+    return d, sorted(v for v in d.unique() if v)
+
+def _table1_credits(t1: TypedTable) -> Optional[pd.Series]:
+    cols = [c for c, k in t1.kinds.items() if k == CREDITS and ("课内" in str(c) or "课外" in str(c))]
+    if not cols:
+        first = t1.col(["学分"], kind=CREDITS)
+        cols = [first] if first else []
+    if not cols:
+        return None
+    return t1.frame[cols].astype("float32").fillna(0).sum(axis=1)
+
+def credit_checks(table1: Optional[TypedTable], table2: Optional[TypedTable],
+                  required: Optional[float] = None, tol: float = 0.5) -> List[CreditCheck]:
+    """
+    向量化学分核对（只读，不修改表格）：
+    1) 附表2 每行“学期×学分分配”之和 = 学分统计
+    2) 附表2 各方向学分统计合计（有“合计”行时取合计行）= 毕业条件的 required 学分
+    3) 附表1 必修课（开课模式含“必修”）按 方向 × 课程体系 汇总 = 附表2 对应必修行
+    方向为空的行视为各方向共有。
+    """
+    out: List[CreditCheck] = []
+    t2 = table2 if table2 is not None and not table2.frame.empty else None
+    total_col = t2.col(["学分统计", "合计学分", "总学分", "学分"], kind=CREDITS) if t2 else None
+    if t2 is not None and total_col is not None:
+        f2 = t2.frame
+        sem_cols = [c for c, k in t2.kinds.items() if k == CREDITS and c != total_col and "学期" in str(c)]
+        total = f2[total_col].astype("float32")
+        sys_col = t2.col(["课程体系", "课程模块", "课程类别"])
+        is_sum_row = f2[sys_col].astype(str).str.contains(_TOTAL_RE) if sys_col else pd.Series(False, index=f2.index)
+
+        if sem_cols:
+            sem_sum = f2[sem_cols].astype("float32").fillna(0).sum(axis=1)
+            rows = total.notna() & f2[sem_cols].notna().any(axis=1)   # 只给出合计、没有学期分配的行不核对
+            bad = rows & ((sem_sum - total).abs() > tol)
+            out.append(CreditCheck("附表2：各行学期分配之和 = 学分统计", float(rows.sum()), float((rows & ~bad).sum()),
+                                   not bad.any(), "、".join(f"第{i + 1}行" for i in np.flatnonzero(bad.to_numpy())[:10])))
+
+        if required is not None:
+            dirs, names = _directions(t2)
+            for d in names or [""]:
+                mine = (dirs == d) | (dirs == "")
+                sums = total[mine & is_sum_row & (dirs == d)] if d else total[mine & is_sum_row]
+                actual = float(sums.max()) if sums.notna().any() else float(np.nansum(total[mine & ~is_sum_row]))
+                out.append(CreditCheck(f"附表2：{d or '全部'} 总学分 = 毕业要求", float(required), actual,
+                                       abs(actual - required) <= tol))
+
+        t1 = table1 if table1 is not None and not table1.frame.empty else None
+        credits1 = _table1_credits(t1) if t1 is not None else None
+        mode_keys, sys_keys = ["开课模式", "修读性质", "课程性质"], ["课程体系", "课程模块", "课程类别"]
+        mode1, sys1 = (t1.col(mode_keys), t1.col(sys_keys)) if t1 is not None else (None, None)
+        mode2 = t2.col(mode_keys)
+        if credits1 is not None and mode1 and sys1 and mode2 and sys_col:
+            f1 = t1.frame
+            req1 = f1[mode1].astype(str).str.contains("必修")
+            req2 = f2[mode2].astype(str).str.contains("必修") & ~is_sum_row
+            sys1_s, sys2_s = f1[sys1].astype(str), f2[sys_col].astype(str)
+            d1, _ = _directions(t1)
+            d2, names = _directions(t2)
+            for d in names or [""]:
+                in1 = req1 & ((d1 == d) | (d1 == ""))
+                in2 = req2 & ((d2 == d) | (d2 == ""))
+                got = credits1[in1].groupby(sys1_s[in1]).sum()
+                want = total[in2].groupby(sys2_s[in2]).sum()
+                for system, w in want.items():
+                    a = float(got.get(system, 0.0))
+                    out.append(CreditCheck(f"附表1 vs 附表2：{d or '全部'}·{system}（必修）", float(w), a,
+                                           abs(a - float(w)) <= tol))
+    return out
+
+def checks_frame(checks: List[CreditCheck]) -> pd.DataFrame:
+    return pd.DataFrame(
+        [{"核对项": c.item, "应为": c.expected, "实际": c.actual, "结果": "✅" if c.ok else "❌", "说明": c.note}
+         for c in checks],
+        columns=["核对项", "应为", "实际", "结果", "说明"],
+    )
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+版式模板指纹：识别学校模板，复用学到的表格参数与 页码 → 附表 映射
+
+以前每次抽取都用同一组 DEFAULT_TABLE_SETTINGS 和写死的 guess_table_appendix_by_page（只适合样例 18 页方案），
+换一所学校的模板就得改代码。这里在抽取时先做一次“版式指纹”：
+- 页数
+- 大章标题（一、二、……）及其所在页的相对位置
+- 每页线框数量（有线表 / 无线表）
+- 附表标记（“……（附表1）”“附表2：……”这类标题行）所在页的相对位置
+
+与本地模板库逐一比较相似度（0~1），超过阈值即认定为已知模板，直接使用其表格参数与 页码 → 附表 映射；
+未知模板则在线框最多的几页上试跑候选表格参数（TABLE_SETTINGS_CANDIDATES），按表格质量选出最佳参数，
+附表映射按标题行推断。抽取成功（识别出表格）后把学到的档案写回模板库，同模板的后续文档不再试跑。
+
+模板库为单个 JSON 文件（TAS_TEMPLATE_DB，默认 ~/.cache/teaching-agent-suite/templates.json），
+写入走临时文件 + os.replace，多进程共用时以最后一次写入为准。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_TEMPLATE_DB = os.environ.get(
+    "TAS_TEMPLATE_DB",
+    os.path.join(os.path.expanduser("~"), ".cache", "teaching-agent-suite", "templates.json"),
+)
+MATCH_THRESHOLD = float(os.environ.get("TAS_TEMPLATE_MATCH", "0.8"))
+
+# 试跑的候选表格参数（名称 → 相对 DEFAULT_TABLE_SETTINGS 的改动）
+TABLE_SETTINGS_CANDIDATES: Dict[str, Dict[str, Any]] = {
+    "lines": {},
+    "lines_loose": {"intersection_tolerance": 8, "snap_tolerance": 5, "join_tolerance": 5},
+    "text": {"vertical_strategy": "text", "horizontal_strategy": "text"},
+}
+EXPLORE_PAGES = 3
+# 候选按从严到宽排列；靠后的候选须比当前最佳高出该比例才会被选中（宽松参数会把正文也切成“表格”）
+EXPLORE_MARGIN = 0.1
+
+_HEADING_RE = re.compile(r"^\s*([一二三四五六七八九十]+)\s*[、\.．]\s*(\S.{0,40}?)\s*$")
+_MARKER_LINE_RE = re.compile(r"^\s*附表\s*(\d+)\s*[:：\s]|[（(]\s*附表\s*(\d+)\s*[)）]\s*$")
+
+# ----------------------------
+# 指纹
+# ----------------------------
+@dataclass
+class LayoutFingerprint:
+    page_count: int
+    headings: Dict[str, float]            # 规范化章名 → 相对位置（所在页 / 页数）
+    markers: Dict[str, float]             # 附表N → 相对位置
+    ruled_ratio: float                    # 有线框的页面占比
+    marker_pages: Dict[int, List[str]] = field(default_factory=dict)   # 页码 → 该页标题行中的附表标记
+
+    @property
+    def digest(self) -> str:
+        raw = json.dumps([self.page_count, sorted(self.headings), sorted(self.markers)], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
+
+def _heading_key(title: str) -> str:
+    # 去掉括号说明与空白：“七、教学计划表（附表1）”与“七、教学计划表”视为同一章
+    return re.sub(r"[（(].*?[)）]|\s+", "", title)[:20]
+
+def layout_fingerprint(page_texts: Sequence[str], ruling_counts: Sequence[int]) -> LayoutFingerprint:
+    n = max(1, len(page_texts))
+    headings: Dict[str, float] = {}
+    markers: Dict[str, float] = {}
+    marker_pages: Dict[int, List[str]] = {}
+    for page_no, text in enumerate(page_texts, start=1):
+        for line in (text or "").splitlines():
+            line = line.strip()
+            if len(line) > 60:
+                continue
+            m = _HEADING_RE.match(line)
+            if m:
+                headings.setdefault(f"{m.group(1)}、{_heading_key(m.group(2))}", page_no / n)
+            mk = _MARKER_LINE_RE.search(line)
+            if mk:
+                name = f"附表{mk.group(1) or mk.group(2)}"
+                markers.setdefault(name, page_no / n)
+                marker_pages.setdefault(page_no, []).append(name)
+    ruled = sum(1 for c in ruling_counts if c >= 4)
+    return LayoutFingerprint(len(page_texts), headings, markers, ruled / n, marker_pages)
+
+def _jaccard_positions(a: Dict[str, float], b: Dict[str, float]) -> float:
+    """
+    键集合的 Jaccard × 共有键的位置一致性（先后顺序一致 + 相对位置接近各占一半）。
+    同一模板的课程数不同时附表页数会变，相对位置随之漂移，但章节 / 附表的先后顺序不变。
+    """
+    if not a and not b:
+        return 1.0
+    keys = set(a) | set(b)
+    common = sorted(set(a) & set(b), key=lambda k: a[k])
+    if not common:
+        return 0.0
+    in_order = sum(1 for k1, k2 in zip(common, common[1:]) if b[k1] <= b[k2]) / max(1, len(common) - 1)
+    closeness = sum(1.0 - min(1.0, abs(a[k] - b[k])) for k in common) / len(common)
+    return len(common) / len(keys) * (0.5 * in_order + 0.5 * closeness)
+
+def similarity(a: LayoutFingerprint, b: LayoutFingerprint) -> float:
+    pages = 1.0 - abs(a.page_count - b.page_count) / max(a.page_count, b.page_count, 1)
+    return (
+        0.1 * pages
+        + 0.4 * _jaccard_positions(a.headings, b.headings)
+        + 0.35 * _jaccard_positions(a.markers, b.markers)
+        + 0.15 * (1.0 - abs(a.ruled_ratio - b.ruled_ratio))
+    )
+
+# ----------------------------
+# 页码 → 附表
+# ----------------------------
+def page_appendix_map(fp: LayoutFingerprint, table_pages: Sequence[int]) -> Dict[int, str]:
+    """
+    附表标题行之后、下一个标题行之前的有表页面都归入该附表；
+    同一页出现多个标记时，该页表格归第一个，之后的页面沿用最后一个。
+    """
+    out: Dict[int, str] = {}
+    current = ""
+    has_tables = set(table_pages)
+    for page_no in range(1, fp.page_count + 1):
+        marks = fp.marker_pages.get(page_no, [])
+        if marks and page_no in has_tables:
+            out[page_no] = marks[0]
+        elif current and page_no in has_tables:
+            out[page_no] = current
+        if marks:
+            current = marks[-1]
+    return out
+
+def scale_page_map(page_map: Dict[int, str], from_pages: int, to_pages: int) -> Dict[int, str]:
+    """模板档案的页码映射按页数比例换算到当前文档（同模板、课程数不同时页数会略有变化）。"""
+    if from_pages == to_pages or not page_map:
+        return dict(page_map)
+    return {max(1, round(p * to_pages / from_pages)): a for p, a in page_map.items()}
+
+# ----------------------------
+# 表格参数试跑
+# ----------------------------
+def table_quality(tables: Sequence[Sequence[Sequence[Any]]]) -> float:
+    """非空单元格数，列数稳定的多列表加分，单列 / 单行的“伪表格”不计。"""
+    score = 0.0
+    for t in tables:
+        rows = [r for r in t if any(str(c).strip() for c in r)]
+        if len(rows) < 2:
+            continue
+        widths = [len(r) for r in rows]
+        if max(widths) < 2:
+            continue
+        filled = sum(1 for r in rows for c in r if str(c).strip())
+        consistency = widths.count(max(set(widths), key=widths.count)) / len(widths)
+        score += filled * consistency
+    return score
+
+def explore_table_settings(pages: Sequence[Any], ruling_counts: Sequence[int], base: Dict[str, Any],
+                           normalize: Any) -> Tuple[str, Dict[str, Any], Dict[int, List[Any]]]:
+    """
+    在线框最多的 EXPLORE_PAGES 页上试跑候选参数，返回 (候选名, 参数, {页下标: 该参数下的原始表格})；
+    页下标从 0 起，返回的表格可直接复用，不必重抽。
+    这些页上有线框时只试按线框切分的候选，按文字对齐切分（text）只用于无线表。
+    """
+    order = sorted(range(len(pages)), key=lambda i: -ruling_counts[i])[:EXPLORE_PAGES]
+    ruled = any(ruling_counts[i] > 0 for i in order)
+    best: Tuple[float, str, Dict[str, Any], Dict[int, List[Any]]] = (-1.0, "lines", base, {})
+    for name, delta in TABLE_SETTINGS_CANDIDATES.items():
+        settings = {**base, **delta}
+        if ruled and "text" in (settings["vertical_strategy"], settings["horizontal_strategy"]):
+            continue
+        raw: Dict[int, List[Any]] = {}
+        for i in order:
+            try:
+                raw[i] = pages[i].tables(settings)
+            except Exception:
+                raw[i] = []
+        score = sum(table_quality([normalize(t) for t in ts]) for ts in raw.values())
+        if score > best[0] * (1 + EXPLORE_MARGIN):
+            best = (score, name, settings, raw)
+    return best[1], best[2], best[3]
+
+# ----------------------------
+# 模板库
+# ----------------------------
+@dataclass
+class TemplateProfile:
+    template_id: str
+    fingerprint: Dict[str, Any]
+    table_settings: Dict[str, Any]
+    settings_name: str
+    page_appendix: Dict[str, str]      # JSON 键为字符串页码
+    runs: int = 0
+    created_at: str = ""
+    updated_at: str = ""
+
+    def layout(self) -> LayoutFingerprint:
+        f = self.fingerprint
+        return LayoutFingerprint(int(f["page_count"]), dict(f["headings"]), dict(f["markers"]), float(f["ruled_ratio"]))
+
+    def page_map(self, page_count: int) -> Dict[int, str]:
+        return scale_page_map({int(p): a for p, a in self.page_appendix.items()},
+                              int(self.fingerprint["page_count"]), page_count)
+
+class TemplateStore:
+    def __init__(self, path: str = DEFAULT_TEMPLATE_DB, threshold: float = MATCH_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._profiles: Optional[Dict[str, TemplateProfile]] = None
+        self._mtime = 0
+
+    def _load(self) -> Dict[str, TemplateProfile]:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = 0
+        if self._profiles is None or mtime != self._mtime:
+            profiles: Dict[str, TemplateProfile] = {}
+            if mtime:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        for d in json.load(f):
+                            d.pop("name", None)     # 旧版模板库里的显示名字段，已不再使用
+                            profiles[d["template_id"]] = TemplateProfile(**d)
+                except (OSError, ValueError, TypeError, KeyError):
+                    profiles = {}   # 模板库损坏：当作空库，下次成功抽取时重写
+            self._profiles, self._mtime = profiles, mtime
+        return self._profiles
+
+    def _save(self, profiles: Dict[str, TemplateProfile]) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump([asdict(p) for p in profiles.values()], f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def profiles(self) -> List[TemplateProfile]:
+        with self._lock:
+            return list(self._load().values())
+
+    def match(self, fp: LayoutFingerprint) -> Tuple[Optional[TemplateProfile], float]:
+        """最相似的已知模板及相似度；低于阈值时返回 (None, 最高相似度)。"""
+        best, score = None, 0.0
+        for p in self.profiles():
+            s = similarity(fp, p.layout())
+            if s > score:
+                best, score = p, s
+        return (best, score) if score >= self.threshold else (None, score)
+
+    def learn(self, fp: LayoutFingerprint, settings_name: str, table_settings: Dict[str, Any],
+              page_map: Dict[int, str], template_id: Optional[str] = None) -> TemplateProfile:
+        """记录一次成功抽取：已知模板累加次数（保留原参数与映射），新模板建档。"""
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            profiles = dict(self._load())
+            prof = profiles.get(template_id or "")
+            if prof is None:
+                d = asdict(fp)
+                d.pop("marker_pages", None)
+                prof = TemplateProfile(
+                    template_id=fp.digest, fingerprint=d, table_settings=dict(table_settings),
+                    settings_name=settings_name, page_appendix={str(p): a for p, a in sorted(page_map.items())},
+                    created_at=now,
+                )
+            prof.runs += 1
+            prof.updated_at = now
+            profiles[prof.template_id] = prof
+            try:
+                self._save(profiles)
+            except OSError:
+                pass  # 磁盘不可写：本进程内仍生效
+            self._profiles = profiles
+            return prof
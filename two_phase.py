@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+两阶段抽取：本地解析结果先行展示，LLM 结果到达后逐字段替换
+
+LLM 全量抽取要等一次完整的往返（几十秒到数分钟），而确定性抽取（run_full_extract）一两秒就能给出
+章节正文与附表。两阶段模式下：
+1. preview_from_result()：把 ExtractResult 转成与 LLM 结果相同的结构
+   （sections 按“一、…六、”映射到 SECTION_KEYS，附表1/2 按列名角色合并并对齐到 TABLE_COLUMNS，
+   附表4 宽表展开为 [{"课程名称","指标点","强度"}]），界面立即按原有标签页展示
+2. LLM 结果到达后 merge_refined()：逐字段（sections.<名称> / table1 / table2 / table4）取 LLM 的非空值，
+   LLM 缺失或为空的字段保留本地解析结果；同时返回每个字段的来源，供界面标注
+
+字段键与 incremental.ALL_KEYS 一致。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from incremental import ALL_KEYS, SECTION_KEYS
+from llm_schema import TABLE_COLUMNS
+
+LOCAL = "local"
+LLM = "llm"
+SOURCE_LABELS = {LOCAL: "📄 本地解析", LLM: "🤖 AI 抽取"}
+
+# ----------------------------
+# 确定性结果 → LLM 结构
+# ----------------------------
+def _norm(name: Any) -> str:
+    return str(name or "").replace("\n", "").replace(" ", "").strip()
+
+def align_columns(columns: Sequence[Any], target: Sequence[str]) -> Dict[int, str]:
+    """
+    确定性表格列（下标）→ TABLE_COLUMNS 列名：先按列名完全一致匹配，
+    再按“本地列名是目标列名的一部分”匹配（学分 → 课内学分、学期一 → 学期一学分分配），每列只用一次。
+    """
+    names = [_norm(c) for c in columns]
+    out: Dict[int, str] = {}
+    for i, n in enumerate(names):
+        if n in target and n not in out.values():
+            out[i] = n
+    for t in target:
+        if t in out.values():
+            continue
+        i = next((i for i, n in enumerate(names) if i not in out and len(n) >= 2 and n in t), None)
+        if i is not None:
+            out[i] = t
+    return out
+
+def _table_records(result: Any, role: str) -> List[Dict[str, str]]:
+    from table_types import table_role
+
+    target = TABLE_COLUMNS[role]
+    rows: List[Dict[str, str]] = []
+    for t in result.tables:
+        cols = t.get("columns") or []
+        if table_role(cols) != role:
+            continue
+        mapping = align_columns(cols, target)
+        for r in t.get("rows") or []:
+            rec = {c: "" for c in target}
+            for i, c in mapping.items():
+                v = r[i] if i < len(r) else ""
+                rec[c] = "" if v is None else str(v)
+            if any(rec.values()):
+                rows.append(rec)
+    return rows
+
+def preview_from_result(result: Any) -> Dict[str, Any]:
+    """ExtractResult → {"sections", "table1", "table2", "table4"}（与 LLM 结果结构相同）。"""
+    from support_matrix import SupportMatrix
+
+    sections: Dict[str, str] = {}
+    for title, text in (result.sections or {}).items():
+        num = title.split("、", 1)[0].strip()
+        name = SECTION_KEYS.get(num)
+        if name and text and name not in sections:
+            sections[name] = text
+    return {
+        "sections": sections,
+        "table1": _table_records(result, "table1"),
+        "table2": _table_records(result, "table2"),
+        "table4": SupportMatrix.from_result(result).to_records(),
+    }
+
+# ----------------------------
+# 合并与来源
+# ----------------------------
+def _get(data: Optional[Dict[str, Any]], key: str) -> Any:
+    if not data:
+        return None
+    if key.startswith("sections."):
+        return (data.get("sections") or {}).get(key[len("sections."):])
+    return data.get(key)
+
+def merge_refined(local: Optional[Dict[str, Any]],
+                  refined: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    逐字段合并：refined（LLM）非空的字段取 refined，否则保留 local（本地解析）。
+    返回 (合并结果, {字段键: LOCAL / LLM})；两边都没有的字段不出现在来源中。
+    """
+    merged: Dict[str, Any] = dict(refined or {})
+    merged["sections"] = dict((refined or {}).get("sections") or {})
+    sources: Dict[str, str] = {}
+    for key in ALL_KEYS:
+        new, old = _get(refined, key), _get(local, key)
+        if new:
+            sources[key] = LLM
+            continue
+        if not old:
+            continue
+        sources[key] = LOCAL
+        if key.startswith("sections."):
+            merged["sections"][key[len("sections."):]] = old
+        else:
+            merged[key] = old
+    for t in TABLE_COLUMNS:
+        merged.setdefault(t, [])
+    return merged, sources
+
+def local_sources(preview: Dict[str, Any]) -> Dict[str, str]:
+    """预览阶段：所有非空字段都来自本地解析。"""
+    return merge_refined(preview, None)[1]
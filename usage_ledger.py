@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+Token / 费用台账与调用前预算检查
+
+以前只能从 429 得知某个 Key 的配额用完了。这里把每次 call_llm_core 返回的 usage
+（Gemini 的 usage_metadata / OpenAI 兼容接口的 usage）按 日期 × 供应商 × Key 累计到本地 SQLite：
+- Key 只保存 SHA-256 前 12 位（key_id），不落盘明文
+- 费用按 PRICES（美元 / 百万 token，估算值）折算，模型不在表中时只记 token
+- 发请求前 reserve()：按提示词长度估算本次消耗，加上当天已用量与其他进行中请求的预占量，
+  超过预算即抛出 BudgetExceededError（轮换模式下换下一个 Key，手动 Key 直接报错，不发请求）；
+  请求结束后 settle() 以实际 usage 入账并释放预占
+- 请求失败（429 / 配额 / 网络等）时 fail() 同样计 1 次请求并记入 failures（限流类另计 rate_limited），
+  不计 token：这些请求同样消耗了供应商的请求配额，预算与用量面板都应看得到
+
+预算（不设置即不限制，也可在构造 UsageLedger 时传入 Budget）：
+- TAS_BUDGET_KEY_TOKENS：单个 Key 每天 token 上限（输入 + 输出）
+- TAS_BUDGET_KEY_REQUESTS：单个 Key 每天请求次数上限
+- TAS_BUDGET_DAILY_USD：单个供应商每天费用上限（美元）
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from prompt_cache import estimate_tokens
+
+DEFAULT_USAGE_DB = os.environ.get(
+    "TAS_USAGE_DB",
+    os.path.join(os.path.expanduser("~"), ".cache", "teaching-agent-suite", "usage.sqlite3"),
+)
+
+# 美元 / 百万 token（输入, 输出），公开价目的估算值，按需修改
+PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "deepseek-chat": (0.27, 1.10),
+    "moonshot-v1-8k": (1.65, 1.65),
+    "glm-4": (13.7, 13.7),
+    "yi-34b-chat-0205": (0.35, 0.35),
+    "qwen-plus": (0.11, 0.28),
+    "doubao-pro-32k": (0.11, 0.28),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    day               TEXT NOT NULL,
+    provider          TEXT NOT NULL,
+    key_id            TEXT NOT NULL,
+    model             TEXT NOT NULL DEFAULT '',
+    requests          INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens     INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens     INTEGER NOT NULL DEFAULT 0,
+    cost_usd          REAL NOT NULL DEFAULT 0,
+    failures          INTEGER NOT NULL DEFAULT 0,
+    rate_limited      INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, provider, key_id)
+);
+"""
+
+# 旧版台账文件没有的列：打开时补上
+_ADDED_COLUMNS = {"failures": "INTEGER NOT NULL DEFAULT 0", "rate_limited": "INTEGER NOT NULL DEFAULT 0"}
+
+_RATE_LIMIT_MARKERS = ("429", "quota", "rate limit", "rate_limit", "resource_exhausted", "resource exhausted")
+
+class BudgetExceededError(Exception):
+    """预计本次请求会超出预算（请求尚未发出）。"""
+
+def _env_number(name: str) -> Optional[float]:
+    v = os.environ.get(name, "").strip()
+    return float(v) if v else None
+
+@dataclass(frozen=True)
+class Budget:
+    key_tokens: Optional[float] = None     # 单 Key 每天 token
+    key_requests: Optional[float] = None   # 单 Key 每天请求数
+    daily_usd: Optional[float] = None      # 单供应商每天费用
+
+    @classmethod
+    def from_env(cls) -> "Budget":
+        return cls(
+            key_tokens=_env_number("TAS_BUDGET_KEY_TOKENS"),
+            key_requests=_env_number("TAS_BUDGET_KEY_REQUESTS"),
+            daily_usd=_env_number("TAS_BUDGET_DAILY_USD"),
+        )
+
+# ----------------------------
+# usage 解析与估算
+# ----------------------------
+def key_id(api_key: str) -> str:
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+
+def today() -> str:
+    return datetime.now().strftime("%Y-%m-%d")
+
+def tokens_from_usage(usage: Any) -> Tuple[int, int]:
+    """(输入 token, 输出 token)；兼容 Gemini usage_metadata 与 OpenAI usage（对象或 dict）。"""
+    if usage is None:
+        return 0, 0
+    get = usage.get if isinstance(usage, dict) else (lambda k, d=None: getattr(usage, k, d))
+    prompt = get("prompt_tokens") or get("prompt_token_count") or 0
+    completion = get("completion_tokens") or get("candidates_token_count") or 0
+    return int(prompt), int(completion)
+
+def estimate_request(prompt_text: str) -> Tuple[int, int]:
+    """(预计输入, 预计输出)：抽取结果的长度与输入同量级，输出按输入的一半、至少 1024 估计。"""
+    p = estimate_tokens(prompt_text or "")
+    return p, max(1024, p // 2)
+
+def is_rate_limit(error: BaseException) -> bool:
+    """429 / 配额 / 限流类错误（各供应商 SDK 的异常类型不同，按消息判断）。"""
+    msg = str(error).lower()
+    return any(m in msg for m in _RATE_LIMIT_MARKERS)
+
+def cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    price_in, price_out = PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+
+# ----------------------------
+# 台账
+# ----------------------------
+@dataclass
+class Reservation:
+    id: int
+    day: str
+    provider: str
+    key_id: str
+    model: str
+    tokens: int
+    cost_usd: float
+    settled: bool = False   # 已入账（settle / fail），之后的异常不再重复计数
+
+class UsageLedger:
+    """
+    单文件 SQLite（WAL），连接按线程创建；多个进程（例如 extract_service 的工作进程）可共用同一文件。
+    预占量只在本进程内可见。
+    """
+
+    def __init__(self, path: str = DEFAULT_USAGE_DB, budget: Optional[Budget] = None):
+        self.path = path
+        self.budget = budget if budget is not None else Budget.from_env()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Reservation] = {}
+        self._ids = itertools.count(1)
+        self._ready = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._ready or self.path == ":memory:":
+                conn.executescript(SCHEMA)
+                have = {r["name"] for r in conn.execute("PRAGMA table_info(usage)")}
+                for col, decl in _ADDED_COLUMNS.items():
+                    if col not in have:
+                        conn.execute(f"ALTER TABLE usage ADD COLUMN {col} {decl}")
+                self._ready = True
+            self._local.conn = conn
+        return conn
+
+    # ---- 预算检查
+    def reserve(self, provider: str, api_key: str, model: str, prompt_text: str) -> Reservation:
+        """估算本次消耗并预占；超出预算时抛出 BudgetExceededError。"""
+        p, c = estimate_request(prompt_text)
+        res = Reservation(0, today(), provider, key_id(api_key), model, p + c, cost_usd(model, p, c))
+        b = self.budget
+        with self._lock:
+            if b.key_tokens is not None or b.key_requests is not None or b.daily_usd is not None:
+                used = self.key_usage(res.day, provider, res.key_id)
+                day_cost = sum(r["cost_usd"] for r in self.usage(res.day, provider))
+                pending = [r for r in self._pending.values() if r.day == res.day and r.provider == provider]
+                mine = [r for r in pending if r.key_id == res.key_id]
+                tokens = used["prompt_tokens"] + used["completion_tokens"] + sum(r.tokens for r in mine) + res.tokens
+                requests = used["requests"] + len(mine) + 1
+                cost = day_cost + sum(r.cost_usd for r in pending) + res.cost_usd
+                if b.key_tokens is not None and tokens > b.key_tokens:
+                    raise BudgetExceededError(
+                        f"Key {res.key_id[:6]} 今日 token 预计 {tokens:,} 超过预算 {b.key_tokens:,.0f}")
+                if b.key_requests is not None and requests > b.key_requests:
+                    raise BudgetExceededError(
+                        f"Key {res.key_id[:6]} 今日请求数将达 {requests} 次，超过预算 {b.key_requests:.0f}")
+                if b.daily_usd is not None and cost > b.daily_usd:
+                    raise BudgetExceededError(
+                        f"{provider} 今日费用预计 ${cost:.2f} 超过预算 ${b.daily_usd:.2f}")
+            res.id = next(self._ids)
+            self._pending[res.id] = res
+        return res
+
+    def release(self, res: Optional[Reservation]) -> None:
+        if res is not None:
+            with self._lock:
+                self._pending.pop(res.id, None)
+
+    # ---- 入账
+    def record(self, provider: str, api_key: str, model: str, usage: Any, cached_tokens: int = 0,
+               day: Optional[str] = None, error: Optional[BaseException] = None) -> Dict[str, Any]:
+        """
+        按实际 usage 入账（响应不带 usage 时只计 1 次请求），返回本次记录。
+        error：失败的请求，计 1 次请求与 1 次失败（限流类另计 rate_limited）。
+        """
+        p, c = tokens_from_usage(usage)
+        row = {"day": day or today(), "provider": provider, "key_id": key_id(api_key), "model": model,
+               "prompt_tokens": p, "completion_tokens": c, "cached_tokens": int(cached_tokens or 0),
+               "cost_usd": cost_usd(model, p, c), "failures": int(error is not None),
+               "rate_limited": int(error is not None and is_rate_limit(error))}
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO usage(day, provider, key_id, model, requests, prompt_tokens, completion_tokens, "
+                "cached_tokens, cost_usd, failures, rate_limited) VALUES (:day, :provider, :key_id, :model, 1, "
+                ":prompt_tokens, :completion_tokens, :cached_tokens, :cost_usd, :failures, :rate_limited) "
+                "ON CONFLICT(day, provider, key_id) DO UPDATE SET model = excluded.model, "
+                "requests = requests + 1, prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+                "completion_tokens = completion_tokens + excluded.completion_tokens, "
+                "cached_tokens = cached_tokens + excluded.cached_tokens, cost_usd = cost_usd + excluded.cost_usd, "
+                "failures = failures + excluded.failures, rate_limited = rate_limited + excluded.rate_limited",
+                row,
+            )
+        return row
+
+    def settle(self, res: Optional[Reservation], api_key: str, usage: Any, cached_tokens: int = 0) -> Dict[str, Any]:
+        """释放预占并以实际用量入账（记在预占时的日期上）。"""
+        self.release(res)
+        res.settled = True
+        return self.record(res.provider, api_key, res.model, usage, cached_tokens, day=res.day)
+
+    def fail(self, res: Optional[Reservation], api_key: str, error: BaseException) -> Optional[Dict[str, Any]]:
+        """请求失败：释放预占，尚未入账时记 1 次失败的请求（不计 token）。"""
+        self.release(res)
+        if res is None or res.settled:
+            return None
+        res.settled = True
+        return self.record(res.provider, api_key, res.model, None, day=res.day, error=error)
+
+    # ---- 查询
+    def usage(self, day: Optional[str] = None, provider: Optional[str] = None) -> List[Dict[str, Any]]:
+        sql, args = "SELECT * FROM usage WHERE day = ?", [day or today()]
+        if provider is not None:
+            sql += " AND provider = ?"
+            args.append(provider)
+        return [dict(r) for r in self._conn().execute(sql + " ORDER BY provider, key_id", args).fetchall()]
+
+    def key_usage(self, day: str, provider: str, kid: str) -> Dict[str, Any]:
+        row = self._conn().execute(
+            "SELECT * FROM usage WHERE day = ? AND provider = ? AND key_id = ?", (day, provider, kid)
+        ).fetchone()
+        if row is None:
+            return {"day": day, "provider": provider, "key_id": kid, "requests": 0, "prompt_tokens": 0,
+                    "completion_tokens": 0, "cached_tokens": 0, "cost_usd": 0.0, "failures": 0, "rate_limited": 0}
+        return dict(row)